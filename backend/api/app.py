@@ -1,7 +1,8 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
+import itertools
 import json
 
 import sys
@@ -13,20 +14,150 @@ sys.path.append(parent_dir)
 
 # Now use the backend prefix consistently
 from backend.core.calculators import calculate_annuity_payment, generate_payment_schedule, calculate_total_interest, calculate_total_payments
-from backend.core.forecast import forecast_property_value
-from backend.core.comparison import calculate_rent_vs_buy
-from backend.core.currency import calculate_mortgage_in_multiple_currencies, convert_currency
+from backend.core.calculators import calculate_loan_state, generate_payment_schedule_cents, generate_payment_schedules
+from backend.core.amortization import ROUNDING_RULES, compounds_per_payment, payments_by_month, payments_per_year, period_to_month
+from backend.core.kernels import select_backend
+from backend.core.incremental import ScenarioCache, apply_delta, build_snapshot, normalize_scenario, scenario_hash
+from backend.core.forecast import PROPERTY_SEASONAL_FACTORS, forecast_property_value, forecast_property_values
+from backend.core.model_cache import ModelCache
+from backend.core.comparison import DEFAULT_PERCENTILES, rent_vs_buy_summary, simulate_rent_vs_buy, summarize_break_even
+from backend.core.currency import convert_currency, currency_summary
+from backend.core.downsampling import lttb_indices
+from backend.core.rates import get_rate_store
+from backend.core.sensitivities import calculate_sensitivities
 from backend.core.scenarios import (
     calculate_early_repayment,
+    calculate_early_repayment_plans,
     calculate_restructuring,
+    calculate_restructuring_options,
     calculate_with_insurance,
-    calculate_with_central_bank_rate
+    calculate_with_central_bank_rate,
+    floating_rate_changes
 )
+from backend.api.schemas import ADMISSION_RULES, MAX_SIMULATION_PATHS
+from backend.api.utils.admission import init_admission
+from backend.api.utils.compression import init_compression
+from backend.api.utils.metrics import KERNEL_BACKEND, init_metrics, record_cache_lookup, stage
+from backend.api.utils.pools import get_scenario_pool
+from backend.api.utils.profiling import init_profiling
+from backend.api.utils.export import (
+    EXPORT_COMPRESSIONS,
+    EXPORT_FORMATS,
+    batch_chunks,
+    csv_stream,
+    parquet_available,
+    parquet_stream,
+    schedule_chunks
+)
+from backend.api.utils.serialization import frame_to_records, init_json
+
+# Amount columns of a payment schedule
+AMOUNT_COLUMNS = ['payment', 'principal', 'interest', 'remaining_loan']
+# Response keys of the common schedule columns
+SCHEDULE_FIELDS = {
+    'month': 'month',
+    'payment': 'payment',
+    'principal': 'principal',
+    'interest': 'interest',
+    'remainingLoan': 'remaining_loan'
+}
+
+
+# Response keys of the quantities of /api/sensitivities, and of their values and derivatives
+SENSITIVITY_QUANTITIES = {
+    'payment': 'payment',
+    'totalInterest': 'total_interest',
+    'remainingLoan': 'remaining_loan'
+}
+SENSITIVITY_FIELDS = {
+    'value': 'value',
+    'dRate': 'rate',
+    'dTerm': 'term',
+    'dPrincipal': 'principal'
+}
+
+
+# Response keys of the rows of /api/compare
+COMPARISON_FIELDS = {
+    'month': 'month',
+    'mortgagePayment': 'mortgage_payment',
+    'propertyTax': 'property_tax',
+    'maintenance': 'maintenance',
+    'rentalIncome': 'rental_income',
+    'taxBenefit': 'tax_benefit',
+    'totalBuyCost': 'total_buy_cost',
+    'rentPayment': 'rent_payment',
+    'opportunityCost': 'opportunity_cost',
+    'totalRentCost': 'total_rent_cost',
+    'propertyValue': 'property_value',
+    'propertyRealValue': 'property_real_value',
+    'propertyEquity': 'property_equity',
+    'investmentValue': 'investment_value',
+    'netWorthBuy': 'net_worth_buy',
+    'netWorthRent': 'net_worth_rent',
+    'breakEven': 'break_even'
+}
+
+
+def chart_rows(table, columns, max_points, keep=None):
+    """
+    Rows of a monthly table kept to chart its columns with at most `max_points` points
+
+    Returns None (all rows) when `max_points` is not given. The first and
+    last months and the `keep` rows are always kept; see
+    downsampling.lttb_indices.
+    """
+    if not max_points:
+        return None
+    series = np.vstack([np.asarray(table[column], dtype=float) for column in columns])
+    return lttb_indices(np.asarray(table['month']), series, max_points, keep)
+
+
+def changes(values):
+    """
+    Rows where a flag or the sign of a series differs from the previous row
+    """
+    values = np.asarray(values)
+    if values.dtype != bool:
+        values = values >= 0
+    return np.flatnonzero(values[1:] != values[:-1]) + 1
+
+
+def payment_frequency(data):
+    """
+    Payment frequency and compounding convention of a request body
+    """
+    return data.get('paymentFrequency') or 'monthly', data.get('compounding') or 'payment'
+
+
+def schedule_fields(fields, frequency):
+    """
+    Response keys of schedule columns; rows are numbered by 'period' rather
+    than 'month' when payments are not monthly
+    """
+    if frequency == 'monthly':
+        return fields
+    return {('period' if key == 'month' else key): column for key, column in fields.items()}
+
 
 def create_app():
     # Initialize the application
     app = Flask(__name__)
     CORS(app)  # Allow cross-domain requests
+    init_profiling(app)  # Per-request profiles when MORTGAGE_PROFILE_TOKEN is set
+    init_metrics(app)  # Request latency and stage timings at /metrics
+    init_admission(app, ADMISSION_RULES)  # Validation, cost budgets and per-client limits
+    init_json(app)  # orjson when installed, NumPy-aware either way
+    init_compression(app)  # gzip/brotli bodies above a size threshold
+
+    # Load and compile the kernels before the first request
+    KERNEL_BACKEND.set(1, select_backend().NAME)
+
+    # Composite scenario snapshots, for incremental recomputation of edits
+    scenario_cache = ScenarioCache()
+
+    # Fitted ml forecast models, shared on disk when MORTGAGE_MODEL_CACHE_DIR is set
+    model_cache = ModelCache(on_lookup=lambda hit: record_cache_lookup('forecast_model', hit))
     
     @app.route('/', methods=['GET'])
     def home():
@@ -36,227 +167,584 @@ def create_app():
     @app.route('/api/calculate', methods=['POST'])
     def calculate():
         try:
-            data = request.json
+            with stage('parse'):
+                data = request.json
             
-            # Extract parameters from request body
-            loan_amount = data.get('loanAmount')
-            interest_rate = data.get('interestRate')
-            loan_term_years = data.get('loanTermYears')
-            payment_type = data.get('paymentType', 'annuity')
+                # Extract parameters from request body
+                loan_amount = data.get('loanAmount')
+                interest_rate = data.get('interestRate')
+                loan_term_years = data.get('loanTermYears')
+                payment_type = data.get('paymentType', 'annuity')
+                rounding = data.get('rounding')
+                frequency, compounding = payment_frequency(data)
             
             if not all([loan_amount, interest_rate, loan_term_years]):
                 return jsonify({'error': 'Parameters loanAmount, interestRate, and loanTermYears are required.'}), 400
             
-            # Perform calculations
-            schedule = generate_payment_schedule(
-                loan_amount, interest_rate, loan_term_years, payment_type
-            )
-            
-            # Convert DataFrame to list of dictionaries
-            schedule_list = []
-            for _, row in schedule.iterrows():
-                schedule_list.append({
-                    'month': int(row['month']),
-                    'payment': float(row['payment']),
-                    'principal': float(row['principal']),
-                    'interest': float(row['interest']),
-                    'remainingLoan': float(row['remaining_loan'])
+            if rounding is not None and rounding not in ROUNDING_RULES:
+                return jsonify({'error': f'rounding must be one of {", ".join(ROUNDING_RULES)}.'}), 400
+            
+            with stage('compute'):
+                # Perform calculations
+                if rounding is None:
+                    schedule = generate_payment_schedule(
+                        loan_amount, interest_rate, loan_term_years, payment_type,
+                        frequency=frequency, compounding=compounding
+                    )
+                else:
+                    # Exact cents: totals are summed as integers, then converted to currency units
+                    schedule = generate_payment_schedule_cents(
+                        loan_amount, interest_rate, loan_term_years, payment_type, rounding,
+                        frequency, compounding
+                    )
+                    total_interest_cents = int(calculate_total_interest(schedule))
+                    total_payments_cents = int(calculate_total_payments(schedule))
+                    schedule = schedule.with_columns(**{name: schedule[name] / 100 for name in AMOUNT_COLUMNS})
+            
+            with stage('serialize'):
+                # Convert schedule columns to list of dictionaries
+                schedule_list = frame_to_records(schedule, schedule_fields(SCHEDULE_FIELDS, frequency))
+            
+                # Calculate total values
+                if rounding is None:
+                    total_interest = float(calculate_total_interest(schedule))
+                    total_payments = float(calculate_total_payments(schedule))
+                else:
+                    total_interest = total_interest_cents / 100
+                    total_payments = total_payments_cents / 100
+            
+                return jsonify({
+                    'schedule': schedule_list,
+                    'totalInterest': total_interest,
+                    'totalPayments': total_payments,
+                    'paymentFrequency': frequency
                 })
-            
-            # Calculate total values
-            total_interest = float(calculate_total_interest(schedule))
-            total_payments = float(calculate_total_payments(schedule))
-            
-            return jsonify({
-                'schedule': schedule_list,
-                'totalInterest': total_interest,
-                'totalPayments': total_payments
-            })
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @app.route('/api/calculate/batch', methods=['POST'])
+    def calculate_batch():
+        try:
+            with stage('parse'):
+                data = request.json
+            
+                loans = data.get('loans')
+                payment_type = data.get('paymentType', 'annuity')
+                rounding = data.get('rounding')
+                include_schedules = data.get('includeSchedules', False)
+                frequency, compounding = payment_frequency(data)
+            
+                if not loans or not all(
+                        loan.get('loanAmount') and loan.get('interestRate') is not None and loan.get('loanTermYears')
+                        for loan in loans):
+                    return jsonify({'error': 'Parameter loans is required; each loan needs loanAmount, interestRate and loanTermYears.'}), 400
+            
+                if rounding is not None and rounding not in ROUNDING_RULES:
+                    return jsonify({'error': f'rounding must be one of {", ".join(ROUNDING_RULES)}.'}), 400
+            
+                loan_amounts = [loan['loanAmount'] for loan in loans]
+                interest_rates = [loan['interestRate'] for loan in loans]
+                loan_terms_years = [loan['loanTermYears'] for loan in loans]
+            
+            with stage('compute'):
+                # All schedules in one set of (loans x payments) matrices
+                schedules = generate_payment_schedules(
+                    loan_amounts, interest_rates, loan_terms_years, payment_type, rounding,
+                    frequency, compounding
+                )
+                months = schedules.pop('months')
+                totals = {name: schedules[name].sum(axis=1) for name in ('payment', 'interest')}
+                if rounding is not None:
+                    # Integer cent sums are exact; convert to currency units once
+                    schedules = {name: values / 100 for name, values in schedules.items()}
+                    totals = {name: values / 100 for name, values in totals.items()}
+            
+            with stage('serialize'):
+                # Schedule rows are NumPy arrays, encoded natively by the JSON provider
+                results = []
+                for i, term in enumerate(months.tolist()):
+                    result = {
+                        'monthlyPayment': float(schedules['payment'][i, 0]),
+                        'totalInterest': float(totals['interest'][i]),
+                        'totalPayments': float(totals['payment'][i]),
+                        'termMonths': period_to_month(term, frequency)
+                    }
+                    if include_schedules:
+                        result['schedule'] = {
+                            'payment': schedules['payment'][i, :term],
+                            'principal': schedules['principal'][i, :term],
+                            'interest': schedules['interest'][i, :term],
+                            'remainingLoan': schedules['remaining_loan'][i, :term]
+                        }
+                    results.append(result)
+            
+                return jsonify({'results': results, 'paymentFrequency': frequency})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @app.route('/api/query', methods=['POST'])
+    def query_loans():
+        try:
+            with stage('parse'):
+                data = request.json
+            
+                loans = data.get('loans')
+                months = data.get('months')
+                payment_type = data.get('paymentType', 'annuity')
+            
+                if not loans or not all(
+                        loan.get('loanAmount') and loan.get('interestRate') is not None and loan.get('loanTermYears')
+                        for loan in loans):
+                    return jsonify({'error': 'Parameter loans is required; each loan needs loanAmount, interestRate and loanTermYears.'}), 400
+            
+                if not months or not all(isinstance(month, int) and month >= 0 for month in months):
+                    return jsonify({'error': 'Parameter months must be a list of non-negative integers.'}), 400
+            
+                loan_amounts = [loan['loanAmount'] for loan in loans]
+                interest_rates = [loan['interestRate'] for loan in loans]
+                loan_terms_years = [loan['loanTermYears'] for loan in loans]
+                payment_types = [loan.get('paymentType', payment_type) for loan in loans]
+                frequency, compounding = payment_frequency(data)
+            
+            with stage('compute'):
+                # Closed-form state of every loan at every month, no schedules built
+                state = calculate_loan_state(
+                    loan_amounts, interest_rates, loan_terms_years, months, payment_types,
+                    frequency, compounding
+                )
+            
+            with stage('serialize'):
+                results = [
+                    {
+                        'remainingLoan': remaining,
+                        'cumulativeInterest': interest,
+                        'cumulativePrincipal': principal
+                    }
+                    for remaining, interest, principal in zip(
+                        state['remaining_loan'].tolist(),
+                        state['cumulative_interest'].tolist(),
+                        state['cumulative_principal'].tolist()
+                    )
+                ]
+            
+                return jsonify({'months': months, 'results': results})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+    @app.route('/api/sensitivities', methods=['POST'])
+    def loan_sensitivities():
+        try:
+            with stage('parse'):
+                data = request.json
+            
+                loans = data.get('loans')
+                months = data.get('months')
+            
+                if not loans or not all(
+                        loan.get('loanAmount') and loan.get('interestRate') is not None and loan.get('loanTermYears')
+                        for loan in loans):
+                    return jsonify({'error': 'Parameter loans is required; each loan needs loanAmount, interestRate and loanTermYears.'}), 400
+            
+                if months is not None and not all(isinstance(month, int) and month >= 0 for month in months):
+                    return jsonify({'error': 'Parameter months must be a list of non-negative integers.'}), 400
+            
+                frequency, compounding = payment_frequency(data)
+            
+            with stage('compute'):
+                # Closed-form derivatives of every annuity loan, no bumped recalculations
+                sensitivities = calculate_sensitivities(
+                    [loan['loanAmount'] for loan in loans],
+                    [loan['interestRate'] for loan in loans],
+                    [loan['loanTermYears'] for loan in loans],
+                    months, frequency, compounding
+                )
+            
+            with stage('serialize'):
+                # One list per quantity and derivative, then one dict per loan
+                columns = {
+                    quantity: {key: sensitivities[name][column].tolist() for key, column in SENSITIVITY_FIELDS.items()}
+                    for quantity, name in SENSITIVITY_QUANTITIES.items()
+                    if name in sensitivities
+                }
+                results = [
+                    {
+                        quantity: {key: values[i] for key, values in fields.items()}
+                        for quantity, fields in columns.items()
+                    }
+                    for i in range(len(loans))
+                ]
+            
+                return jsonify({'months': months, 'results': results, 'paymentFrequency': frequency})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Server error: {str(e)}'}), 500
     
     @app.route('/api/forecast', methods=['POST'])
     def property_forecast():
         try:
-            data = request.json
-            
-            # Extract parameters from request body
-            initial_value = data.get('initialValue')
-            growth_rate = data.get('growthRate')
-            years = data.get('years')
-            seasonal_factors = data.get('seasonalFactors')
-            regional_adjustment = data.get('regionalAdjustment', 0)
-            inflation_rate = data.get('inflationRate', 0)
-            model = data.get('model', 'linear')
+            with stage('parse'):
+                data = request.json
+            
+                # Extract parameters from request body
+                initial_value = data.get('initialValue')
+                growth_rate = data.get('growthRate')
+                years = data.get('years')
+                seasonal_factors = data.get('seasonalFactors')
+                regional_adjustment = data.get('regionalAdjustment', 0)
+                inflation_rate = data.get('inflationRate', 0)
+                model = data.get('model', 'linear')
+                seed = data.get('seed', 0)
             
             if not all([initial_value, growth_rate, years]):
                 return jsonify({'error': 'Parameters initialValue, growthRate and years are required.'}), 400
             
-            # Calculate forecast
-            forecast_df = forecast_property_value(
-                initial_value, growth_rate, years, seasonal_factors,
-                regional_adjustment, inflation_rate, model
-            )
-            
-            # Convert DataFrame to list of dictionaries
-            forecast_list = []
-            for _, row in forecast_df.iterrows():
-                forecast_list.append({
-                    'month': int(row['month']),
-                    'nominalValue': float(row['nominal_value']),
-                    'realValue': float(row['real_value'])
+            with stage('compute'):
+                # Calculate forecast
+                forecast_df = forecast_property_value(
+                    initial_value, growth_rate, years, seasonal_factors,
+                    regional_adjustment, inflation_rate, model, seed, model_cache
+                )
+            
+            with stage('serialize'):
+                # Convert DataFrame to list of dictionaries
+                forecast_list = frame_to_records(forecast_df, {
+                    'month': 'month',
+                    'nominalValue': 'nominal_value',
+                    'realValue': 'real_value'
                 })
             
-            # Final values
-            final_nominal_value = float(forecast_df.iloc[-1]['nominal_value'])
-            final_real_value = float(forecast_df.iloc[-1]['real_value'])
-            total_growth = final_nominal_value / initial_value - 1
-            real_growth = final_real_value / initial_value - 1
-            
-            return jsonify({
-                'forecast': forecast_list,
-                'finalNominalValue': final_nominal_value,
-                'finalRealValue': final_real_value,
-                'totalGrowth': total_growth,
-                'realGrowth': real_growth
-            })
+                # Final values
+                final_nominal_value = float(forecast_df.iloc[-1]['nominal_value'])
+                final_real_value = float(forecast_df.iloc[-1]['real_value'])
+                total_growth = final_nominal_value / initial_value - 1
+                real_growth = final_real_value / initial_value - 1
+            
+                return jsonify({
+                    'forecast': forecast_list,
+                    'finalNominalValue': final_nominal_value,
+                    'finalRealValue': final_real_value,
+                    'totalGrowth': total_growth,
+                    'realGrowth': real_growth
+                })
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @app.route('/api/forecast/batch', methods=['POST'])
+    def property_forecast_batch():
+        try:
+            with stage('parse'):
+                data = request.json
+            
+                properties = data.get('properties')
+                regions = data.get('regions')
+                years = data.get('years')
+                growth_rate = data.get('growthRate')
+                inflation_rate = data.get('inflationRate', 0)
+                model = data.get('model', 'linear')
+                include_forecasts = data.get('includeForecasts', False)
+                seed = data.get('seed', 0)
+            
+                if not properties or not regions or not years or not all(
+                        prop.get('initialValue') and prop.get('region') is not None for prop in properties):
+                    return jsonify({'error': 'Parameters properties, regions and years are required; each property needs initialValue and region.'}), 400
+            
+                unknown = {prop['region'] for prop in properties} - set(regions)
+                if unknown:
+                    return jsonify({'error': f'Unknown regions: {", ".join(sorted(map(str, unknown)))}.'}), 400
+            
+                # Per-region parameters, falling back to the request-wide growth rate
+                region_names = list(regions)
+                growth_rates = [regions[name].get('growthRate', growth_rate) for name in region_names]
+                if any(rate is None for rate in growth_rates):
+                    return jsonify({'error': 'Every region needs a growthRate when no default growthRate is given.'}), 400
+                regional_adjustments = [regions[name].get('regionalAdjustment', 0) for name in region_names]
+                seasonal_factors = [regions[name].get('seasonalFactors') or PROPERTY_SEASONAL_FACTORS
+                                    for name in region_names]
+                if any(len(factors) != 12 for factors in seasonal_factors):
+                    return jsonify({'error': 'seasonalFactors must have 12 values.'}), 400
+            
+                region_index = {name: i for i, name in enumerate(region_names)}
+                initial_values = [prop['initialValue'] for prop in properties]
+                property_regions = [region_index[prop['region']] for prop in properties]
+            
+            with stage('compute'):
+                # All properties as one (properties x months) matrix, one curve per distinct region
+                forecast = forecast_property_values(
+                    initial_values, property_regions, growth_rates, years, seasonal_factors,
+                    regional_adjustments, inflation_rate, model, seed, model_cache
+                )
+                nominal_values = forecast['nominal_value']
+                real_values = forecast['real_value']
+            
+            with stage('serialize'):
+                results = []
+                for i, (initial_value, final_nominal_value, final_real_value) in enumerate(zip(
+                        initial_values, nominal_values[:, -1].tolist(), real_values[:, -1].tolist())):
+                    result = {
+                        'finalNominalValue': final_nominal_value,
+                        'finalRealValue': final_real_value,
+                        'totalGrowth': final_nominal_value / initial_value - 1,
+                        'realGrowth': final_real_value / initial_value - 1
+                    }
+                    if include_forecasts:
+                        result['forecast'] = {
+                            'nominalValue': nominal_values[i],
+                            'realValue': real_values[i]
+                        }
+                    results.append(result)
+            
+                return jsonify({
+                    'results': results,
+                    'months': int(len(forecast['month'])),
+                    'regionCurves': forecast['curves']
+                })
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Server error: {str(e)}'}), 500
     
     @app.route('/api/compare', methods=['POST'])
     def rent_vs_buy():
         try:
-            data = request.json
-            
-            # Extract parameters from request body
-            property_value = data.get('propertyValue')
-            down_payment = data.get('downPayment')
-            interest_rate = data.get('interestRate')
-            loan_term_years = data.get('loanTermYears')
-            monthly_rent = data.get('monthlyRent')
-            rent_growth_rate = data.get('rentGrowthRate')
-            property_growth_rate = data.get('propertyGrowthRate')
-            maintenance_cost_percent = data.get('maintenanceCostPercent')
-            property_tax_percent = data.get('propertyTaxPercent')
-            rental_income = data.get('rentalIncome', 0)
-            tax_benefit_rate = data.get('taxBenefitRate', 0)
-            inflation_rate = data.get('inflationRate', 0)
-            opportunity_cost_rate = data.get('opportunityCostRate', 0)
+            with stage('parse'):
+                data = request.json
+            
+                # Extract parameters from request body
+                property_value = data.get('propertyValue')
+                down_payment = data.get('downPayment')
+                interest_rate = data.get('interestRate')
+                loan_term_years = data.get('loanTermYears')
+                monthly_rent = data.get('monthlyRent')
+                rent_growth_rate = data.get('rentGrowthRate')
+                property_growth_rate = data.get('propertyGrowthRate')
+                maintenance_cost_percent = data.get('maintenanceCostPercent')
+                property_tax_percent = data.get('propertyTaxPercent')
+                rental_income = data.get('rentalIncome', 0)
+                tax_benefit_rate = data.get('taxBenefitRate', 0)
+                inflation_rate = data.get('inflationRate', 0)
+                opportunity_cost_rate = data.get('opportunityCostRate', 0)
+                max_points = data.get('maxPoints')
             
             if not all([property_value, down_payment, interest_rate, loan_term_years, 
                     monthly_rent, rent_growth_rate, property_growth_rate,
                     maintenance_cost_percent, property_tax_percent]):
                 return jsonify({'error': 'Missing required parameters.'}), 400
             
-            # Calculate comparison
-            comparison_df = calculate_rent_vs_buy(
-                property_value, down_payment, interest_rate, loan_term_years,
-                monthly_rent, rent_growth_rate, property_growth_rate,
-                maintenance_cost_percent, property_tax_percent,
-                rental_income, tax_benefit_rate, inflation_rate,
-                opportunity_cost_rate
-            )
-            
-            # Convert DataFrame to list of dictionaries
-            comparison_list = []
-            for _, row in comparison_df.iterrows():
-                comparison_list.append({
-                    'month': int(row['month']),
-                    'mortgagePayment': float(row['mortgage_payment']),
-                    'propertyTax': float(row['property_tax']),
-                    'maintenance': float(row['maintenance']),
-                    'rentalIncome': float(row['rental_income']),
-                    'taxBenefit': float(row['tax_benefit']),
-                    'totalBuyCost': float(row['total_buy_cost']),
-                    'rentPayment': float(row['rent_payment']),
-                    'opportunityCost': float(row['opportunity_cost']),
-                    'totalRentCost': float(row['total_rent_cost']),
-                    'propertyValue': float(row['property_value']),
-                    'propertyRealValue': float(row['property_real_value']),
-                    'propertyEquity': float(row['property_equity']),
-                    'investmentValue': float(row['investment_value']),
-                    'netWorthBuy': float(row['net_worth_buy']),
-                    'netWorthRent': float(row['net_worth_rent']),
-                    'breakEven': bool(row['break_even'])
+            with stage('compute'):
+                # Stream the comparison: key metrics are aggregated block by block,
+                # and only the charted columns are kept for every month
+                summary = rent_vs_buy_summary(
+                    property_value, down_payment, interest_rate, loan_term_years,
+                    monthly_rent, rent_growth_rate, property_growth_rate,
+                    maintenance_cost_percent, property_tax_percent,
+                    rental_income, tax_benefit_rate, inflation_rate,
+                    opportunity_cost_rate, columns=COMPARISON_FIELDS.values()
+                )
+                comparison = summary['comparison']
+            
+            with stage('serialize'):
+                # Rows charted: all, or at most maxPoints keeping the break-even changes
+                rows = chart_rows(
+                    comparison, [column for column in COMPARISON_FIELDS.values()
+                                 if column not in ('month', 'break_even')],
+                    max_points, changes(comparison['break_even']))
+                comparison_list = frame_to_records(comparison, COMPARISON_FIELDS, rows)
+            
+                # Key metrics for the result
+                break_even_month = summary['break_even_month']
+                break_even_years = break_even_month / 12 if break_even_month is not None else None
+            
+                total_buy_costs = summary['total_buy_costs']
+                total_rent_costs = summary['total_rent_costs']
+            
+                final_property_value = summary['final_property_value']
+                final_investment_value = summary['final_investment_value']
+            
+                buy_position = final_property_value - total_buy_costs
+                rent_position = final_investment_value - total_rent_costs
+            
+                return jsonify({
+                    'comparison': comparison_list,
+                    'breakEvenMonth': break_even_month,
+                    'breakEvenYears': break_even_years,
+                    'totalBuyCosts': total_buy_costs,
+                    'totalRentCosts': total_rent_costs,
+                    'finalPropertyValue': final_property_value,
+                    'finalInvestmentValue': final_investment_value,
+                    'buyPosition': buy_position,
+                    'rentPosition': rent_position
                 })
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @app.route('/api/compare/simulate', methods=['POST'])
+    def rent_vs_buy_simulation():
+        try:
+            with stage('parse'):
+                data = request.json
+            
+                # Extract parameters from request body
+                property_value = data.get('propertyValue')
+                down_payment = data.get('downPayment')
+                interest_rate = data.get('interestRate')
+                loan_term_years = data.get('loanTermYears')
+                monthly_rent = data.get('monthlyRent')
+                rent_growth_rate = data.get('rentGrowthRate')
+                property_growth_rate = data.get('propertyGrowthRate')
+                maintenance_cost_percent = data.get('maintenanceCostPercent')
+                property_tax_percent = data.get('propertyTaxPercent')
+                paths = data.get('paths', 5000)
+                correlations = data.get('correlations') or {}
+                percentiles = data.get('percentiles', list(DEFAULT_PERCENTILES))
+                max_points = data.get('maxPoints')
+            
+            if not all([property_value, down_payment, interest_rate, loan_term_years,
+                    monthly_rent, rent_growth_rate, property_growth_rate,
+                    maintenance_cost_percent, property_tax_percent]):
+                return jsonify({'error': 'Missing required parameters.'}), 400
             
-            # Key metrics for the result
-            break_even_month = None
-            break_even_years = None
-            if any(comparison_df['break_even']):
-                break_even_month = int(comparison_df[comparison_df['break_even']].iloc[0]['month'])
-                break_even_years = break_even_month / 12
-            
-            total_buy_costs = float(comparison_df['total_buy_cost'].sum())
-            total_rent_costs = float(comparison_df['total_rent_cost'].sum())
-            
-            final_property_value = float(comparison_df.iloc[-1]['property_value'])
-            final_investment_value = float(comparison_df.iloc[-1]['investment_value'])
+            if not isinstance(paths, int) or not 1 <= paths <= MAX_SIMULATION_PATHS:
+                return jsonify({'error': f'paths must be an integer between 1 and {MAX_SIMULATION_PATHS}.'}), 400
             
-            buy_position = final_property_value - total_buy_costs
-            rent_position = final_investment_value - total_rent_costs
+            if not percentiles or not all(0 <= q <= 100 for q in percentiles):
+                return jsonify({'error': 'percentiles must be values between 0 and 100.'}), 400
             
-            return jsonify({
-                'comparison': comparison_list,
-                'breakEvenMonth': break_even_month,
-                'breakEvenYears': break_even_years,
-                'totalBuyCosts': total_buy_costs,
-                'totalRentCosts': total_rent_costs,
-                'finalPropertyValue': final_property_value,
-                'finalInvestmentValue': final_investment_value,
-                'buyPosition': buy_position,
-                'rentPosition': rent_position
-            })
+            with stage('compute'):
+                # Evaluate the comparison on all simulated paths at once
+                bands, break_even_months = simulate_rent_vs_buy(
+                    property_value, down_payment, interest_rate, loan_term_years,
+                    monthly_rent, rent_growth_rate, property_growth_rate,
+                    maintenance_cost_percent, property_tax_percent,
+                    data.get('rentalIncome', 0), data.get('taxBenefitRate', 0),
+                    data.get('inflationRate', 0), data.get('opportunityCostRate', 0),
+                    paths=paths,
+                    property_volatility=data.get('propertyVolatility', 5.0),
+                    rent_volatility=data.get('rentVolatility', 2.0),
+                    investment_volatility=data.get('investmentVolatility', 0.0),
+                    property_rent_correlation=correlations.get('propertyRent', 0.5),
+                    property_investment_correlation=correlations.get('propertyInvestment', 0.0),
+                    rent_investment_correlation=correlations.get('rentInvestment', 0.0),
+                    percentiles=percentiles,
+                    seed=data.get('seed')
+                )
+                break_even = summarize_break_even(break_even_months, loan_term_years, percentiles)
+            
+            with stage('serialize'):
+                # Months charted: all, or at most maxPoints keeping the crossings of the difference bands
+                band_columns = [column for column in bands.columns if column != 'month']
+                rows = chart_rows(bands, band_columns, max_points, np.concatenate([
+                    changes(bands[f'net_worth_difference_p{q:g}']) for q in percentiles]))
+                rows = slice(None) if rows is None else rows
+            
+                # Percentile bands column-wise, ready for charting
+                band_series = {}
+                for key, name in (('netWorthBuy', 'net_worth_buy'), ('netWorthRent', 'net_worth_rent'),
+                                  ('netWorthDifference', 'net_worth_difference')):
+                    band_series[key] = {f'p{q:g}': bands[f'{name}_p{q:g}'].to_numpy()[rows].tolist()
+                                        for q in percentiles}
+            
+                return jsonify({
+                    'months': bands['month'].to_numpy()[rows].tolist(),
+                    'bands': band_series,
+                    'breakEven': {
+                        'probability': break_even['probability'],
+                        'percentiles': {f'p{q:g}': month for q, month in break_even['percentiles'].items()},
+                        'byYear': break_even['by_year'].tolist()
+                    },
+                    'paths': paths
+                })
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Server error: {str(e)}'}), 500
     
     @app.route('/api/currency', methods=['POST'])
     def currency_analysis():
         try:
-            data = request.json
-            
-            loan_amount = data.get('loanAmount')
-            interest_rate = data.get('interestRate')
-            loan_term_years = data.get('loanTermYears')
-            base_currency = data.get('baseCurrency')
-            target_currencies = data.get('targetCurrencies')
-            currency_annual_change = data.get('currencyAnnualChange')
+            with stage('parse'):
+                data = request.json
+            
+                loan_amount = data.get('loanAmount')
+                interest_rate = data.get('interestRate')
+                loan_term_years = data.get('loanTermYears')
+                base_currency = data.get('baseCurrency')
+                target_currencies = data.get('targetCurrencies')
+                currency_annual_change = data.get('currencyAnnualChange')
+                start_date = data.get('startDate')
+                max_points = data.get('maxPoints')
             
             if not all([loan_amount, interest_rate, loan_term_years, base_currency, target_currencies]):
                 return jsonify({'error': 'Missing required parameters.'}), 400
             
-            # Calculate multi-currency comparison
-            currency_df = calculate_mortgage_in_multiple_currencies(
-                loan_amount, interest_rate, loan_term_years,
-                base_currency, target_currencies, currency_annual_change
-            )
-            
-            # Convert DataFrame to list of dictionaries
-            currency_list = []
-            for _, row in currency_df.iterrows():
-                entry = {'month': int(row['month'])}
-                
-                # Add payment, principal, interest, remaining for each currency
-                for currency in target_currencies:
-                    entry[f'payment_{currency}'] = float(row[f'payment_{currency}'])
-                    entry[f'principal_{currency}'] = float(row[f'principal_{currency}'])
-                    entry[f'interest_{currency}'] = float(row[f'interest_{currency}'])
-                    entry[f'remaining_{currency}'] = float(row[f'remaining_{currency}'])
-                    
-                    # Add exchange rate for non-base currencies
-                    if currency != base_currency and f'rate_{currency}' in currency_df.columns:
-                        entry[f'rate_{currency}'] = float(row[f'rate_{currency}'])
-                
-                currency_list.append(entry)
-            
-            # Calculate total interest in each currency
-            total_interest = {}
+            # Columns returned for each month
+            fields = {'month': 'month'}
             for currency in target_currencies:
-                total_interest[currency] = float(currency_df[f'interest_{currency}'].sum())
+                # Payment, principal, interest, remaining for each currency
+                for prefix in ('payment', 'principal', 'interest', 'remaining'):
+                    fields[f'{prefix}_{currency}'] = f'{prefix}_{currency}'
+            
+                # Exchange rate for non-base currencies
+                if currency != base_currency:
+                    fields[f'rate_{currency}'] = f'rate_{currency}'
+            # Months priced at historical rates, with a start date
+            historical = [f'historical_{currency}' for currency in target_currencies
+                          if currency != base_currency] if start_date is not None else []
+            
+            with stage('compute'):
+                # Stream the multi-currency schedule: totals are aggregated block by
+                # block, and only the returned columns are kept for every month
+                summary = currency_summary(
+                    loan_amount, interest_rate, loan_term_years,
+                    base_currency, target_currencies, currency_annual_change, start_date,
+                    columns=list(fields.values()) + historical
+                )
+                currency_schedule = summary['schedule']
+            
+            with stage('serialize'):
+                # Rows charted: all, or at most maxPoints keeping the last historical month
+                rows = chart_rows(
+                    currency_schedule, [column for column in fields.values() if column != 'month'], max_points,
+                    np.concatenate([changes(currency_schedule[column]) - 1 for column in historical] or [[]]))
+                currency_list = frame_to_records(currency_schedule, fields, rows)
+            
+                result = {
+                    'currencyAnalysis': currency_list,
+                    'totalInterest': summary['total_interest']
+                }
+                if start_date is not None:
+                    # Months priced at historical rates; later months are projected
+                    result['historicalMonths'] = summary['historical_months']
+            
+                return jsonify(result)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @app.route('/api/currencies', methods=['GET'])
+    def supported_currencies():
+        """List supported currencies with their rates against the requested base currency."""
+        try:
+            rate_table = get_rate_store().table()
+            base_currency = request.args.get('base', rate_table.currencies[0])
+            
+            if base_currency not in rate_table:
+                return jsonify({'error': f'Currency {base_currency} is not supported.'}), 400
             
             return jsonify({
-                'currencyAnalysis': currency_list,
-                'totalInterest': total_interest
+                'baseCurrency': base_currency,
+                'currencies': list(rate_table.currencies),
+                'rates': {
+                    currency: rate_table.rate(base_currency, currency)
+                    for currency in rate_table.currencies
+                }
             })
         except Exception as e:
             return jsonify({'error': f'Server error: {str(e)}'}), 500
@@ -264,272 +752,571 @@ def create_app():
     @app.route('/api/scenarios/early_repayment', methods=['POST'])
     def early_repayment():
         try:
-            data = request.json
+            with stage('parse'):
+                data = request.json
             
-            loan_amount = data.get('loanAmount')
-            interest_rate = data.get('interestRate')
-            loan_term_years = data.get('loanTermYears')
-            early_payments = data.get('earlyPayments', [])
+                loan_amount = data.get('loanAmount')
+                interest_rate = data.get('interestRate')
+                loan_term_years = data.get('loanTermYears')
+                early_payments = data.get('earlyPayments', [])
+                plans = data.get('plans')
+                frequency, compounding = payment_frequency(data)
             
             if not all([loan_amount, interest_rate, loan_term_years]):
                 return jsonify({'error': 'Missing required parameters.'}), 400
             
-            # Calculate schedule with early repayment
-            early_schedule = calculate_early_repayment(
-                loan_amount, interest_rate, loan_term_years, early_payments
-            )
-            
-            # Calculate regular schedule for comparison
-            regular_schedule = generate_payment_schedule(
-                loan_amount, interest_rate, loan_term_years
-            )
-            
-            # Convert to lists of dictionaries
-            early_list = []
-            for _, row in early_schedule.iterrows():
-                early_list.append({
-                    'month': int(row['month']),
-                    'payment': float(row['payment']),
-                    'principal': float(row['principal']),
-                    'interest': float(row['interest']),
-                    'earlyPayment': float(row['early_payment']),
-                    'remainingLoan': float(row['remaining_loan']),
-                    'monthlyPayment': float(row['monthly_payment'])
-                })
-            
-            regular_list = []
-            for _, row in regular_schedule.iterrows():
-                regular_list.append({
-                    'month': int(row['month']),
-                    'payment': float(row['payment']),
-                    'principal': float(row['principal']),
-                    'interest': float(row['interest']),
-                    'remainingLoan': float(row['remaining_loan'])
+            if plans is not None:
+                # Several repayment plans compared in one call
+                return early_repayment_plans(
+                    loan_amount, interest_rate, loan_term_years, plans,
+                    data.get('includeSchedules', False), frequency, compounding
+                )
+            
+            with stage('compute'):
+                # Calculate schedule with early repayment
+                early_schedule = calculate_early_repayment(
+                    loan_amount, interest_rate, loan_term_years, early_payments, frequency, compounding
+                )
+            
+                # Calculate regular schedule for comparison
+                regular_schedule = generate_payment_schedule(
+                    loan_amount, interest_rate, loan_term_years, frequency=frequency, compounding=compounding
+                )
+            
+            with stage('serialize'):
+                # Convert to lists of dictionaries
+                early_list = frame_to_records(early_schedule, schedule_fields({
+                    **SCHEDULE_FIELDS,
+                    'earlyPayment': 'early_payment',
+                    'monthlyPayment': 'monthly_payment'
+                }, frequency))
+                regular_list = frame_to_records(regular_schedule, schedule_fields(SCHEDULE_FIELDS, frequency))
+            
+                # Calculate savings
+                total_payments_early = float(early_schedule['payment'].sum())
+                total_payments_regular = float(regular_schedule['payment'].sum())
+            
+                total_interest_early = float(early_schedule['interest'].sum())
+                total_interest_regular = float(regular_schedule['interest'].sum())
+            
+                months_saved = (period_to_month(len(regular_schedule), frequency)
+                                - period_to_month(len(early_schedule), frequency))
+            
+                return jsonify({
+                    'earlySchedule': early_list,
+                    'regularSchedule': regular_list,
+                    'totalPaymentsEarly': total_payments_early,
+                    'totalPaymentsRegular': total_payments_regular,
+                    'totalInterestEarly': total_interest_early,
+                    'totalInterestRegular': total_interest_regular,
+                    'monthsSaved': months_saved,
+                    'paymentFrequency': frequency
                 })
-            
-            # Calculate savings
-            total_payments_early = float(early_schedule['payment'].sum())
-            total_payments_regular = float(regular_schedule['payment'].sum())
-            
-            total_interest_early = float(early_schedule['interest'].sum())
-            total_interest_regular = float(regular_schedule['interest'].sum())
-            
-            months_saved = len(regular_schedule) - len(early_schedule)
-            
-            return jsonify({
-                'earlySchedule': early_list,
-                'regularSchedule': regular_list,
-                'totalPaymentsEarly': total_payments_early,
-                'totalPaymentsRegular': total_payments_regular,
-                'totalInterestEarly': total_interest_early,
-                'totalInterestRegular': total_interest_regular,
-                'monthsSaved': months_saved
-            })
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Server error: {str(e)}'}), 500
     
+    def early_repayment_plans(loan_amount, interest_rate, loan_term_years, plans,
+                              include_schedules, frequency='monthly', compounding='payment'):
+        """Rank several early repayment plans evaluated against one shared regular schedule."""
+        with stage('compute'):
+            regular_schedule, summary, schedules = calculate_early_repayment_plans(
+                loan_amount, interest_rate, loan_term_years,
+                [
+                    {
+                        'early_payments': plan.get('earlyPayments'),
+                        'recurring': [
+                            {
+                                'amount': recurring['amount'],
+                                'type': recurring.get('type', 'reduce_term'),
+                                'start_month': recurring.get('startMonth'),
+                                'end_month': recurring.get('endMonth'),
+                                'every_months': recurring.get('everyMonths')
+                            }
+                            for recurring in plan.get('recurring') or []
+                        ]
+                    }
+                    for plan in plans
+                ],
+                frequency, compounding, executor=get_scenario_pool()
+            )
+        
+        with stage('serialize'):
+            plans_list = frame_to_records(summary, {
+                'rank': 'rank',
+                'plan': 'plan',
+                'totalPayments': 'total_payments',
+                'totalInterest': 'total_interest',
+                'totalEarlyPayments': 'total_early_payments',
+                'interestSaved': 'interest_saved',
+                'monthsSaved': 'months_saved',
+                'payoffMonth': 'payoff_month',
+                'peakPayment': 'peak_payment'
+            })
+            
+            for entry in plans_list:
+                entry['name'] = plans[entry['plan']].get('name')
+                if include_schedules:
+                    entry['schedule'] = frame_to_records(schedules[entry['plan']], schedule_fields({
+                        **SCHEDULE_FIELDS,
+                        'earlyPayment': 'early_payment',
+                        'monthlyPayment': 'monthly_payment'
+                    }, frequency))
+            
+            response = {
+                'totalPaymentsRegular': float(regular_schedule['payment'].sum()),
+                'totalInterestRegular': float(regular_schedule['interest'].sum()),
+                'regularPayment': float(regular_schedule['payment'][0]),
+                'regularPayoffMonth': period_to_month(len(regular_schedule), frequency),
+                'plans': plans_list,
+                'paymentFrequency': frequency
+            }
+            if include_schedules:
+                response['regularSchedule'] = frame_to_records(
+                    regular_schedule, schedule_fields(SCHEDULE_FIELDS, frequency))
+            return jsonify(response)
+    
     @app.route('/api/scenarios/restructuring', methods=['POST'])
     def restructuring():
         try:
-            data = request.json
-            
-            loan_amount = data.get('loanAmount')
-            original_interest_rate = data.get('originalInterestRate')
-            original_term_years = data.get('originalTermYears')
-            months_paid = data.get('monthsPaid')
-            new_interest_rate = data.get('newInterestRate')
-            new_term_years = data.get('newTermYears')
+            with stage('parse'):
+                data = request.json
+            
+                loan_amount = data.get('loanAmount')
+                original_interest_rate = data.get('originalInterestRate')
+                original_term_years = data.get('originalTermYears')
+                months_paid = data.get('monthsPaid')
+                new_interest_rate = data.get('newInterestRate')
+                new_term_years = data.get('newTermYears')
+                options = data.get('options')
+                frequency, compounding = payment_frequency(data)
+            
+            if options is not None:
+                # Several offers compared in one call
+                if not all([loan_amount, original_interest_rate, original_term_years]) or months_paid is None:
+                    return jsonify({'error': 'Missing required parameters.'}), 400
+                return restructuring_options(
+                    loan_amount, original_interest_rate, original_term_years, months_paid,
+                    options, data.get('includeSchedules', False), frequency, compounding
+                )
             
             if not all([loan_amount, original_interest_rate, original_term_years, months_paid]):
                 return jsonify({'error': 'Missing required parameters.'}), 400
             
-            # Calculate restructuring
-            original_schedule, restructured_schedule, comparison = calculate_restructuring(
-                loan_amount, original_interest_rate, original_term_years,
-                months_paid, new_interest_rate, new_term_years
-            )
-            
-            # Convert to lists of dictionaries
-            original_list = []
-            for _, row in original_schedule.iterrows():
-                original_list.append({
-                    'month': int(row['month']),
-                    'payment': float(row['payment']),
-                    'principal': float(row['principal']),
-                    'interest': float(row['interest']),
-                    'remainingLoan': float(row['remaining_loan'])
+            with stage('compute'):
+                # Calculate restructuring
+                original_schedule, restructured_schedule, comparison = calculate_restructuring(
+                    loan_amount, original_interest_rate, original_term_years,
+                    months_paid, new_interest_rate, new_term_years, frequency, compounding
+                )
+                # Payments made by the end of month monthsPaid
+                payments_paid = int(payments_by_month(months_paid, frequency))
+            
+            with stage('serialize'):
+                # Convert to lists of dictionaries
+                original_list = frame_to_records(original_schedule, schedule_fields(SCHEDULE_FIELDS, frequency))
+                restructured_list = frame_to_records(restructured_schedule, schedule_fields(SCHEDULE_FIELDS, frequency))
+                comparison_list = frame_to_records(comparison, schedule_fields({
+                    'month': 'month',
+                    'originalPayment': 'original_payment',
+                    'restructuredPayment': 'restructured_payment',
+                    'originalRemaining': 'original_remaining',
+                    'restructuredRemaining': 'restructured_remaining',
+                    'paymentDifference': 'payment_difference',
+                    'status': 'status'
+                }, frequency))
+            
+                # Calculate key metrics
+                original_remaining_payments = float(original_schedule['payment'][payments_paid:].sum())
+                restructured_total_payments = float(restructured_schedule['payment'].sum())
+            
+                original_remaining_interest = float(original_schedule['interest'][payments_paid:].sum())
+                restructured_total_interest = float(restructured_schedule['interest'].sum())
+            
+                original_monthly = float(original_schedule['payment'][0])
+                restructured_monthly = float(restructured_schedule['payment'][0])
+            
+                original_remaining_term = len(original_schedule) - payments_paid
+                restructured_term = len(restructured_schedule)
+            
+                return jsonify({
+                    'originalSchedule': original_list,
+                    'restructuredSchedule': restructured_list,
+                    'comparison': comparison_list,
+                    'originalRemainingPayments': original_remaining_payments,
+                    'restructuredTotalPayments': restructured_total_payments,
+                    'originalRemainingInterest': original_remaining_interest,
+                    'restructuredTotalInterest': restructured_total_interest,
+                    'originalMonthlyPayment': original_monthly,
+                    'restructuredMonthlyPayment': restructured_monthly,
+                    'originalRemainingTerm': original_remaining_term,
+                    'restructuredTerm': restructured_term,
+                    'paymentFrequency': frequency
                 })
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    def restructuring_options(loan_amount, original_interest_rate, original_term_years,
+                              months_paid, options, include_schedules, frequency='monthly',
+                              compounding='payment'):
+        """Rank several restructuring options computed from one shared remaining balance."""
+        with stage('compute'):
+            original, summary, schedules = calculate_restructuring_options(
+                loan_amount, original_interest_rate, original_term_years, months_paid,
+                [
+                    {
+                        'new_interest_rate': option.get('newInterestRate'),
+                        'new_term_years': option.get('newTermYears'),
+                        'fees': option.get('fees', 0)
+                    }
+                    for option in options
+                ],
+                frequency, compounding
+            )
+        
+        with stage('serialize'):
+            options_list = frame_to_records(summary, {
+                'rank': 'rank',
+                'option': 'option',
+                'newInterestRate': 'new_interest_rate',
+                'newTermYears': 'new_term_years',
+                'fees': 'fees',
+                'monthlyPayment': 'monthly_payment',
+                'paymentDifference': 'payment_difference',
+                'totalPayments': 'total_payments',
+                'totalInterest': 'total_interest',
+                'interestSaved': 'interest_saved',
+                'netSavings': 'net_savings',
+                'breakEvenMonth': 'break_even_month'
+            })
             
-            restructured_list = []
-            for _, row in restructured_schedule.iterrows():
-                restructured_list.append({
-                    'month': int(row['month']),
-                    'payment': float(row['payment']),
-                    'principal': float(row['principal']),
-                    'interest': float(row['interest']),
-                    'remainingLoan': float(row['remaining_loan'])
-                })
-            
-            comparison_list = []
-            for _, row in comparison.iterrows():
-                comparison_list.append({
-                    'month': int(row['month']),
-                    'originalPayment': float(row['original_payment']),
-                    'restructuredPayment': float(row['restructured_payment']),
-                    'originalRemaining': float(row['original_remaining']),
-                    'restructuredRemaining': float(row['restructured_remaining']),
-                    'paymentDifference': float(row['payment_difference']),
-                    'status': row['status']
-                })
-            
-            # Calculate key metrics
-            original_remaining_payments = float(original_schedule.iloc[months_paid:]['payment'].sum())
-            restructured_total_payments = float(restructured_schedule['payment'].sum())
-            
-            original_remaining_interest = float(original_schedule.iloc[months_paid:]['interest'].sum())
-            restructured_total_interest = float(restructured_schedule['interest'].sum())
-            
-            original_monthly = float(original_schedule.iloc[0]['payment'])
-            restructured_monthly = float(restructured_schedule.iloc[0]['payment'])
-            
-            original_remaining_term = len(original_schedule) - months_paid
-            restructured_term = len(restructured_schedule)
+            for entry in options_list:
+                if entry['breakEvenMonth'] < 0:
+                    entry['breakEvenMonth'] = None
+                if include_schedules:
+                    term = int(round(entry['newTermYears'] * payments_per_year(frequency)))
+                    entry['schedule'] = {
+                        'payment': schedules['payment'][entry['option'], :term].tolist(),
+                        'interest': schedules['interest'][entry['option'], :term].tolist(),
+                        'remainingLoan': schedules['remaining_loan'][entry['option'], :term].tolist()
+                    }
             
             return jsonify({
-                'originalSchedule': original_list,
-                'restructuredSchedule': restructured_list,
-                'comparison': comparison_list,
-                'originalRemainingPayments': original_remaining_payments,
-                'restructuredTotalPayments': restructured_total_payments,
-                'originalRemainingInterest': original_remaining_interest,
-                'restructuredTotalInterest': restructured_total_interest,
-                'originalMonthlyPayment': original_monthly,
-                'restructuredMonthlyPayment': restructured_monthly,
-                'originalRemainingTerm': original_remaining_term,
-                'restructuredTerm': restructured_term
+                'remainingLoan': original['remaining_loan'],
+                'originalMonthlyPayment': original['monthly_payment'],
+                'originalRemainingTerm': original['remaining_term'],
+                'originalRemainingPayments': original['remaining_payments'],
+                'originalRemainingInterest': original['remaining_interest'],
+                'options': options_list,
+                'paymentFrequency': frequency
             })
-        except Exception as e:
-            return jsonify({'error': f'Server error: {str(e)}'}), 500
     
     @app.route('/api/scenarios/insurance', methods=['POST'])
     def insurance_impact():
         try:
-            data = request.json
+            with stage('parse'):
+                data = request.json
             
-            loan_amount = data.get('loanAmount')
-            interest_rate = data.get('interestRate')
-            loan_term_years = data.get('loanTermYears')
-            insurance_rate = data.get('insuranceRate')
-            insurance_term_years = data.get('insuranceTermYears')
+                loan_amount = data.get('loanAmount')
+                interest_rate = data.get('interestRate')
+                loan_term_years = data.get('loanTermYears')
+                insurance_rate = data.get('insuranceRate')
+                insurance_term_years = data.get('insuranceTermYears')
+                frequency, compounding = payment_frequency(data)
             
             if not all([loan_amount, interest_rate, loan_term_years, insurance_rate]):
                 return jsonify({'error': 'Missing required parameters.'}), 400
             
-            # Calculate schedule with insurance
-            insurance_schedule = calculate_with_insurance(
-                loan_amount, interest_rate, loan_term_years,
-                insurance_rate, insurance_term_years
-            )
-            
-            # Calculate regular schedule for comparison
-            regular_schedule = generate_payment_schedule(
-                loan_amount, interest_rate, loan_term_years
-            )
-            
-            # Convert to list of dictionaries
-            insurance_list = []
-            for _, row in insurance_schedule.iterrows():
-                insurance_list.append({
-                    'month': int(row['month']),
-                    'payment': float(row['payment']),
-                    'principal': float(row['principal']),
-                    'interest': float(row['interest']),
-                    'insurance': float(row['insurance']),
-                    'totalPayment': float(row['total_payment']),
-                    'remainingLoan': float(row['remaining_loan'])
+            with stage('compute'):
+                # Calculate schedule with insurance
+                insurance_schedule = calculate_with_insurance(
+                    loan_amount, interest_rate, loan_term_years,
+                    insurance_rate, insurance_term_years, frequency, compounding
+                )
+            
+                # Calculate regular schedule for comparison
+                regular_schedule = generate_payment_schedule(
+                    loan_amount, interest_rate, loan_term_years, frequency=frequency, compounding=compounding
+                )
+            
+            with stage('serialize'):
+                # Convert to list of dictionaries
+                insurance_list = frame_to_records(insurance_schedule, schedule_fields({
+                    **SCHEDULE_FIELDS,
+                    'insurance': 'insurance',
+                    'totalPayment': 'total_payment'
+                }, frequency))
+            
+                # Calculate key metrics
+                total_insurance = float(insurance_schedule['insurance'].sum())
+                total_payments_with_insurance = float(insurance_schedule['total_payment'].sum())
+                total_payments_regular = float(regular_schedule['payment'].sum())
+            
+                return jsonify({
+                    'insuranceSchedule': insurance_list,
+                    'totalInsurance': total_insurance,
+                    'totalPaymentsWithInsurance': total_payments_with_insurance,
+                    'totalPaymentsRegular': total_payments_regular,
+                    'increaseTotalPayments': total_payments_with_insurance - total_payments_regular,
+                    'paymentFrequency': frequency
                 })
-            
-            # Calculate key metrics
-            total_insurance = float(insurance_schedule['insurance'].sum())
-            total_payments_with_insurance = float(insurance_schedule['total_payment'].sum())
-            total_payments_regular = float(regular_schedule['payment'].sum())
-            
-            return jsonify({
-                'insuranceSchedule': insurance_list,
-                'totalInsurance': total_insurance,
-                'totalPaymentsWithInsurance': total_payments_with_insurance,
-                'totalPaymentsRegular': total_payments_regular,
-                'increaseTotalPayments': total_payments_with_insurance - total_payments_regular
-            })
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Server error: {str(e)}'}), 500
     
     @app.route('/api/scenarios/central_bank_rate', methods=['POST'])
     def central_bank_rate_impact():
         try:
-            data = request.json
+            with stage('parse'):
+                data = request.json
             
-            loan_amount = data.get('loanAmount')
-            base_interest_rate = data.get('baseInterestRate')
-            loan_term_years = data.get('loanTermYears')
-            central_bank_rate = data.get('centralBankRate')
-            margin = data.get('margin')
-            predicted_cb_rates = data.get('predictedCbRates', [])
+                loan_amount = data.get('loanAmount')
+                base_interest_rate = data.get('baseInterestRate')
+                loan_term_years = data.get('loanTermYears')
+                central_bank_rate = data.get('centralBankRate')
+                margin = data.get('margin')
+                predicted_cb_rates = data.get('predictedCbRates', [])
+                frequency, compounding = payment_frequency(data)
             
             if not all([loan_amount, base_interest_rate, loan_term_years, central_bank_rate, margin]):
                 return jsonify({'error': 'Missing required parameters.'}), 400
             
-            # Calculate schedule with floating rate
-            cb_schedule = calculate_with_central_bank_rate(
-                loan_amount, base_interest_rate, loan_term_years,
-                central_bank_rate, margin, predicted_cb_rates
-            )
-            
-            # Calculate schedule with fixed rate for comparison
-            fixed_schedule = generate_payment_schedule(
-                loan_amount, base_interest_rate, loan_term_years
-            )
-            
-            # Convert to lists of dictionaries
-            cb_list = []
-            for _, row in cb_schedule.iterrows():
-                cb_list.append({
-                    'month': int(row['month']),
-                    'payment': float(row['payment']),
-                    'principal': float(row['principal']),
-                    'interest': float(row['interest']),
-                    'remainingLoan': float(row['remaining_loan']),
-                    'cbRate': float(row['cb_rate']),
-                    'interestRate': float(row['interest_rate'])
+            with stage('compute'):
+                # Calculate schedule with floating rate
+                cb_schedule = calculate_with_central_bank_rate(
+                    loan_amount, base_interest_rate, loan_term_years,
+                    central_bank_rate, margin, predicted_cb_rates, frequency, compounding
+                )
+            
+                # Calculate schedule with fixed rate for comparison
+                fixed_schedule = generate_payment_schedule(
+                    loan_amount, base_interest_rate, loan_term_years, frequency=frequency, compounding=compounding
+                )
+            
+            with stage('serialize'):
+                # Convert to lists of dictionaries
+                cb_list = frame_to_records(cb_schedule, schedule_fields({
+                    **SCHEDULE_FIELDS,
+                    'cbRate': 'cb_rate',
+                    'interestRate': 'interest_rate'
+                }, frequency))
+                fixed_list = frame_to_records(fixed_schedule, schedule_fields(SCHEDULE_FIELDS, frequency))
+            
+                # Calculate key metrics
+                total_payments_cb = float(cb_schedule['payment'].sum())
+                total_payments_fixed = float(fixed_schedule['payment'].sum())
+            
+                total_interest_cb = float(cb_schedule['interest'].sum())
+                total_interest_fixed = float(fixed_schedule['interest'].sum())
+            
+                return jsonify({
+                    'cbSchedule': cb_list,
+                    'fixedSchedule': fixed_list,
+                    'totalPaymentsCb': total_payments_cb,
+                    'totalPaymentsFixed': total_payments_fixed,
+                    'totalInterestCb': total_interest_cb,
+                    'totalInterestFixed': total_interest_fixed,
+                    'paymentDifference': total_payments_cb - total_payments_fixed,
+                    'interestDifference': total_interest_cb - total_interest_fixed,
+                    'paymentFrequency': frequency
                 })
-            
-            fixed_list = []
-            for _, row in fixed_schedule.iterrows():
-                fixed_list.append({
-                    'month': int(row['month']),
-                    'payment': float(row['payment']),
-                    'principal': float(row['principal']),
-                    'interest': float(row['interest']),
-                    'remainingLoan': float(row['remaining_loan'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+    @app.route('/api/scenarios/composite', methods=['POST'])
+    def composite_scenario():
+        try:
+            with stage('parse'):
+                data = request.json
+                scenario_id = data.get('scenarioId')
+            
+                if scenario_id:
+                    # Delta request: edit a cached scenario and recompute only the affected months
+                    base = scenario_cache.get(scenario_id)
+                    record_cache_lookup('scenario_snapshot', base is not None)
+                    if base is None:
+                        return jsonify({'error': 'Unknown scenarioId; send the full scenario.'}), 404
+                else:
+                    loan_amount = data.get('loanAmount')
+                    interest_rate = data.get('interestRate')
+                    loan_term_years = data.get('loanTermYears')
+                    rate_changes = data.get('rateChanges', [])
+                    floating_rate = data.get('floatingRate')
+                    early_payments = data.get('earlyPayments', [])
+                    insurance = data.get('insurance') or {}
+                    frequency, compounding = payment_frequency(data)
+                
+                    # A floating rate replaces the fixed rate and explicit rate changes
+                    if floating_rate:
+                        if floating_rate.get('centralBankRate') is None or floating_rate.get('margin') is None:
+                            return jsonify({'error': 'floatingRate requires centralBankRate and margin.'}), 400
+                        rate_changes = floating_rate_changes(
+                            floating_rate['centralBankRate'], floating_rate['margin'],
+                            floating_rate.get('predictedCbRates', [])
+                        )
+                        interest_rate = rate_changes[0]['rate']
+                
+                    if not all([loan_amount, loan_term_years]) or interest_rate is None:
+                        return jsonify({'error': 'Missing required parameters.'}), 400
+                
+                    params = normalize_scenario(
+                        loan_amount, interest_rate, loan_term_years, rate_changes, early_payments, insurance,
+                        frequency, compounding)
+            
+            with stage('compute'):
+                # Calculate combined schedule in a single pass, reusing cached work where possible
+                if scenario_id:
+                    snapshot, recomputed_from = apply_delta(
+                        base,
+                        rate_changes=data.get('rateChanges'),
+                        early_payments=data.get('earlyPayments'),
+                        insurance=data.get('insurance')
+                    )
+                else:
+                    snapshot = scenario_cache.get(scenario_hash(params))
+                    record_cache_lookup('scenario_snapshot', snapshot is not None)
+                    recomputed_from = None
+                    if snapshot is None:
+                        snapshot = build_snapshot(params)
+                        recomputed_from = 1
+                scenario_cache.put(snapshot)
+                schedule = snapshot.to_schedule()
+            
+                # Fixed-rate loan without events, for comparison
+                loan_amount = snapshot.params['loan_amount']
+                frequency = snapshot.params['frequency']
+                loan_term_periods = snapshot.params['loan_term_periods']
+                total_payments_regular = calculate_annuity_payment(
+                    loan_amount, snapshot.params['interest_rate'], loan_term_periods / payments_per_year(frequency),
+                    frequency, snapshot.params['compounding']) * loan_term_periods
+            
+            with stage('serialize'):
+                schedule_list = frame_to_records(schedule, schedule_fields({
+                    'month': 'month',
+                    'payment': 'payment',
+                    'principal': 'principal',
+                    'interest': 'interest',
+                    'earlyPayment': 'early_payment',
+                    'remainingLoan': 'remaining_loan',
+                    'monthlyPayment': 'monthly_payment',
+                    'interestRate': 'interest_rate',
+                    'insurance': 'insurance',
+                    'totalPayment': 'total_payment'
+                }, frequency))
+            
+                total_payments = float(schedule['payment'].sum())
+                total_interest = float(schedule['interest'].sum())
+                total_insurance = float(schedule['insurance'].sum())
+            
+                return jsonify({
+                    'schedule': schedule_list,
+                    'totalPayments': total_payments,
+                    'totalInterest': total_interest,
+                    'totalEarlyPayments': float(schedule['early_payment'].sum()),
+                    'totalInsurance': total_insurance,
+                    'totalCost': total_payments + total_insurance,
+                    'totalPaymentsRegular': total_payments_regular,
+                    'totalInterestRegular': total_payments_regular - loan_amount,
+                    'monthsSaved': period_to_month(loan_term_periods, frequency) - period_to_month(len(schedule), frequency),
+                    'scenarioId': snapshot.scenario_id,
+                    'recomputedFromMonth': None if recomputed_from is None else period_to_month(recomputed_from, frequency),
+                    'paymentFrequency': frequency
                 })
-            
-            # Calculate key metrics
-            total_payments_cb = float(cb_schedule['payment'].sum())
-            total_payments_fixed = float(fixed_schedule['payment'].sum())
-            
-            total_interest_cb = float(cb_schedule['interest'].sum())
-            total_interest_fixed = float(fixed_schedule['interest'].sum())
-            
-            return jsonify({
-                'cbSchedule': cb_list,
-                'fixedSchedule': fixed_list,
-                'totalPaymentsCb': total_payments_cb,
-                'totalPaymentsFixed': total_payments_fixed,
-                'totalInterestCb': total_interest_cb,
-                'totalInterestFixed': total_interest_fixed,
-                'paymentDifference': total_payments_cb - total_payments_fixed,
-                'interestDifference': total_interest_cb - total_interest_fixed
-            })
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+    
+    @app.route('/api/export', methods=['POST'])
+    def export_schedules():
+        try:
+            with stage('parse'):
+                data = request.json
+            
+                export_format = data.get('format', 'csv')
+                compression = data.get('compression')
+                decimals = data.get('decimals')
+                scenario_id = data.get('scenarioId')
+                scenario = data.get('scenario')
+            
+                if export_format not in EXPORT_FORMATS:
+                    return jsonify({'error': f'format must be one of {", ".join(EXPORT_FORMATS)}.'}), 400
+                if compression is not None and (export_format != 'csv' or compression not in EXPORT_COMPRESSIONS):
+                    return jsonify({'error': 'compression is only supported for csv: gzip.'}), 400
+                if export_format == 'parquet' and not parquet_available():
+                    return jsonify({'error': 'Parquet export requires pyarrow, which is not installed.'}), 400
+                if decimals is not None and (not isinstance(decimals, int) or not 0 <= decimals <= 12):
+                    return jsonify({'error': 'decimals must be an integer between 0 and 12.'}), 400
+            
+                if scenario_id:
+                    snapshot = scenario_cache.get(scenario_id)
+                    record_cache_lookup('scenario_snapshot', snapshot is not None)
+                    if snapshot is None:
+                        return jsonify({'error': 'Unknown scenarioId; send the full scenario.'}), 404
+                elif scenario:
+                    if not all([scenario.get('loanAmount'), scenario.get('loanTermYears')]) or \
+                            scenario.get('interestRate') is None:
+                        return jsonify({'error': 'scenario requires loanAmount, interestRate and loanTermYears.'}), 400
+                    params = normalize_scenario(
+                        scenario['loanAmount'], scenario['interestRate'], scenario['loanTermYears'],
+                        scenario.get('rateChanges'), scenario.get('earlyPayments'), scenario.get('insurance'),
+                        *payment_frequency(scenario))
+                    snapshot = None
+                else:
+                    loans = data.get('loans')
+                    payment_type = data.get('paymentType', 'annuity')
+                    rounding = data.get('rounding')
+                    frequency, compounding = payment_frequency(data)
+            
+                    if not loans or not all(
+                            loan.get('loanAmount') and loan.get('interestRate') is not None and loan.get('loanTermYears')
+                            for loan in loans):
+                        return jsonify({'error': 'Parameter loans, scenario or scenarioId is required; each loan needs loanAmount, interestRate and loanTermYears.'}), 400
+                    if payment_type not in ('annuity', 'differentiated'):
+                        return jsonify({'error': 'paymentType must be annuity or differentiated.'}), 400
+                    if rounding is not None and rounding not in ROUNDING_RULES:
+                        return jsonify({'error': f'rounding must be one of {", ".join(ROUNDING_RULES)}.'}), 400
+                    # Checked before streaming: errors raised while the body is sent cannot change the status
+                    if rounding is not None and not compounds_per_payment(frequency, compounding):
+                        return jsonify({'error': 'Exact cents schedules require interest compounded once per payment period.'}), 400
+            
+            with stage('compute'):
+                if scenario_id or scenario:
+                    # A single scenario schedule is small; build it now and stream its rows
+                    if snapshot is None:
+                        snapshot = build_snapshot(params)
+                        scenario_cache.put(snapshot)
+                    chunks = schedule_chunks(snapshot.to_schedule(), frequency=snapshot.params['frequency'])
+                else:
+                    # Batches are amortized chunk by chunk while the response is streamed
+                    chunks = batch_chunks(
+                        [loan['loanAmount'] for loan in loans],
+                        [loan['interestRate'] for loan in loans],
+                        [loan['loanTermYears'] for loan in loans],
+                        payment_type, rounding, frequency, compounding
+                    )
+                # The first chunk is computed here, so that its errors are still reported with their status
+                first = next(chunks, None)
+                if first is not None:
+                    chunks = itertools.chain([first], chunks)
+            
+            if export_format == 'parquet':
+                body, mimetype, filename = parquet_stream(chunks), 'application/vnd.apache.parquet', 'schedules.parquet'
+            elif compression == 'gzip':
+                body, mimetype, filename = csv_stream(chunks, 'gzip', decimals), 'application/gzip', 'schedules.csv.gz'
+            else:
+                body, mimetype, filename = csv_stream(chunks, None, decimals), 'text/csv', 'schedules.csv'
+            
+            return Response(body, mimetype=mimetype,
+                            headers={'Content-Disposition': f'attachment; filename={filename}'})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': f'Server error: {str(e)}'}), 500
             
@@ -0,0 +1,411 @@
+"""
+Request schemas, cost models and cost budgets of the API endpoints
+
+Costs are estimated in schedule payments computed (one monthly loan over
+30 years costs 360, a biweekly one 780), scaled by the number of loans, paths, properties or currencies a
+request multiplies them by. Budgets are set well above typical requests; the
+MORTGAGE_COST_BUDGET_SCALE environment variable scales all of them.
+"""
+from backend.api.utils.admission import AdmissionRule
+from backend.api.utils.export import EXPORT_COMPRESSIONS, EXPORT_FORMATS
+from backend.api.utils.validation import Array, Boolean, Integer, Mapping, Number, Object, String
+from backend.core.amortization import (
+    COMPOUNDING_PERIODS,
+    PAYMENT_FREQUENCIES,
+    ROUNDING_RULES,
+    payments_by_month,
+    term_periods
+)
+
+MAX_TERM_YEARS = 100
+MAX_TERM_MONTHS = MAX_TERM_YEARS * 12
+MAX_TERM_PAYMENTS = MAX_TERM_YEARS * max(PAYMENT_FREQUENCIES.values())
+MAX_BATCH_LOANS = 10000
+MAX_EXPORT_LOANS = 100000
+MAX_PROPERTIES = 100000
+MAX_REGIONS = 1000
+MAX_CURRENCIES = 50
+MAX_OPTIONS = 100
+MAX_PLANS = 50
+MAX_SIMULATION_PATHS = 20000
+
+PAYMENT_TYPES = ('annuity', 'differentiated')
+
+
+def amount(required=True):
+    return Number(required, minimum=0, maximum=1e12, exclusive_minimum=True)
+
+
+def rate(required=True):
+    return Number(required, minimum=-100, maximum=100)
+
+
+def term_years(required=True):
+    return Number(required, minimum=0, maximum=MAX_TERM_YEARS, exclusive_minimum=True)
+
+
+def month():
+    return Integer(True, minimum=1, maximum=MAX_TERM_MONTHS)
+
+
+def term_months(years):
+    return round((years or 0) * 12)
+
+
+def term_payments(years, body):
+    return round((years or 0) * PAYMENT_FREQUENCIES.get(body.get('paymentFrequency') or 'monthly', 12))
+
+
+def short_term(terms, frequency):
+    """
+    Error message for the first term (path, years) shorter than one payment,
+    or None
+
+    Terms are rounded to whole payments, so shorter ones would have none.
+    """
+    for path, years in terms:
+        if years is not None and term_periods(years, frequency) < 1:
+            return f'{path} must cover at least one {frequency.replace("_", "-")} payment.'
+    return None
+
+
+def body_frequency(body):
+    return body.get('paymentFrequency') or 'monthly'
+
+
+def terms_check(*names, monthly=False):
+    """
+    Check that the terms in years under the given keys cover at least one
+    payment of the body's payment frequency (of one month if `monthly`)
+    """
+    return lambda body: short_term(((name, body.get(name)) for name in names),
+                                   'monthly' if monthly else body_frequency(body))
+
+
+def loans_terms(body):
+    return short_term(((f'loans[{i}].loanTermYears', loan.get('loanTermYears'))
+                       for i, loan in enumerate(body.get('loans') or [])), body_frequency(body))
+
+
+def scenario_terms(scenario, path=None):
+    prefix = f'{path}.' if path else ''
+    insurance = scenario.get('insurance') or {}
+    return short_term(((f'{prefix}loanTermYears', scenario.get('loanTermYears')),
+                       (f'{prefix}insurance.termYears', insurance.get('termYears'))), body_frequency(scenario))
+
+
+def restructuring_terms(body):
+    options = body.get('options') or []
+    frequency = body_frequency(body)
+    error = short_term([('originalTermYears', body.get('originalTermYears')),
+                        ('newTermYears', body.get('newTermYears'))]
+                       + [(f'options[{i}].newTermYears', option.get('newTermYears'))
+                          for i, option in enumerate(options)], frequency)
+    # A loan already repaid has nothing left to restructure
+    if error is None and payments_by_month(body['monthsPaid'], frequency) >= \
+            term_periods(body['originalTermYears'], frequency):
+        error = 'monthsPaid must be less than the original term.'
+    return error
+
+
+def export_terms(body):
+    if body.get('scenario'):
+        return scenario_terms(body['scenario'], 'scenario')
+    return loans_terms(body)
+
+
+FREQUENCY = {
+    'paymentFrequency': String(choices=PAYMENT_FREQUENCIES),
+    'compounding': String(choices=COMPOUNDING_PERIODS)
+}
+LOAN = {
+    'loanAmount': amount(),
+    'interestRate': Number(True, minimum=0, maximum=100),
+    'loanTermYears': term_years(),
+    'paymentType': String(choices=PAYMENT_TYPES)
+}
+EARLY_PAYMENTS = Array(Object({
+    'month': month(),
+    'amount': Number(True, minimum=0, maximum=1e12),
+    'type': String(choices=('reduce_term', 'reduce_payment'))
+}), max_items=MAX_TERM_MONTHS)
+# Recurring early payments of repayment plans: every everyMonths months from startMonth to endMonth
+RECURRING_PAYMENTS = Array(Object({
+    'amount': Number(True, minimum=0, maximum=1e12),
+    'type': String(choices=('reduce_term', 'reduce_payment')),
+    'startMonth': Integer(minimum=1, maximum=MAX_TERM_MONTHS),
+    'endMonth': Integer(minimum=1, maximum=MAX_TERM_MONTHS),
+    'everyMonths': Integer(minimum=1, maximum=MAX_TERM_MONTHS)
+}), max_items=MAX_TERM_MONTHS)
+# A null rate removes the change of that month in composite scenario deltas
+RATE_CHANGES = Array(Object({
+    'month': month(),
+    'rate': Number(minimum=0, maximum=100)
+}), max_items=MAX_TERM_MONTHS)
+INSURANCE = Object({
+    'rate': Number(minimum=0, maximum=100),
+    'type': String(choices=('fixed', 'balance')),
+    'termYears': term_years(False)
+})
+FLOATING_RATE = Object({
+    'centralBankRate': Number(minimum=0, maximum=100),
+    'margin': Number(minimum=-100, maximum=100),
+    'predictedCbRates': RATE_CHANGES
+})
+SCENARIO = {
+    'loanAmount': amount(False),
+    'interestRate': Number(minimum=0, maximum=100),
+    'loanTermYears': term_years(False),
+    'scenarioId': String(max_length=64),
+    'rateChanges': RATE_CHANGES,
+    'floatingRate': FLOATING_RATE,
+    'earlyPayments': EARLY_PAYMENTS,
+    'insurance': INSURANCE,
+    **FREQUENCY
+}
+# Chart downsampling: at most this many rows per series (first, last and key months always kept)
+MAX_POINTS = Integer(minimum=3, maximum=MAX_TERM_MONTHS)
+FORECAST_MODEL = String(choices=('linear', 'exponential', 'ml'))
+SEASONAL_FACTORS = Array(Number(True, minimum=0, exclusive_minimum=True), min_items=12, max_items=12)
+RENT_VS_BUY = {
+    'propertyValue': amount(),
+    'downPayment': Number(True, minimum=0, maximum=1e12),
+    'interestRate': Number(True, minimum=0, maximum=100),
+    'loanTermYears': term_years(),
+    'monthlyRent': Number(True, minimum=0, maximum=1e12),
+    'rentGrowthRate': rate(),
+    'propertyGrowthRate': rate(),
+    'maintenanceCostPercent': Number(True, minimum=0, maximum=100),
+    'propertyTaxPercent': Number(True, minimum=0, maximum=100),
+    'rentalIncome': Number(minimum=0, maximum=1e12),
+    'taxBenefitRate': Number(minimum=0, maximum=100),
+    'inflationRate': rate(False),
+    'opportunityCostRate': rate(False),
+    'maxPoints': MAX_POINTS
+}
+
+
+def loans_cost(body, factor=1):
+    return factor * sum(term_payments(loan.get('loanTermYears'), body) for loan in body['loans'])
+
+
+def scenario_cost(body):
+    # Delta requests on a cached scenario may omit the term: assume the longest
+    payments = term_payments(body['loanTermYears'], body) if body.get('loanTermYears') else MAX_TERM_PAYMENTS
+    floating_rate = body.get('floatingRate') or {}
+    events = sum(len(body.get(key) or []) for key in ('earlyPayments', 'rateChanges'))
+    return payments + events + len(floating_rate.get('predictedCbRates') or [])
+
+
+def early_repayment_cost(body):
+    # Every plan is a schedule of its own, on top of the shared regular schedule
+    plans = body.get('plans')
+    if plans is None:
+        return scenario_cost(body)
+    events = sum(len(plan.get(key) or []) for plan in plans for key in ('earlyPayments', 'recurring'))
+    return term_payments(body['loanTermYears'], body) * (1 + len(plans)) + events
+
+
+def export_cost(body):
+    if body.get('loans'):
+        return loans_cost(body)
+    return scenario_cost(body.get('scenario') or {})
+
+
+ADMISSION_RULES = {
+    'calculate': AdmissionRule(
+        dict(LOAN, rounding=String(choices=ROUNDING_RULES), **FREQUENCY),
+        cost=lambda body: term_payments(body['loanTermYears'], body),
+        budget=MAX_TERM_PAYMENTS,
+        check=terms_check('loanTermYears')),
+    'calculate_batch': AdmissionRule(
+        {
+            'loans': Array(Object(LOAN), required=True, min_items=1, max_items=MAX_BATCH_LOANS),
+            'paymentType': String(choices=PAYMENT_TYPES),
+            'rounding': String(choices=ROUNDING_RULES),
+            'includeSchedules': Boolean(),
+            **FREQUENCY
+        },
+        cost=lambda body: loans_cost(body, 2 if body.get('includeSchedules') else 1),
+        budget=2_000_000,
+        check=loans_terms),
+    'query_loans': AdmissionRule(
+        {
+            'loans': Array(Object(LOAN), required=True, min_items=1, max_items=MAX_BATCH_LOANS),
+            'months': Array(Integer(True, minimum=0, maximum=MAX_TERM_MONTHS),
+                            required=True, min_items=1, max_items=MAX_TERM_MONTHS + 1),
+            'paymentType': String(choices=PAYMENT_TYPES),
+            **FREQUENCY
+        },
+        cost=lambda body: len(body['loans']) * len(body['months']),
+        budget=2_000_000,
+        check=loans_terms),
+    'loan_sensitivities': AdmissionRule(
+        {
+            'loans': Array(Object({
+                'loanAmount': amount(),
+                'interestRate': Number(True, minimum=0, maximum=100),
+                'loanTermYears': term_years()
+            }), required=True, min_items=1, max_items=MAX_BATCH_LOANS),
+            'months': Array(Integer(True, minimum=0, maximum=MAX_TERM_MONTHS),
+                            min_items=1, max_items=MAX_TERM_MONTHS + 1),
+            **FREQUENCY
+        },
+        cost=lambda body: len(body['loans']) * (1 + len(body.get('months') or [])),
+        budget=2_000_000,
+        check=loans_terms),
+    'property_forecast': AdmissionRule(
+        {
+            'initialValue': amount(),
+            'growthRate': rate(),
+            'years': Integer(True, minimum=1, maximum=MAX_TERM_YEARS),
+            'seasonalFactors': SEASONAL_FACTORS,
+            'regionalAdjustment': rate(False),
+            'inflationRate': rate(False),
+            'model': FORECAST_MODEL,
+            'seed': Integer(minimum=0)
+        },
+        cost=lambda body: body['years'] * 12,
+        budget=MAX_TERM_MONTHS),
+    'property_forecast_batch': AdmissionRule(
+        {
+            'properties': Array(Object({
+                'initialValue': amount(),
+                'region': String(True, max_length=128)
+            }), required=True, min_items=1, max_items=MAX_PROPERTIES),
+            'regions': Mapping(Object({
+                'growthRate': rate(False),
+                'regionalAdjustment': rate(False),
+                'seasonalFactors': SEASONAL_FACTORS
+            }), required=True, min_items=1, max_items=MAX_REGIONS),
+            'years': Integer(True, minimum=1, maximum=MAX_TERM_YEARS),
+            'growthRate': rate(False),
+            'inflationRate': rate(False),
+            'model': FORECAST_MODEL,
+            'includeForecasts': Boolean(),
+            'seed': Integer(minimum=0)
+        },
+        cost=lambda body: body['years'] * 12 * (
+            len(body['properties']) * (2 if body.get('includeForecasts') else 1) + len(body['regions'])),
+        budget=10_000_000),
+    'rent_vs_buy': AdmissionRule(
+        RENT_VS_BUY,
+        cost=lambda body: term_months(body['loanTermYears']),
+        budget=MAX_TERM_MONTHS,
+        check=terms_check('loanTermYears', monthly=True)),
+    'rent_vs_buy_simulation': AdmissionRule(
+        dict(
+            RENT_VS_BUY,
+            paths=Integer(minimum=1, maximum=MAX_SIMULATION_PATHS),
+            propertyVolatility=Number(minimum=0, maximum=100),
+            rentVolatility=Number(minimum=0, maximum=100),
+            investmentVolatility=Number(minimum=0, maximum=100),
+            correlations=Object({
+                'propertyRent': Number(minimum=-1, maximum=1),
+                'propertyInvestment': Number(minimum=-1, maximum=1),
+                'rentInvestment': Number(minimum=-1, maximum=1)
+            }),
+            percentiles=Array(Number(True, minimum=0, maximum=100), min_items=1, max_items=101),
+            seed=Integer(minimum=0)
+        ),
+        cost=lambda body: (body.get('paths') or 5000) * term_months(body['loanTermYears']),
+        budget=MAX_SIMULATION_PATHS * 600,
+        check=terms_check('loanTermYears', monthly=True)),
+    'currency_analysis': AdmissionRule(
+        {
+            'loanAmount': amount(),
+            'interestRate': Number(True, minimum=0, maximum=100),
+            'loanTermYears': term_years(),
+            'baseCurrency': String(True, max_length=8),
+            'targetCurrencies': Array(String(True, max_length=8), required=True,
+                                      min_items=1, max_items=MAX_CURRENCIES),
+            'currencyAnnualChange': Mapping(Mapping(Number(True, minimum=-1, maximum=10),
+                                                    max_items=MAX_CURRENCIES), max_items=MAX_CURRENCIES),
+            'startDate': String(max_length=10),
+            'maxPoints': MAX_POINTS
+        },
+        cost=lambda body: term_months(body['loanTermYears']) * (1 + len(body['targetCurrencies'])),
+        budget=MAX_TERM_MONTHS * (1 + MAX_CURRENCIES),
+        check=terms_check('loanTermYears', monthly=True)),
+    'early_repayment': AdmissionRule(
+        {
+            'loanAmount': amount(),
+            'interestRate': Number(True, minimum=0, maximum=100),
+            'loanTermYears': term_years(),
+            'earlyPayments': EARLY_PAYMENTS,
+            'plans': Array(Object({
+                'name': String(max_length=128),
+                'earlyPayments': EARLY_PAYMENTS,
+                'recurring': RECURRING_PAYMENTS
+            }), min_items=1, max_items=MAX_PLANS),
+            'includeSchedules': Boolean(),
+            **FREQUENCY
+        },
+        cost=early_repayment_cost,
+        budget=MAX_TERM_PAYMENTS * (1 + MAX_PLANS),
+        check=terms_check('loanTermYears')),
+    'restructuring': AdmissionRule(
+        {
+            'loanAmount': amount(),
+            'originalInterestRate': Number(True, minimum=0, maximum=100),
+            'originalTermYears': term_years(),
+            'monthsPaid': Integer(True, minimum=0, maximum=MAX_TERM_MONTHS),
+            'newInterestRate': Number(minimum=0, maximum=100),
+            'newTermYears': term_years(False),
+            'options': Array(Object({
+                'newInterestRate': Number(minimum=0, maximum=100),
+                'newTermYears': term_years(False),
+                'fees': Number(minimum=0, maximum=1e12)
+            }), min_items=1, max_items=MAX_OPTIONS),
+            'includeSchedules': Boolean(),
+            **FREQUENCY
+        },
+        cost=lambda body: term_payments(body['originalTermYears'], body) * (1 + len(body.get('options') or [None])),
+        budget=MAX_TERM_PAYMENTS * (1 + MAX_OPTIONS),
+        check=restructuring_terms),
+    'insurance_impact': AdmissionRule(
+        {
+            'loanAmount': amount(),
+            'interestRate': Number(True, minimum=0, maximum=100),
+            'loanTermYears': term_years(),
+            'insuranceRate': Number(True, minimum=0, maximum=100),
+            'insuranceTermYears': term_years(False),
+            **FREQUENCY
+        },
+        cost=lambda body: term_payments(body['loanTermYears'], body),
+        budget=MAX_TERM_PAYMENTS,
+        check=terms_check('loanTermYears', 'insuranceTermYears')),
+    'central_bank_rate_impact': AdmissionRule(
+        {
+            'loanAmount': amount(),
+            'baseInterestRate': Number(True, minimum=0, maximum=100),
+            'loanTermYears': term_years(),
+            'centralBankRate': Number(True, minimum=0, maximum=100),
+            'margin': Number(True, minimum=-100, maximum=100),
+            'predictedCbRates': RATE_CHANGES,
+            **FREQUENCY
+        },
+        cost=lambda body: term_payments(body['loanTermYears'], body) + len(body.get('predictedCbRates') or []),
+        budget=3 * MAX_TERM_PAYMENTS,
+        check=terms_check('loanTermYears')),
+    'composite_scenario': AdmissionRule(
+        SCENARIO,
+        cost=scenario_cost,
+        budget=3 * MAX_TERM_PAYMENTS,
+        check=scenario_terms),
+    'export_schedules': AdmissionRule(
+        {
+            'format': String(choices=EXPORT_FORMATS),
+            'compression': String(choices=EXPORT_COMPRESSIONS),
+            'decimals': Integer(minimum=0, maximum=12),
+            'scenarioId': String(max_length=64),
+            'scenario': Object(SCENARIO),
+            'loans': Array(Object(LOAN), min_items=1, max_items=MAX_EXPORT_LOANS),
+            'paymentType': String(choices=PAYMENT_TYPES),
+            'rounding': String(choices=ROUNDING_RULES),
+            **FREQUENCY
+        },
+        cost=export_cost,
+        budget=2_000_000,
+        check=export_terms)
+}
@@ -0,0 +1,158 @@
+import os
+import threading
+
+from flask import g, jsonify, request
+
+from backend.api.utils.metrics import ADMISSION_REJECTIONS
+from backend.api.utils.validation import validate_body
+
+# Requests a single client may have in progress at once, per worker process
+DEFAULT_CLIENT_CONCURRENCY = 4
+CLIENT_CONCURRENCY_ENV = 'MORTGAGE_CLIENT_CONCURRENCY'
+# Multiplier applied to every endpoint's cost budget
+COST_BUDGET_SCALE_ENV = 'MORTGAGE_COST_BUDGET_SCALE'
+# Largest accepted request body, rejected by Flask with 413 before it is read
+MAX_REQUEST_BYTES = 32 * 1024 * 1024
+
+
+class AdmissionRule:
+    """
+    Validation schema, cost model and cost budget of one endpoint
+
+    Parameters:
+    -----------
+    schema : dict
+        Mapping of body key to Field (see backend.api.utils.validation)
+    cost : callable
+        Estimated cost of a valid body, in schedule months computed
+    budget : float
+        Largest accepted cost; costlier requests are rejected with 413
+    check : callable, optional
+        Checks across fields of a body that satisfies the schema: error
+        message, or None if the body is valid
+    """
+
+    def __init__(self, schema, cost, budget, check=None):
+        self.schema = schema
+        self.cost = cost
+        self.budget = budget
+        self.check = check
+
+
+class ClientLimiter:
+    """
+    Non-blocking limit on the number of requests in progress per client
+
+    Parameters:
+    -----------
+    limit : int
+        Requests a client may have in progress at once
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, client):
+        """
+        Take a slot for a client; False if it already has `limit` requests in progress
+        """
+        with self._lock:
+            active = self._active.get(client, 0)
+            if active >= self.limit:
+                return False
+            self._active[client] = active + 1
+            return True
+
+    def release(self, client):
+        with self._lock:
+            active = self._active.get(client, 0) - 1
+            if active > 0:
+                self._active[client] = active
+            else:
+                self._active.pop(client, None)
+
+    def active(self, client):
+        return self._active.get(client, 0)
+
+
+def client_id():
+    """
+    Identity used for per-client limits: the peer address of the request
+
+    Behind a reverse proxy, wrap the app in werkzeug's ProxyFix so that the
+    address is the client's and not the proxy's.
+    """
+    return request.remote_addr or 'unknown'
+
+
+def init_admission(app, rules):
+    """
+    Validate, cost and admit every request to an endpoint with a rule
+
+    Before the route runs, the JSON body is checked against the endpoint's
+    schema (400), its estimated cost against the endpoint's budget (413),
+    and the client's requests in progress against the concurrency limit
+    (429, with Retry-After). Rejections are counted by endpoint and reason.
+
+    Parameters:
+    -----------
+    app : flask.Flask
+        Application
+    rules : dict
+        Mapping of endpoint name to AdmissionRule
+    """
+    app.config.setdefault('MAX_CONTENT_LENGTH', MAX_REQUEST_BYTES)
+    scale = float(os.environ.get(COST_BUDGET_SCALE_ENV, 1.0))
+    limiter = ClientLimiter(int(os.environ.get(CLIENT_CONCURRENCY_ENV, DEFAULT_CLIENT_CONCURRENCY)))
+    app.extensions['client_limiter'] = limiter
+
+    def reject(reason, message, status):
+        ADMISSION_REJECTIONS.inc(request.endpoint, reason)
+        return jsonify({'error': message}), status
+
+    @app.before_request
+    def _admit():
+        rule = rules.get(request.endpoint)
+        if rule is None:
+            return None
+
+        body = request.get_json(silent=True)
+        error = validate_body(rule.schema, body)
+        if error is None and rule.check is not None:
+            error = rule.check(body)
+        if error is not None:
+            return reject('invalid', error, 400)
+
+        cost = rule.cost(body)
+        budget = rule.budget * scale
+        if cost > budget:
+            return reject('cost', f'Request too large: estimated cost {cost:,.0f} exceeds the '
+                                  f'budget of {budget:,.0f} for this endpoint; split it into smaller requests.', 413)
+
+        client = client_id()
+        if not limiter.acquire(client):
+            response, status = reject('concurrency', 'Too many concurrent requests from this client.', 429)
+            response.headers['Retry-After'] = '1'
+            return response, status
+        g.admission_client = client
+        return None
+
+    @app.after_request
+    def _release(response):
+        client = g.pop('admission_client', None)
+        if client is not None:
+            if response.is_streamed:
+                # Streamed bodies are computed while sent: keep the slot until then
+                response.call_on_close(lambda: limiter.release(client))
+            else:
+                limiter.release(client)
+        return response
+
+    @app.teardown_request
+    def _release_on_error(exc):
+        # The route failed before a response was built
+        client = g.pop('admission_client', None)
+        if client is not None:
+            limiter.release(client)
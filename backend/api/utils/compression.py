@@ -0,0 +1,108 @@
+import gzip
+import os
+import time
+
+from flask import request
+
+from backend.api.utils.metrics import STAGE_LATENCY
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+# Bodies smaller than this are sent as is: compression would barely pay for its headers
+DEFAULT_MIN_SIZE = 1024
+COMPRESSION_MIN_SIZE_ENV = 'MORTGAGE_COMPRESSION_MIN_BYTES'
+# Fast levels: JSON of numbers compresses within about 10% of the default levels, several times faster
+GZIP_LEVEL = 1
+BROTLI_QUALITY = 4
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/csv', 'text/plain', 'text/html')
+
+
+def available_encodings():
+    """
+    Content codings the service can produce, in order of preference
+    """
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding, encodings=None):
+    """
+    Preferred content coding accepted by the client, or None
+
+    Parameters:
+    -----------
+    accept_encoding : werkzeug.datastructures.MIMEAccept or Accept
+        Parsed Accept-Encoding header (request.accept_encodings)
+    encodings : sequence of str, optional
+        Codings to choose from, in order of preference; defaults to
+        available_encodings()
+
+    Returns:
+    --------
+    str or None
+        The coding with the highest quality for the client, ties going to
+        the service's preference; None if no coding is acceptable
+    """
+    best, best_quality = None, 0
+    for encoding in encodings or available_encodings():
+        quality = accept_encoding[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding):
+    """
+    Compress a response body with a content coding ('br' or 'gzip')
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, GZIP_LEVEL, mtime=0)
+
+
+def init_compression(app, min_size=None):
+    """
+    Compress response bodies above a size threshold
+
+    The coding is negotiated with the request's Accept-Encoding header
+    (brotli when installed and accepted, else gzip). Streamed, already
+    encoded, non-2xx and non-text responses are left untouched, and every
+    response that could have been compressed varies on Accept-Encoding.
+    Compression time is recorded as the 'compress' request stage.
+
+    Register this after init_metrics, so that the response size metric
+    records the bytes actually sent.
+
+    Parameters:
+    -----------
+    app : flask.Flask
+        Application
+    min_size : int, optional
+        Smallest body compressed, in bytes; defaults to the
+        MORTGAGE_COMPRESSION_MIN_BYTES environment variable, then 1024
+    """
+    if min_size is None:
+        min_size = int(os.environ.get(COMPRESSION_MIN_SIZE_ENV, DEFAULT_MIN_SIZE))
+
+    @app.after_request
+    def _compress(response):
+        if (response.direct_passthrough or response.is_streamed
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+
+        if (not 200 <= response.status_code < 300 or response.status_code == 204
+                or 'Content-Encoding' in response.headers
+                or response.content_length is None or response.content_length < min_size):
+            return response
+        encoding = negotiate_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        start = time.perf_counter()
+        response.set_data(compress(response.get_data(), encoding))
+        response.headers['Content-Encoding'] = encoding
+        STAGE_LATENCY.observe(time.perf_counter() - start, request.endpoint or 'unknown', 'compress')
+        return response
@@ -0,0 +1,295 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import g, request
+
+# Latency buckets in seconds, from sub-millisecond cache hits to multi-second batch work
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Response size buckets in bytes
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = [
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    ]
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    """
+    Monotonically increasing counter with labels
+    """
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labelvalues, value in items:
+            yield self.name, _format_labels(self.labelnames, labelvalues), value
+
+
+class Gauge:
+    """
+    Value that can go up and down, with labels
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues, amount=1):
+        self.inc(*labelvalues, amount=-amount)
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labelvalues, value in items:
+            yield self.name, _format_labels(self.labelnames, labelvalues), value
+
+
+class Histogram:
+    """
+    Histogram with fixed upper bucket bounds, with labels
+
+    Each observation costs one binary search and one locked update, so it is
+    cheap enough to record on every request.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                # Per-bucket counts (last slot is +Inf), sum and count
+                state = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, *labelvalues):
+        state = self._values.get(labelvalues)
+        return state[2] if state else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(labelvalues, (list(state[0]), state[1], state[2]))
+                     for labelvalues, state in self._values.items()]
+        bounds = self.buckets + (float('inf'),)
+        for labelvalues, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, labelvalues, ('le', _format_value(float(bound))))
+                yield f'{self.name}_bucket', labels, cumulative
+            labels = _format_labels(self.labelnames, labelvalues)
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, count
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together in the Prometheus text format
+
+    Metrics are kept in process memory, so with several gunicorn workers each
+    worker reports its own values and the scraper aggregates them.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """
+        Render all metrics in the Prometheus text exposition format (version 0.0.4)
+        """
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry used by the API
+REGISTRY = MetricsRegistry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    'mortgage_request_duration_seconds',
+    'Request latency by endpoint',
+    ('endpoint', 'method', 'status')
+)
+STAGE_LATENCY = REGISTRY.histogram(
+    'mortgage_request_stage_duration_seconds',
+    'Time spent in each request stage (parse, compute, serialize) by endpoint',
+    ('endpoint', 'stage')
+)
+RESPONSE_SIZE = REGISTRY.histogram(
+    'mortgage_response_size_bytes',
+    'Response body size by endpoint',
+    ('endpoint',),
+    buckets=SIZE_BUCKETS
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    'mortgage_cache_requests_total',
+    'Cache lookups by cache name and result (hit or miss)',
+    ('cache', 'result')
+)
+POOL_QUEUE_DEPTH = REGISTRY.gauge(
+    'mortgage_pool_queue_depth',
+    'Tasks submitted to a worker pool and not yet finished',
+    ('pool',)
+)
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    'mortgage_admission_rejections_total',
+    'Requests rejected before running, by endpoint and reason (invalid, cost, concurrency)',
+    ('endpoint', 'reason')
+)
+KERNEL_BACKEND = REGISTRY.gauge(
+    'mortgage_kernel_backend_info',
+    'Kernel backend used for path-dependent calculations (value is always 1)',
+    ('backend',)
+)
+
+
+def record_cache_lookup(cache_name, hit):
+    """
+    Record a cache hit or miss; the hit rate is hits / (hits + misses)
+    """
+    CACHE_REQUESTS.inc(cache_name, 'hit' if hit else 'miss')
+
+
+@contextmanager
+def track_pool_task(pool_name):
+    """
+    Count a task in the pool queue depth gauge while it is pending or running
+    """
+    POOL_QUEUE_DEPTH.inc(pool_name)
+    try:
+        yield
+    finally:
+        POOL_QUEUE_DEPTH.dec(pool_name)
+
+
+@contextmanager
+def stage(name):
+    """
+    Time a stage of the current request
+
+    Usage inside a route:
+
+        with stage('compute'):
+            schedule = generate_payment_schedule(...)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start, request.endpoint or 'unknown', name)
+
+
+def init_metrics(app):
+    """
+    Register request hooks that record latency and response size,
+    and the /metrics endpoint that exposes them
+    """
+
+    @app.before_request
+    def _start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('request_start', None)
+        if start is None:
+            return response
+        endpoint = request.endpoint or 'unknown'
+        REQUEST_LATENCY.observe(time.perf_counter() - start, endpoint, request.method, response.status_code)
+        if response.content_length is not None:
+            RESPONSE_SIZE.observe(response.content_length, endpoint)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Expose metrics in the Prometheus text format."""
+        return REGISTRY.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
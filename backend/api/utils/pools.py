@@ -0,0 +1,68 @@
+"""
+Worker pools shared by the requests of a process
+
+Endpoints that split one request into independent tasks (such as several
+repayment plans of one loan) run them on a process-wide thread pool, so the
+number of threads stays bounded however many requests arrive at once. The
+tasks submitted and not yet finished are reported per pool by the
+mortgage_pool_queue_depth gauge.
+
+MORTGAGE_SCENARIO_WORKERS sets the size of the scenario pool (default: the
+number of CPUs, at most 4); with 1 or 0 the tasks are evaluated in the
+request thread, as a single thread would only add dispatch overhead.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.api.utils.metrics import track_pool_task
+
+SCENARIO_WORKERS_ENV = 'MORTGAGE_SCENARIO_WORKERS'
+DEFAULT_SCENARIO_WORKERS = min(4, os.cpu_count() or 1)
+
+
+class TrackedThreadPool(ThreadPoolExecutor):
+    """
+    Thread pool whose pending and running tasks are counted in the pool queue depth gauge
+
+    Parameters:
+    -----------
+    name : str
+        Pool label of the gauge, and prefix of the thread names
+    max_workers : int
+        Number of threads
+    """
+
+    def __init__(self, name, max_workers):
+        super().__init__(max_workers, thread_name_prefix=name)
+        self.name = name
+
+    def submit(self, fn, /, *args, **kwargs):
+        tracker = track_pool_task(self.name)
+        tracker.__enter__()
+        try:
+            future = super().submit(fn, *args, **kwargs)
+        except BaseException:
+            tracker.__exit__(None, None, None)
+            raise
+        future.add_done_callback(lambda _: tracker.__exit__(None, None, None))
+        return future
+
+
+_scenario_pool = None
+_scenario_pool_lock = threading.Lock()
+
+
+def get_scenario_pool():
+    """
+    Process-wide pool of scenario tasks, or None when it would have a single thread
+    """
+    global _scenario_pool
+    if _scenario_pool is None:
+        with _scenario_pool_lock:
+            if _scenario_pool is None:
+                workers = int(os.environ.get(SCENARIO_WORKERS_ENV, DEFAULT_SCENARIO_WORKERS))
+                if workers <= 1:
+                    return None
+                _scenario_pool = TrackedThreadPool('scenarios', workers)
+    return _scenario_pool
@@ -0,0 +1,197 @@
+"""
+On-demand profiles of single requests
+
+Profiling is off unless MORTGAGE_PROFILE_TOKEN is set: without it no hook is
+registered and requests run exactly as before. With it, a request carrying
+the header `X-Profile-Token: <token>` is profiled by sampling the stack of
+the thread serving it every MORTGAGE_PROFILE_INTERVAL_MS milliseconds
+(default 1), from before validation until its body is sent. The sampler
+needs the GIL: while a profile runs, the interpreter's switch interval is
+lowered to the sampling interval for the whole process.
+
+The samples are written in the collapsed stack format, one
+`frame;frame;...;frame count` line per distinct stack, root first, which
+flamegraph.pl, inferno or speedscope draw as a flame graph:
+
+    curl -H 'X-Profile-Token: ...' -d @payload.json http://host/api/compare
+    curl -H 'X-Profile-Token: ...' http://host/debug/profiles/<X-Profile-File> > out.collapsed
+    flamegraph.pl out.collapsed > out.svg
+
+Profiles are stored in MORTGAGE_PROFILE_DIR (default: a `mortgage_profiles`
+directory in the system temporary directory); the response names the file
+in its X-Profile-File header.
+"""
+import hmac
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+from flask import abort, g, request, send_from_directory
+
+PROFILE_TOKEN_ENV = 'MORTGAGE_PROFILE_TOKEN'
+PROFILE_DIR_ENV = 'MORTGAGE_PROFILE_DIR'
+PROFILE_INTERVAL_ENV = 'MORTGAGE_PROFILE_INTERVAL_MS'
+PROFILE_HEADER = 'X-Profile-Token'
+DEFAULT_INTERVAL_MS = 1.0
+
+
+def frame_label(code):
+    """
+    Flame graph label of a code object: `path/of/module.py:function`
+    """
+    filename = code.co_filename
+    for prefix in sorted(filter(None, sys.path), key=len, reverse=True):
+        if filename.startswith(prefix + os.sep):
+            filename = filename[len(prefix) + 1:]
+            break
+    return f'{filename}:{getattr(code, "co_qualname", code.co_name)}'.replace(' ', '_').replace(';', ':')
+
+
+# Active samplers, and the switch interval to restore when the last one stops
+_switch_lock = threading.Lock()
+_switch_state = {'active': 0, 'interval': None}
+
+
+class StackSampler:
+    """
+    Samples the Python stack of one thread from a background thread
+
+    Parameters:
+    -----------
+    thread_id : int
+        Identifier of the sampled thread (threading.get_ident())
+    interval : float
+        Seconds between samples
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        with _switch_lock:
+            if _switch_state['active'] == 0:
+                _switch_state['interval'] = sys.getswitchinterval()
+                sys.setswitchinterval(min(self.interval, _switch_state['interval']))
+            _switch_state['active'] += 1
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop sampling; returns the number of samples per collapsed stack
+        """
+        if not self._stop.is_set():
+            self._stop.set()
+            self._thread.join()
+            with _switch_lock:
+                _switch_state['active'] -= 1
+                if _switch_state['active'] == 0:
+                    sys.setswitchinterval(_switch_state['interval'])
+        return self.stacks
+
+    def _run(self):
+        labels = self._labels
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            del frame
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+
+def write_collapsed(stacks, path):
+    """
+    Write samples per stack in the collapsed stack format, most sampled first
+    """
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w') as f:
+        for stack, count in stacks.most_common():
+            f.write(f'{stack} {count}\n')
+    os.replace(temp_path, path)
+
+
+def init_profiling(app, token=None, directory=None):
+    """
+    Profile requests that carry the profiling token, when one is configured
+
+    Register this before the other request hooks, so that profiles cover
+    validation, serialization and compression too.
+
+    Parameters:
+    -----------
+    app : flask.Flask
+        Application
+    token : str, optional
+        Secret that enables profiling of a request; defaults to the
+        MORTGAGE_PROFILE_TOKEN environment variable. Without a token
+        nothing is registered.
+    directory : str, optional
+        Directory of the profiles; defaults to MORTGAGE_PROFILE_DIR
+    """
+    token = token or os.environ.get(PROFILE_TOKEN_ENV)
+    if not token:
+        return
+    token = token.encode()
+    directory = (directory or os.environ.get(PROFILE_DIR_ENV)
+                 or os.path.join(tempfile.gettempdir(), 'mortgage_profiles'))
+    os.makedirs(directory, exist_ok=True)
+    interval = float(os.environ.get(PROFILE_INTERVAL_ENV, DEFAULT_INTERVAL_MS)) / 1000
+
+    def authorized():
+        supplied = request.headers.get(PROFILE_HEADER)
+        return supplied is not None and hmac.compare_digest(supplied.encode(), token)
+
+    @app.before_request
+    def _start_profile():
+        if authorized() and request.endpoint != 'profile_file':
+            g.profile = (StackSampler(threading.get_ident(), interval).start(), time.perf_counter())
+
+    @app.after_request
+    def _stop_profile(response):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+        sampler, start = profile
+        name = f'{time.strftime("%Y%m%dT%H%M%S")}-{request.endpoint or "unknown"}-{uuid.uuid4().hex[:8]}.collapsed'
+        response.headers['X-Profile-File'] = name
+
+        def finish():
+            write_collapsed(sampler.stop(), os.path.join(directory, name))
+
+        if response.is_streamed:
+            # Streamed bodies are computed while sent: profile until then
+            response.call_on_close(finish)
+        else:
+            finish()
+            response.headers['X-Profile-Seconds'] = f'{time.perf_counter() - start:.6f}'
+        return response
+
+    @app.teardown_request
+    def _stop_profile_on_error(exc):
+        # The route failed before a response was built
+        profile = g.pop('profile', None)
+        if profile is not None:
+            profile[0].stop()
+
+    @app.route('/debug/profiles/<name>', methods=['GET'])
+    def profile_file(name):
+        """Download a stored profile (requires the profiling token)."""
+        if not authorized():
+            abort(404)
+        return send_from_directory(directory, name, mimetype='text/plain')
@@ -0,0 +1,118 @@
+import os
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Falls back to the standard library encoder
+    orjson = None
+
+JSON_ENCODER_ENV = 'MORTGAGE_JSON_ENCODER'
+
+
+def frame_to_records(frame, fields, rows=None):
+    """
+    Convert DataFrame or Schedule columns to a list of JSON-ready dictionaries
+
+    Columns are converted to Python lists once (`tolist` yields native ints,
+    floats and bools), then zipped into records, which avoids per-row
+    `iterrows` overhead.
+
+    Parameters:
+    -----------
+    frame : pandas.DataFrame or Schedule
+        Source table; anything whose columns support `tolist()`
+    fields : dict
+        Mapping of output key to column name
+    rows : array-like of int, optional
+        Positions of the rows to convert, such as a downsampled selection;
+        all rows by default
+
+    Returns:
+    --------
+    list of dict
+        One dictionary per row
+    """
+    keys = list(fields)
+    if rows is None:
+        columns = [frame[fields[key]].tolist() for key in keys]
+    else:
+        columns = [np.asarray(frame[fields[key]])[rows].tolist() for key in keys]
+    return [dict(zip(keys, values)) for values in zip(*columns)]
+
+
+class NumpyJSONProvider(DefaultJSONProvider):
+    """
+    Standard library JSON provider that also encodes NumPy arrays and scalars
+    """
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, (np.ndarray, np.generic)):
+            return o.tolist()
+        return DefaultJSONProvider.default(o)
+
+
+class OrjsonProvider(NumpyJSONProvider):
+    """
+    JSON provider backed by orjson
+
+    NumPy arrays (C-contiguous, numeric) are encoded natively, without a
+    `tolist` copy; anything orjson cannot encode goes through `default`.
+    Unlike the standard library, NaN and infinity are encoded as null, so
+    responses are always valid JSON. Keys are sorted when `sort_keys` is set,
+    as with the default provider.
+    """
+
+    def _options(self):
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        options = self._options()
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            options |= orjson.OPT_INDENT_2
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=options) + b'\n', mimetype=self.mimetype)
+
+
+JSON_PROVIDERS = {'orjson': OrjsonProvider, 'stdlib': NumpyJSONProvider}
+
+
+def init_json(app, name=None):
+    """
+    Install the JSON provider used by jsonify and request.get_json
+
+    Parameters:
+    -----------
+    app : flask.Flask
+        Application
+    name : str, optional
+        'auto', 'orjson' or 'stdlib'; defaults to the MORTGAGE_JSON_ENCODER
+        environment variable, then 'auto' (orjson when it is installed)
+
+    Returns:
+    --------
+    str
+        Name of the installed provider
+    """
+    name = name or os.environ.get(JSON_ENCODER_ENV, 'auto')
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'stdlib'
+    if name not in JSON_PROVIDERS:
+        raise ValueError(f"Unknown JSON encoder: {name}")
+    if name == 'orjson' and orjson is None:
+        raise ImportError("The orjson JSON encoder requires the orjson package")
+
+    app.json = JSON_PROVIDERS[name](app)
+    return name
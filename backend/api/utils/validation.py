@@ -0,0 +1,161 @@
+import math
+
+
+class Field:
+    """
+    Declarative constraint on one JSON value
+
+    Use the constructors below (Number, Integer, String, Boolean, Array,
+    Object, Mapping) rather than building fields directly.
+
+    Parameters:
+    -----------
+    kind : str
+        'number', 'integer', 'string', 'boolean', 'array', 'object' or 'mapping'
+    required : bool, optional
+        Whether the value must be present and not null
+    minimum, maximum : float, optional
+        Inclusive bounds of numbers, and of string lengths
+    exclusive_minimum : bool, optional
+        Whether the minimum itself is rejected
+    choices : sequence, optional
+        Allowed values
+    min_items, max_items : int, optional
+        Bounds of the number of items of arrays and mappings
+    items : Field, optional
+        Constraint on each item of an array, or each value of a mapping
+    fields : dict, optional
+        Constraints of the keys of an object (other keys are ignored)
+    """
+
+    def __init__(self, kind, required=False, minimum=None, maximum=None, exclusive_minimum=False,
+                 choices=None, min_items=None, max_items=None, items=None, fields=None):
+        self.kind = kind
+        self.required = required
+        self.minimum = minimum
+        self.maximum = maximum
+        self.exclusive_minimum = exclusive_minimum
+        self.choices = tuple(choices) if choices is not None else None
+        self.min_items = min_items
+        self.max_items = max_items
+        self.items = items
+        self.fields = fields
+
+    def check(self, value, path):
+        """
+        Error message for a value, or None if it satisfies the constraint
+        """
+        if value is None:
+            return f'{path} is required.' if self.required else None
+
+        kind = self.kind
+        if kind in ('number', 'integer'):
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                return f'{path} must be a number.'
+            if kind == 'integer' and not isinstance(value, int):
+                return f'{path} must be an integer.'
+            return self._check_bounds(value, path, 'be')
+        if kind == 'string':
+            if not isinstance(value, str):
+                return f'{path} must be a string.'
+            if self.choices is None:
+                return self._check_bounds(len(value), path, 'have a length')
+        elif kind == 'boolean':
+            if not isinstance(value, bool):
+                return f'{path} must be true or false.'
+        elif kind == 'array':
+            if not isinstance(value, list):
+                return f'{path} must be a list.'
+            return self._check_items(enumerate(value), len(value), path, '{path}[{key}]')
+        elif kind in ('object', 'mapping'):
+            if not isinstance(value, dict):
+                return f'{path} must be an object.'
+            if kind == 'mapping':
+                return self._check_items(value.items(), len(value), path, '{path}.{key}')
+            return validate_fields(self.fields, value, path)
+
+        if self.choices is not None and value not in self.choices:
+            return f'{path} must be one of {", ".join(map(str, self.choices))}.'
+        return None
+
+    def _check_bounds(self, value, path, verb):
+        if self.minimum is not None:
+            if value < self.minimum or (self.exclusive_minimum and value == self.minimum):
+                relation = 'greater than' if self.exclusive_minimum else 'at least'
+                return f'{path} must {verb} {relation} {self.minimum:g}.'
+        if self.maximum is not None and value > self.maximum:
+            return f'{path} must {verb} at most {self.maximum:g}.'
+        return None
+
+    def _check_items(self, items, count, path, item_path):
+        if self.min_items is not None and count < self.min_items:
+            return f'{path} must have at least {self.min_items} item(s).'
+        if self.max_items is not None and count > self.max_items:
+            return f'{path} must have at most {self.max_items} item(s).'
+        if self.items is not None:
+            for key, item in items:
+                error = self.items.check(item, item_path.format(path=path, key=key))
+                if error is not None:
+                    return error
+        return None
+
+
+def Number(required=False, minimum=None, maximum=None, exclusive_minimum=False):
+    return Field('number', required, minimum, maximum, exclusive_minimum)
+
+
+def Integer(required=False, minimum=None, maximum=None):
+    return Field('integer', required, minimum, maximum)
+
+
+def String(required=False, choices=None, max_length=None):
+    return Field('string', required, maximum=max_length, choices=choices)
+
+
+def Boolean(required=False):
+    return Field('boolean', required)
+
+
+def Array(items, required=False, min_items=None, max_items=None):
+    return Field('array', required, min_items=min_items, max_items=max_items, items=items)
+
+
+def Object(fields, required=False):
+    return Field('object', required, fields=fields)
+
+
+def Mapping(values, required=False, min_items=None, max_items=None):
+    return Field('mapping', required, min_items=min_items, max_items=max_items, items=values)
+
+
+def validate_fields(schema, body, path=None):
+    """
+    First error message of an object against a schema, or None if it is valid
+
+    Parameters:
+    -----------
+    schema : dict
+        Mapping of key to Field
+    body : dict
+        Decoded JSON object
+    path : str, optional
+        Path of the object in the request body, for messages
+
+    Returns:
+    --------
+    str or None
+    """
+    for name, field in schema.items():
+        error = field.check(body.get(name), f'{path}.{name}' if path else name)
+        if error is not None:
+            return error
+    return None
+
+
+def validate_body(schema, body):
+    """
+    First error message of a request body against a schema, or None if it is valid
+    """
+    if not isinstance(body, dict):
+        return 'Request body must be a JSON object.'
+    return validate_fields(schema, body)
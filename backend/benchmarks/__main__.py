@@ -0,0 +1,129 @@
+import argparse
+import os
+import sys
+
+# Add the parent directory of backend to Python path
+parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(parent_dir)
+
+from backend.benchmarks.cases import (
+    check_kernel_agreement,
+    collect_benchmarks,
+    response_sizes,
+    schedule_memory
+)
+from backend.benchmarks.runner import (
+    DEFAULT_BASELINE_PATH,
+    DEFAULT_THRESHOLD,
+    compare_to_baseline,
+    format_seconds,
+    format_throughput,
+    load_baseline,
+    run_benchmarks,
+    save_baseline
+)
+from backend.tests.helpers import check_sensitivities
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mortgage Calculator Pro benchmarks')
+    parser.add_argument('--group', choices=['core', 'api', 'all'], default='all',
+                        help='Benchmark group to run')
+    parser.add_argument('--filter', default=None,
+                        help='Only run benchmarks whose name contains this substring')
+    parser.add_argument('--baseline', default=os.environ.get('BENCHMARK_BASELINE', DEFAULT_BASELINE_PATH),
+                        help='Path of the JSON baseline file')
+    parser.add_argument('--threshold', type=float,
+                        default=float(os.environ.get('BENCHMARK_THRESHOLD', DEFAULT_THRESHOLD)),
+                        help='Allowed relative slowdown before a benchmark fails (0.25 = 25%%)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='Number of timed rounds per benchmark')
+    parser.add_argument('--min-time', type=float, default=0.05,
+                        help='Minimum duration of one round in seconds')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Store the results as the new baseline instead of comparing')
+    parser.add_argument('--list', action='store_true',
+                        help='List the benchmark names and exit')
+    parser.add_argument('--memory', action='store_true',
+                        help='Report the memory per cached 30-year schedule and exit')
+    parser.add_argument('--sizes', action='store_true',
+                        help='Report the response size of the largest API responses per content coding and exit')
+    parser.add_argument('--skip-check', action='store_true',
+                        help='Do not check that the kernel backends and sensitivities agree before timing')
+
+    args = parser.parse_args(argv)
+
+    groups = ('core', 'api') if args.group == 'all' else (args.group,)
+    benchmarks = collect_benchmarks(groups, args.filter)
+
+    if args.memory:
+        for name, size in schedule_memory().items():
+            print(f'{name:<20} {size / 1024:8.1f} KiB per schedule')
+        return 0
+
+    if args.sizes:
+        for name, sizes in response_sizes().items():
+            identity = sizes['identity']
+            encoded = ', '.join(f'{encoding} {size / 1024:.1f} KiB ({size / identity:.0%})'
+                                for encoding, size in sizes.items() if encoding != 'identity')
+            print(f'{name:<55} {identity / 1024:8.1f} KiB -> {encoded}')
+        return 0
+
+    if args.list:
+        for benchmark in benchmarks:
+            print(benchmark.name)
+        return 0
+
+    if 'core' in groups and not args.skip_check:
+        problems = check_kernel_agreement()
+        if problems:
+            print('Kernel backends disagree:')
+            for problem in problems:
+                print(f'  {problem}')
+            return 1
+        print('Kernel backends agree')
+        problems = check_sensitivities()
+        if problems:
+            print('Analytic sensitivities disagree with finite differences:')
+            for problem in problems:
+                print(f'  {problem}')
+            return 1
+        print('Analytic sensitivities agree with finite differences\n')
+
+    baseline = load_baseline(args.baseline)
+
+    def report(benchmark, result):
+        throughput = ''
+        if 'throughput' in result:
+            throughput = f', {format_throughput(result["throughput"], result["unit"])}'
+        print(f'{benchmark.name:<55} {format_seconds(result["best"]):>10} '
+              f'(median {format_seconds(result["median"])}, {result["loops"]} loops{throughput})', flush=True)
+
+    results = run_benchmarks(benchmarks, repeat=args.repeat, min_time=args.min_time, report=report)
+
+    if args.update_baseline or baseline is None:
+        save_baseline(args.baseline, results, baseline)
+        print(f'\nBaseline written to {args.baseline}')
+        return 0
+
+    comparison = compare_to_baseline(results, baseline, args.threshold)
+
+    print(f'\nComparison with {args.baseline} (threshold +{args.threshold:.0%})')
+    regressions = 0
+    for entry in comparison:
+        ratio = '  new' if entry['ratio'] is None else f'{entry["ratio"]:5.2f}x'
+        flag = '  REGRESSION' if entry['regressed'] else ''
+        print(f'{entry["name"]:<55} {format_seconds(entry["baseline"]):>10} -> '
+              f'{format_seconds(entry["current"]):>10} {ratio}{flag}')
+        regressions += entry['regressed']
+
+    if regressions:
+        print(f'\n{regressions} benchmark(s) slower than the baseline by more than {args.threshold:.0%}')
+        return 1
+
+    print('\nNo regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,863 @@
+import atexit
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from backend.benchmarks.runner import Benchmark
+from backend.core.kernels import available_backends, load_backend
+from backend.core.calculators import (
+    calculate_loan_state,
+    generate_payment_schedule,
+    generate_payment_schedule_cents,
+    generate_payment_schedules
+)
+from backend.core.amortization import ROUNDING_RULES
+from backend.core.incremental import apply_delta, build_snapshot, normalize_scenario
+from backend.core.sensitivities import calculate_sensitivities
+from backend.core.downsampling import lttb_indices
+from backend.core.comparison import calculate_rent_vs_buy, rent_vs_buy_summary, simulate_rent_vs_buy
+from backend.core.forecast import forecast_property_value, forecast_property_values
+from backend.core.model_cache import ModelCache
+from backend.core.currency import calculate_mortgage_in_multiple_currencies
+from backend.core.fx_history import FxHistory, to_days
+from backend.core.scenarios import (
+    calculate_early_repayment,
+    calculate_early_repayment_plans,
+    calculate_restructuring,
+    calculate_restructuring_options,
+    calculate_with_insurance,
+    calculate_with_central_bank_rate,
+    calculate_composite_scenario,
+    floating_rate_changes
+)
+from backend.tests.helpers import kernel_cents_inputs, kernel_inputs, kernel_paths_inputs
+
+# Sweep parameters
+TERM_YEARS = (1, 5, 10, 15, 20, 25, 30, 40, 50)
+SCENARIO_TERM_YEARS = (1, 10, 30, 50)
+BATCH_SIZES = (1, 10, 100, 1000)
+CURRENCY_SETS = (
+    ['USD'],
+    ['USD', 'EUR'],
+    ['USD', 'EUR', 'JPY'],
+    ['USD', 'EUR', 'JPY', 'RUB']
+)
+EARLY_PAYMENT_COUNTS = (0, 1, 10, 50)
+RESTRUCTURING_OPTION_COUNTS = (1, 10, 50)
+REPAYMENT_PLAN_COUNTS = (5, 20)
+PLAN_POOL_THREADS = 4
+DELTA_EDIT_MONTHS = (12, 180, 588)
+QUERY_MONTHS = list(range(0, 361, 12))
+SIMULATION_PATHS = (1000, 5000)
+FORECAST_BATCH_SIZES = (100, 10000)
+FORECAST_REGIONS = 50
+FX_HISTORY_YEARS = 25
+EXPORT_LOANS = 1000
+# Largest JSON responses, timed with each JSON encoder and content coding
+WIRE_PAYLOADS = ('api.compare[years=30]', 'api.compare[years=30,points=120]', 'api.currency[currencies=4]',
+                 'api.calculate_batch[size=100,schedules]')
+# Chart downsampling target (maxPoints)
+CHART_POINTS = 120
+KERNEL_EVENT_COUNTS = (0, 10, 100)
+KERNEL_BATCH_SIZES = (1, 100, 1000)
+KERNEL_PATH_COUNTS = (100, 10000)
+
+# Reference loan used when a parameter is not being swept
+LOAN_AMOUNT = 300000
+INTEREST_RATE = 6.5
+LOAN_TERM_YEARS = 30
+
+
+def make_early_payments(count, loan_term_years=LOAN_TERM_YEARS, amount=2000):
+    """
+    Build `count` early payments spread evenly over the loan term,
+    alternating between the two repayment types
+    """
+    loan_term_months = loan_term_years * 12
+    step = max(1, loan_term_months // (count + 1))
+    return [
+        {
+            'month': step * (i + 1),
+            'amount': amount,
+            'type': 'reduce_term' if i % 2 == 0 else 'reduce_payment'
+        }
+        for i in range(count)
+    ]
+
+
+def make_cb_rates(count, loan_term_years=LOAN_TERM_YEARS, start_rate=4.0):
+    """
+    Build `count` central bank rate changes spread evenly over the loan term
+    """
+    loan_term_months = loan_term_years * 12
+    step = max(2, loan_term_months // (count + 1))
+    return [
+        {'month': step * (i + 1), 'rate': start_rate + 0.25 * ((-1) ** i) * (i % 4)}
+        for i in range(count)
+    ]
+
+
+def make_restructuring_options(count):
+    """
+    Build `count` refinance offers with varied rates, terms and fees
+    """
+    return [
+        {
+            'new_interest_rate': 4.0 + 0.125 * (i % 20),
+            'new_term_years': (10, 15, 20, 25, 30)[i % 5],
+            'fees': 500 * (i % 7)
+        }
+        for i in range(count)
+    ]
+
+
+def make_repayment_plans(count):
+    """
+    Build `count` early repayment plans: lump sums, recurring amounts and
+    mixes of both, alternating between the two repayment types
+    """
+    plans = []
+    for i in range(count):
+        kind = i % 3
+        repayment_type = 'reduce_term' if i % 2 == 0 else 'reduce_payment'
+        plans.append({
+            'early_payments': [] if kind == 1 else [
+                {'month': 12 * (1 + i % 10), 'amount': 10000 + 2500 * i, 'type': repayment_type}
+            ],
+            'recurring': [] if kind == 0 else [
+                {'amount': 100 + 50 * i, 'type': repayment_type, 'start_month': 1 + i,
+                 'end_month': None, 'every_months': (1, 3, 12)[i % 3]}
+            ]
+        })
+    return plans
+
+
+def batch_loans(size):
+    """
+    Build a batch of `size` loans with varied amounts, rates and terms
+    """
+    return [
+        (100000 + 5000 * i, 3.0 + (i % 10) * 0.5, (10, 15, 20, 25, 30)[i % 5])
+        for i in range(size)
+    ]
+
+
+def batch_properties(size, regions=FORECAST_REGIONS):
+    """
+    Build a batch of `size` properties spread over `regions` regions
+
+    Returns (initial values, region of each property, growth rate of each
+    region, regional adjustment of each region); many regions share the
+    same parameters, as real region tables do.
+    """
+    initial_values = [150000 + 1000 * (i % 850) for i in range(size)]
+    property_regions = [i % regions for i in range(size)]
+    growth_rates = [(2.0, 3.0, 4.0, 5.0)[r % 4] for r in range(regions)]
+    adjustments = [(0.0, 0.5, -0.5)[r % 3] for r in range(regions)]
+    return initial_values, property_regions, growth_rates, adjustments
+
+
+def synthetic_fx_history(years=FX_HISTORY_YEARS, currencies=('EUR', 'JPY', 'RUB')):
+    """
+    FX history store in a temporary directory with `years` of daily USD rates
+
+    Rates follow seeded random walks from the bundled spot rates; the
+    directory is removed at exit.
+    """
+    directory = tempfile.mkdtemp(prefix='fx_history_')
+    atexit.register(shutil.rmtree, directory, True)
+
+    history = FxHistory(directory)
+    rng = np.random.default_rng(0)
+    end_day = to_days('2024-12-31')
+    days = np.arange(end_day - round(years * 365.25), end_day + 1)
+    for currency, spot in zip(currencies, (0.85, 110.0, 73.5)):
+        history.write('USD', currency, days, spot * np.exp(np.cumsum(rng.normal(0, 0.005, len(days)))))
+    return history
+
+
+def rent_vs_buy_params(loan_term_years=LOAN_TERM_YEARS):
+    """
+    Keyword arguments for calculate_rent_vs_buy with a typical purchase
+    """
+    return {
+        'property_value': 400000,
+        'down_payment': 80000,
+        'interest_rate': INTEREST_RATE,
+        'loan_term_years': loan_term_years,
+        'monthly_rent': 1800,
+        'rent_growth_rate': 3.0,
+        'property_growth_rate': 4.0,
+        'maintenance_cost_percent': 1.0,
+        'property_tax_percent': 1.2,
+        'rental_income': 0,
+        'tax_benefit_rate': 15,
+        'inflation_rate': 2.5,
+        'opportunity_cost_rate': 6.0
+    }
+
+
+def core_benchmarks():
+    """
+    Benchmarks of the core calculation functions
+    """
+    benchmarks = []
+
+    for years in TERM_YEARS:
+        for payment_type in ('annuity', 'differentiated'):
+            benchmarks.append(Benchmark(
+                f'core.schedule[{payment_type},years={years}]', 'core',
+                lambda years=years, payment_type=payment_type: generate_payment_schedule(
+                    LOAN_AMOUNT, INTEREST_RATE, years, payment_type)
+            ))
+
+    for frequency in ('biweekly', 'weekly'):
+        benchmarks.append(Benchmark(
+            f'core.schedule[annuity,years=30,frequency={frequency}]', 'core',
+            lambda frequency=frequency: generate_payment_schedule(
+                LOAN_AMOUNT, INTEREST_RATE, 30, frequency=frequency)
+        ))
+    benchmarks.append(Benchmark(
+        'core.schedule[annuity,years=30,frequency=biweekly,compounding=semi_annual]', 'core',
+        lambda: generate_payment_schedule(
+            LOAN_AMOUNT, INTEREST_RATE, 30, frequency='biweekly', compounding='semi_annual')
+    ))
+
+    for years in (1, 30, 50):
+        for payment_type in ('annuity', 'differentiated'):
+            benchmarks.append(Benchmark(
+                f'core.schedule_cents[{payment_type},years={years}]', 'core',
+                lambda years=years, payment_type=payment_type: generate_payment_schedule_cents(
+                    LOAN_AMOUNT, INTEREST_RATE, years, payment_type, 'half_up')
+            ))
+
+    for size in BATCH_SIZES:
+        loans = batch_loans(size)
+        if size <= 100:
+            benchmarks.append(Benchmark(
+                f'core.schedule_batch[size={size}]', 'core',
+                lambda loans=loans: [generate_payment_schedule(*loan) for loan in loans]
+            ))
+        amounts, rates, terms = (list(column) for column in zip(*loans))
+        for rounding in (None, 'half_up'):
+            label = 'float' if rounding is None else 'cents'
+            benchmarks.append(Benchmark(
+                f'core.schedules_matrix[{label},size={size}]', 'core',
+                lambda amounts=amounts, rates=rates, terms=terms, rounding=rounding: generate_payment_schedules(
+                    amounts, rates, terms, 'annuity', rounding)
+            ))
+        benchmarks.append(Benchmark(
+            f'core.loan_state[size={size},months={len(QUERY_MONTHS)}]', 'core',
+            lambda amounts=amounts, rates=rates, terms=terms: calculate_loan_state(
+                amounts, rates, terms, QUERY_MONTHS)
+        ))
+        benchmarks.append(Benchmark(
+            f'core.sensitivities[size={size},months={len(QUERY_MONTHS)}]', 'core',
+            lambda amounts=amounts, rates=rates, terms=terms: calculate_sensitivities(
+                amounts, rates, terms, QUERY_MONTHS)
+        ))
+
+    for years in SCENARIO_TERM_YEARS:
+        params = rent_vs_buy_params(years)
+        benchmarks.append(Benchmark(
+            f'core.rent_vs_buy[years={years}]', 'core',
+            lambda params=params: calculate_rent_vs_buy(**params)
+        ))
+
+    # Break-even and totals streamed block by block, without the table
+    params = rent_vs_buy_params(50)
+    benchmarks.append(Benchmark(
+        'core.rent_vs_buy_summary[years=50]', 'core',
+        lambda params=params: rent_vs_buy_summary(**params)
+    ))
+
+    # Downsampling every series of a 50 year rent-vs-buy comparison
+    comparison = calculate_rent_vs_buy(**rent_vs_buy_params(50))
+    series = comparison.drop(columns=['month', 'break_even']).to_numpy(dtype=float).T
+    benchmarks.append(Benchmark(
+        f'core.lttb[series={len(series)},months={len(comparison)},points={CHART_POINTS}]', 'core',
+        lambda: lttb_indices(comparison['month'].to_numpy(), series, CHART_POINTS)
+    ))
+
+    for size in FORECAST_BATCH_SIZES:
+        initial_values, property_regions, growth_rates, adjustments = batch_properties(size)
+        benchmarks.append(Benchmark(
+            f'core.forecast_batch[size={size}]', 'core',
+            lambda initial_values=initial_values, property_regions=property_regions,
+            growth_rates=growth_rates, adjustments=adjustments: forecast_property_values(
+                initial_values, property_regions, growth_rates, 30,
+                regional_adjustments=adjustments, inflation_rate=2.5)
+        ))
+
+    # Fitted ml trend: refit on every call vs a predict from a warm cache
+    model_cache = ModelCache()
+    forecast_property_value(400000, 4.0, 30, model='ml', model_cache=model_cache)
+    for label, cache in (('cold', None), ('warm', model_cache)):
+        benchmarks.append(Benchmark(
+            f'core.forecast_ml[cache={label}]', 'core',
+            lambda cache=cache: forecast_property_value(400000, 4.0, 30, inflation_rate=2.5,
+                                                        model='ml', model_cache=cache)
+        ))
+
+    for paths in SIMULATION_PATHS:
+        params = rent_vs_buy_params(LOAN_TERM_YEARS)
+        benchmarks.append(Benchmark(
+            f'core.rent_vs_buy_simulation[paths={paths}]', 'core',
+            lambda params=params, paths=paths: simulate_rent_vs_buy(**params, paths=paths, seed=0)
+        ))
+
+    for currencies in CURRENCY_SETS:
+        benchmarks.append(Benchmark(
+            f'core.currency[currencies={len(currencies)}]', 'core',
+            lambda currencies=currencies: calculate_mortgage_in_multiple_currencies(
+                LOAN_AMOUNT, INTEREST_RATE, LOAN_TERM_YEARS, 'USD', currencies)
+        ))
+
+    # Backtest: 10 years of history then projected months, vs a 1 year range scan
+    fx_history = synthetic_fx_history()
+    benchmarks.append(Benchmark(
+        'core.currency_backtest[currencies=3]', 'core',
+        lambda: calculate_mortgage_in_multiple_currencies(
+            LOAN_AMOUNT, INTEREST_RATE, LOAN_TERM_YEARS, 'USD', ['USD', 'EUR', 'JPY', 'RUB'],
+            start_date='2015-01-15', fx_history=fx_history)
+    ))
+    benchmarks.append(Benchmark(
+        'core.fx_history_range[days=365]', 'core',
+        lambda: fx_history.series('USD', 'EUR').range('2019-01-01', '2019-12-31')
+    ))
+
+    for count in EARLY_PAYMENT_COUNTS:
+        early_payments = make_early_payments(count)
+        benchmarks.append(Benchmark(
+            f'core.early_repayment[payments={count}]', 'core',
+            lambda early_payments=early_payments: calculate_early_repayment(
+                LOAN_AMOUNT, INTEREST_RATE, LOAN_TERM_YEARS, early_payments)
+        ))
+
+    for count in RESTRUCTURING_OPTION_COUNTS:
+        options = make_restructuring_options(count)
+        benchmarks.append(Benchmark(
+            f'core.restructuring_options[options={count}]', 'core',
+            lambda options=options: calculate_restructuring_options(
+                LOAN_AMOUNT, INTEREST_RATE, LOAN_TERM_YEARS, 60, options)
+        ))
+
+    # The same plans one call each, together, and together on a thread pool
+    plan_pool = ThreadPoolExecutor(PLAN_POOL_THREADS)
+    atexit.register(plan_pool.shutdown)
+    for count in REPAYMENT_PLAN_COUNTS:
+        plans = make_repayment_plans(count)
+        benchmarks.append(Benchmark(
+            f'core.early_repayment_plans[plans={count},separate]', 'core',
+            lambda plans=plans: [
+                (calculate_early_repayment(
+                    LOAN_AMOUNT, INTEREST_RATE, LOAN_TERM_YEARS,
+                    plan['early_payments'] + [
+                        {'month': month, 'amount': recurring['amount'], 'type': recurring['type']}
+                        for recurring in plan['recurring']
+                        for month in range(recurring['start_month'], LOAN_TERM_YEARS * 12 + 1,
+                                           recurring['every_months'])
+                    ]),
+                 generate_payment_schedule(LOAN_AMOUNT, INTEREST_RATE, LOAN_TERM_YEARS))
+                for plan in plans
+            ]
+        ))
+        benchmarks.append(Benchmark(
+            f'core.early_repayment_plans[plans={count}]', 'core',
+            lambda plans=plans: calculate_early_repayment_plans(
+                LOAN_AMOUNT, INTEREST_RATE, LOAN_TERM_YEARS, plans)
+        ))
+        benchmarks.append(Benchmark(
+            f'core.early_repayment_plans[plans={count},threads={PLAN_POOL_THREADS}]', 'core',
+            lambda plans=plans: calculate_early_repayment_plans(
+                LOAN_AMOUNT, INTEREST_RATE, LOAN_TERM_YEARS, plans, executor=plan_pool)
+        ))
+
+    for years in SCENARIO_TERM_YEARS:
+        early_payments = make_early_payments(10, years)
+        cb_rates = make_cb_rates(5, years)
+        benchmarks.append(Benchmark(
+            f'core.early_repayment[years={years},payments=10]', 'core',
+            lambda years=years, early_payments=early_payments: calculate_early_repayment(
+                LOAN_AMOUNT, INTEREST_RATE, years, early_payments)
+        ))
+        benchmarks.append(Benchmark(
+            f'core.restructuring[years={years}]', 'core',
+            lambda years=years: calculate_restructuring(
+                LOAN_AMOUNT, INTEREST_RATE, years, years * 6, 5.0, max(1, years // 2))
+        ))
+        benchmarks.append(Benchmark(
+            f'core.insurance[years={years}]', 'core',
+            lambda years=years: calculate_with_insurance(
+                LOAN_AMOUNT, INTEREST_RATE, years, 0.5, None)
+        ))
+        benchmarks.append(Benchmark(
+            f'core.central_bank_rate[years={years}]', 'core',
+            lambda years=years, cb_rates=cb_rates: calculate_with_central_bank_rate(
+                LOAN_AMOUNT, INTEREST_RATE, years, 4.0, 2.5, list(cb_rates))
+        ))
+        rate_changes = floating_rate_changes(4.0, 2.5, cb_rates)
+        benchmarks.append(Benchmark(
+            f'core.composite[years={years},payments=10,changes=5]', 'core',
+            lambda years=years, rate_changes=rate_changes, early_payments=early_payments:
+                calculate_composite_scenario(
+                    LOAN_AMOUNT, INTEREST_RATE, years, rate_changes, early_payments,
+                    insurance_rate=0.4, insurance_type='balance')
+        ))
+
+    # Interactive edit of a 50-year scenario: full recompute vs suffix recompute
+    params = normalize_scenario(
+        LOAN_AMOUNT, INTEREST_RATE, 50, floating_rate_changes(4.0, 2.5, make_cb_rates(5, 50)),
+        make_early_payments(10, 50), {'rate': 0.4, 'type': 'balance'})
+    snapshot = build_snapshot(params)
+    for month in DELTA_EDIT_MONTHS:
+        delta = {'rate_changes': [{'month': month, 'rate': 5.5}]}
+        edited = apply_delta(snapshot, **delta)[0].params
+        benchmarks.append(Benchmark(
+            f'core.composite_edit[full,month={month}]', 'core',
+            lambda edited=edited: build_snapshot(edited)
+        ))
+        benchmarks.append(Benchmark(
+            f'core.composite_edit[delta,month={month}]', 'core',
+            lambda delta=delta: apply_delta(snapshot, **delta)
+        ))
+
+    return benchmarks
+
+
+def schedule_memory(count=200, loan_term_years=LOAN_TERM_YEARS):
+    """
+    Memory per cached schedule for each schedule representation
+
+    `count` schedules are built and kept alive while tracemalloc measures the
+    memory they hold, so the figures include per-object overhead, not only
+    the column data.
+
+    Returns:
+    --------
+    dict
+        Representation name -> bytes per schedule
+    """
+    import gc
+    import tracemalloc
+
+    representations = {
+        'DataFrame': lambda: generate_payment_schedule(
+            LOAN_AMOUNT, INTEREST_RATE, loan_term_years).to_dataframe(),
+        'Schedule[float64]': lambda: generate_payment_schedule(
+            LOAN_AMOUNT, INTEREST_RATE, loan_term_years),
+        'Schedule[float32]': lambda: generate_payment_schedule(
+            LOAN_AMOUNT, INTEREST_RATE, loan_term_years, dtype=np.float32)
+    }
+
+    results = {}
+    for name, build in representations.items():
+        build()
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        cached = [build() for _ in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        results[name] = (after - before) / len(cached)
+        del cached
+
+    return results
+
+
+def response_sizes(names=WIRE_PAYLOADS):
+    """
+    Response body size of the largest API responses for each content coding
+
+    Returns:
+    --------
+    dict
+        Benchmark payload name -> {content coding ('identity', 'gzip', 'br'): bytes}
+    """
+    from backend.api.app import create_app
+    from backend.api.utils.compression import available_encodings
+
+    client = create_app().test_client()
+    payloads = api_payloads()
+    sizes = {}
+    for name in names:
+        url, payload = payloads[name]
+        sizes[name] = {
+            encoding: len(client.post(url, json=payload, headers={'Accept-Encoding': encoding}).get_data())
+            for encoding in ('identity',) + available_encodings()
+        }
+    return sizes
+
+
+def check_kernel_agreement(rtol=1e-9):
+    """
+    Check that every available kernel backend returns the same results
+
+    Float kernels must agree to a relative tolerance, integer-cents kernels exactly.
+
+    Returns:
+    --------
+    list of str
+        Descriptions of the disagreements (empty when all backends agree)
+    """
+    backends = [load_backend(name) for name in available_backends()]
+    reference, others = backends[0], backends[1:]
+    problems = []
+
+    def compare(label, expected, actual, exact=False):
+        for name in expected:
+            a, b = np.asarray(expected[name]), np.asarray(actual[name])
+            if a.shape != b.shape:
+                problems.append(f'{label} {name}: shape {a.shape} != {b.shape}')
+            elif exact and not np.array_equal(a, b):
+                problems.append(f'{label} {name}: values differ')
+            elif not exact and not np.allclose(a, b, rtol=rtol, atol=rtol * LOAN_AMOUNT):
+                problems.append(f'{label} {name}: max difference {np.abs(a - b).max():.3g}')
+
+    for backend in others:
+        for events in KERNEL_EVENT_COUNTS:
+            inputs = kernel_inputs(events)
+            compare(f'{backend.NAME}.amortize_events[events={events}]',
+                    reference.amortize_events(*inputs), backend.amortize_events(*inputs))
+
+        principal_cents, rate_units, months, payment_cents = kernel_cents_inputs(KERNEL_BATCH_SIZES[1])
+        for rounding in ROUNDING_RULES:
+            for payments in (payment_cents, None):
+                label = f'{backend.NAME}.amortize_cents[{rounding},{"annuity" if payments is not None else "differentiated"}]'
+                compare(label,
+                        reference.amortize_cents(principal_cents, rate_units, months, payments, rounding),
+                        backend.amortize_cents(principal_cents, rate_units, months, payments, rounding),
+                        exact=True)
+
+        initial_values, monthly_returns = kernel_paths_inputs(KERNEL_PATH_COUNTS[0])
+        compare(f'{backend.NAME}.compound_paths',
+                {'values': reference.compound_paths(initial_values, monthly_returns)},
+                {'values': backend.compound_paths(initial_values, monthly_returns)})
+
+    return problems
+
+
+def kernel_benchmarks():
+    """
+    Benchmarks of each available kernel backend on the same inputs
+    """
+    benchmarks = []
+
+    for name in available_backends():
+        backend = load_backend(name)
+        backend.warm_up()
+
+        for events in KERNEL_EVENT_COUNTS:
+            inputs = kernel_inputs(events)
+            benchmarks.append(Benchmark(
+                f'core.kernel[{name}].amortize_events[events={events}]', 'core',
+                lambda backend=backend, inputs=inputs: backend.amortize_events(*inputs)
+            ))
+
+        for size in KERNEL_BATCH_SIZES:
+            inputs = kernel_cents_inputs(size)
+            benchmarks.append(Benchmark(
+                f'core.kernel[{name}].amortize_cents[size={size}]', 'core',
+                lambda backend=backend, inputs=inputs: backend.amortize_cents(*inputs, 'half_up')
+            ))
+
+        for paths in KERNEL_PATH_COUNTS:
+            inputs = kernel_paths_inputs(paths)
+            benchmarks.append(Benchmark(
+                f'core.kernel[{name}].compound_paths[paths={paths}]', 'core',
+                lambda backend=backend, inputs=inputs: backend.compound_paths(*inputs)
+            ))
+
+    return benchmarks
+
+
+def api_payloads():
+    """
+    Request payloads for each API route, keyed by benchmark name
+    """
+    payloads = {}
+
+    for years in (1, 30, 50):
+        payloads[f'api.calculate[years={years}]'] = ('/api/calculate', {
+            'loanAmount': LOAN_AMOUNT,
+            'interestRate': INTEREST_RATE,
+            'loanTermYears': years,
+            'paymentType': 'annuity'
+        })
+
+    payloads['api.calculate[years=30,cents]'] = ('/api/calculate', {
+        'loanAmount': LOAN_AMOUNT,
+        'interestRate': INTEREST_RATE,
+        'loanTermYears': 30,
+        'rounding': 'half_up'
+    })
+
+    payloads['api.calculate[years=30,frequency=biweekly]'] = ('/api/calculate', {
+        'loanAmount': LOAN_AMOUNT,
+        'interestRate': INTEREST_RATE,
+        'loanTermYears': 30,
+        'paymentFrequency': 'biweekly'
+    })
+
+    for size in (10, 1000):
+        payloads[f'api.calculate_batch[size={size}]'] = ('/api/calculate/batch', {
+            'loans': [
+                {'loanAmount': amount, 'interestRate': rate, 'loanTermYears': years}
+                for amount, rate, years in batch_loans(size)
+            ]
+        })
+        payloads[f'api.query[size={size},months={len(QUERY_MONTHS)}]'] = ('/api/query', {
+            'loans': [
+                {'loanAmount': amount, 'interestRate': rate, 'loanTermYears': years}
+                for amount, rate, years in batch_loans(size)
+            ],
+            'months': QUERY_MONTHS
+        })
+        payloads[f'api.sensitivities[size={size},months={len(QUERY_MONTHS)}]'] = ('/api/sensitivities', {
+            'loans': [
+                {'loanAmount': amount, 'interestRate': rate, 'loanTermYears': years}
+                for amount, rate, years in batch_loans(size)
+            ],
+            'months': QUERY_MONTHS
+        })
+
+    payloads['api.calculate_batch[size=100,schedules]'] = ('/api/calculate/batch', {
+        'loans': [
+            {'loanAmount': amount, 'interestRate': rate, 'loanTermYears': years}
+            for amount, rate, years in batch_loans(100)
+        ],
+        'includeSchedules': True
+    })
+
+    payloads['api.forecast[years=30]'] = ('/api/forecast', {
+        'initialValue': 400000,
+        'growthRate': 4.0,
+        'years': 30,
+        'inflationRate': 2.5,
+        'model': 'linear'
+    })
+
+    payloads['api.forecast[model=ml]'] = ('/api/forecast', {
+        'initialValue': 400000,
+        'growthRate': 4.0,
+        'years': 30,
+        'inflationRate': 2.5,
+        'model': 'ml'
+    })
+
+    initial_values, property_regions, growth_rates, adjustments = batch_properties(1000)
+    payloads['api.forecast_batch[size=1000]'] = ('/api/forecast/batch', {
+        'properties': [{'initialValue': value, 'region': f'region-{region}'}
+                       for value, region in zip(initial_values, property_regions)],
+        'regions': {f'region-{i}': {'growthRate': rate, 'regionalAdjustment': adjustment}
+                    for i, (rate, adjustment) in enumerate(zip(growth_rates, adjustments))},
+        'years': 30,
+        'inflationRate': 2.5,
+        'model': 'linear'
+    })
+
+    compare_payload = {
+        'propertyValue': 400000,
+        'downPayment': 80000,
+        'interestRate': INTEREST_RATE,
+        'loanTermYears': 30,
+        'monthlyRent': 1800,
+        'rentGrowthRate': 3.0,
+        'propertyGrowthRate': 4.0,
+        'maintenanceCostPercent': 1.0,
+        'propertyTaxPercent': 1.2,
+        'taxBenefitRate': 15,
+        'inflationRate': 2.5,
+        'opportunityCostRate': 6.0
+    }
+    payloads['api.compare[years=30]'] = ('/api/compare', compare_payload)
+    payloads[f'api.compare[years=30,points={CHART_POINTS}]'] = ('/api/compare', dict(
+        compare_payload, maxPoints=CHART_POINTS))
+
+    payloads['api.compare_simulate[paths=5000]'] = ('/api/compare/simulate', dict(
+        compare_payload, paths=5000, investmentVolatility=12.0, seed=0))
+
+    for currencies in CURRENCY_SETS:
+        payloads[f'api.currency[currencies={len(currencies)}]'] = ('/api/currency', {
+            'loanAmount': LOAN_AMOUNT,
+            'interestRate': INTEREST_RATE,
+            'loanTermYears': LOAN_TERM_YEARS,
+            'baseCurrency': 'USD',
+            'targetCurrencies': currencies
+        })
+    payloads[f'api.currency[currencies=4,points={CHART_POINTS}]'] = ('/api/currency', dict(
+        payloads['api.currency[currencies=4]'][1], maxPoints=CHART_POINTS))
+
+    for count in (1, 10, 50):
+        payloads[f'api.early_repayment[payments={count}]'] = ('/api/scenarios/early_repayment', {
+            'loanAmount': LOAN_AMOUNT,
+            'interestRate': INTEREST_RATE,
+            'loanTermYears': LOAN_TERM_YEARS,
+            'earlyPayments': make_early_payments(count)
+        })
+
+    payloads['api.early_repayment[plans=20]'] = ('/api/scenarios/early_repayment', {
+        'loanAmount': LOAN_AMOUNT,
+        'interestRate': INTEREST_RATE,
+        'loanTermYears': LOAN_TERM_YEARS,
+        'plans': [
+            {
+                'name': f'Plan {i + 1}',
+                'earlyPayments': plan['early_payments'],
+                'recurring': [
+                    {'amount': recurring['amount'], 'type': recurring['type'],
+                     'startMonth': recurring['start_month'], 'everyMonths': recurring['every_months']}
+                    for recurring in plan['recurring']
+                ]
+            }
+            for i, plan in enumerate(make_repayment_plans(20))
+        ]
+    })
+
+    payloads['api.restructuring[years=30]'] = ('/api/scenarios/restructuring', {
+        'loanAmount': LOAN_AMOUNT,
+        'originalInterestRate': INTEREST_RATE,
+        'originalTermYears': LOAN_TERM_YEARS,
+        'monthsPaid': 60,
+        'newInterestRate': 5.0,
+        'newTermYears': 20
+    })
+
+    payloads['api.restructuring[options=50]'] = ('/api/scenarios/restructuring', {
+        'loanAmount': LOAN_AMOUNT,
+        'originalInterestRate': INTEREST_RATE,
+        'originalTermYears': LOAN_TERM_YEARS,
+        'monthsPaid': 60,
+        'options': [
+            {'newInterestRate': option['new_interest_rate'], 'newTermYears': option['new_term_years'],
+             'fees': option['fees']}
+            for option in make_restructuring_options(50)
+        ]
+    })
+
+    payloads['api.insurance[years=30]'] = ('/api/scenarios/insurance', {
+        'loanAmount': LOAN_AMOUNT,
+        'interestRate': INTEREST_RATE,
+        'loanTermYears': LOAN_TERM_YEARS,
+        'insuranceRate': 0.5
+    })
+
+    payloads['api.central_bank_rate[years=30]'] = ('/api/scenarios/central_bank_rate', {
+        'loanAmount': LOAN_AMOUNT,
+        'baseInterestRate': INTEREST_RATE,
+        'loanTermYears': LOAN_TERM_YEARS,
+        'centralBankRate': 4.0,
+        'margin': 2.5,
+        'predictedCbRates': make_cb_rates(5)
+    })
+
+    payloads['api.composite[years=30]'] = ('/api/scenarios/composite', {
+        'loanAmount': LOAN_AMOUNT,
+        'loanTermYears': LOAN_TERM_YEARS,
+        'floatingRate': {'centralBankRate': 4.0, 'margin': 2.5, 'predictedCbRates': make_cb_rates(5)},
+        'earlyPayments': make_early_payments(10),
+        'insurance': {'rate': 0.4, 'type': 'balance'}
+    })
+
+    return payloads
+
+
+def api_benchmarks():
+    """
+    Benchmarks of the Flask routes, called through the test client
+    """
+    from backend.api.app import create_app
+
+    client = create_app().test_client()
+    benchmarks = []
+
+    def post(url, payload, headers=None, client=client):
+        response = client.post(url, json=payload, headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError(f'{url} returned {response.status_code}: {response.get_data(as_text=True)}')
+        # Consume streamed bodies so that their generation is timed, then
+        # close them as a WSGI server would
+        response.get_data()
+        response.close()
+        return response
+
+    for name, (url, payload) in api_payloads().items():
+        benchmarks.append(Benchmark(
+            name, 'api',
+            lambda url=url, payload=payload: post(url, payload)
+        ))
+
+    # Wire format: the default (orjson when installed) against the standard
+    # library encoder, and compressed against identity bodies
+    from backend.api.utils.compression import available_encodings
+    from backend.api.utils.serialization import init_json
+
+    stdlib_app = create_app()
+    init_json(stdlib_app, 'stdlib')
+    stdlib_client = stdlib_app.test_client()
+    payloads = api_payloads()
+    for name in WIRE_PAYLOADS:
+        url, payload = payloads[name]
+        variants = {'json=stdlib': (stdlib_client, None)}
+        for encoding in available_encodings():
+            variants[f'encoding={encoding}'] = (client, {'Accept-Encoding': encoding})
+        for label, (variant_client, headers) in variants.items():
+            benchmarks.append(Benchmark(
+                f'{name[:-1]},{label}]', 'api',
+                lambda url=url, payload=payload, headers=headers, variant_client=variant_client:
+                    post(url, payload, headers, variant_client)
+            ))
+
+    # Export throughput in schedule rows per second
+    from backend.api.utils.export import parquet_available
+
+    loans = batch_loans(EXPORT_LOANS)
+    export_rows = sum(term * 12 for _, _, term in loans)
+    export_loans = [{'loanAmount': amount, 'interestRate': rate, 'loanTermYears': term}
+                    for amount, rate, term in loans]
+    export_options = {
+        'csv': {'format': 'csv'},
+        'csv,decimals=2': {'format': 'csv', 'decimals': 2},
+        'csv.gz': {'format': 'csv', 'compression': 'gzip'}
+    }
+    if parquet_available():
+        export_options['parquet'] = {'format': 'parquet'}
+    for label, options in export_options.items():
+        payload = dict(options, loans=export_loans)
+        benchmarks.append(Benchmark(
+            f'api.export[{label},loans={EXPORT_LOANS}]', 'api',
+            lambda payload=payload: post('/api/export', payload),
+            items=export_rows
+        ))
+
+    return benchmarks
+
+
+def collect_benchmarks(groups=('core', 'api'), name_filter=None):
+    """
+    Collect the benchmark cases of the selected groups
+
+    Parameters:
+    -----------
+    groups : tuple of str, optional
+        Benchmark groups to include ('core', 'api')
+    name_filter : str, optional
+        Only include cases whose name contains this substring
+
+    Returns:
+    --------
+    list of Benchmark
+    """
+    benchmarks = []
+    if 'core' in groups:
+        benchmarks.extend(core_benchmarks())
+        benchmarks.extend(kernel_benchmarks())
+    if 'api' in groups:
+        benchmarks.extend(api_benchmarks())
+
+    if name_filter:
+        benchmarks = [b for b in benchmarks if name_filter in b.name]
+
+    return benchmarks
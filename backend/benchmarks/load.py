@@ -0,0 +1,340 @@
+"""
+End-to-end load test of the API served by gunicorn
+
+Starts `gunicorn backend.api.app:create_app()` locally for every combination
+of worker processes, threads per worker and environment settings, drives it
+for a fixed time with a weighted mix of realistic requests from concurrent
+keep-alive connections, and reports throughput and p50/p95/p99 latency per
+endpoint:
+
+    python -m backend.benchmarks.load --workers 1,2,4 --threads 1,4 --duration 30
+
+Settings read from the environment by the service (kernel backend, pool
+sizes, JSON encoder...) are swept with --env, one configuration per value:
+
+    python -m backend.benchmarks.load --workers 2 --env MORTGAGE_KERNEL_BACKEND=numpy,numba
+
+--url drives an already running server instead. All load comes from one
+client address, so the per-client concurrency limit of the service is raised
+to the load generator's concurrency. The generator is a single Python process:
+run it on a machine with spare cores, and compare configurations rather than
+reading the absolute numbers of one run.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from backend.api.utils.admission import CLIENT_CONCURRENCY_ENV
+from backend.benchmarks.cases import api_payloads
+from backend.benchmarks.runner import environment_info, format_seconds
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+APP_SPEC = 'backend.api.app:create_app()'
+GUNICORN_CONFIG = os.path.join(REPO_ROOT, 'backend', 'gunicorn.conf.py')
+DEFAULT_PORT = 8765
+SERVER_START_TIMEOUT = 30
+REQUEST_TIMEOUT = 60
+PERCENTILES = (50, 95, 99)
+
+# Request mix: benchmark payload name and relative weight, roughly the traffic of the web app
+LOAD_MIX = {
+    'api.calculate[years=30]': 25,
+    'api.calculate[years=30,cents]': 5,
+    'api.calculate[years=30,frequency=biweekly]': 5,
+    'api.compare[years=30]': 10,
+    'api.currency[currencies=2]': 8,
+    'api.forecast[years=30]': 10,
+    'api.early_repayment[payments=10]': 10,
+    'api.restructuring[years=30]': 6,
+    'api.insurance[years=30]': 5,
+    'api.central_bank_rate[years=30]': 6,
+    'api.composite[years=30]': 10
+}
+
+
+def load_requests(mix=None):
+    """
+    Paths, encoded JSON bodies and weights of the request mix
+
+    Returns:
+    --------
+    list of tuple
+        (path, body bytes, weight) for each payload of the mix
+    """
+    payloads = api_payloads()
+    requests = []
+    for name, weight in (mix or LOAD_MIX).items():
+        path, body = payloads[name]
+        requests.append((path, json.dumps(body).encode(), weight))
+    return requests
+
+
+def run_load(url, requests, concurrency=16, duration=20.0, warmup=3.0, seed=0):
+    """
+    Drive a server with the request mix from concurrent connections
+
+    Each of `concurrency` threads keeps one HTTP/1.1 connection open and sends
+    requests drawn from the weighted mix back to back. Requests completed
+    during the first `warmup` seconds are not recorded.
+
+    Parameters:
+    -----------
+    url : str
+        Base URL of the server, such as http://127.0.0.1:8765
+    requests : list of tuple
+        (path, body, weight) from load_requests
+    concurrency : int, optional
+        Number of concurrent connections
+    duration : float, optional
+        Seconds of recorded load
+    warmup : float, optional
+        Seconds of unrecorded load before it
+
+    Returns:
+    --------
+    tuple
+        (samples, elapsed): list of (path, seconds, status) per recorded
+        request (status 0 for connection errors), and the recorded seconds
+    """
+    address = urlsplit(url)
+    paths, bodies, weights = zip(*requests)
+    start = time.perf_counter()
+    record_from = start + warmup
+    stop_at = record_from + duration
+    samples = []
+    samples_lock = threading.Lock()
+
+    def connect():
+        return http.client.HTTPConnection(address.hostname, address.port, timeout=REQUEST_TIMEOUT)
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        connection = connect()
+        recorded = []
+        while True:
+            choice = rng.choices(range(len(paths)), weights)[0]
+            sent = time.perf_counter()
+            if sent >= stop_at:
+                break
+            try:
+                connection.request('POST', paths[choice], bodies[choice], {
+                    'Content-Type': 'application/json',
+                    'Accept-Encoding': 'gzip'
+                })
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = connect()
+                status = 0
+            if sent >= record_from:
+                recorded.append((paths[choice], time.perf_counter() - sent, status))
+        connection.close()
+        with samples_lock:
+            samples.extend(recorded)
+
+    threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, max(time.perf_counter(), stop_at) - record_from
+
+
+def summarize(samples, elapsed):
+    """
+    Throughput and latency percentiles per endpoint, and over all requests
+
+    Returns:
+    --------
+    dict
+        Mapping of path (and 'all') to requests, errors (non-2xx or failed),
+        throughput (requests per second) and p50/p95/p99 latency in seconds
+    """
+    by_path = {}
+    for path, seconds, status in samples:
+        by_path.setdefault(path, []).append((seconds, status))
+    by_path['all'] = [(seconds, status) for _, seconds, status in samples]
+
+    summary = {}
+    for path, entries in sorted(by_path.items()):
+        latencies = np.array([seconds for seconds, _ in entries])
+        quantiles = np.percentile(latencies, PERCENTILES) if len(latencies) else [float('nan')] * len(PERCENTILES)
+        summary[path] = {
+            'requests': len(entries),
+            'errors': sum(1 for _, status in entries if not 200 <= status < 300),
+            'throughput': len(entries) / elapsed,
+            **{f'p{q}': float(value) for q, value in zip(PERCENTILES, quantiles)}
+        }
+    return summary
+
+
+def start_server(workers, threads, port, env=None):
+    """
+    Start gunicorn serving the API on 127.0.0.1 and wait until it answers
+
+    Parameters:
+    -----------
+    workers, threads : int
+        Worker processes and threads per worker (gthread workers when above 1)
+    port : int
+        Port to bind
+    env : dict, optional
+        Environment variables set for the server on top of the current ones
+
+    Returns:
+    --------
+    subprocess.Popen
+        The gunicorn master process
+    """
+    command = [
+        sys.executable, '-m', 'gunicorn',
+        '--bind', f'127.0.0.1:{port}',
+        '--workers', str(workers),
+        '--threads', str(threads),
+        '--timeout', str(REQUEST_TIMEOUT),
+        '--log-level', 'warning',
+        '--config', GUNICORN_CONFIG,
+        APP_SPEC
+    ]
+    server_env = dict(os.environ, **(env or {}))
+    server_env['PYTHONPATH'] = os.pathsep.join(filter(None, (REPO_ROOT, server_env.get('PYTHONPATH'))))
+    process = subprocess.Popen(command, cwd=REPO_ROOT, env=server_env)
+
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with status {process.returncode}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                pass
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/')
+            connection.getresponse().read()
+            connection.close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f'gunicorn did not answer within {SERVER_START_TIMEOUT} seconds')
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=SERVER_START_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def parse_env_settings(settings):
+    """
+    Environment configurations from KEY=VALUE[,VALUE...] arguments
+
+    Returns:
+    --------
+    list of dict
+        One environment per combination of the listed values
+    """
+    keys, values = [], []
+    for setting in settings or []:
+        key, _, listed = setting.partition('=')
+        if not key or not listed:
+            raise ValueError(f'Expected KEY=VALUE[,VALUE...], got {setting!r}')
+        keys.append(key)
+        values.append(listed.split(','))
+    return [dict(zip(keys, combination)) for combination in itertools.product(*values)]
+
+
+def print_summary(label, summary):
+    print(f'\n{label}')
+    print(f'{"endpoint":<40} {"requests":>9} {"errors":>7} {"req/s":>9} '
+          + ' '.join(f'{f"p{q}":>10}' for q in PERCENTILES))
+    for path, entry in summary.items():
+        print(f'{path:<40} {entry["requests"]:>9} {entry["errors"]:>7} {entry["throughput"]:>9.1f} '
+              + ' '.join(f'{format_seconds(entry[f"p{q}"]):>10}' for q in PERCENTILES), flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mortgage Calculator Pro load test')
+    parser.add_argument('--url', default=None,
+                        help='Drive an already running server instead of starting gunicorn')
+    parser.add_argument('--workers', default='1,2',
+                        help='Comma-separated gunicorn worker process counts')
+    parser.add_argument('--threads', default='1,4',
+                        help='Comma-separated thread counts per worker')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE[,VALUE...]',
+                        help='Server environment setting; several values add configurations')
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help='Concurrent client connections')
+    parser.add_argument('--duration', type=float, default=20.0,
+                        help='Seconds of recorded load per configuration')
+    parser.add_argument('--warmup', type=float, default=3.0,
+                        help='Seconds of unrecorded load before each measurement')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help='Port of the local server')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed of the request mix')
+    parser.add_argument('--output', default=None,
+                        help='Write the results of every configuration to this JSON file')
+
+    args = parser.parse_args(argv)
+    requests = load_requests()
+
+    if args.url:
+        configurations = [({}, None, None)]
+    else:
+        configurations = [
+            (env, workers, threads)
+            for env in parse_env_settings(args.env)
+            for workers in map(int, args.workers.split(','))
+            for threads in map(int, args.threads.split(','))
+        ]
+
+    results = []
+    for env, workers, threads in configurations:
+        server = None
+        if args.url:
+            url, label = args.url, args.url
+        else:
+            # Every request comes from this host: let it use all its connections
+            server_env = {CLIENT_CONCURRENCY_ENV: str(args.concurrency), **env}
+            server = start_server(workers, threads, args.port, server_env)
+            url = f'http://127.0.0.1:{args.port}'
+            label = ', '.join([f'workers={workers}', f'threads={threads}']
+                              + [f'{key}={value}' for key, value in env.items()])
+        try:
+            samples, elapsed = run_load(url, requests, args.concurrency, args.duration, args.warmup, args.seed)
+        finally:
+            if server is not None:
+                stop_server(server)
+
+        summary = summarize(samples, elapsed)
+        print_summary(f'{label} (concurrency {args.concurrency}, {elapsed:.1f} s)', summary)
+        results.append({'workers': workers, 'threads': threads, 'env': env,
+                        'concurrency': args.concurrency, 'seconds': elapsed, 'endpoints': summary})
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment_info(), 'mix': LOAD_MIX, 'results': results}, f, indent=2)
+        print(f'\nResults written to {args.output}')
+
+    errors = sum(result['endpoints'].get('all', {}).get('errors', 0) for result in results)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,244 @@
+import json
+import os
+import platform
+import time
+from datetime import datetime, timezone
+
+
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_THRESHOLD = 0.25
+
+
+class Benchmark:
+    """
+    A single named benchmark case
+
+    Parameters:
+    -----------
+    name : str
+        Unique benchmark name, used as the key in the baseline file
+    group : str
+        Group name ('core' or 'api')
+    func : callable
+        Zero-argument callable to time
+    items : int, optional
+        Number of items (rows, bytes...) processed per call; results then
+        include a throughput in items per second
+    unit : str, optional
+        Name of the items, for reports
+    """
+
+    def __init__(self, name, group, func, items=None, unit='rows'):
+        self.name = name
+        self.group = group
+        self.func = func
+        self.items = items
+        self.unit = unit
+
+
+def time_benchmark(benchmark, repeat=5, min_time=0.05):
+    """
+    Time a benchmark case
+
+    The callable is run in a loop whose length is calibrated so that one round
+    takes at least `min_time` seconds, and the round is repeated `repeat` times.
+
+    Parameters:
+    -----------
+    benchmark : Benchmark
+        Benchmark case to time
+    repeat : int, optional
+        Number of timed rounds
+    min_time : float, optional
+        Minimum duration of one round in seconds
+
+    Returns:
+    --------
+    dict
+        Timing result with best and median seconds per call
+    """
+    func = benchmark.func
+
+    # Warm up and calibrate the number of loops per round
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        timings.append((time.perf_counter() - start) / loops)
+
+    timings.sort()
+    return {
+        'best': timings[0],
+        'median': timings[len(timings) // 2],
+        'loops': loops,
+        'rounds': repeat
+    }
+
+
+def run_benchmarks(benchmarks, repeat=5, min_time=0.05, report=None):
+    """
+    Run a list of benchmark cases
+
+    Parameters:
+    -----------
+    benchmarks : list of Benchmark
+        Cases to run
+    repeat : int, optional
+        Number of timed rounds per case
+    min_time : float, optional
+        Minimum duration of one round in seconds
+    report : callable, optional
+        Called with (benchmark, result) after each case
+
+    Returns:
+    --------
+    dict
+        Results keyed by benchmark name
+    """
+    results = {}
+    for benchmark in benchmarks:
+        result = time_benchmark(benchmark, repeat=repeat, min_time=min_time)
+        result['group'] = benchmark.group
+        if benchmark.items is not None:
+            result['throughput'] = benchmark.items / result['best'] if result['best'] > 0 else None
+            result['unit'] = benchmark.unit
+        results[benchmark.name] = result
+        if report is not None:
+            report(benchmark, result)
+    return results
+
+
+def environment_info():
+    """
+    Describe the machine and library versions the results were produced on
+    """
+    import numpy as np
+    import pandas as pd
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'created': datetime.now(timezone.utc).isoformat()
+    }
+
+
+def load_baseline(path):
+    """
+    Load a baseline file, returning None if it does not exist
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results, previous=None):
+    """
+    Write results to a baseline file
+
+    Cases that were not run this time (e.g. because of a filter) are kept from
+    the previous baseline.
+    """
+    merged = dict(previous['results']) if previous else {}
+    merged.update(results)
+
+    baseline = {
+        'environment': environment_info(),
+        'results': dict(sorted(merged.items()))
+    }
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def compare_to_baseline(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare results to a baseline
+
+    The best time of each case is compared, as it is the least sensitive to
+    noise from other processes.
+
+    Parameters:
+    -----------
+    results : dict
+        Results from run_benchmarks
+    baseline : dict
+        Baseline loaded with load_baseline
+    threshold : float, optional
+        Allowed relative slowdown (0.25 means 25% slower than the baseline)
+
+    Returns:
+    --------
+    list of dict
+        One entry per case with the baseline and current time, the ratio and
+        whether the case regressed
+    """
+    comparison = []
+    baseline_results = baseline['results'] if baseline else {}
+
+    for name, result in results.items():
+        previous = baseline_results.get(name)
+        if previous is None:
+            comparison.append({
+                'name': name,
+                'baseline': None,
+                'current': result['best'],
+                'ratio': None,
+                'regressed': False
+            })
+            continue
+
+        ratio = result['best'] / previous['best'] if previous['best'] > 0 else 1.0
+        comparison.append({
+            'name': name,
+            'baseline': previous['best'],
+            'current': result['best'],
+            'ratio': ratio,
+            'regressed': ratio > 1 + threshold
+        })
+
+    return comparison
+
+
+def format_seconds(seconds):
+    """
+    Format a duration with a readable unit
+    """
+    if seconds is None:
+        return '-'
+    if seconds < 1e-3:
+        return f'{seconds * 1e6:.1f}us'
+    if seconds < 1:
+        return f'{seconds * 1e3:.2f}ms'
+    return f'{seconds:.3f}s'
+
+
+def format_throughput(items_per_second, unit):
+    """
+    Format a throughput with a readable magnitude
+    """
+    if items_per_second is None:
+        return '-'
+    for factor, prefix in ((1e9, 'G'), (1e6, 'M'), (1e3, 'k')):
+        if items_per_second >= factor:
+            return f'{items_per_second / factor:.2f}{prefix} {unit}/s'
+    return f'{items_per_second:.1f} {unit}/s'
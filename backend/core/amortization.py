@@ -0,0 +1,594 @@
+import numpy as np
+
+from backend.core.tables import get_tables
+
+# Payments per year of each payment frequency
+PAYMENT_FREQUENCIES = {'monthly': 12, 'semi_monthly': 24, 'biweekly': 26, 'weekly': 52}
+# Compounding periods per year of each compounding convention; 'payment'
+# compounds once per payment period (the annual rate divided by the number
+# of payments per year) and 'continuous' compounds continuously
+COMPOUNDING_PERIODS = {'payment': None, 'monthly': 12, 'semi_annual': 2, 'annual': 1,
+                       'daily': 365, 'continuous': None}
+
+
+def payments_per_year(frequency='monthly'):
+    """
+    Number of payments per year of a payment frequency
+    """
+    if frequency not in PAYMENT_FREQUENCIES:
+        raise ValueError(f"Unknown payment frequency: {frequency}")
+    return PAYMENT_FREQUENCIES[frequency]
+
+
+def compounds_per_payment(frequency='monthly', compounding='payment'):
+    """
+    Whether interest compounds exactly once per payment period
+
+    The periodic rate is then the annual rate divided by the number of
+    payments per year, which is what exact cents schedules require.
+    """
+    if compounding not in COMPOUNDING_PERIODS:
+        raise ValueError(f"Unknown compounding convention: {compounding}")
+    return compounding == 'payment' or COMPOUNDING_PERIODS[compounding] == payments_per_year(frequency)
+
+
+def periodic_rate(interest_rate, frequency='monthly', compounding='payment'):
+    """
+    Interest rate of one payment period from an annual nominal rate
+
+    With compounding m times a year and n payments a year, the rate of a
+    payment period is (1 + i / m) ** (m / n) - 1, the rate that accrues the
+    same interest over a year; continuous compounding gives exp(i / n) - 1.
+    Works element-wise on NumPy arrays as well as on scalars.
+
+    Parameters:
+    -----------
+    interest_rate : float or numpy.ndarray
+        Annual nominal interest rate (percentage)
+    frequency : str, optional
+        Payment frequency, one of PAYMENT_FREQUENCIES
+    compounding : str, optional
+        Compounding convention, one of COMPOUNDING_PERIODS
+
+    Returns:
+    --------
+    float or numpy.ndarray
+        Interest rate per payment period (fraction, not percentage)
+    """
+    periods = payments_per_year(frequency)
+    if compounds_per_payment(frequency, compounding):
+        return interest_rate / 100 / periods
+
+    annual_rate = np.asarray(interest_rate, dtype=float) / 100
+    if compounding == 'continuous':
+        rate = np.expm1(annual_rate / periods)
+    else:
+        compounds = COMPOUNDING_PERIODS[compounding]
+        rate = np.expm1(compounds / periods * np.log1p(annual_rate / compounds))
+    return rate[()] if rate.ndim == 0 else rate
+
+
+def periodic_rate_derivative(interest_rate, frequency='monthly', compounding='payment'):
+    """
+    Derivative of periodic_rate with respect to the annual rate, per percentage point
+
+    Works element-wise on NumPy arrays as well as on scalars.
+    """
+    periods = payments_per_year(frequency)
+    annual_rate = np.asarray(interest_rate, dtype=float)
+    if compounds_per_payment(frequency, compounding):
+        derivative = np.full_like(annual_rate, 1 / 100 / periods)
+    elif compounding == 'continuous':
+        derivative = np.exp(annual_rate / 100 / periods) / 100 / periods
+    else:
+        # d/di (1 + i / m) ** (m / n) = (1 + i / m) ** (m / n - 1) / n
+        compounds = COMPOUNDING_PERIODS[compounding]
+        derivative = (1 + annual_rate / 100 / compounds) ** (compounds / periods - 1) / 100 / periods
+    return derivative[()] if derivative.ndim == 0 else derivative
+
+
+def term_periods(loan_term_years, frequency='monthly'):
+    """
+    Number of payments of a loan term in years, rounded to whole payments
+
+    Works element-wise on NumPy arrays (returning int64) as well as on scalars.
+    """
+    periods = np.round(np.asarray(loan_term_years, dtype=float) * payments_per_year(frequency)).astype(np.int64)
+    return int(periods) if periods.ndim == 0 else periods
+
+
+def month_to_period(month, frequency='monthly'):
+    """
+    First payment period (1-based) that starts in or after a month (1-based)
+
+    Payment k covers the time from (k - 1) / n to k / n years, so events
+    given by month (rate changes, early payments) apply from the first payment
+    whose period starts no earlier than the month. Identity for monthly
+    payments. Works element-wise on NumPy arrays as well as on scalars.
+    """
+    periods = payments_per_year(frequency)
+    if periods == 12:
+        return month
+    period = -(-(np.asarray(month, dtype=np.int64) - 1) * periods // 12) + 1
+    return int(period) if period.ndim == 0 else period
+
+
+def payments_by_month(months, frequency='monthly'):
+    """
+    Number of payments made by the end of each month (months counted from the start of the loan)
+
+    Identity for monthly payments. Works element-wise on NumPy arrays as well as on scalars.
+    """
+    periods = payments_per_year(frequency)
+    if periods == 12:
+        return months
+    return np.floor(np.asarray(months, dtype=float) * periods / 12)
+
+
+def period_to_month(period, frequency='monthly'):
+    """
+    Month (1-based) in which a payment (1-based) falls due
+
+    Identity for monthly payments. Works element-wise on NumPy arrays as well as on scalars.
+    """
+    periods = payments_per_year(frequency)
+    if periods == 12:
+        return period
+    month = -(-np.asarray(period, dtype=np.int64) * 12 // periods)
+    return int(month) if month.ndim == 0 else month
+
+
+def annuity_payment_for(balance, monthly_rate, months):
+    """
+    Annuity payment that repays `balance` in `months` equal payments
+
+    Works element-wise on NumPy arrays as well as on scalars.
+
+    Parameters:
+    -----------
+    balance : float or numpy.ndarray
+        Outstanding balance
+    monthly_rate : float or numpy.ndarray
+        Monthly interest rate (fraction, not percentage)
+    months : int or numpy.ndarray
+        Number of remaining monthly payments
+
+    Returns:
+    --------
+    float or numpy.ndarray
+        Monthly payment amount
+    """
+    balance = np.asarray(balance, dtype=float)
+    monthly_rate = np.asarray(monthly_rate, dtype=float)
+    months = np.asarray(months, dtype=float)
+
+    growth = (1 + monthly_rate) ** months
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payment = np.where(
+            monthly_rate == 0,
+            balance / months,
+            balance * monthly_rate * growth / (growth - 1)
+        )
+    return payment[()] if payment.ndim == 0 else payment
+
+
+def amortize_segment(balance, monthly_rate, payment, months, pay_off=False):
+    """
+    Amortize a balance over a run of months with constant rate and payment
+
+    Balances are evaluated in closed form, B_k = B_0 g^k - P (g^k - 1) / r with
+    g = 1 + r, so a segment costs a handful of array operations regardless of
+    its length. The segment is cut short at the month the balance is repaid.
+
+    Parameters:
+    -----------
+    balance : float
+        Balance at the start of the segment
+    monthly_rate : float
+        Monthly interest rate (fraction, not percentage)
+    payment : float
+        Regular monthly payment (principal + interest)
+    months : int
+        Number of months in the segment
+    pay_off : bool, optional
+        Force the remaining balance to be repaid in the last month of the
+        segment (used for the final month of the loan term)
+
+    Returns:
+    --------
+    tuple of numpy.ndarray
+        (payment, principal, interest, remaining) per month; the arrays are
+        shorter than `months` if the loan is repaid inside the segment
+    """
+    if months <= 0:
+        empty = np.empty(0)
+        return empty, empty, empty, empty
+
+    k = np.arange(months + 1, dtype=float)
+
+    if monthly_rate == 0:
+        balances = balance - payment * k
+    else:
+        growth = (1 + monthly_rate) ** k
+        balances = balance * growth - payment * (growth - 1) / monthly_rate
+
+    start_balances = balances[:-1]
+    remaining = balances[1:]
+
+    # First month in which the balance is repaid (allowing for rounding error)
+    tolerance = 1e-9 * max(balance, 1.0)
+    paid = np.flatnonzero(remaining <= tolerance)
+    last = paid[0] + 1 if len(paid) else months
+    if len(paid) or pay_off:
+        start_balances = start_balances[:last]
+        remaining = remaining[:last].copy()
+        remaining[-1] = 0.0
+    else:
+        remaining = remaining.copy()
+
+    interest = start_balances * monthly_rate
+    principal = payment - interest
+    payments = np.full(len(interest), float(payment))
+
+    if len(paid) or pay_off:
+        # Last payment repays exactly what is left
+        principal[-1] = start_balances[-1]
+        payments[-1] = principal[-1] + interest[-1]
+
+    return payments, principal, interest, remaining
+
+
+def amortize_matrix(balances, monthly_rates, payments, months):
+    """
+    Amortize several loans at once, one loan per row
+
+    Each loan has a constant rate and payment. All schedules are evaluated in
+    closed form as (loans x months) matrices; months after a loan's term are
+    zero-filled.
+
+    Parameters:
+    -----------
+    balances : numpy.ndarray
+        Starting balance of each loan
+    monthly_rates : numpy.ndarray
+        Monthly interest rate of each loan (fraction, not percentage)
+    payments : numpy.ndarray
+        Monthly payment of each loan
+    months : numpy.ndarray
+        Term of each loan in months
+
+    Returns:
+    --------
+    dict of numpy.ndarray
+        'payment', 'principal', 'interest' and 'remaining_loan' matrices of
+        shape (loans, max(months))
+    """
+    balances = np.asarray(balances, dtype=float)
+    monthly_rates = np.asarray(monthly_rates, dtype=float)
+    payments = np.asarray(payments, dtype=float)
+    months = np.asarray(months, dtype=np.int64)
+    if (months < 1).any():
+        raise ValueError("Every loan term must cover at least one payment")
+
+    horizon = int(months.max()) if len(months) else 0
+    k = np.arange(horizon + 1, dtype=float)
+
+    rates = monthly_rates[:, np.newaxis]
+    # Precomputed rows for rates on the shared grid, exact powers otherwise
+    growth = get_tables().growth_powers(monthly_rates, horizon)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annuity_part = np.where(rates == 0, k, (growth - 1) / rates)
+    balance_path = balances[:, np.newaxis] * growth - payments[:, np.newaxis] * annuity_part
+
+    active = k[np.newaxis, 1:] <= months[:, np.newaxis]
+    start_balances = np.where(active, balance_path[:, :-1], 0.0)
+
+    interest = start_balances * rates
+    principal = np.where(active, payments[:, np.newaxis] - interest, 0.0)
+    remaining = np.where(active, balance_path[:, 1:], 0.0)
+
+    # The last payment of each loan repays exactly what is left
+    rows = np.arange(len(months))
+    last = months - 1
+    principal[rows, last] = start_balances[rows, last]
+    remaining[rows, last] = 0.0
+
+    return {
+        'payment': principal + interest,
+        'principal': principal,
+        'interest': interest,
+        'remaining_loan': remaining
+    }
+
+
+def remaining_balance(balance, monthly_rate, payment, months_paid):
+    """
+    Balance left after `months_paid` constant payments, in closed form
+
+    Works element-wise on NumPy arrays as well as on scalars.
+    """
+    balance = np.asarray(balance, dtype=float)
+    monthly_rate = np.asarray(monthly_rate, dtype=float)
+    months_paid = np.asarray(months_paid, dtype=float)
+
+    growth = (1 + monthly_rate) ** months_paid
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annuity_part = np.where(monthly_rate == 0, months_paid, (growth - 1) / monthly_rate)
+    result = np.maximum(balance * growth - payment * annuity_part, 0.0)
+    return result[()] if result.ndim == 0 else result
+
+
+def loan_state_at(balances, monthly_rates, terms, months_paid, differentiated=False):
+    """
+    Remaining balance, cumulative interest and cumulative principal after
+    `months_paid` payments, in closed form
+
+    No schedule is built: each value costs a handful of array operations
+    whatever the term. Arguments broadcast against each other, so a column of
+    loans (shape (loans, 1)) and a row of months (shape (months,)) give
+    (loans x months) results. Months are clipped to [0, term].
+
+    Parameters:
+    -----------
+    balances : float or numpy.ndarray
+        Loan amounts
+    monthly_rates : float or numpy.ndarray
+        Monthly interest rates (fraction, not percentage)
+    terms : int or numpy.ndarray
+        Loan terms in months
+    months_paid : int or numpy.ndarray
+        Number of payments made
+    differentiated : bool or numpy.ndarray, optional
+        True for differentiated loans (constant principal part), False for
+        annuity loans (constant payment)
+
+    Returns:
+    --------
+    tuple of numpy.ndarray
+        (remaining_loan, cumulative_interest, cumulative_principal)
+    """
+    balances = np.asarray(balances, dtype=float)
+    monthly_rates = np.asarray(monthly_rates, dtype=float)
+    terms = np.asarray(terms, dtype=float)
+    k = np.clip(np.asarray(months_paid, dtype=float), 0, terms)
+
+    # Annuity: B_k = B (1+r)^k - P ((1+r)^k - 1) / r, interest = k P - (B - B_k)
+    payment = annuity_payment_for(balances, monthly_rates, terms)
+    annuity_remaining = np.where(k >= terms, 0.0, remaining_balance(balances, monthly_rates, payment, k))
+    annuity_interest = k * payment - (balances - annuity_remaining)
+
+    # Differentiated: B_k = B - k B / n, interest = r (k B - (B / n) k (k - 1) / 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        principal_part = balances / terms
+    differentiated_remaining = np.where(k >= terms, 0.0, balances - principal_part * k)
+    differentiated_interest = monthly_rates * (k * balances - principal_part * k * (k - 1) / 2)
+
+    remaining = np.where(differentiated, differentiated_remaining, annuity_remaining)
+    interest = np.where(differentiated, differentiated_interest, annuity_interest)
+    return remaining, interest, balances - remaining
+
+
+# Rounding rules for cent amounts
+ROUNDING_RULES = ('half_up', 'half_even', 'down', 'up')
+
+# Annual rates (percentages) are represented exactly as integers in units of 1/10000 percent
+RATE_SCALE = 10000
+# Interest in cents = balance in cents * rate units / (100 * payments per year * RATE_SCALE)
+MONTHLY_RATE_DENOMINATOR = 100 * 12 * RATE_SCALE
+# Batches up to this size are amortized loan by loan with Python integers
+SMALL_BATCH_SIZE = 8
+
+
+def round_divide(numerator, denominator, rounding='half_up'):
+    """
+    Integer division of non-negative integers with a rounding rule
+
+    Works on Python ints and on NumPy int64 arrays.
+
+    Parameters:
+    -----------
+    numerator : int or numpy.ndarray
+        Non-negative dividend
+    denominator : int
+        Positive divisor
+    rounding : str, optional
+        'half_up' (commercial rounding), 'half_even' (banker's rounding),
+        'down' (truncate) or 'up' (ceiling)
+
+    Returns:
+    --------
+    int or numpy.ndarray
+        Rounded quotient
+    """
+    quotient = numerator // denominator
+    remainder = numerator % denominator
+
+    if rounding == 'half_up':
+        return quotient + (2 * remainder >= denominator)
+    if rounding == 'half_even':
+        return quotient + ((2 * remainder > denominator) |
+                           ((2 * remainder == denominator) & (quotient % 2 == 1)))
+    if rounding == 'down':
+        return quotient
+    if rounding == 'up':
+        return quotient + (remainder > 0)
+    raise ValueError(f"Unknown rounding rule: {rounding}")
+
+
+def round_to_cents(amounts, rounding='half_up'):
+    """
+    Round currency amounts (floats) to whole cents (int64) with a rounding rule
+    """
+    cents = np.asarray(amounts, dtype=float) * 100
+    # Guard against representation error such as 0.285 * 100 = 28.499999999999996
+    cents = np.round(cents, 6)
+
+    if rounding == 'half_up':
+        rounded = np.floor(cents + 0.5)
+    elif rounding == 'half_even':
+        rounded = np.rint(cents)
+    elif rounding == 'down':
+        rounded = np.floor(cents)
+    elif rounding == 'up':
+        rounded = np.ceil(cents)
+    else:
+        raise ValueError(f"Unknown rounding rule: {rounding}")
+
+    return rounded.astype(np.int64)
+
+
+def rate_to_units(interest_rate):
+    """
+    Convert annual rates in percent to integer units of 1/10000 percent
+    """
+    return np.round(np.asarray(interest_rate, dtype=float) * RATE_SCALE).astype(np.int64)
+
+
+def amortize_cents(principal_cents, rate_units, months, payment_cents=None, rounding='half_up',
+                   periods_per_year=12):
+    """
+    Amortize loans in exact integer cents, one loan per row
+
+    Every month the interest is rounded to the cent with the chosen rule and
+    the last payment of each loan repays exactly the remaining balance, so the
+    principal column sums exactly to the loan amount. Months are stepped in a
+    loop, while all loans of the batch are processed together with int64
+    array operations. Small batches are stepped loan by loan with Python
+    integers, which is faster than array operations on a few elements.
+
+    Parameters:
+    -----------
+    principal_cents : numpy.ndarray
+        Loan amounts in cents (int64)
+    rate_units : numpy.ndarray
+        Annual rates in units of 1/10000 percent (int64)
+    months : numpy.ndarray
+        Term of each loan in months
+    payment_cents : numpy.ndarray, optional
+        Fixed monthly payment of each loan in cents (annuity loans).
+        If omitted the loans are differentiated: the principal part is the
+        loan amount divided by the term, rounded with the same rule.
+    rounding : str, optional
+        Rounding rule, see round_divide
+    periods_per_year : int, optional
+        Payments per year; `months` and `payment_cents` are then per payment
+        period, and the period rate is the annual rate divided by this number
+
+    Returns:
+    --------
+    dict of numpy.ndarray
+        'payment', 'principal', 'interest' and 'remaining_loan' int64 matrices
+        of shape (loans, max(months)), zero after each loan's term
+    """
+    principal_cents = np.asarray(principal_cents, dtype=np.int64)
+    rate_units = np.asarray(rate_units, dtype=np.int64)
+    months = np.asarray(months, dtype=np.int64)
+    if payment_cents is not None:
+        payment_cents = np.asarray(payment_cents, dtype=np.int64)
+
+    loans = len(principal_cents)
+    horizon = int(months.max()) if loans else 0
+
+    if loans <= SMALL_BATCH_SIZE:
+        schedules = {name: np.zeros((loans, horizon), dtype=np.int64)
+                     for name in ('payment', 'principal', 'interest', 'remaining_loan')}
+        for i in range(loans):
+            single = amortize_cents_single(
+                principal_cents[i], rate_units[i], months[i],
+                None if payment_cents is None else payment_cents[i], rounding, periods_per_year)
+            for name, values in single.items():
+                schedules[name][i, :len(values)] = values
+        return schedules
+
+    if payment_cents is None:
+        # Differentiated: constant principal part
+        regular_principal = round_divide(principal_cents, months, rounding)
+
+    # Month-major storage so that each step writes contiguous rows
+    principal = np.empty((horizon, loans), dtype=np.int64)
+    interest = np.empty((horizon, loans), dtype=np.int64)
+    remaining = np.empty((horizon, loans), dtype=np.int64)
+    last_month = np.arange(horizon)[:, np.newaxis] == (months - 1)[np.newaxis, :]
+
+    denominator = 100 * periods_per_year * RATE_SCALE
+    balance = principal_cents.copy()
+    for month in range(horizon):
+        month_interest = round_divide(balance * rate_units, denominator, rounding)
+        if payment_cents is None:
+            month_principal = regular_principal
+        else:
+            month_principal = payment_cents - month_interest
+
+        # Never repay more than the balance, and repay all of it in the last month.
+        # Once a loan is repaid its balance, interest and principal stay at zero.
+        month_principal = np.minimum(month_principal, balance)
+        month_principal = np.where(last_month[month], balance, month_principal)
+        balance = balance - month_principal
+
+        principal[month] = month_principal
+        interest[month] = month_interest
+        remaining[month] = balance
+
+    return {
+        'payment': (principal + interest).T,
+        'principal': principal.T,
+        'interest': interest.T,
+        'remaining_loan': remaining.T
+    }
+
+
+def amortize_cents_single(principal_cents, rate_units, months, payment_cents=None, rounding='half_up',
+                          periods_per_year=12):
+    """
+    Amortize one loan in exact integer cents
+
+    Same rules as amortize_cents, stepped with Python integers, which is much
+    faster than array operations on one-element arrays.
+
+    Returns:
+    --------
+    dict of numpy.ndarray
+        'payment', 'principal', 'interest' and 'remaining_loan' int64 arrays
+    """
+    principal_cents = int(principal_cents)
+    rate_units = int(rate_units)
+    months = int(months)
+
+    if payment_cents is None:
+        regular_principal = int(round_divide(principal_cents, months, rounding))
+    else:
+        payment_cents = int(payment_cents)
+
+    payments = []
+    principals = []
+    interests = []
+    remainings = []
+
+    denominator = 100 * int(periods_per_year) * RATE_SCALE
+    balance = principal_cents
+    for month in range(months):
+        month_interest = int(round_divide(balance * rate_units, denominator, rounding))
+        if payment_cents is None:
+            month_principal = regular_principal
+        else:
+            month_principal = payment_cents - month_interest
+
+        if month == months - 1 or month_principal > balance:
+            month_principal = balance
+
+        balance -= month_principal
+
+        payments.append(month_principal + month_interest)
+        principals.append(month_principal)
+        interests.append(month_interest)
+        remainings.append(balance)
+
+        if balance == 0:
+            break
+
+    return {
+        'payment': np.array(payments, dtype=np.int64),
+        'principal': np.array(principals, dtype=np.int64),
+        'interest': np.array(interests, dtype=np.int64),
+        'remaining_loan': np.array(remainings, dtype=np.int64)
+    }
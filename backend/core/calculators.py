@@ -1,9 +1,24 @@
-import pandas as pd
 import numpy as np
+from backend.core.kernels import get_kernels
+from backend.core.schedule import Schedule
+from backend.core.amortization import (
+    amortize_matrix,
+    amortize_segment,
+    annuity_payment_for,
+    compounds_per_payment,
+    loan_state_at,
+    payments_by_month,
+    payments_per_year,
+    periodic_rate,
+    rate_to_units,
+    round_to_cents,
+    term_periods
+)
 
-def calculate_annuity_payment(loan_amount, interest_rate, loan_term_years):
+def calculate_annuity_payment(loan_amount, interest_rate, loan_term_years, frequency="monthly",
+                              compounding="payment"):
     """
-    Calculate monthly annuity payment
+    Calculate annuity payment
     
     Parameters:
     -----------
@@ -13,27 +28,33 @@ def calculate_annuity_payment(loan_amount, interest_rate, loan_term_years):
         Annual interest rate (percentage)
     loan_term_years : float
         Loan term in years
+    frequency : str, optional
+        Payment frequency: 'monthly', 'semi_monthly', 'biweekly' or 'weekly'
+    compounding : str, optional
+        Compounding convention (see amortization.periodic_rate); by default
+        interest compounds once per payment period
         
     Returns:
     --------
     float
-        Monthly payment amount
+        Payment amount per period (monthly payment by default)
     """
-    monthly_rate = interest_rate / 100 / 12
-    loan_term_months = loan_term_years * 12
+    period_rate = periodic_rate(interest_rate, frequency, compounding)
+    loan_term_periods = loan_term_years * payments_per_year(frequency)
     
     # Handle edge case of 0% interest rate
-    if monthly_rate == 0:
-        return loan_amount / loan_term_months
+    if period_rate == 0:
+        return loan_amount / loan_term_periods
     
     # Standard annuity payment formula
-    annuity_payment = loan_amount * monthly_rate * (1 + monthly_rate) ** loan_term_months / (
-                (1 + monthly_rate) ** loan_term_months - 1)
+    annuity_payment = loan_amount * period_rate * (1 + period_rate) ** loan_term_periods / (
+                (1 + period_rate) ** loan_term_periods - 1)
                 
     return annuity_payment
 
 
-def calculate_differentiated_payment(loan_amount, interest_rate, loan_term_years, month):
+def calculate_differentiated_payment(loan_amount, interest_rate, loan_term_years, month,
+                                     frequency="monthly", compounding="payment"):
     """
     Calculate differentiated payment for a specific month
     
@@ -46,32 +67,43 @@ def calculate_differentiated_payment(loan_amount, interest_rate, loan_term_years
     loan_term_years : float
         Loan term in years
     month : int
-        Month number (1-based) for which to calculate the payment
+        Payment number (1-based) for which to calculate the payment; the
+        month with monthly payments
+    frequency : str, optional
+        Payment frequency: 'monthly', 'semi_monthly', 'biweekly' or 'weekly'
+    compounding : str, optional
+        Compounding convention (see amortization.periodic_rate)
         
     Returns:
     --------
     float
-        Monthly payment amount for the specified month
+        Payment amount for the specified payment
     """
-    loan_term_months = loan_term_years * 12
-    monthly_rate = interest_rate / 100 / 12
+    loan_term_periods = loan_term_years * payments_per_year(frequency)
+    period_rate = periodic_rate(interest_rate, frequency, compounding)
     
     # Principal payment is constant
-    principal_payment = loan_amount / loan_term_months
+    principal_payment = loan_amount / loan_term_periods
     
-    # Calculate remaining loan amount at the beginning of the month
+    # Calculate remaining loan amount at the beginning of the period
     remaining_loan = loan_amount - (principal_payment * (month - 1))
     
     # Calculate interest on remaining loan
-    interest_payment = remaining_loan * monthly_rate
+    interest_payment = remaining_loan * period_rate
     
     return principal_payment + interest_payment
 
 
-def generate_payment_schedule(loan_amount, interest_rate, loan_term_years, payment_type="annuity"):
+def generate_payment_schedule(loan_amount, interest_rate, loan_term_years, payment_type="annuity",
+                              dtype=np.float64, frequency="monthly", compounding="payment"):
     """
     Generate complete payment schedule
     
+    With a payment frequency other than monthly, each row is one payment
+    period and the schedule's 'month' column numbers the payments. Rows are
+    computed in closed form, so a weekly schedule costs about as much as a
+    monthly one.
+    
     Parameters:
     -----------
     loan_amount : float
@@ -82,68 +114,227 @@ def generate_payment_schedule(loan_amount, interest_rate, loan_term_years, payme
         Loan term in years
     payment_type : str, optional
         Payment type: 'annuity' or 'differentiated'
+    dtype : numpy dtype, optional
+        dtype of the schedule columns: numpy.float64 or numpy.float32
+    frequency : str, optional
+        Payment frequency: 'monthly', 'semi_monthly', 'biweekly' or 'weekly'
+    compounding : str, optional
+        Compounding convention (see amortization.periodic_rate)
         
     Returns:
     --------
-    pandas.DataFrame
-        DataFrame with complete payment schedule
+    Schedule
+        Complete payment schedule
     """
-    schedule = []
-    loan_term_months = loan_term_years * 12
-    monthly_rate = interest_rate / 100 / 12
-
-    remaining_loan = loan_amount
+    loan_term_periods = term_periods(loan_term_years, frequency)
+    period_rate = periodic_rate(interest_rate, frequency, compounding)
 
     if payment_type == "annuity":
-        monthly_payment = calculate_annuity_payment(loan_amount, interest_rate, loan_term_years)
-
-        for month in range(1, loan_term_months + 1):
-            interest_payment = remaining_loan * monthly_rate
-            principal_payment = monthly_payment - interest_payment
-
-            # Ensure we don't overpay in the last month due to rounding
-            if month == loan_term_months:
-                principal_payment = remaining_loan
-                monthly_payment = principal_payment + interest_payment
-
-            # Record the payment for this month
-            schedule.append({
-                'month': month,
-                'payment': monthly_payment,
-                'principal': principal_payment,
-                'interest': interest_payment,
-                'remaining_loan': remaining_loan - principal_payment
-            })
-            
-            # Update remaining loan for next month
-            remaining_loan -= principal_payment
-
-            # Ensure the remaining loan doesn't go below zero
-            if remaining_loan < 0:
-                remaining_loan = 0
+        period_payment = calculate_annuity_payment(
+            loan_amount, interest_rate, loan_term_years, frequency, compounding)
+        # Closed form; the last payment repays exactly the remaining balance
+        payment, principal, interest, remaining = amortize_segment(
+            loan_amount, period_rate, period_payment, loan_term_periods, pay_off=True)
     else:  # differentiated
-        for month in range(1, loan_term_months + 1):
-            principal_payment = loan_amount / loan_term_months
-            interest_payment = remaining_loan * monthly_rate
-            monthly_payment = principal_payment + interest_payment
-
-            # Record the payment for this month
-            schedule.append({
-                'month': month,
-                'payment': monthly_payment,
-                'principal': principal_payment,
-                'interest': interest_payment,
-                'remaining_loan': remaining_loan - principal_payment
-            })
-            
-            # Update remaining loan for next month
-            remaining_loan -= principal_payment
-
-            # Ensure the remaining loan doesn't go below zero
-            if remaining_loan < 0:
-                remaining_loan = 0
-
-    return pd.DataFrame(schedule)
+        principal = np.full(loan_term_periods, loan_amount / loan_term_periods)
+        remaining = np.maximum(loan_amount - principal * np.arange(1, loan_term_periods + 1), 0.0)
+        interest = np.concatenate(([loan_amount], remaining[:-1])) * period_rate
+        payment = principal + interest
+
+    return Schedule({
+        'payment': payment,
+        'principal': principal,
+        'interest': interest,
+        'remaining_loan': remaining
+    }, dtype=dtype)
+
+
+def generate_payment_schedule_cents(loan_amount, interest_rate, loan_term_years,
+                                    payment_type="annuity", rounding="half_up",
+                                    frequency="monthly", compounding="payment"):
+    """
+    Generate complete payment schedule in exact integer cents
+    
+    The loan amount and the annuity payment are rounded to the cent, interest
+    is rounded to the cent every payment period with the chosen rule, and the
+    last payment repays exactly the remaining balance, so the principal column
+    sums exactly to the loan amount. Interest must compound once per payment
+    period, so that the period rate is an exact fraction of the annual rate.
+    
+    Parameters:
+    -----------
+    loan_amount : float
+        Principal loan amount
+    interest_rate : float
+        Annual interest rate (percentage, up to 4 decimal places)
+    loan_term_years : float
+        Loan term in years
+    payment_type : str, optional
+        Payment type: 'annuity' or 'differentiated'
+    rounding : str, optional
+        Rounding rule: 'half_up', 'half_even', 'down' or 'up'
+    frequency : str, optional
+        Payment frequency: 'monthly', 'semi_monthly', 'biweekly' or 'weekly'
+    compounding : str, optional
+        Compounding convention; must compound once per payment period
+        
+    Returns:
+    --------
+    Schedule
+        Complete payment schedule; amount columns are int64 cents
+    """
+    if not compounds_per_payment(frequency, compounding):
+        raise ValueError("Exact cents schedules require interest compounded once per payment period")
+
+    loan_term_periods = term_periods(loan_term_years, frequency)
+    principal_cents = round_to_cents(loan_amount, rounding)
+
+    payment_cents = None
+    if payment_type == "annuity":
+        payment_cents = round_to_cents(
+            calculate_annuity_payment(loan_amount, interest_rate, loan_term_years, frequency), rounding)
+
+    schedules = get_kernels().amortize_cents(
+        [principal_cents], [rate_to_units(interest_rate)], [loan_term_periods],
+        None if payment_cents is None else [payment_cents], rounding, payments_per_year(frequency))
+
+    # Drop the payments after the loan is repaid
+    paid = np.flatnonzero(schedules['remaining_loan'][0] == 0)
+    count = paid[0] + 1 if len(paid) else loan_term_periods
+
+    return Schedule({
+        'payment': schedules['payment'][0, :count],
+        'principal': schedules['principal'][0, :count],
+        'interest': schedules['interest'][0, :count],
+        'remaining_loan': schedules['remaining_loan'][0, :count]
+    })
+
+
+def generate_payment_schedules(loan_amounts, interest_rates, loan_terms_years,
+                               payment_type="annuity", rounding=None, frequency="monthly",
+                               compounding="payment"):
+    """
+    Generate payment schedules for a batch of loans at once
+    
+    Parameters:
+    -----------
+    loan_amounts : array-like
+        Principal amount of each loan
+    interest_rates : array-like
+        Annual interest rate of each loan (percentage)
+    loan_terms_years : array-like
+        Term of each loan in years
+    payment_type : str, optional
+        Payment type of the batch: 'annuity' or 'differentiated'
+    rounding : str, optional
+        If given, schedules are computed in exact integer cents with this
+        rounding rule ('half_up', 'half_even', 'down' or 'up')
+    frequency : str, optional
+        Payment frequency of the batch: 'monthly', 'semi_monthly', 'biweekly' or 'weekly'
+    compounding : str, optional
+        Compounding convention (see amortization.periodic_rate)
+        
+    Returns:
+    --------
+    dict of numpy.ndarray
+        'payment', 'principal', 'interest' and 'remaining_loan' matrices of
+        shape (loans, longest term in payments), zero after each loan's term
+        (float64 amounts, or int64 cents when rounding is given), and
+        'months' with the number of payments of each loan (its term in
+        months with monthly payments)
+    """
+    loan_amounts = np.asarray(loan_amounts, dtype=float)
+    interest_rates = np.asarray(interest_rates, dtype=float)
+    months = term_periods(np.asarray(loan_terms_years, dtype=float), frequency)
+
+    if payment_type not in ("annuity", "differentiated"):
+        raise ValueError(f"Unknown payment type: {payment_type}")
+
+    period_rates = periodic_rate(interest_rates, frequency, compounding)
+
+    if rounding is not None:
+        if not compounds_per_payment(frequency, compounding):
+            raise ValueError("Exact cents schedules require interest compounded once per payment period")
+        payment_cents = None
+        if payment_type == "annuity":
+            payment_cents = round_to_cents(annuity_payment_for(loan_amounts, period_rates, months), rounding)
+        schedules = get_kernels().amortize_cents(
+            round_to_cents(loan_amounts, rounding), rate_to_units(interest_rates), months,
+            payment_cents, rounding, payments_per_year(frequency))
+    elif payment_type == "annuity":
+        schedules = amortize_matrix(
+            loan_amounts, period_rates, annuity_payment_for(loan_amounts, period_rates, months), months)
+    else:
+        # Differentiated: constant principal part, interest on the declining balance
+        k = np.arange(1, (int(months.max()) if len(months) else 0) + 1)
+        active = k[np.newaxis, :] <= months[:, np.newaxis]
+        principal_part = (loan_amounts / months)[:, np.newaxis]
+        start_balances = np.where(active, loan_amounts[:, np.newaxis] - principal_part * (k - 1), 0.0)
+        principal = np.where(active, principal_part, 0.0)
+        interest = start_balances * period_rates[:, np.newaxis]
+        schedules = {
+            'payment': principal + interest,
+            'principal': principal,
+            'interest': interest,
+            'remaining_loan': np.where(active, np.maximum(start_balances - principal_part, 0.0), 0.0)
+        }
+
+    schedules['months'] = months
+    return schedules
+
+
+def calculate_loan_state(loan_amounts, interest_rates, loan_terms_years, months,
+                         payment_type="annuity", frequency="monthly", compounding="payment"):
+    """
+    Remaining balance, cumulative interest and cumulative principal of loans
+    at arbitrary months, without generating their schedules
+    
+    Parameters:
+    -----------
+    loan_amounts : array-like
+        Principal amount of each loan
+    interest_rates : array-like
+        Annual interest rate of each loan (percentage)
+    loan_terms_years : array-like
+        Term of each loan in years
+    months : array-like
+        Months to query (0 is the start of the loan, months after the term
+        return the repaid state); with monthly payments, the number of
+        payments made, otherwise the payments made by the end of the month
+    payment_type : str or array-like, optional
+        'annuity' or 'differentiated', for the whole batch or for each loan
+    frequency : str, optional
+        Payment frequency of the batch: 'monthly', 'semi_monthly', 'biweekly' or 'weekly'
+    compounding : str, optional
+        Compounding convention (see amortization.periodic_rate)
+        
+    Returns:
+    --------
+    dict of numpy.ndarray
+        'remaining_loan', 'cumulative_interest' and 'cumulative_principal'
+        matrices of shape (loans, months)
+    """
+    loan_amounts = np.asarray(loan_amounts, dtype=float)[:, np.newaxis]
+    period_rates = periodic_rate(np.asarray(interest_rates, dtype=float)[:, np.newaxis], frequency, compounding)
+    terms = term_periods(np.asarray(loan_terms_years, dtype=float), frequency)[:, np.newaxis]
+    months = np.asarray(payments_by_month(months, frequency), dtype=float)
+
+    payment_types = np.asarray(payment_type)
+    unknown = set(np.unique(payment_types).tolist()) - {"annuity", "differentiated"}
+    if unknown:
+        raise ValueError(f"Unknown payment type: {', '.join(sorted(unknown))}")
+    differentiated = payment_types == "differentiated"
+    if differentiated.ndim:
+        differentiated = differentiated[:, np.newaxis]
+
+    remaining, interest, principal = loan_state_at(
+        loan_amounts, period_rates, terms, months, differentiated)
+
+    return {
+        'remaining_loan': remaining,
+        'cumulative_interest': interest,
+        'cumulative_principal': principal
+    }
 
 
 def calculate_total_interest(schedule):
@@ -152,8 +343,8 @@ def calculate_total_interest(schedule):
     
     Parameters:
     -----------
-    schedule : pandas.DataFrame
-        Payment schedule DataFrame
+    schedule : Schedule or pandas.DataFrame
+        Payment schedule
         
     Returns:
     --------
@@ -169,8 +360,8 @@ def calculate_total_payments(schedule):
     
     Parameters:
     -----------
-    schedule : pandas.DataFrame
-        Payment schedule DataFrame
+    schedule : Schedule or pandas.DataFrame
+        Payment schedule
         
     Returns:
     --------
@@ -1,7 +1,10 @@
 import pandas as pd
 import numpy as np
 from backend.core.calculators import generate_payment_schedule
-from backend.core.forecast import forecast_property_value
+from backend.core.forecast import PROPERTY_SEASONAL_FACTORS
+from backend.core.kernels import get_kernels
+from backend.core.pipeline import DEFAULT_CHUNK_MONTHS, collect_blocks, schedule_blocks, summarize_blocks
+from backend.core.schedule import Schedule
 
 def calculate_rent_vs_buy(property_value, down_payment, interest_rate, loan_term_years,
                           monthly_rent, rent_growth_rate, property_growth_rate,
@@ -45,105 +48,323 @@ def calculate_rent_vs_buy(property_value, down_payment, interest_rate, loan_term
     pandas.DataFrame
         DataFrame with rent vs buy metrics over time
     """
-    loan_amount = property_value - down_payment
-    loan_term_months = loan_term_years * 12
+    return collect_blocks(rent_vs_buy_blocks(
+        property_value, down_payment, interest_rate, loan_term_years,
+        monthly_rent, rent_growth_rate, property_growth_rate,
+        maintenance_cost_percent, property_tax_percent,
+        rental_income, tax_benefit_rate, inflation_rate, opportunity_cost_rate,
+        chunk_months=None
+    )).to_dataframe()
 
-    # Calculate mortgage schedule
-    mortgage_schedule = generate_payment_schedule(loan_amount, interest_rate, loan_term_years)
 
-    # Property value forecast
-    property_forecast = forecast_property_value(
-        property_value, property_growth_rate, loan_term_years,
-        inflation_rate=inflation_rate
-    )
+def rent_vs_buy_blocks(property_value, down_payment, interest_rate, loan_term_years,
+                       monthly_rent, rent_growth_rate, property_growth_rate,
+                       maintenance_cost_percent, property_tax_percent,
+                       rental_income=0, tax_benefit_rate=0, inflation_rate=0,
+                       opportunity_cost_rate=0, chunk_months=DEFAULT_CHUNK_MONTHS):
+    """
+    Rent vs buy comparison as a stream of blocks of months
+
+    Pipeline stage of calculate_rent_vs_buy (see backend.core.pipeline): the
+    mortgage schedule is streamed block by block, and each month's costs
+    and net worths are evaluated for the whole block at once. Rents, costs
+    and the invested down payment grow geometrically, so they are computed
+    in closed form from the month number; the property value follows the
+    linear model of forecast_property_value, carried from block to block.
+
+    Parameters:
+    -----------
+    property_value, down_payment, interest_rate, loan_term_years, monthly_rent,
+    rent_growth_rate, property_growth_rate, maintenance_cost_percent,
+    property_tax_percent, rental_income, tax_benefit_rate, inflation_rate,
+    opportunity_cost_rate
+        See calculate_rent_vs_buy
+    chunk_months : int, optional
+        Months per block; None for a single block
+
+    Yields:
+    -------
+    Schedule
+        The columns of calculate_rent_vs_buy for the months of the block
+    """
+    loan_amount = property_value - down_payment
 
     # Monthly metrics
     monthly_maintenance = property_value * maintenance_cost_percent / 100 / 12
     monthly_property_tax = property_value * property_tax_percent / 100 / 12
 
-    # Annual adjustment rates
+    # Monthly growth rates
     monthly_rent_growth = (1 + rent_growth_rate / 100) ** (1 / 12) - 1
-    monthly_maintenance_growth = (1 + inflation_rate / 100) ** (1 / 12) - 1
+    monthly_inflation = (1 + inflation_rate / 100) ** (1 / 12) - 1
     monthly_opportunity_cost = (1 + opportunity_cost_rate / 100) ** (1 / 12) - 1
+    monthly_property_growth = (1 + property_growth_rate / 100) ** (1 / 12) - 1
+    seasonal_factors = np.asarray(PROPERTY_SEASONAL_FACTORS, dtype=float)
 
-    comparison_data = []
-
-    # Initial values
-    current_rent = monthly_rent
-    current_maintenance = monthly_maintenance
-    current_property_tax = monthly_property_tax
-    current_rental_income = rental_income
-
-    # Opportunity cost of down payment (what you could have earned by investing it)
-    opportunity_value = down_payment
-
-    for month in range(1, loan_term_months + 1):
-        # Get mortgage payment for this month
-        mortgage_row = mortgage_schedule.iloc[month - 1]
-        mortgage_payment = mortgage_row['payment']
-        interest_payment = mortgage_row['interest']
+    # Property value at the end of the previous block
+    current_value = float(property_value)
 
-        # Update opportunity cost of down payment
-        opportunity_value *= (1 + monthly_opportunity_cost)
+    for block in schedule_blocks(loan_amount, interest_rate, loan_term_years, chunk_months):
+        months = block.months
 
-        # Update rent with growth rate
-        current_rent *= (1 + monthly_rent_growth)
+        rent_growth = (1 + monthly_rent_growth) ** months
+        inflation_growth = (1 + monthly_inflation) ** months
+        current_rent = monthly_rent * rent_growth
+        current_maintenance = monthly_maintenance * inflation_growth
+        current_property_tax = monthly_property_tax * inflation_growth
+        current_rental_income = rental_income * rent_growth
 
-        # Update maintenance and property tax with inflation
-        current_maintenance *= (1 + monthly_maintenance_growth)
-        current_property_tax *= (1 + monthly_maintenance_growth)
-        current_rental_income *= (1 + monthly_rent_growth)
+        # Down payment invested instead, and its monthly return (the opportunity cost)
+        opportunity_value = down_payment * (1 + monthly_opportunity_cost) ** months
+        opportunity_cost = opportunity_value * monthly_opportunity_cost
 
         # Tax benefit from mortgage interest deduction
-        tax_benefit = interest_payment * tax_benefit_rate / 100
-
-        # Monthly costs for buying
-        buy_monthly_cost = mortgage_payment + current_maintenance + current_property_tax - current_rental_income - tax_benefit
-
-        # Monthly costs for renting (rent + opportunity cost of down payment)
-        rent_monthly_cost = current_rent + (opportunity_value * monthly_opportunity_cost)
-
-        # Property value for this month
-        property_value_current = property_forecast.iloc[month - 1]['nominal_value']
-        property_real_value = property_forecast.iloc[month - 1]['real_value']
-
-        # Net equity in the property
-        property_equity = property_value_current - mortgage_row['remaining_loan']
+        tax_benefit = block['interest'] * tax_benefit_rate / 100
 
-        # Net worth difference (property equity vs investment of down payment + saved difference)
-        # This is simplified and would need more complex modeling for a full financial model
-        net_worth_buy = property_equity
-        net_worth_rent = opportunity_value
+        buy_monthly_cost = (block['payment'] + current_maintenance + current_property_tax
+                            - current_rental_income - tax_benefit)
+        rent_monthly_cost = current_rent + opportunity_cost
 
-        # Save the difference between buying and renting costs
-        if rent_monthly_cost > buy_monthly_cost:
-            # If renting costs more, add the savings to net worth for buying
-            net_worth_buy += (rent_monthly_cost - buy_monthly_cost)
-        else:
-            # If buying costs more, add the savings to net worth for renting
-            net_worth_rent += (buy_monthly_cost - rent_monthly_cost)
+        # Property value: monthly growth with the seasonal pattern, compounded month by month
+        property_values = current_value * np.cumprod(
+            (1 + monthly_property_growth) * seasonal_factors[(months - 1) % 12])
+        current_value = property_values[-1]
+        property_equity = property_values - block['remaining_loan']
 
-        # Break-even analysis
-        break_even = net_worth_buy >= net_worth_rent
+        # The cheaper option's monthly savings add to its net worth
+        savings = rent_monthly_cost - buy_monthly_cost
+        net_worth_buy = property_equity + np.maximum(savings, 0)
+        net_worth_rent = opportunity_value + np.maximum(-savings, 0)
 
-        comparison_data.append({
-            'month': month,
-            'mortgage_payment': mortgage_payment,
+        yield Schedule({
+            'mortgage_payment': block['payment'],
             'property_tax': current_property_tax,
             'maintenance': current_maintenance,
             'rental_income': current_rental_income,
             'tax_benefit': tax_benefit,
             'total_buy_cost': buy_monthly_cost,
             'rent_payment': current_rent,
-            'opportunity_cost': opportunity_value * monthly_opportunity_cost,
+            'opportunity_cost': opportunity_cost,
             'total_rent_cost': rent_monthly_cost,
-            'property_value': property_value_current,
-            'property_real_value': property_real_value,
+            'property_value': property_values,
+            'property_real_value': property_values / inflation_growth,
             'property_equity': property_equity,
             'investment_value': opportunity_value,
             'net_worth_buy': net_worth_buy,
             'net_worth_rent': net_worth_rent,
-            'break_even': break_even
-        })
+            'break_even': net_worth_buy >= net_worth_rent
+        }, first_month=block.first_month)
+
+
+def rent_vs_buy_summary(property_value, down_payment, interest_rate, loan_term_years,
+                        monthly_rent, rent_growth_rate, property_growth_rate,
+                        maintenance_cost_percent, property_tax_percent,
+                        rental_income=0, tax_benefit_rate=0, inflation_rate=0,
+                        opportunity_cost_rate=0, chunk_months=DEFAULT_CHUNK_MONTHS, columns=()):
+    """
+    Key metrics of the rent vs buy comparison, without building its table
+
+    The comparison is streamed block by block and reduced to running
+    aggregates, so memory stays at one block whatever the term, plus the
+    columns asked for.
+
+    Parameters:
+    -----------
+    property_value, down_payment, ..., opportunity_cost_rate
+        See calculate_rent_vs_buy
+    chunk_months : int, optional
+        Months per block
+    columns : sequence of str, optional
+        Columns of the comparison to keep for every month (charts)
+
+    Returns:
+    --------
+    dict
+        'break_even_month' (first month buying is at least as good as
+        renting, None if never), 'total_buy_costs', 'total_rent_costs',
+        'final_property_value', 'final_investment_value' and 'comparison',
+        a Schedule of the kept columns
+    """
+    summary = summarize_blocks(
+        rent_vs_buy_blocks(
+            property_value, down_payment, interest_rate, loan_term_years,
+            monthly_rent, rent_growth_rate, property_growth_rate,
+            maintenance_cost_percent, property_tax_percent,
+            rental_income, tax_benefit_rate, inflation_rate, opportunity_cost_rate,
+            chunk_months
+        ),
+        sums=('total_buy_cost', 'total_rent_cost'),
+        first_true=('break_even',),
+        final=('property_value', 'investment_value'),
+        collect=columns)
+
+    return {
+        'break_even_month': summary['first_true']['break_even'],
+        'total_buy_costs': summary['sums']['total_buy_cost'],
+        'total_rent_costs': summary['sums']['total_rent_cost'],
+        'final_property_value': summary['final']['property_value'],
+        'final_investment_value': summary['final']['investment_value'],
+        'comparison': summary['table']
+    }
+
+
+# Percentiles reported by the Monte Carlo comparison
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def simulate_rent_vs_buy(property_value, down_payment, interest_rate, loan_term_years,
+                         monthly_rent, rent_growth_rate, property_growth_rate,
+                         maintenance_cost_percent, property_tax_percent,
+                         rental_income=0, tax_benefit_rate=0, inflation_rate=0,
+                         opportunity_cost_rate=0, paths=5000,
+                         property_volatility=5.0, rent_volatility=2.0, investment_volatility=0.0,
+                         property_rent_correlation=0.5, property_investment_correlation=0.0,
+                         rent_investment_correlation=0.0, percentiles=DEFAULT_PERCENTILES,
+                         seed=None):
+    """
+    Monte Carlo rent vs buy comparison with simulated growth paths
+
+    Property prices, rents and (optionally) investment returns follow
+    correlated lognormal monthly growth whose expected annual rates are the
+    deterministic inputs. The comparison of calculate_rent_vs_buy is then
+    evaluated for all paths at once on (paths x months) matrices. With all
+    volatilities at zero every path equals the deterministic comparison.
+
+    Parameters:
+    -----------
+    property_value, down_payment, interest_rate, loan_term_years, monthly_rent,
+    rent_growth_rate, property_growth_rate, maintenance_cost_percent,
+    property_tax_percent, rental_income, tax_benefit_rate, inflation_rate,
+    opportunity_cost_rate
+        See calculate_rent_vs_buy; growth rates are the expected annual rates
+    paths : int, optional
+        Number of simulated paths
+    property_volatility : float, optional
+        Annual volatility of property price growth (percentage)
+    rent_volatility : float, optional
+        Annual volatility of rent growth (percentage)
+    investment_volatility : float, optional
+        Annual volatility of investment returns (percentage); 0 keeps the
+        opportunity cost rate deterministic
+    property_rent_correlation : float, optional
+        Correlation between property price and rent growth shocks
+    property_investment_correlation : float, optional
+        Correlation between property price growth and investment return shocks
+    rent_investment_correlation : float, optional
+        Correlation between rent growth and investment return shocks
+    percentiles : sequence of float, optional
+        Percentiles of the net worth bands
+    seed : int, optional
+        Seed of the random generator, for reproducible results
+
+    Returns:
+    --------
+    tuple
+        (bands, break_even_months): bands is a DataFrame with one row per
+        month and columns 'net_worth_buy_p{q}', 'net_worth_rent_p{q}' and
+        'net_worth_difference_p{q}' (buy minus rent) for each percentile q;
+        break_even_months is an int array with the first month in which
+        buying is at least as good as renting on each path (-1 if never)
+    """
+    if paths < 1:
+        raise ValueError("paths must be at least 1")
+
+    correlation = np.array([
+        [1.0, property_rent_correlation, property_investment_correlation],
+        [property_rent_correlation, 1.0, rent_investment_correlation],
+        [property_investment_correlation, rent_investment_correlation, 1.0]
+    ])
+    try:
+        mixing = np.linalg.cholesky(correlation)
+    except np.linalg.LinAlgError:
+        raise ValueError("Correlations do not form a valid correlation matrix")
+
+    loan_amount = property_value - down_payment
+    loan_term_months = int(round(loan_term_years * 12))
+    months = np.arange(1, loan_term_months + 1)
+
+    # Mortgage and inflation-linked costs are the same on every path
+    mortgage_schedule = generate_payment_schedule(loan_amount, interest_rate, loan_term_years)
+    monthly_inflation = (1 + inflation_rate / 100) ** (1 / 12) - 1
+    inflation_growth = (1 + monthly_inflation) ** months
+    fixed_buy_cost = (
+        mortgage_schedule['payment']
+        + property_value * (maintenance_cost_percent + property_tax_percent) / 100 / 12 * inflation_growth
+        - mortgage_schedule['interest'] * tax_benefit_rate / 100
+    )
+
+    # Correlated standard normal shocks: (3, paths, months)
+    rng = np.random.default_rng(seed)
+    shocks = np.einsum('ij,jpm->ipm', mixing, rng.standard_normal((3, paths, loan_term_months)))
+
+    def monthly_returns(annual_rate, annual_volatility, shock):
+        # Lognormal growth whose expected annual growth is annual_rate
+        sigma = annual_volatility / 100 / np.sqrt(12)
+        drift = np.log(1 + annual_rate / 100) / 12 - sigma ** 2 / 2
+        return np.expm1(drift + sigma * shock)
+
+    kernels = get_kernels()
+    ones = np.ones(paths)
+
+    # Property value with the seasonal pattern of the linear forecast model
+    seasonal = np.resize(PROPERTY_SEASONAL_FACTORS, loan_term_months)
+    property_returns = (1 + monthly_returns(property_growth_rate, property_volatility, shocks[0])) * seasonal - 1
+    property_values = kernels.compound_paths(ones * property_value, property_returns)
+
+    rent_growth = kernels.compound_paths(ones, monthly_returns(rent_growth_rate, rent_volatility, shocks[1]))
+
+    investment_returns = monthly_returns(opportunity_cost_rate, investment_volatility, shocks[2])
+    investment_values = kernels.compound_paths(ones * down_payment, investment_returns)
+    del shocks, property_returns
+
+    buy_cost = fixed_buy_cost - rental_income * rent_growth
+    rent_cost = monthly_rent * rent_growth + investment_values * investment_returns
+    del rent_growth, investment_returns
+
+    # Monthly savings of the cheaper option add to its net worth
+    savings = rent_cost - buy_cost
+    net_worth_buy = property_values - mortgage_schedule['remaining_loan'] + np.maximum(savings, 0)
+    net_worth_rent = investment_values + np.maximum(-savings, 0)
+    del property_values, investment_values, savings, buy_cost, rent_cost
+
+    break_even = net_worth_buy >= net_worth_rent
+    break_even_months = np.where(break_even.any(axis=1), break_even.argmax(axis=1) + 1, -1)
+
+    bands = {'month': months}
+    for name, values in (('net_worth_buy', net_worth_buy), ('net_worth_rent', net_worth_rent),
+                         ('net_worth_difference', net_worth_buy - net_worth_rent)):
+        for q, band in zip(percentiles, np.percentile(values, percentiles, axis=0)):
+            bands[f'{name}_p{q:g}'] = band
+
+    return pd.DataFrame(bands), break_even_months
+
+
+def summarize_break_even(break_even_months, loan_term_years, percentiles=DEFAULT_PERCENTILES):
+    """
+    Distribution of the break-even month across simulated paths
+
+    Parameters:
+    -----------
+    break_even_months : numpy.ndarray
+        Break-even month of each path (-1 if never), see simulate_rent_vs_buy
+    loan_term_years : float
+        Horizon of the simulation in years
+    percentiles : sequence of float, optional
+        Percentiles of the break-even month among paths that break even
+
+    Returns:
+    --------
+    dict
+        'probability': share of paths that break even within the horizon,
+        'percentiles': {q: month} among those paths (empty if none),
+        'by_year': number of paths first breaking even in each year
+    """
+    reached = break_even_months[break_even_months > 0]
+    years = int(np.ceil(loan_term_years))
+    by_year = np.bincount((reached - 1) // 12, minlength=years)[:years]
 
-    return pd.DataFrame(comparison_data)
\ No newline at end of file
+    return {
+        'probability': len(reached) / len(break_even_months) if len(break_even_months) else 0.0,
+        'percentiles': {q: float(value) for q, value in zip(
+            percentiles, np.percentile(reached, percentiles))} if len(reached) else {},
+        'by_year': by_year
+    }
@@ -1,6 +1,7 @@
-import pandas as pd
-import numpy as np
-from backend.core.calculators import generate_payment_schedule
+from backend.core.fx_history import get_fx_history, payment_dates, rates_with_projection
+from backend.core.pipeline import DEFAULT_CHUNK_MONTHS, collect_blocks, schedule_blocks, summarize_blocks
+from backend.core.rates import get_rate_store
+from backend.core.schedule import Schedule
 
 def convert_currency(amount, from_currency, to_currency):
     """
@@ -8,8 +9,8 @@ def convert_currency(amount, from_currency, to_currency):
     
     Parameters:
     -----------
-    amount : float
-        Amount to convert
+    amount : float or numpy.ndarray
+        Amount (or array of amounts) to convert
     from_currency : str
         Source currency code (e.g., 'USD')
     to_currency : str
@@ -17,33 +18,24 @@ def convert_currency(amount, from_currency, to_currency):
         
     Returns:
     --------
-    float
+    float or numpy.ndarray
         Converted amount
     """
-    try:
-        # In a real application, we would use an API for live currency rates
-        # For this demo version, we use a static fallback
-        conversion_rates = {
-            'USD': {'EUR': 0.85, 'RUB': 73.5, 'JPY': 110.0, 'USD': 1.0},
-            'EUR': {'USD': 1.18, 'RUB': 86.5, 'JPY': 130.0, 'EUR': 1.0},
-            'RUB': {'USD': 0.0136, 'EUR': 0.0116, 'JPY': 1.5, 'RUB': 1.0},
-            'JPY': {'USD': 0.0091, 'EUR': 0.0077, 'RUB': 0.67, 'JPY': 1.0}
-        }
-
-        return amount * conversion_rates[from_currency][to_currency]
-    except KeyError:
-        # Handle unsupported currency
-        raise ValueError(f"Conversion from {from_currency} to {to_currency} is not supported")
-    except Exception as e:
-        # Handle other exceptions
-        raise Exception(f"Error during currency conversion: {str(e)}")
+    # Rates come from the local rates file, loaded once into a currency matrix
+    return get_rate_store().table().convert(amount, from_currency, to_currency)
 
 
 def calculate_mortgage_in_multiple_currencies(loan_amount, interest_rate, loan_term_years,
                                              base_currency, target_currencies,
-                                             currency_annual_change=None):
+                                             currency_annual_change=None, start_date=None,
+                                             fx_history=None, chunk_months=DEFAULT_CHUNK_MONTHS):
     """
     Calculate mortgage payments in multiple currencies with projected exchange rates
+
+    With a start date the schedule is backtested: months paid on or before the
+    last observation of the exchange rate history use the historical rate of
+    their payment date, and later months project the rate from the last
+    observation.
     
     Parameters:
     -----------
@@ -58,70 +50,144 @@ def calculate_mortgage_in_multiple_currencies(loan_amount, interest_rate, loan_t
     target_currencies : list
         List of target currency codes
     currency_annual_change : dict, optional
-        Dictionary of annual currency change rates
+        Dictionary of annual currency change rates {from: {to: change}};
+        pairs not given use the projection from the rates file
+    start_date : str, optional
+        Date of the first payment (YYYY-MM-DD); rates are projected from
+        today's rates file if not given
+    fx_history : FxHistory, optional
+        Exchange rate history used with a start date (default: the local store)
+    chunk_months : int, optional
+        Months converted at a time (see backend.core.pipeline); None for the
+        whole term at once
         
     Returns:
     --------
-    pandas.DataFrame
-        DataFrame with payment schedule in multiple currencies
+    Schedule
+        Payment schedule in multiple currencies, with a boolean
+        historical_<currency> column per currency when start_date is given
     """
-    if currency_annual_change is None:
-        # Default annual currency change rates (can be positive or negative)
-        currency_annual_change = {
-            'USD': {'EUR': -0.01, 'RUB': 0.02, 'JPY': 0.01, 'USD': 0.0},
-            'EUR': {'USD': 0.01, 'RUB': 0.03, 'JPY': 0.02, 'EUR': 0.0},
-            'RUB': {'USD': -0.02, 'EUR': -0.03, 'JPY': -0.01, 'RUB': 0.0},
-            'JPY': {'USD': -0.01, 'EUR': -0.02, 'RUB': 0.01, 'JPY': 0.0}
-        }
-    
-    # Generate payment schedule in base currency
-    base_schedule = generate_payment_schedule(loan_amount, interest_rate, loan_term_years)
-
-    # Create empty list for multi-currency comparison
-    multi_currency_data = []
-
-    # Monthly change rates
-    monthly_change_rates = {}
-    for from_curr in currency_annual_change:
-        monthly_change_rates[from_curr] = {}
-        for to_curr in currency_annual_change[from_curr]:
-            annual_rate = currency_annual_change[from_curr][to_curr]
-            monthly_change_rates[from_curr][to_curr] = (1 + annual_rate) ** (1 / 12) - 1
-
-    # Current exchange rates
-    current_rates = {}
+    return collect_blocks(currency_blocks(
+        schedule_blocks(loan_amount, interest_rate, loan_term_years, chunk_months),
+        base_currency, target_currencies, currency_annual_change, start_date, fx_history))
+
+
+def currency_summary(loan_amount, interest_rate, loan_term_years, base_currency, target_currencies,
+                     currency_annual_change=None, start_date=None, fx_history=None,
+                     chunk_months=DEFAULT_CHUNK_MONTHS, columns=()):
+    """
+    Totals of the multi-currency schedule, streamed block by block
+
+    Only the columns asked for are kept for every month; the others are
+    released with their block.
+
+    Parameters:
+    -----------
+    loan_amount, interest_rate, ..., fx_history
+        See calculate_mortgage_in_multiple_currencies
+    chunk_months : int, optional
+        Months converted at a time
+    columns : sequence of str, optional
+        Columns of the schedule to keep for every month (charts)
+
+    Returns:
+    --------
+    dict
+        'total_interest' by target currency, 'historical_months' (months
+        priced at historical rates by converted currency, None without a
+        start date) and 'schedule', a Schedule of the kept columns
+    """
+    historical = [f'historical_{currency}' for currency in target_currencies
+                  if currency != base_currency] if start_date is not None else []
+    summary = summarize_blocks(
+        currency_blocks(schedule_blocks(loan_amount, interest_rate, loan_term_years, chunk_months),
+                        base_currency, target_currencies, currency_annual_change, start_date, fx_history),
+        sums=[f'interest_{currency}' for currency in target_currencies] + historical,
+        collect=columns)
+
+    return {
+        'total_interest': {currency: summary['sums'][f'interest_{currency}'] for currency in target_currencies},
+        'historical_months': {
+            name[len('historical_'):]: int(summary['sums'][name]) for name in historical
+        } if start_date is not None else None,
+        'schedule': summary['table']
+    }
+
+
+def currency_blocks(blocks, base_currency, target_currencies, currency_annual_change=None,
+                    start_date=None, fx_history=None):
+    """
+    Convert a stream of base currency schedule blocks into multi-currency blocks
+
+    Pipeline stage of calculate_mortgage_in_multiple_currencies (see
+    backend.core.pipeline): exchange rates are computed for the months of
+    each block as it arrives.
+
+    Parameters:
+    -----------
+    blocks : iterable of Schedule
+        Blocks of a monthly payment schedule in the base currency
+    base_currency, target_currencies, currency_annual_change, start_date, fx_history
+        See calculate_mortgage_in_multiple_currencies
+
+    Yields:
+    -------
+    Schedule
+        payment_, principal_, interest_, remaining_ and (except for the base
+        currency) rate_ and, with a start date, historical_ columns of each
+        currency for the rows of the block
+    """
+    rate_table = get_rate_store().table()
+    if start_date is not None:
+        fx_history = fx_history or get_fx_history()
+
+    # Projection of each converted currency: (currency, monthly change, spot rate or history)
+    conversions = []
     for currency in target_currencies:
-        if currency != base_currency:
-            current_rates[currency] = convert_currency(1.0, base_currency, currency)
-
-    # Calculate payments in all currencies for each month
-    for month in range(1, len(base_schedule) + 1):
-        row = base_schedule.iloc[month - 1]
-
-        payment_data = {
-            'month': month,
-            f'payment_{base_currency}': row['payment'],
-            f'principal_{base_currency}': row['principal'],
-            f'interest_{base_currency}': row['interest'],
-            f'remaining_{base_currency}': row['remaining_loan']
-        }
+        if currency == base_currency:
+            continue
 
-        # Calculate for target currencies
-        for currency in target_currencies:
-            if currency != base_currency:
-                # Update exchange rate based on projected changes
-                if month > 1:
-                    monthly_change = monthly_change_rates[base_currency][currency]
-                    current_rates[currency] *= (1 + monthly_change)
+        # Explicit annual change for this pair, or the projection from the rates file
+        annual_change = (currency_annual_change or {}).get(base_currency, {}).get(currency)
+        if annual_change is None:
+            monthly_change = rate_table.monthly_change_rate(base_currency, currency)
+        else:
+            monthly_change = (1 + annual_change) ** (1 / 12) - 1
 
-                rate = current_rates[currency]
+        if start_date is None:
+            source = rate_table.rate(base_currency, currency)
+        else:
+            source = fx_history.series(base_currency, currency)
+        conversions.append((currency, monthly_change, source))
+
+    for block in blocks:
+        months = block.months
+        if start_date is not None:
+            dates = payment_dates(start_date, len(months), offset=block.first_month - 1)
+
+        multi_currency_data = {
+            f'payment_{base_currency}': block['payment'],
+            f'principal_{base_currency}': block['principal'],
+            f'interest_{base_currency}': block['interest'],
+            f'remaining_{base_currency}': block['remaining_loan']
+        }
 
-                payment_data[f'payment_{currency}'] = row['payment'] * rate
-                payment_data[f'principal_{currency}'] = row['principal'] * rate
-                payment_data[f'interest_{currency}'] = row['interest'] * rate
-                payment_data[f'remaining_{currency}'] = row['remaining_loan'] * rate
-                payment_data[f'rate_{currency}'] = rate
+        for currency, monthly_change, source in conversions:
+            if start_date is None:
+                # Exchange rate for each month, compounding the monthly change from month 2
+                rates = source * (1 + monthly_change) ** (months - 1)
+            else:
+                # Historical rates for past payment dates, projected after the history ends
+                try:
+                    rates, historical = rates_with_projection(source, dates, monthly_change)
+                except ValueError as e:
+                    raise ValueError(f"{base_currency}/{currency}: {e}")
+                multi_currency_data[f'historical_{currency}'] = historical
 
-        multi_currency_data.append(payment_data)
+            multi_currency_data[f'payment_{currency}'] = multi_currency_data[f'payment_{base_currency}'] * rates
+            multi_currency_data[f'principal_{currency}'] = multi_currency_data[f'principal_{base_currency}'] * rates
+            multi_currency_data[f'interest_{currency}'] = multi_currency_data[f'interest_{base_currency}'] * rates
+            multi_currency_data[f'remaining_{currency}'] = multi_currency_data[f'remaining_{base_currency}'] * rates
+            multi_currency_data[f'rate_{currency}'] = rates
 
-    return pd.DataFrame(multi_currency_data)
\ No newline at end of file
+        yield Schedule(multi_currency_data, first_month=block.first_month)
@@ -0,0 +1,85 @@
+import warnings
+
+import numpy as np
+
+
+def lttb_indices(x, series, max_points, keep=None):
+    """
+    Rows to keep to draw time series with at most `max_points` points
+
+    Largest-triangle-three-buckets (LTTB) selection, vectorized: the first
+    and last rows are kept, the rows in between are split into equal
+    buckets, and each bucket keeps the row forming the largest triangle with
+    the averages of the neighbouring buckets (the classic algorithm anchors
+    on the row chosen in the previous bucket, which makes it sequential).
+    Several series sharing the x axis are downsampled together: each is
+    scaled to its range, and the triangle areas of all series are added up,
+    so the rows kept preserve the shape of every series.
+
+    Parameters:
+    -----------
+    x : array-like
+        Increasing x values (months) of the n rows
+    series : array-like
+        Values of each series, shape (series, n) or (n,) for a single series;
+        NaNs count as the series minimum
+    max_points : int
+        Largest number of rows returned (at least 3)
+    keep : array-like of int, optional
+        Rows that must be kept (break-even months...); they take the place of
+        buckets, so the total stays within max_points
+
+    Returns:
+    --------
+    numpy.ndarray
+        Increasing row positions, all rows when there are at most max_points
+    """
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    keep = np.unique(np.concatenate(([0, n - 1], np.asarray(keep if keep is not None else [], dtype=np.int64))))
+    keep = keep[(keep >= 0) & (keep < n)]
+    if max_points < 3:
+        raise ValueError("max_points must be at least 3")
+    if n <= max_points:
+        return np.arange(n)
+
+    buckets = max_points - len(keep)
+    if buckets <= 0:
+        return keep[np.linspace(0, len(keep) - 1, max_points).round().astype(np.int64)]
+
+    values = np.atleast_2d(np.asarray(series, dtype=float))
+    with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+        # All-NaN series have no range: they count as flat
+        warnings.simplefilter('ignore', RuntimeWarning)
+        low = np.nanmin(values, axis=1, keepdims=True)
+        span = np.nanmax(values, axis=1, keepdims=True) - low
+        values = np.nan_to_num((values - low) / np.where(span > 0, span, 1))
+    x = (x - x[0]) / (x[-1] - x[0])
+
+    # Interior rows split into buckets of (almost) equal size, padded to the largest
+    edges = np.linspace(1, n - 1, buckets + 1).astype(np.int64)
+    width = int(np.diff(edges).max())
+    rows = edges[:-1, np.newaxis] + np.arange(width)
+    valid = rows < edges[1:, np.newaxis]
+    rows = np.where(valid, rows, edges[:-1, np.newaxis])
+    counts = valid.sum(axis=1)
+
+    bucket_x = x[rows]
+    bucket_y = values[:, rows]
+    mean_x = (bucket_x * valid).sum(axis=1) / counts
+    mean_y = (bucket_y * valid).sum(axis=2) / counts
+
+    # Anchors: average of the previous and next buckets (first and last rows at the ends)
+    prev_x = np.concatenate(([x[0]], mean_x[:-1]))
+    next_x = np.concatenate((mean_x[1:], [x[-1]]))
+    prev_y = np.concatenate((values[:, :1], mean_y[:, :-1]), axis=1)
+    next_y = np.concatenate((mean_y[:, 1:], values[:, -1:]), axis=1)
+
+    area = np.abs(
+        (prev_x - next_x)[:, np.newaxis] * (bucket_y - prev_y[:, :, np.newaxis])
+        - (prev_x[:, np.newaxis] - bucket_x) * (next_y - prev_y)[:, :, np.newaxis]
+    ).sum(axis=0)
+    area[~valid] = -1
+    chosen = rows[np.arange(buckets), area.argmax(axis=1)]
+
+    return np.union1d(chosen, keep)
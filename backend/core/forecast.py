@@ -2,9 +2,66 @@ import pandas as pd
 import numpy as np
 from sklearn.linear_model import LinearRegression
 
+from backend.core.model_cache import model_key
+
+# Default seasonal factors by month: slightly higher in spring/summer, lower in winter
+PROPERTY_SEASONAL_FACTORS = [0.997, 1.001, 1.003, 1.005, 1.006, 1.005,
+                             1.003, 1.001, 0.999, 0.998, 0.996, 0.995]
+
+
+def fit_trend_model(growth_rate, seasonal_factors, months, seed=0):
+    """
+    Fit the "ml" trend model on a synthetic history of a unit property value
+    
+    Parameters:
+    -----------
+    growth_rate : float
+        Total annual growth rate, regional adjustment included (percentage)
+    seasonal_factors : list
+        Seasonal adjustment factors by month (12 values)
+    months : int
+        Length of the synthetic history in months
+    seed : int, optional
+        Seed of the synthetic noise
+        
+    Returns:
+    --------
+    sklearn.linear_model.LinearRegression
+        Model of the value by month index (0-based)
+    """
+    monthly_growth_rate = (1 + growth_rate / 100) ** (1 / 12) - 1
+    X = np.arange(months).reshape(-1, 1)
+
+    # Synthetic historical pattern with some noise
+    seasonal = np.asarray(seasonal_factors, dtype=float)[np.arange(months) % 12]
+    noise_factors = 1 + np.random.default_rng(seed).normal(0, 0.005, months)
+    y = (1 + monthly_growth_rate) ** np.arange(months) * seasonal * noise_factors
+
+    return LinearRegression().fit(X, y)
+
+
+def ml_trend_model(growth_rate, seasonal_factors, months, seed=0, model_cache=None):
+    """
+    Fitted "ml" trend model, from the cache when one is given
+    
+    Models are keyed by total growth rate, seasonal factors, horizon and
+    seed; the initial value is not part of the key since predictions are
+    scaled by it.
+    """
+    def fit():
+        return fit_trend_model(growth_rate, seasonal_factors, months, seed)
+
+    if model_cache is None:
+        return fit()
+
+    key = model_key('trend', float(growth_rate), [float(f) for f in seasonal_factors], int(months), seed)
+    return model_cache.get_or_fit(key, fit)
+
+
 def forecast_property_value(initial_value, growth_rate, years,
                             seasonal_factors=None, regional_adjustment=0,
-                            inflation_rate=0, model="linear"):
+                            inflation_rate=0, model="linear", seed=0,
+                            model_cache=None):
     """
     Forecast property value over time with various growth models
     
@@ -24,6 +81,11 @@ def forecast_property_value(initial_value, growth_rate, years,
         Annual inflation rate (percentage)
     model : str, optional
         Forecasting model type ("linear", "exponential", "ml")
+    seed : int, optional
+        Seed of the synthetic noise of the "ml" model; the same inputs and
+        seed always give the same forecast
+    model_cache : ModelCache, optional
+        Cache of fitted "ml" trend models; models are refitted if not given
         
     Returns:
     --------
@@ -34,9 +96,7 @@ def forecast_property_value(initial_value, growth_rate, years,
 
     # Default seasonal factors if none provided
     if seasonal_factors is None:
-        # Slightly higher in spring/summer, lower in winter
-        seasonal_factors = [0.997, 1.001, 1.003, 1.005, 1.006, 1.005,
-                            1.003, 1.001, 0.999, 0.998, 0.996, 0.995]
+        seasonal_factors = PROPERTY_SEASONAL_FACTORS
                             
     # Adjusted monthly growth rate
     total_growth_rate = growth_rate + regional_adjustment
@@ -83,35 +143,144 @@ def forecast_property_value(initial_value, growth_rate, years,
             })
 
     elif model == "ml":
-        # Simple ML-based approach using historical data pattern
-        # This is a simplified simulation for demonstration
-        X = np.array(range(months)).reshape(-1, 1)
-        y = np.zeros(months)
-
-        # Generate synthetic historical pattern with some noise
-        for i in range(months):
-            month_in_year = i % 12
-            seasonal_factor = seasonal_factors[month_in_year]
-            growth_factor = (1 + monthly_growth_rate) ** i
-            noise_factor = 1 + np.random.normal(0, 0.005)  # Random noise
+        # Trend fitted on a unit value: the regression is linear in the
+        # initial value, so one fitted model serves every property value
+        trend_model = ml_trend_model(total_growth_rate, seasonal_factors, months, seed, model_cache)
+        month_numbers = np.arange(1, months + 1)
+        nominal_values = initial_value * trend_model.predict((month_numbers - 1).reshape(-1, 1))
 
-            y[i] = initial_value * growth_factor * seasonal_factor * noise_factor
+        return pd.DataFrame({
+            'month': month_numbers,
+            'nominal_value': nominal_values,
+            'real_value': nominal_values / (1 + monthly_inflation_rate) ** month_numbers
+        })
 
-        # Fit linear regression model
-        model = LinearRegression()
-        model.fit(X, y)
+    return pd.DataFrame(forecast_data)
 
-        # Predict values
-        predicted_values = model.predict(X)
 
-        for month in range(1, months + 1):
-            nominal_value = predicted_values[month - 1]
-            real_value = nominal_value / (1 + monthly_inflation_rate) ** month
+def region_value_curves(growth_rates, years, seasonal_factors, model="linear", seed=0,
+                        model_cache=None):
+    """
+    Nominal value paths of a unit initial value for several regions at once
+    
+    Parameters:
+    -----------
+    growth_rates : array-like
+        Total annual growth rate of each region, regional adjustment included (percentage)
+    years : int
+        Number of years to forecast
+    seasonal_factors : array-like
+        Seasonal adjustment factors of each region, shape (regions, 12)
+    model : str, optional
+        Forecasting model type ("linear", "exponential", "ml")
+    seed : int, optional
+        Seed of the synthetic noise of the "ml" model
+    model_cache : ModelCache, optional
+        Cache of fitted "ml" trend models
+        
+    Returns:
+    --------
+    numpy.ndarray
+        Value of each region's curve at each month, shape (regions, months)
+    """
+    growth_rates = np.asarray(growth_rates, dtype=float)
+    seasonal_factors = np.asarray(seasonal_factors, dtype=float)
+    months = years * 12
 
-            forecast_data.append({
-                'month': month,
-                'nominal_value': nominal_value,
-                'real_value': real_value
-            })
+    monthly_growth_rates = (1 + growth_rates / 100) ** (1 / 12) - 1
+    # Seasonal factor of each month of the horizon, per region
+    seasonal = seasonal_factors[:, np.arange(months) % 12]
+
+    if model == "linear":
+        return np.cumprod((1 + monthly_growth_rates)[:, None] * seasonal, axis=1)
+    elif model == "exponential":
+        return (1 + monthly_growth_rates)[:, None] ** np.arange(1, months + 1) * seasonal
+    elif model == "ml":
+        # The regression is linear in the initial value, so a unit curve scales exactly
+        month_index = np.arange(months).reshape(-1, 1)
+        return np.array([
+            ml_trend_model(growth_rate, factors, months, seed, model_cache).predict(month_index)
+            for growth_rate, factors in zip(growth_rates, seasonal_factors)
+        ]).reshape(len(growth_rates), months)
+
+    raise ValueError(f"Unknown forecast model: {model}")
+
+
+def forecast_property_values(initial_values, regions, growth_rates, years,
+                             seasonal_factors=None, regional_adjustments=None,
+                             inflation_rate=0, model="linear", seed=0, model_cache=None):
+    """
+    Forecast the values of many properties across regions at once
+    
+    Every model scales linearly with the initial value, so each distinct
+    region curve (growth rate plus adjustment and seasonal factors) is
+    computed once for a unit value and multiplied by the initial value of
+    each property in that region. Regions with identical parameters share
+    a single curve.
+    
+    Parameters:
+    -----------
+    initial_values : array-like
+        Initial value of each property
+    regions : array-like of int
+        Index of each property's region into the per-region parameters
+    growth_rates : array-like
+        Annual growth rate of each region (percentage)
+    years : int
+        Number of years to forecast
+    seasonal_factors : array-like, optional
+        Seasonal adjustment factors of each region, shape (regions, 12);
+        PROPERTY_SEASONAL_FACTORS for every region if not given
+    regional_adjustments : array-like, optional
+        Regional growth adjustment of each region (percentage)
+    inflation_rate : float, optional
+        Annual inflation rate (percentage)
+    model : str, optional
+        Forecasting model type ("linear", "exponential", "ml")
+    seed : int, optional
+        Seed of the synthetic noise of the "ml" model
+    model_cache : ModelCache, optional
+        Cache of fitted "ml" trend models
+        
+    Returns:
+    --------
+    dict
+        'nominal_value' and 'real_value' matrices of shape (properties, months),
+        'month' with the month numbers and 'curves' with the number of
+        distinct region curves computed
+    """
+    initial_values = np.asarray(initial_values, dtype=float)
+    regions = np.asarray(regions, dtype=np.int64)
+    growth_rates = np.asarray(growth_rates, dtype=float)
+    months = years * 12
+
+    if regional_adjustments is None:
+        regional_adjustments = np.zeros(len(growth_rates))
+    if seasonal_factors is None:
+        seasonal_factors = np.tile(PROPERTY_SEASONAL_FACTORS, (len(growth_rates), 1))
+    seasonal_factors = np.asarray(seasonal_factors, dtype=float)
+
+    if seasonal_factors.shape != (len(growth_rates), 12):
+        raise ValueError("Seasonal factors must have 12 values for every region")
+    if len(initial_values) != len(regions):
+        raise ValueError("Every property needs an initial value and a region")
+    if len(regions) and (regions.min() < 0 or regions.max() >= len(growth_rates)):
+        raise ValueError("Property region out of range")
+
+    # Deduplicate regions that produce the same curve
+    curve_params = np.column_stack((growth_rates + np.asarray(regional_adjustments, dtype=float),
+                                    seasonal_factors))
+    unique_params, region_curves = np.unique(curve_params, axis=0, return_inverse=True)
+    curves = region_value_curves(unique_params[:, 0], years, unique_params[:, 1:], model, seed, model_cache)
+
+    nominal_values = initial_values[:, None] * curves[region_curves.reshape(-1)[regions]]
+
+    monthly_inflation_rate = (1 + inflation_rate / 100) ** (1 / 12) - 1
+    deflators = (1 + monthly_inflation_rate) ** -np.arange(1, months + 1)
 
-    return pd.DataFrame(forecast_data)
\ No newline at end of file
+    return {
+        'month': np.arange(1, months + 1),
+        'nominal_value': nominal_values,
+        'real_value': nominal_values * deflators,
+        'curves': len(unique_params)
+    }
@@ -0,0 +1,387 @@
+"""
+Local store of historical exchange rates
+
+Each currency pair is one NumPy .npy file, `<BASE>_<QUOTE>.npy`, holding a
+structured array of (day, rate) rows sorted by day, where day is the number
+of days since 1970-01-01 (int32) and rate the units of QUOTE per unit of
+BASE (float64): 12 bytes per observation. Files are memory-mapped read-only,
+so a worker only pages in the parts of a series it reads, and every date
+lookup is a binary search on the day column.
+
+History is imported from CSV with `import_fx_csv`, or from the command line:
+
+    python -m backend.core.fx_history import rates.csv [--base USD]
+
+Either in long format (columns date, base, quote, rate) or in wide format
+(a date column and one column per quote currency, with --base). Imported
+rows replace existing observations of the same day. The store directory is
+MORTGAGE_FX_HISTORY_DIR, or backend/data/fx_history.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_HISTORY_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'fx_history')
+HISTORY_DIR_ENV = 'MORTGAGE_FX_HISTORY_DIR'
+
+# One observation: day number since the epoch and exchange rate
+OBSERVATION_DTYPE = np.dtype([('day', '<i4'), ('rate', '<f8')])
+
+
+def to_days(dates):
+    """
+    Day numbers since 1970-01-01 of dates (strings, datetime64 or Timestamps)
+    """
+    return np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+
+
+def payment_dates(start_date, months, offset=0):
+    """
+    Date of each monthly payment, starting on start_date
+
+    The day of month of start_date is kept, clipped to the end of shorter
+    months (a loan starting on January 31 pays on February 28 or 29). With
+    an offset, the dates of payments offset + 1 to offset + months.
+    """
+    start = np.datetime64(start_date, 'D')
+    first_month = start.astype('datetime64[M]')
+    month_starts = first_month + np.arange(offset, offset + months)
+    day_offset = start - first_month.astype('datetime64[D]')
+    month_ends = (month_starts + 1).astype('datetime64[D]') - 1
+    return np.minimum(month_starts.astype('datetime64[D]') + day_offset, month_ends)
+
+
+class FxSeries:
+    """
+    Exchange rate history of one currency pair
+
+    Parameters:
+    -----------
+    days : numpy.ndarray
+        Sorted day numbers of the observations
+    rates : numpy.ndarray
+        Exchange rate of each observation
+    inverse : bool, optional
+        Serve the reverse pair: rates are inverted as they are read, so the
+        stored series is never copied
+    """
+
+    def __init__(self, days, rates, inverse=False):
+        self.days = days
+        self.rates = rates
+        self.inverse = inverse
+
+    def __len__(self):
+        return len(self.days)
+
+    @property
+    def first_day(self):
+        return int(self.days[0])
+
+    @property
+    def last_day(self):
+        return int(self.days[-1])
+
+    def inverted(self):
+        """
+        Series of the reverse pair
+        """
+        return FxSeries(self.days, self.rates, not self.inverse)
+
+    def _read(self, rates):
+        rates = np.asarray(rates, dtype=float)
+        return 1.0 / rates if self.inverse else rates
+
+    def range(self, start_date, end_date):
+        """
+        Observations with start_date <= date <= end_date
+
+        Returns:
+        --------
+        tuple
+            (dates as datetime64[D], rates)
+        """
+        start = np.searchsorted(self.days, to_days(start_date), side='left')
+        stop = np.searchsorted(self.days, to_days(end_date), side='right')
+        return np.asarray(self.days[start:stop]).astype('datetime64[D]'), self._read(self.rates[start:stop])
+
+    def as_of(self, dates):
+        """
+        Rate of the last observation on or before each date
+
+        Dates before the first observation get NaN.
+        """
+        positions = np.searchsorted(self.days, to_days(dates), side='right') - 1
+        rates = self._read(self.rates[np.maximum(positions, 0)])
+        rates[positions < 0] = np.nan
+        return rates
+
+
+def rates_with_projection(series, dates, monthly_change):
+    """
+    Historical exchange rate on each date, projected past the end of the history
+
+    Dates up to the last observation get the rate of the last observation on
+    or before them. Later dates compound `monthly_change` from the last
+    observed rate, one step per calendar month after it.
+
+    Parameters:
+    -----------
+    series : FxSeries
+        History of the currency pair
+    dates : numpy.ndarray
+        Sorted dates (datetime64[D])
+    monthly_change : float
+        Projected monthly change of the rate
+
+    Returns:
+    --------
+    tuple
+        (rates, boolean mask of the dates served from history)
+    """
+    days = to_days(dates)
+    if len(days) and days[0] < series.first_day:
+        raise ValueError(f"Exchange rate history starts on {np.datetime64(series.first_day, 'D')}")
+
+    historical = days <= series.last_day
+    last_date = np.datetime64(series.last_day, 'D')
+    months_after = (np.asarray(dates, dtype='datetime64[M]') - last_date.astype('datetime64[M]')).astype(np.int64)
+    projected = series.as_of([last_date])[0] * (1 + monthly_change) ** months_after
+
+    rates = projected
+    if historical.any():
+        rates = np.where(historical, series.as_of(np.where(historical, dates, last_date)), projected)
+    return rates, historical
+
+
+class FxHistory:
+    """
+    Memory-mapped exchange rate history, one file per currency pair
+
+    Pairs without a file of their own are served from the reverse pair, or
+    triangulated through a currency both have a history against, from the
+    date both series have started. Series are mapped on first use; files
+    replaced by a new import are picked up within `check_interval` seconds.
+
+    Parameters:
+    -----------
+    directory : str
+        Store directory
+    check_interval : float, optional
+        Minimum number of seconds between file modification checks of a pair
+    """
+
+    def __init__(self, directory, check_interval=5.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _path(self, base, quote):
+        return os.path.join(self.directory, f'{base}_{quote}.npy')
+
+    def pairs(self):
+        """
+        Currency pairs with a stored history, as (base, quote) tuples
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(tuple(name[:-4].split('_', 1)) for name in os.listdir(self.directory)
+                      if name.endswith('.npy') and '_' in name)
+
+    def _stored(self, base, quote):
+        # Mapped series of a pair file, or None if there is no file
+        path = self._path(base, quote)
+        now = time.monotonic()
+        cached = self._series.get((base, quote))
+        if cached is not None and now < cached[2]:
+            return cached[0]
+
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            self._series.pop((base, quote), None)
+            return None
+
+        with self._lock:
+            cached = self._series.get((base, quote))
+            if cached is None or cached[1] != mtime:
+                observations = np.load(path, mmap_mode='r')
+                series = FxSeries(observations['day'], observations['rate'])
+            else:
+                series = cached[0]
+            self._series[(base, quote)] = (series, mtime, now + self.check_interval)
+            return series
+
+    def series(self, base, quote):
+        """
+        History of a currency pair
+
+        Raises ValueError if the pair cannot be served from the stored series.
+        """
+        series = self._direct(base, quote)
+        if series is not None:
+            return series
+
+        # Cross rate through a currency with a history against both
+        currencies = sorted({currency for pair in self.pairs() for currency in pair} - {base, quote})
+        for via in currencies:
+            to_base, to_quote = self._direct(via, base), self._direct(via, quote)
+            if to_base is None or to_quote is None:
+                continue
+            # Observation days of either series while both have started
+            days = np.union1d(to_base.days, to_quote.days)
+            days = days[days >= max(to_base.first_day, to_quote.first_day)]
+            if len(days):
+                dates = days.astype('datetime64[D]')
+                return FxSeries(days, to_quote.as_of(dates) / to_base.as_of(dates))
+
+        raise ValueError(f"No exchange rate history for {base}/{quote}")
+
+    def _direct(self, base, quote):
+        # Stored series of the pair or of the reverse pair, or None
+        series = self._stored(base, quote)
+        if series is not None:
+            return series
+        series = self._stored(quote, base)
+        if series is not None:
+            return series.inverted()
+        return None
+
+    def write(self, base, quote, days, rates):
+        """
+        Merge observations into the stored history of a pair
+
+        Observations replace stored ones of the same day. The new file is
+        written next to the old one and renamed over it, so readers never see
+        a partial file.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        days = np.asarray(days, dtype=np.int64)
+        rates = np.asarray(rates, dtype=float)
+
+        existing = self._stored(base, quote)
+        if existing is not None:
+            keep = ~np.isin(existing.days, days)
+            days = np.concatenate((np.asarray(existing.days)[keep], days))
+            rates = np.concatenate((np.asarray(existing.rates)[keep], rates))
+
+        # Sort by day, keeping the last of duplicate days
+        order = np.argsort(days, kind='stable')
+        days, rates = days[order], rates[order]
+        last = np.append(days[1:] != days[:-1], True)
+
+        observations = np.empty(int(last.sum()), dtype=OBSERVATION_DTYPE)
+        observations['day'] = days[last]
+        observations['rate'] = rates[last]
+
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as temp_file:
+                np.save(temp_file, observations)
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, self._path(base, quote))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        with self._lock:
+            self._series.pop((base, quote), None)
+        return len(observations)
+
+
+def import_fx_csv(csv_path, history, base=None):
+    """
+    Import exchange rate history from a CSV file
+
+    Parameters:
+    -----------
+    csv_path : str
+        CSV file, in long format (columns date, base, quote, rate) or in wide
+        format (a date column and one rate column per quote currency)
+    history : FxHistory
+        Store to import into
+    base : str, optional
+        Base currency of a wide-format file
+
+    Returns:
+    --------
+    dict
+        Number of stored observations of each imported pair, keyed 'BASE/QUOTE'
+    """
+    frame = pd.read_csv(csv_path)
+    frame.columns = [column.strip() for column in frame.columns]
+    if 'date' not in frame.columns:
+        raise ValueError("FX history CSV needs a date column")
+
+    if {'base', 'quote', 'rate'} <= set(frame.columns):
+        long_frame = frame[['date', 'base', 'quote', 'rate']]
+    else:
+        if base is None:
+            raise ValueError("Wide FX history CSV needs a base currency")
+        long_frame = frame.melt(id_vars='date', var_name='quote', value_name='rate')
+        long_frame['base'] = base
+
+    long_frame = long_frame.dropna(subset=['rate'])
+    if (long_frame['rate'] <= 0).any():
+        raise ValueError("Exchange rates must be positive")
+
+    counts = {}
+    days = to_days(pd.to_datetime(long_frame['date']).to_numpy())
+    for (pair_base, pair_quote), rows in long_frame.groupby(['base', 'quote']).indices.items():
+        counts[f'{pair_base}/{pair_quote}'] = history.write(
+            pair_base, pair_quote, days[rows], long_frame['rate'].to_numpy()[rows])
+    return counts
+
+
+_default_history = None
+_default_history_lock = threading.Lock()
+
+
+def get_fx_history():
+    """
+    Process-wide history store, in MORTGAGE_FX_HISTORY_DIR or the bundled data directory
+    """
+    global _default_history
+    if _default_history is None:
+        with _default_history_lock:
+            if _default_history is None:
+                _default_history = FxHistory(os.environ.get(HISTORY_DIR_ENV, DEFAULT_HISTORY_DIR))
+    return _default_history
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m backend.core.fx_history',
+                                     description='Manage the local exchange rate history')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help='import history from a CSV file')
+    import_parser.add_argument('csv_path')
+    import_parser.add_argument('--base', help='base currency of a wide-format file')
+    import_parser.add_argument('--directory', help='store directory (default: MORTGAGE_FX_HISTORY_DIR)')
+
+    list_parser = commands.add_parser('list', help='list the stored currency pairs')
+    list_parser.add_argument('--directory', help='store directory (default: MORTGAGE_FX_HISTORY_DIR)')
+
+    args = parser.parse_args(argv)
+    history = FxHistory(args.directory) if args.directory else get_fx_history()
+
+    if args.command == 'import':
+        for pair, count in import_fx_csv(args.csv_path, history, args.base).items():
+            print(f'{pair}: {count} observations')
+    else:
+        for base, quote in history.pairs():
+            series = history.series(base, quote)
+            print(f'{base}/{quote}: {len(series)} observations, '
+                  f'{np.datetime64(series.first_day, "D")} to {np.datetime64(series.last_day, "D")}')
+
+
+if __name__ == '__main__':
+    main()
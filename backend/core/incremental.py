@@ -0,0 +1,313 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from backend.core.amortization import annuity_payment_for, payments_per_year, periodic_rate, term_periods
+from backend.core.kernels import get_kernels
+from backend.core.schedule import Schedule
+from backend.core.scenarios import composite_schedule, prepayment_arrays, rate_path
+
+DEFAULT_CACHE_SIZE = 256
+
+SCHEDULE_COLUMNS = ('payment', 'principal', 'interest', 'early_payment', 'remaining_loan', 'monthly_payment')
+
+
+def normalize_scenario(loan_amount, interest_rate, loan_term_years, rate_changes=None,
+                       early_payments=None, insurance=None, frequency='monthly', compounding='payment'):
+    """
+    Canonical parameters of a composite scenario
+
+    Rate changes are keyed by month (the last change of a month wins) and
+    early payments are sorted by month, so equivalent requests produce the
+    same parameters and the same scenario hash.
+
+    Parameters:
+    -----------
+    loan_amount : float
+        Loan amount
+    interest_rate : float
+        Initial annual interest rate (percentage)
+    loan_term_years : float
+        Loan term in years
+    rate_changes : list of dict, optional
+        [{'month': month_number, 'rate': annual_rate}]
+    early_payments : list of dict, optional
+        [{'month': month_number, 'amount': payment_amount, 'type': 'reduce_term'/'reduce_payment'}]
+    insurance : dict, optional
+        {'rate': annual_rate, 'type': 'fixed'/'balance', 'termYears': years}
+    frequency : str, optional
+        Payment frequency: 'monthly', 'semi_monthly', 'biweekly' or 'weekly'
+    compounding : str, optional
+        Compounding convention (see amortization.periodic_rate)
+
+    Returns:
+    --------
+    dict
+        Canonical scenario parameters; the term is in payments
+    """
+    insurance = insurance or {}
+    changes = {int(change['month']): float(change['rate']) for change in rate_changes or []}
+    # Validates the frequency and the compounding convention
+    periodic_rate(0.0, frequency, compounding)
+
+    return {
+        'loan_amount': float(loan_amount),
+        'interest_rate': float(interest_rate),
+        'loan_term_periods': term_periods(loan_term_years, frequency),
+        'frequency': frequency,
+        'compounding': compounding,
+        'rate_changes': [{'month': month, 'rate': changes[month]} for month in sorted(changes)],
+        'early_payments': sorted(
+            ({'month': int(payment['month']), 'amount': float(payment['amount']),
+              'type': payment.get('type', 'reduce_term')} for payment in early_payments or []),
+            key=lambda x: x['month']),
+        'insurance': {
+            'rate': float(insurance.get('rate', 0)),
+            'type': insurance.get('type', 'fixed'),
+            'term_years': insurance.get('termYears')
+        }
+    }
+
+
+def scenario_hash(params):
+    """
+    Stable identifier of canonical scenario parameters
+    """
+    encoded = json.dumps(params, sort_keys=True, separators=(',', ':')).encode()
+    return hashlib.sha1(encoded).hexdigest()[:20]
+
+
+class ScenarioSnapshot:
+    """
+    Amortized composite scenario with the state needed to resume it
+
+    The schedule columns hold, for every payment, the balance and the regular
+    payment, and the input arrays hold the rate, so the state at the start of
+    any payment period can be restored and a later edit only needs to
+    recompute the payments from the first affected one. With monthly
+    payments, periods are months.
+
+    Parameters:
+    -----------
+    params : dict
+        Canonical scenario parameters (see normalize_scenario)
+    interest_rates : numpy.ndarray
+        Annual interest rate of each payment of the term (percentage)
+    prepayments : numpy.ndarray
+        Early payment amount of each payment
+    reduce_payment : numpy.ndarray
+        Whether the early payment of each payment reduces the payment
+    schedule : Schedule
+        Schedule columns returned by the amortize_events kernel
+    """
+
+    def __init__(self, params, interest_rates, prepayments, reduce_payment, schedule):
+        self.params = params
+        self.interest_rates = interest_rates
+        self.prepayments = prepayments
+        self.reduce_payment = reduce_payment
+        self.schedule = schedule
+        self._scenario_id = None
+
+    @property
+    def scenario_id(self):
+        if self._scenario_id is None:
+            self._scenario_id = scenario_hash(self.params)
+        return self._scenario_id
+
+    def __len__(self):
+        return len(self.schedule['payment'])
+
+    def resume_state(self, month):
+        """
+        Balance and regular payment at the start of a payment period (1-based)
+
+        Returns None when the loan is repaid before that month.
+        """
+        if month == 1:
+            return self.params['loan_amount'], None
+        if month - 1 > len(self):
+            return None
+        previous = month - 2
+        balance = float(self.schedule['remaining_loan'][previous])
+        if balance <= 0:
+            return None
+
+        # Regular payment after the previous month, before any rate change of this one
+        payment = float(self.schedule['monthly_payment'][previous])
+        if self.schedule['early_payment'][previous] > 0 and self.reduce_payment[previous]:
+            payment = float(annuity_payment_for(
+                balance, period_rates(self.params, self.interest_rates[previous]),
+                self.params['loan_term_periods'] - previous - 1))
+        return balance, payment
+
+    def to_schedule(self):
+        """
+        Composite scenario schedule of this snapshot, with insurance
+        """
+        insurance = self.params['insurance']
+        return composite_schedule(
+            self.params['loan_amount'], self.params['loan_term_periods'], self.interest_rates,
+            self.schedule, insurance['rate'], insurance['type'], insurance['term_years'],
+            self.params['frequency'])
+
+
+def period_rates(params, interest_rates):
+    """
+    Interest rate per payment period of annual rates (percentage) of a scenario
+    """
+    return periodic_rate(interest_rates, params['frequency'], params['compounding'])
+
+
+def _scenario_inputs(params):
+    loan_term_periods = params['loan_term_periods']
+    frequency = params['frequency']
+    interest_rates = rate_path(loan_term_periods, params['interest_rate'], params['rate_changes'], frequency)
+    prepayments, reduce_payment = prepayment_arrays(loan_term_periods, params['early_payments'], frequency)
+    return interest_rates, prepayments, reduce_payment
+
+
+def build_snapshot(params):
+    """
+    Amortize a composite scenario from month 1
+
+    Parameters:
+    -----------
+    params : dict
+        Canonical scenario parameters (see normalize_scenario)
+
+    Returns:
+    --------
+    ScenarioSnapshot
+    """
+    if params['insurance']['type'] not in ('fixed', 'balance'):
+        raise ValueError(f"Unknown insurance type: {params['insurance']['type']}")
+
+    interest_rates, prepayments, reduce_payment = _scenario_inputs(params)
+    schedule = Schedule(get_kernels().amortize_events(
+        params['loan_amount'], period_rates(params, interest_rates), prepayments, reduce_payment,
+        params['loan_term_periods']))
+    return ScenarioSnapshot(params, interest_rates, prepayments, reduce_payment, schedule)
+
+
+def apply_delta(snapshot, rate_changes=None, early_payments=None, insurance=None):
+    """
+    Edit a scenario and recompute only the payments from the first affected one
+
+    Rate changes in the delta replace the change of the same month (a rate of
+    None removes it). Early payments in the delta replace all early payments
+    of the same month (an amount of 0 removes them). Insurance settings, when
+    given, replace the previous ones; they do not affect the amortization.
+
+    The first month whose rate or early payment differs is found by comparing
+    the per-month inputs. The schedule before that month is reused as is, and
+    the kernel resumes from the saved balance and payment for the rest.
+
+    Parameters:
+    -----------
+    snapshot : ScenarioSnapshot
+        Scenario to edit
+    rate_changes : list of dict, optional
+        [{'month': month_number, 'rate': annual_rate or None}]
+    early_payments : list of dict, optional
+        [{'month': month_number, 'amount': payment_amount, 'type': 'reduce_term'/'reduce_payment'}]
+    insurance : dict, optional
+        {'rate': annual_rate, 'type': 'fixed'/'balance', 'termYears': years}
+
+    Returns:
+    --------
+    tuple
+        (ScenarioSnapshot, first recomputed payment (the month with monthly
+        payments) or None when the schedule is unchanged)
+    """
+    params = snapshot.params
+
+    changes = {change['month']: change['rate'] for change in params['rate_changes']}
+    for change in rate_changes or []:
+        if change.get('rate') is None:
+            changes.pop(int(change['month']), None)
+        else:
+            changes[int(change['month'])] = change['rate']
+
+    edited_months = {int(payment['month']) for payment in early_payments or []}
+    payments = [payment for payment in params['early_payments'] if payment['month'] not in edited_months]
+    payments.extend(payment for payment in early_payments or [] if payment['amount'] > 0)
+
+    if insurance is None:
+        stored = params['insurance']
+        insurance = {'rate': stored['rate'], 'type': stored['type'], 'termYears': stored['term_years']}
+
+    new_params = normalize_scenario(
+        params['loan_amount'], params['interest_rate'],
+        params['loan_term_periods'] / payments_per_year(params['frequency']),
+        [{'month': month, 'rate': rate} for month, rate in changes.items()], payments, insurance,
+        params['frequency'], params['compounding'])
+    if new_params['insurance']['type'] not in ('fixed', 'balance'):
+        raise ValueError(f"Unknown insurance type: {new_params['insurance']['type']}")
+
+    interest_rates, prepayments, reduce_payment = _scenario_inputs(new_params)
+    changed = np.flatnonzero(
+        (interest_rates != snapshot.interest_rates) | (prepayments != snapshot.prepayments) |
+        (reduce_payment != snapshot.reduce_payment))
+
+    state = snapshot.resume_state(int(changed[0]) + 1) if len(changed) else None
+    if state is None:
+        # Nothing changed before the loan is repaid: reuse the schedule
+        return ScenarioSnapshot(new_params, interest_rates, prepayments, reduce_payment, snapshot.schedule), None
+
+    start = int(changed[0])
+    balance, payment = state
+    months_left = new_params['loan_term_periods'] - start
+    if payment is not None and interest_rates[start] != interest_rates[start - 1]:
+        # A rate change at the first recomputed month recalculates the payment
+        payment = None
+
+    suffix = get_kernels().amortize_events(
+        balance, period_rates(new_params, interest_rates[start:]), prepayments[start:], reduce_payment[start:],
+        months_left, payment)
+    schedule = Schedule({name: np.concatenate((snapshot.schedule[name][:start], suffix[name]))
+                         for name in SCHEDULE_COLUMNS})
+
+    return ScenarioSnapshot(new_params, interest_rates, prepayments, reduce_payment, schedule), start + 1
+
+
+class ScenarioCache:
+    """
+    Thread-safe LRU cache of scenario snapshots keyed by scenario hash
+
+    Parameters:
+    -----------
+    maxsize : int, optional
+        Maximum number of snapshots kept; the least recently used one is evicted
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._snapshots)
+
+    def get(self, scenario_id):
+        """
+        Snapshot of a scenario, or None if it is not cached
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(scenario_id)
+            if snapshot is not None:
+                self._snapshots.move_to_end(scenario_id)
+            return snapshot
+
+    def put(self, snapshot):
+        """
+        Cache a snapshot under its scenario hash
+        """
+        with self._lock:
+            self._snapshots[snapshot.scenario_id] = snapshot
+            self._snapshots.move_to_end(snapshot.scenario_id)
+            while len(self._snapshots) > self.maxsize:
+                self._snapshots.popitem(last=False)
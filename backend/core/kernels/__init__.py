@@ -0,0 +1,96 @@
+"""
+Pluggable kernels for path-dependent calculations
+
+Two interchangeable backends implement the same functions:
+
+- numba: compiled month-by-month loops (used when Numba is installed)
+- numpy: vectorized NumPy implementations (always available)
+
+The backend is chosen once, when the first kernel is requested, from the
+MORTGAGE_KERNEL_BACKEND environment variable ('auto', 'numba' or 'numpy';
+'auto' prefers Numba). Compiled Numba kernels are cached on disk; set
+NUMBA_CACHE_DIR to a persistent, writable directory when the source tree is
+read-only.
+"""
+import importlib
+import os
+import threading
+
+BACKEND_ENV = 'MORTGAGE_KERNEL_BACKEND'
+BACKENDS = ('numba', 'numpy')
+
+_backend = None
+_lock = threading.Lock()
+
+
+def load_backend(name):
+    """
+    Import a kernel backend module by name
+
+    Raises ImportError if the backend's dependencies are not installed.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown kernel backend: {name}")
+    return importlib.import_module(f'backend.core.kernels.{name}_backend')
+
+
+def available_backends():
+    """
+    Names of the backends that can be loaded in this environment
+    """
+    available = []
+    for name in BACKENDS:
+        try:
+            load_backend(name)
+        except ImportError:
+            continue
+        available.append(name)
+    return available
+
+
+def select_backend(name=None):
+    """
+    Select and warm up the kernel backend
+
+    Parameters:
+    -----------
+    name : str, optional
+        'auto', 'numba' or 'numpy'; defaults to the MORTGAGE_KERNEL_BACKEND
+        environment variable, then 'auto'
+
+    Returns:
+    --------
+    module
+        The selected backend
+    """
+    global _backend
+    name = name or os.environ.get(BACKEND_ENV, 'auto')
+
+    if name == 'auto':
+        candidates = BACKENDS
+    else:
+        candidates = (name,)
+
+    with _lock:
+        for candidate in candidates:
+            try:
+                backend = load_backend(candidate)
+            except ImportError:
+                if name != 'auto':
+                    raise
+                continue
+            backend.warm_up()
+            _backend = backend
+            return backend
+
+    raise ImportError("No kernel backend is available")
+
+
+def get_kernels():
+    """
+    The selected kernel backend, selecting it on first use
+    """
+    backend = _backend
+    if backend is None:
+        backend = select_backend()
+    return backend
@@ -0,0 +1,217 @@
+import numpy as np
+from numba import njit
+
+from backend.core.amortization import RATE_SCALE, ROUNDING_RULES
+
+NAME = 'numba'
+
+# Compiled kernels are cached on disk (next to this file, or in NUMBA_CACHE_DIR),
+# so new workers load machine code instead of compiling it again. The event kernel
+# releases the GIL, so threads of a pool amortize several plans at once.
+
+
+@njit(cache=True, nogil=True)
+def _annuity_payment(balance, monthly_rate, months):
+    if months <= 0:
+        return balance
+    if monthly_rate == 0:
+        return balance / months
+    growth = (1 + monthly_rate) ** months
+    return balance * monthly_rate * growth / (growth - 1)
+
+
+@njit(cache=True, nogil=True)
+def _amortize_events(balance, monthly_rates, prepayments, reduce_payment, months, regular_payment):
+    payment = np.zeros(months)
+    principal = np.zeros(months)
+    interest = np.zeros(months)
+    early_payment = np.zeros(months)
+    remaining = np.zeros(months)
+    monthly_payment = np.zeros(months)
+
+    remaining_loan = balance
+    tolerance = 1e-9 * max(balance, 1.0)
+    count = 0
+
+    for month in range(months):
+        rate = monthly_rates[month]
+        if month > 0 and rate != monthly_rates[month - 1]:
+            regular_payment = _annuity_payment(remaining_loan, rate, months - month)
+
+        month_interest = remaining_loan * rate
+        month_principal = regular_payment - month_interest
+        month_payment = regular_payment
+
+        # Last month of the term, or the payment covers what is left
+        if month == months - 1 or remaining_loan - month_principal <= tolerance:
+            month_principal = remaining_loan
+            month_payment = month_principal + month_interest
+
+        remaining_loan -= month_principal
+
+        month_early = 0.0
+        if prepayments[month] > 0 and remaining_loan > 0:
+            month_early = min(prepayments[month], remaining_loan)
+            remaining_loan -= month_early
+
+        payment[month] = month_payment + month_early
+        principal[month] = month_principal + month_early
+        interest[month] = month_interest
+        early_payment[month] = month_early
+        remaining[month] = remaining_loan
+        monthly_payment[month] = regular_payment
+        count = month + 1
+
+        if remaining_loan <= 0:
+            break
+
+        if month_early > 0 and reduce_payment[month]:
+            regular_payment = _annuity_payment(remaining_loan, rate, months - month - 1)
+
+    return (payment[:count], principal[:count], interest[:count], early_payment[:count],
+            remaining[:count], monthly_payment[:count])
+
+
+@njit(cache=True)
+def _round_divide(numerator, denominator, rule):
+    quotient = numerator // denominator
+    remainder = numerator % denominator
+    if rule == 0:
+        if 2 * remainder >= denominator:
+            quotient += 1
+    elif rule == 1:
+        if 2 * remainder > denominator or (2 * remainder == denominator and quotient % 2 == 1):
+            quotient += 1
+    elif rule == 3:
+        if remainder > 0:
+            quotient += 1
+    return quotient
+
+
+@njit(cache=True)
+def _amortize_cents(principal_cents, rate_units, months, payment_cents, differentiated, rule, denominator):
+    loans = principal_cents.shape[0]
+    horizon = 0
+    for i in range(loans):
+        horizon = max(horizon, months[i])
+
+    payment = np.zeros((loans, horizon), dtype=np.int64)
+    principal = np.zeros((loans, horizon), dtype=np.int64)
+    interest = np.zeros((loans, horizon), dtype=np.int64)
+    remaining = np.zeros((loans, horizon), dtype=np.int64)
+
+    for i in range(loans):
+        balance = principal_cents[i]
+        if differentiated:
+            regular = _round_divide(principal_cents[i], months[i], rule)
+        else:
+            regular = payment_cents[i]
+
+        for month in range(months[i]):
+            month_interest = _round_divide(balance * rate_units[i], denominator, rule)
+            if differentiated:
+                month_principal = regular
+            else:
+                month_principal = regular - month_interest
+
+            if month == months[i] - 1 or month_principal > balance:
+                month_principal = balance
+            balance -= month_principal
+
+            payment[i, month] = month_principal + month_interest
+            principal[i, month] = month_principal
+            interest[i, month] = month_interest
+            remaining[i, month] = balance
+
+            if balance == 0:
+                break
+
+    return payment, principal, interest, remaining
+
+
+@njit(cache=True)
+def _compound_paths(initial_values, monthly_returns):
+    paths, months = monthly_returns.shape
+    values = np.empty((paths, months))
+    for path in range(paths):
+        value = initial_values[path]
+        for month in range(months):
+            value *= 1 + monthly_returns[path, month]
+            values[path, month] = value
+    return values
+
+
+def amortize_events(balance, monthly_rates, prepayments, reduce_payment, months, payment=None):
+    """
+    Amortize one loan with per-month rates and early payments
+
+    Compiled month-by-month loop; see numpy_backend.amortize_events for the rules.
+    """
+    monthly_rates = np.ascontiguousarray(monthly_rates, dtype=np.float64)
+    if payment is None:
+        payment = _annuity_payment(float(balance), monthly_rates[0], int(months))
+    columns = _amortize_events(
+        float(balance),
+        monthly_rates,
+        np.ascontiguousarray(prepayments, dtype=np.float64),
+        np.ascontiguousarray(reduce_payment, dtype=np.bool_),
+        int(months),
+        float(payment)
+    )
+    names = ('payment', 'principal', 'interest', 'early_payment', 'remaining_loan', 'monthly_payment')
+    return dict(zip(names, columns))
+
+
+def amortize_cents(principal_cents, rate_units, months, payment_cents=None, rounding='half_up',
+                   periods_per_year=12):
+    """
+    Amortize loans in exact integer cents, one loan per row
+
+    Compiled loop over loans and months; see amortization.amortize_cents for the rules.
+    """
+    if rounding not in ROUNDING_RULES:
+        raise ValueError(f"Unknown rounding rule: {rounding}")
+
+    principal_cents = np.ascontiguousarray(principal_cents, dtype=np.int64)
+    differentiated = payment_cents is None
+    if differentiated:
+        payment_cents = np.zeros(len(principal_cents), dtype=np.int64)
+
+    payment, principal, interest, remaining = _amortize_cents(
+        principal_cents,
+        np.ascontiguousarray(rate_units, dtype=np.int64),
+        np.ascontiguousarray(months, dtype=np.int64),
+        np.ascontiguousarray(payment_cents, dtype=np.int64),
+        differentiated,
+        ROUNDING_RULES.index(rounding),
+        100 * int(periods_per_year) * RATE_SCALE
+    )
+    return {
+        'payment': payment,
+        'principal': principal,
+        'interest': interest,
+        'remaining_loan': remaining
+    }
+
+
+def compound_paths(initial_values, monthly_returns):
+    """
+    Compound simulated monthly returns into value paths (compiled loop)
+    """
+    return _compound_paths(
+        np.ascontiguousarray(initial_values, dtype=np.float64),
+        np.ascontiguousarray(monthly_returns, dtype=np.float64)
+    )
+
+
+def warm_up():
+    """
+    Compile (or load from the disk cache) every kernel for the argument types used at run time
+    """
+    amortize_events(1000.0, np.full(12, 0.005), np.zeros(12), np.zeros(12, dtype=np.bool_), 12)
+    amortize_cents(np.array([100000]), np.array([50000]), np.array([12]), np.array([8600]), 'half_up')
+    amortize_cents(np.array([100000]), np.array([50000]), np.array([12]), None, 'half_up')
+    compound_paths(np.ones(2), np.zeros((2, 12)))
+
+
+__all__ = ['NAME', 'amortize_cents', 'amortize_events', 'compound_paths', 'warm_up']
@@ -0,0 +1,123 @@
+import numpy as np
+
+from backend.core.amortization import amortize_cents, amortize_segment, annuity_payment_for
+
+NAME = 'numpy'
+
+
+def amortize_events(balance, monthly_rates, prepayments, reduce_payment, months, payment=None):
+    """
+    Amortize one loan with per-month rates and early payments
+
+    The rate may change in any month; the payment is then recalculated over
+    the remaining term at the start of that month. Early payments are applied
+    at the end of their month, after the regular payment, and recalculate the
+    payment over the remaining term when `reduce_payment` is set for that month.
+
+    The term is split into segments at every event and each segment is
+    amortized in closed form, so the cost grows with the number of events
+    rather than the number of months.
+
+    Parameters:
+    -----------
+    balance : float
+        Loan amount
+    monthly_rates : numpy.ndarray
+        Monthly interest rate of each month of the term (fraction, float64)
+    prepayments : numpy.ndarray
+        Early payment amount at the end of each month (float64)
+    reduce_payment : numpy.ndarray
+        Whether the early payment of each month reduces the payment (bool)
+        instead of the term
+    months : int
+        Loan term in months
+    payment : float, optional
+        Regular payment of the first month; defaults to the annuity payment
+        over the whole term. Used to resume a schedule from a saved state.
+
+    Returns:
+    --------
+    dict of numpy.ndarray
+        'payment' (regular + early), 'principal' (regular + early), 'interest',
+        'early_payment', 'remaining_loan' and 'monthly_payment' (regular
+        payment), one element per month until the loan is repaid
+    """
+    # Segment starts (0-based months): rate changes start a segment, early payments end one
+    rate_changes = np.flatnonzero(np.diff(monthly_rates)) + 1
+    prepayment_months = np.flatnonzero(prepayments > 0)
+    starts = np.union1d(np.union1d([0], rate_changes), prepayment_months[prepayment_months < months - 1] + 1)
+
+    remaining_loan = float(balance)
+    if payment is None:
+        payment = annuity_payment_for(remaining_loan, monthly_rates[0], months)
+    monthly_payment = float(payment)
+
+    parts = {name: [] for name in ('payment', 'principal', 'interest', 'early_payment',
+                                   'remaining_loan', 'monthly_payment')}
+
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else months
+        rate = monthly_rates[start]
+
+        if start > 0 and monthly_rates[start] != monthly_rates[start - 1]:
+            monthly_payment = float(annuity_payment_for(remaining_loan, rate, months - start))
+
+        payments, principal, interest, remaining = amortize_segment(
+            remaining_loan, rate, monthly_payment, end - start, pay_off=(end == months))
+
+        count = len(payments)
+        early_payment = np.zeros(count)
+        paid_off = count < end - start or remaining[-1] <= 0
+
+        last = end - 1
+        if not paid_off and prepayments[last] > 0:
+            amount = min(prepayments[last], remaining[-1])
+            early_payment[-1] = amount
+            remaining[-1] -= amount
+            payments[-1] += amount
+            principal[-1] += amount
+            paid_off = remaining[-1] <= 0
+
+        parts['payment'].append(payments)
+        parts['principal'].append(principal)
+        parts['interest'].append(interest)
+        parts['early_payment'].append(early_payment)
+        parts['remaining_loan'].append(remaining)
+        parts['monthly_payment'].append(np.full(count, monthly_payment))
+
+        if paid_off:
+            break
+
+        remaining_loan = remaining[-1]
+        if prepayments[last] > 0 and reduce_payment[last]:
+            monthly_payment = float(annuity_payment_for(remaining_loan, rate, months - end))
+
+    return {name: np.concatenate(values) for name, values in parts.items()}
+
+
+def compound_paths(initial_values, monthly_returns):
+    """
+    Compound simulated monthly returns into value paths
+
+    Parameters:
+    -----------
+    initial_values : numpy.ndarray
+        Starting value of each path (paths,)
+    monthly_returns : numpy.ndarray
+        Simulated monthly returns (paths x months)
+
+    Returns:
+    --------
+    numpy.ndarray
+        Value at the end of each month (paths x months)
+    """
+    return initial_values[:, np.newaxis] * np.cumprod(1 + monthly_returns, axis=1)
+
+
+def warm_up():
+    """
+    Nothing to prepare: NumPy kernels need no compilation
+    """
+
+
+__all__ = ['NAME', 'amortize_cents', 'amortize_events', 'compound_paths', 'warm_up']
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import joblib
+
+DEFAULT_MODEL_CACHE_SIZE = 128
+# Directory where fitted models are persisted, shared by all workers of a host
+MODEL_CACHE_DIR_ENV = 'MORTGAGE_MODEL_CACHE_DIR'
+
+
+def model_key(*parts):
+    """
+    Stable identifier of the inputs a model was fitted on
+    """
+    encoded = json.dumps(parts, separators=(',', ':')).encode()
+    return hashlib.sha1(encoded).hexdigest()[:20]
+
+
+class ModelCache:
+    """
+    Thread-safe LRU cache of fitted models, optionally persisted to disk
+
+    Models are kept in memory up to `maxsize` entries. With a directory, every
+    fitted model is also written there (atomically, one file per key), and a
+    miss in memory is looked up on disk before fitting, so workers sharing the
+    directory only fit each model once. Files are loaded with joblib (pickle):
+    only point the cache at a directory the service itself writes to.
+
+    Parameters:
+    -----------
+    maxsize : int, optional
+        Maximum number of models kept in memory; the least recently used one is evicted
+    directory : str, optional
+        Directory to persist models to; defaults to the MORTGAGE_MODEL_CACHE_DIR
+        environment variable, no persistence if unset
+    on_lookup : callable, optional
+        Called with True (hit, in memory or on disk) or False (fitted) on every lookup
+    """
+
+    def __init__(self, maxsize=DEFAULT_MODEL_CACHE_SIZE, directory=None, on_lookup=None):
+        self.maxsize = maxsize
+        self.directory = directory or os.environ.get(MODEL_CACHE_DIR_ENV)
+        self.on_lookup = on_lookup
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self._models)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.joblib')
+
+    def _remember(self, key, model):
+        with self._lock:
+            self._models[key] = model
+            self._models.move_to_end(key)
+            while len(self._models) > self.maxsize:
+                self._models.popitem(last=False)
+
+    def _load(self, key):
+        try:
+            return joblib.load(self._path(key))
+        except (OSError, EOFError, ValueError):
+            # Missing, or being replaced: fit instead
+            return None
+
+    def _save(self, key, model):
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as temp_file:
+                joblib.dump(model, temp_file)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            # Persistence is best effort; the model stays cached in memory
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def get(self, key):
+        """
+        Cached model, from memory or disk, or None
+        """
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                return model
+
+        if self.directory:
+            model = self._load(key)
+            if model is not None:
+                self._remember(key, model)
+        return model
+
+    def get_or_fit(self, key, fit):
+        """
+        Cached model for a key, calling fit() to create it on a miss
+
+        Concurrent misses on the same key may both fit; the models are
+        identical and the last one is kept.
+        """
+        model = self.get(key)
+        if self.on_lookup is not None:
+            self.on_lookup(model is not None)
+        if model is not None:
+            return model
+
+        model = fit()
+        self._remember(key, model)
+        if self.directory:
+            self._save(key, model)
+        return model
+
+    def clear(self):
+        """
+        Drop the models kept in memory (persisted files are kept)
+        """
+        with self._lock:
+            self._models.clear()
@@ -0,0 +1,146 @@
+"""
+Streaming schedule pipeline
+
+Schedules are produced as a sequence of blocks, each a Schedule of at most
+`chunk_months` consecutive rows, and downstream stages (currency conversion,
+rent-vs-buy comparison...) are generators that turn each block into a block
+of their own as it arrives. Consumers either collect the blocks into one
+table (collect_blocks) or reduce them to running aggregates
+(summarize_blocks), in which case no more than one block per stage is alive
+at a time, whatever the horizon; summarize_blocks can also keep a few
+columns of every row, for the charted output of the API.
+
+With chunk_months=None the whole term is a single block, computed exactly
+like the materialized calculators.
+"""
+import numpy as np
+
+from backend.core.amortization import amortize_segment, periodic_rate, term_periods
+from backend.core.calculators import calculate_annuity_payment
+from backend.core.schedule import Schedule
+
+# Rows per block of streamed schedules
+DEFAULT_CHUNK_MONTHS = 120
+
+
+def schedule_blocks(loan_amount, interest_rate, loan_term_years, chunk_months=DEFAULT_CHUNK_MONTHS,
+                    frequency="monthly", compounding="payment"):
+    """
+    Annuity payment schedule as a sequence of blocks
+
+    Each block is amortized in closed form from the balance left by the
+    previous one, so producing a block costs the same at any point of the term.
+
+    Parameters:
+    -----------
+    loan_amount : float
+        Principal loan amount
+    interest_rate : float
+        Annual interest rate (percentage)
+    loan_term_years : float
+        Loan term in years
+    chunk_months : int, optional
+        Rows per block; None for a single block
+    frequency : str, optional
+        Payment frequency: 'monthly', 'semi_monthly', 'biweekly' or 'weekly'
+    compounding : str, optional
+        Compounding convention (see amortization.periodic_rate)
+
+    Yields:
+    -------
+    Schedule
+        'payment', 'principal', 'interest' and 'remaining_loan' of the next
+        rows, numbered from their month (payment period)
+    """
+    loan_term_periods = term_periods(loan_term_years, frequency)
+    period_rate = periodic_rate(interest_rate, frequency, compounding)
+    period_payment = calculate_annuity_payment(loan_amount, interest_rate, loan_term_years, frequency, compounding)
+    if loan_term_periods < 1:
+        raise ValueError("Loan term must cover at least one payment")
+    chunk_months = chunk_months or loan_term_periods
+
+    balance = loan_amount
+    for start in range(0, loan_term_periods, chunk_months):
+        rows = min(chunk_months, loan_term_periods - start)
+        payment, principal, interest, remaining = amortize_segment(
+            balance, period_rate, period_payment, rows, pay_off=(start + rows == loan_term_periods))
+        yield Schedule({
+            'payment': payment,
+            'principal': principal,
+            'interest': interest,
+            'remaining_loan': remaining
+        }, first_month=start + 1)
+        if len(remaining) < rows:
+            return
+        balance = remaining[-1]
+
+
+def collect_blocks(blocks):
+    """
+    Concatenate a sequence of blocks into one Schedule
+
+    A single block is returned as it is, without copying.
+    """
+    blocks = list(blocks)
+    if len(blocks) == 1:
+        return blocks[0]
+    if not blocks:
+        raise ValueError("No blocks to collect: the schedule has no payments")
+    columns = [name for name in blocks[0].columns if name != 'month']
+    return Schedule({name: np.concatenate([block[name] for block in blocks]) for name in columns},
+                    first_month=blocks[0].first_month)
+
+
+def summarize_blocks(blocks, sums=(), first_true=(), final=(), collect=()):
+    """
+    Online aggregates of a sequence of blocks, consumed one block at a time
+
+    Parameters:
+    -----------
+    blocks : iterable of Schedule
+        Blocks of consecutive rows
+    sums : sequence of str, optional
+        Columns to add up
+    first_true : sequence of str, optional
+        Boolean columns whose first true month is wanted (break-even...)
+    final : sequence of str, optional
+        Columns whose last value is wanted
+    collect : sequence of str, optional
+        Columns kept for every row, such as the charted ones; the other
+        columns of each block are released as soon as it is aggregated
+
+    Returns:
+    --------
+    dict
+        'rows' (number of rows), 'sums', 'first_true' (month, or None if never
+        true) and 'final' (value, or None without rows), each a dict by column,
+        and 'table', a Schedule of the collected columns
+    """
+    totals = dict.fromkeys(sums, 0.0)
+    first_months = dict.fromkeys(first_true)
+    last_values = dict.fromkeys(final)
+    parts = {name: [] for name in collect if name != 'month'}
+    first_month = 1
+    rows = 0
+
+    for block in blocks:
+        if not len(block):
+            continue
+        if not rows:
+            first_month = block.first_month
+        rows += len(block)
+        for name in totals:
+            totals[name] += float(block[name].sum())
+        for name in first_months:
+            if first_months[name] is None:
+                hits = np.flatnonzero(block[name])
+                if len(hits):
+                    first_months[name] = block.first_month + int(hits[0])
+        for name in last_values:
+            last_values[name] = block[name][-1].item()
+        for name in parts:
+            parts[name].append(block[name])
+
+    table = Schedule({name: values[0] if len(values) == 1 else np.concatenate(values or [np.empty(0)])
+                      for name, values in parts.items()}, first_month=first_month)
+    return {'rows': rows, 'sums': totals, 'first_true': first_months, 'final': last_values, 'table': table}
@@ -0,0 +1,241 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_RATES_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'exchange_rates.json')
+
+
+class RateTable:
+    """
+    Immutable currency x currency table of exchange rates
+
+    `rates[i, j]` is the number of units of currency j for one unit of
+    currency i, and `monthly_change[i, j]` the projected monthly change of
+    that rate. Lookups are O(1) index operations on dense NumPy matrices.
+
+    Parameters:
+    -----------
+    currencies : list of str
+        Currency codes, in matrix order
+    rates : numpy.ndarray
+        Exchange rate matrix (N x N)
+    monthly_change : numpy.ndarray
+        Projected monthly change rate matrix (N x N)
+    """
+
+    def __init__(self, currencies, rates, monthly_change):
+        self.currencies = tuple(currencies)
+        self.index = {currency: i for i, currency in enumerate(self.currencies)}
+        self.rates = rates
+        self.monthly_change = monthly_change
+        self.rates.flags.writeable = False
+        self.monthly_change.flags.writeable = False
+
+    def __contains__(self, currency):
+        return currency in self.index
+
+    def _pair_index(self, from_currency, to_currency):
+        try:
+            return self.index[from_currency], self.index[to_currency]
+        except KeyError:
+            raise ValueError(f"Conversion from {from_currency} to {to_currency} is not supported")
+
+    def indices(self, currencies):
+        """
+        Matrix indices of a sequence of currency codes
+        """
+        try:
+            return np.array([self.index[currency] for currency in currencies], dtype=np.intp)
+        except KeyError as e:
+            raise ValueError(f"Currency {e.args[0]} is not supported")
+
+    def rate(self, from_currency, to_currency):
+        """
+        Exchange rate from one currency to another
+        """
+        i, j = self._pair_index(from_currency, to_currency)
+        return float(self.rates[i, j])
+
+    def monthly_change_rate(self, from_currency, to_currency):
+        """
+        Projected monthly change of the exchange rate from one currency to another
+        """
+        i, j = self._pair_index(from_currency, to_currency)
+        return float(self.monthly_change[i, j])
+
+    def convert(self, amounts, from_currency, to_currency):
+        """
+        Convert a scalar or an array of amounts between two currencies
+        """
+        return np.multiply(amounts, self.rate(from_currency, to_currency))
+
+    def convert_many(self, amounts, from_currency, to_currencies):
+        """
+        Convert an array of amounts into several currencies at once
+
+        Returns:
+        --------
+        numpy.ndarray
+            Array of shape (len(to_currencies),) + amounts.shape
+        """
+        i = self.indices([from_currency])[0]
+        factors = self.rates[i, self.indices(to_currencies)]
+        amounts = np.asarray(amounts, dtype=float)
+        return factors.reshape((-1,) + (1,) * amounts.ndim) * amounts
+
+    def convert_pairs(self, amounts, from_currencies, to_currencies):
+        """
+        Convert element-wise, each amount with its own currency pair
+        """
+        return np.asarray(amounts, dtype=float) * self.rates[
+            self.indices(from_currencies), self.indices(to_currencies)]
+
+
+def build_rate_table(config):
+    """
+    Build a RateTable from a rates configuration
+
+    Parameters:
+    -----------
+    config : dict
+        Configuration with keys:
+        - 'pivot': pivot currency code used for triangulation
+        - 'rates': units of each currency per one unit of the pivot
+        - 'pairs' (optional): direct quotes {from: {to: rate}} that take
+          precedence over triangulated cross rates
+        - 'annual_change' (optional): projected annual change rates
+          {from: {to: change}}, triangulated the same way
+
+    Returns:
+    --------
+    RateTable
+    """
+    pivot = config['pivot']
+    pivot_rates = dict(config.get('rates', {}))
+    pairs = config.get('pairs', {})
+    annual_change = config.get('annual_change', {})
+
+    pivot_rates[pivot] = 1.0
+
+    # Currencies quoted only as direct pairs against the pivot
+    for to_currency, rate in pairs.get(pivot, {}).items():
+        pivot_rates.setdefault(to_currency, rate)
+    for from_currency, quotes in pairs.items():
+        if pivot in quotes and quotes[pivot]:
+            pivot_rates.setdefault(from_currency, 1.0 / quotes[pivot])
+
+    currencies = sorted(pivot_rates, key=lambda c: (c != pivot, c))
+    index = {currency: i for i, currency in enumerate(currencies)}
+    per_pivot = np.array([pivot_rates[currency] for currency in currencies], dtype=float)
+
+    # Triangulate every pair through the pivot, then apply direct quotes
+    rates = per_pivot[np.newaxis, :] / per_pivot[:, np.newaxis]
+    for from_currency, quotes in pairs.items():
+        for to_currency, rate in quotes.items():
+            if from_currency in index and to_currency in index:
+                rates[index[from_currency], index[to_currency]] = rate
+    np.fill_diagonal(rates, 1.0)
+
+    # Projected changes: growth factors against the pivot, triangulated the same way
+    pivot_growth = np.ones(len(currencies))
+    for to_currency, change in annual_change.get(pivot, {}).items():
+        if to_currency in index:
+            pivot_growth[index[to_currency]] = 1 + change
+    for from_currency, changes in annual_change.items():
+        if from_currency in index and pivot in changes and from_currency not in annual_change.get(pivot, {}):
+            pivot_growth[index[from_currency]] = 1 / (1 + changes[pivot])
+
+    annual_growth = pivot_growth[np.newaxis, :] / pivot_growth[:, np.newaxis]
+    for from_currency, changes in annual_change.items():
+        for to_currency, change in changes.items():
+            if from_currency in index and to_currency in index:
+                annual_growth[index[from_currency], index[to_currency]] = 1 + change
+    np.fill_diagonal(annual_growth, 1.0)
+
+    monthly_change = annual_growth ** (1 / 12) - 1
+
+    return RateTable(currencies, rates, monthly_change)
+
+
+class RateStore:
+    """
+    Exchange rate store backed by a local JSON rates file
+
+    The file is parsed once into a RateTable. The store checks the file's
+    modification time at most every `check_interval` seconds and rebuilds the
+    table when it changes, so rates can be updated without restarting workers.
+    Readers always get a complete table: a new table replaces the old one in a
+    single reference assignment.
+
+    Parameters:
+    -----------
+    path : str
+        Path of the rates file
+    check_interval : float, optional
+        Minimum number of seconds between file modification checks
+    """
+
+    def __init__(self, path, check_interval=5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._table = None
+        self._mtime = None
+        self._next_check = 0.0
+
+    def load(self):
+        """
+        (Re)load the rates file unconditionally and return the new table
+        """
+        with self._lock:
+            mtime = os.stat(self.path).st_mtime
+            with open(self.path) as f:
+                table = build_rate_table(json.load(f))
+            self._table = table
+            self._mtime = mtime
+            self._next_check = time.monotonic() + self.check_interval
+            return table
+
+    def table(self):
+        """
+        Current rate table, reloaded first if the rates file has changed
+        """
+        table = self._table
+        if table is None:
+            return self.load()
+
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            try:
+                changed = os.stat(self.path).st_mtime != self._mtime
+            except OSError:
+                # Keep serving the last good table if the file is being replaced
+                changed = False
+            if changed:
+                try:
+                    table = self.load()
+                except (OSError, ValueError, KeyError):
+                    pass
+
+        return table
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_rate_store():
+    """
+    Process-wide rate store, reading MORTGAGE_RATES_FILE or the bundled rates file
+    """
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = RateStore(os.environ.get('MORTGAGE_RATES_FILE', DEFAULT_RATES_FILE))
+    return _default_store
@@ -1,9 +1,71 @@
 import pandas as pd
 import numpy as np
-from backend.core.calculators import calculate_annuity_payment, generate_payment_schedule
+from backend.core.calculators import calculate_loan_state, generate_payment_schedule
+from backend.core.kernels import get_kernels
+from backend.core.schedule import Schedule, empty_schedule
+from backend.core.amortization import (
+    amortize_matrix,
+    annuity_payment_for,
+    month_to_period,
+    payments_by_month,
+    payments_per_year,
+    period_to_month,
+    periodic_rate,
+    remaining_balance,
+    term_periods
+)
+
+# Columns of the restructuring comparison
+COMPARISON_COLUMNS = ('original_payment', 'restructured_payment', 'original_remaining',
+                      'restructured_remaining', 'payment_difference', 'status')
+
+# Repayment plans evaluated by one task of an executor
+PLANS_PER_TASK = 4
+
+
+def rate_path(loan_term_periods, interest_rate, rate_changes=None, frequency='monthly'):
+    """
+    Annual rate (percentage) for each month of the term
+
+    Each change applies from its month onwards; changes outside the term are
+    ignored. With a payment frequency other than monthly, the term and the
+    path are in payment periods, and a change applies from the first payment
+    period that starts in its month.
+    """
+    rates = np.full(loan_term_periods, float(interest_rate))
+    for change in sorted(rate_changes or [], key=lambda x: x['month']):
+        if change['month'] < 1:
+            continue
+        period = month_to_period(change['month'], frequency)
+        if period <= loan_term_periods:
+            rates[period - 1:] = change['rate']
+    return rates
+
+
+def prepayment_arrays(loan_term_periods, early_payments=None, frequency='monthly'):
+    """
+    Early payment amount and 'reduce_payment' flag for each month of the term
+
+    Several early payments in the same month are added up; the type of the
+    last one applies ('reduce_term' when not given). Payments outside the
+    term are ignored. With a payment frequency other than monthly, the term
+    and the arrays are in payment periods, and an early payment is made with
+    the last payment due in its month.
+    """
+    prepayments = np.zeros(loan_term_periods)
+    reduce_payment = np.zeros(loan_term_periods, dtype=bool)
+    for early_payment in sorted(early_payments or [], key=lambda x: x['month']):
+        if early_payment['month'] < 1 or early_payment['amount'] <= 0:
+            continue
+        period = int(payments_by_month(early_payment['month'], frequency))
+        if period <= loan_term_periods:
+            prepayments[period - 1] += early_payment['amount']
+            reduce_payment[period - 1] = early_payment.get('type', 'reduce_term') == 'reduce_payment'
+    return prepayments, reduce_payment
+
 
 def calculate_early_repayment(loan_amount, interest_rate, loan_term_years,
-                              early_payments=None):
+                              early_payments=None, frequency='monthly', compounding='payment'):
     """
     Calculate mortgage with early repayments
     
@@ -18,86 +80,156 @@ def calculate_early_repayment(loan_amount, interest_rate, loan_term_years,
     early_payments : list of dict, optional
         List of early payments with format:
         [{'month': month_number, 'amount': payment_amount, 'type': 'reduce_term'/'reduce_payment'}]
+    frequency : str, optional
+        Payment frequency: 'monthly', 'semi_monthly', 'biweekly' or 'weekly'
+    compounding : str, optional
+        Compounding convention (see amortization.periodic_rate)
         
     Returns:
     --------
-    pandas.DataFrame
-        DataFrame with payment schedule including early repayments
+    Schedule
+        Payment schedule including early repayments, one row per payment
     """
     if early_payments is None:
         early_payments = []
 
-    # Sort early payments by month
-    early_payments = sorted(early_payments, key=lambda x: x['month'])
+    loan_term_periods = term_periods(loan_term_years, frequency)
+    monthly_rates = np.full(loan_term_periods, periodic_rate(interest_rate, frequency, compounding))
+    prepayments, reduce_payment = prepayment_arrays(loan_term_periods, early_payments, frequency)
 
-    schedule = []
-    loan_term_months = loan_term_years * 12
-    monthly_rate = interest_rate / 100 / 12
+    schedule = get_kernels().amortize_events(
+        loan_amount, monthly_rates, prepayments, reduce_payment, loan_term_periods)
 
-    remaining_loan = loan_amount
-    monthly_payment = calculate_annuity_payment(loan_amount, interest_rate, loan_term_years)
+    return Schedule(schedule)
 
-    month = 1
-    early_payment_idx = 0
 
-    while remaining_loan > 0 and month <= loan_term_months:
-        # Calculate regular payment components
-        interest_payment = remaining_loan * monthly_rate
-        principal_payment = min(monthly_payment - interest_payment, remaining_loan)
-
-        # Check if there's an early payment this month
-        early_payment_amount = 0
-        early_payment_type = None
+def plan_prepayment_arrays(loan_term_periods, loan_term_years, plan, frequency='monthly'):
+    """
+    Early payment amount and 'reduce_payment' flag for each month of the term of a repayment plan
 
-        while (early_payment_idx < len(early_payments) and
-               early_payments[early_payment_idx]['month'] == month):
-            early_payment = early_payments[early_payment_idx]
-            early_payment_amount += early_payment['amount']
-            early_payment_type = early_payment['type']
-            early_payment_idx += 1
+    One-off early payments are placed as in prepayment_arrays; recurring
+    amounts are then added to every month of their range, and their type
+    applies to those months.
 
-        # Apply early payment
-        if early_payment_amount > 0:
-            # Limit early payment to remaining loan
-            early_payment_amount = min(early_payment_amount, remaining_loan)
+    Parameters:
+    -----------
+    loan_term_periods : int
+        Loan term in payments
+    loan_term_years : float
+        Loan term in years (the default end of recurring amounts)
+    plan : dict
+        {'early_payments': [{'month', 'amount', 'type'}],
+         'recurring': [{'amount', 'type', 'start_month', 'end_month', 'every_months'}]};
+        recurring amounts are paid every `every_months` months (default 1)
+        from `start_month` (default 1) to `end_month` (default: the end of the term)
+    frequency : str, optional
+        Payment frequency: 'monthly', 'semi_monthly', 'biweekly' or 'weekly'
+    """
+    prepayments, reduce_payment = prepayment_arrays(
+        loan_term_periods, plan.get('early_payments'), frequency)
+    for recurring in plan.get('recurring') or []:
+        if recurring['amount'] <= 0:
+            continue
+        end_month = recurring.get('end_month') or round(loan_term_years * 12)
+        months = np.arange(recurring.get('start_month') or 1, end_month + 1, recurring.get('every_months') or 1)
+        periods = np.asarray(payments_by_month(months, frequency), dtype=np.int64)
+        periods = periods[(periods >= 1) & (periods <= loan_term_periods)]
+        np.add.at(prepayments, periods - 1, recurring['amount'])
+        reduce_payment[periods - 1] = recurring.get('type') == 'reduce_payment'
+    return prepayments, reduce_payment
+
+
+def calculate_early_repayment_plans(loan_amount, interest_rate, loan_term_years, plans,
+                                    frequency='monthly', compounding='payment', executor=None):
+    """
+    Compare several early repayment plans of one loan
 
-            # Update remaining loan
-            remaining_loan -= early_payment_amount
+    The regular schedule, the rate path and the regular payment are computed
+    once and shared by all plans; each plan is then a single kernel call.
+    With an executor, the plans are evaluated concurrently in tasks of
+    PLANS_PER_TASK plans (the Numba kernel releases the GIL), so a task
+    outweighs its dispatch.
 
-            # Recalculate monthly payment if type is reduce_payment
-            if early_payment_type == 'reduce_payment' and remaining_loan > 0:
-                remaining_months = loan_term_months - month
-                monthly_payment = calculate_annuity_payment(remaining_loan, interest_rate, remaining_months / 12)
+    Parameters:
+    -----------
+    loan_amount : float
+        Loan amount
+    interest_rate : float
+        Annual interest rate (percentage)
+    loan_term_years : float
+        Loan term in years
+    plans : list of dict
+        Repayment plans (see plan_prepayment_arrays)
+    frequency : str, optional
+        Payment frequency: 'monthly', 'semi_monthly', 'biweekly' or 'weekly'
+    compounding : str, optional
+        Compounding convention (see amortization.periodic_rate)
+    executor : concurrent.futures.Executor, optional
+        Executor evaluating the plans; by default they are evaluated in the
+        calling thread
 
-        # Record the payment for this month
-        schedule.append({
-            'month': month,
-            'payment': monthly_payment + early_payment_amount,
-            'principal': principal_payment + early_payment_amount,
-            'interest': interest_payment,
-            'early_payment': early_payment_amount,
-            'remaining_loan': remaining_loan - principal_payment,
-            'monthly_payment': monthly_payment
-        })
+    Returns:
+    --------
+    tuple
+        (regular_schedule, summary, schedules) where summary is a Schedule
+        with one row per plan ranked by interest saved, then months saved,
+        peak_payment being the largest payment of the plan (regular plus
+        early), and schedules is a list of Schedule objects in the order the
+        plans were given
+    """
+    if not plans:
+        raise ValueError("At least one repayment plan is required")
 
-        # Update remaining loan for next month
-        remaining_loan -= principal_payment
+    loan_term_periods = term_periods(loan_term_years, frequency)
+    regular_schedule = generate_payment_schedule(
+        loan_amount, interest_rate, loan_term_years, frequency=frequency, compounding=compounding)
 
-        # Ensure the remaining loan doesn't go below zero
-        if remaining_loan < 0:
-            remaining_loan = 0
+    monthly_rates = np.full(loan_term_periods, periodic_rate(interest_rate, frequency, compounding))
+    regular_payment = float(annuity_payment_for(loan_amount, monthly_rates[0], loan_term_periods))
+    kernels = get_kernels()
 
-        # Break if loan is fully paid
-        if remaining_loan == 0:
-            break
+    def evaluate(plan):
+        prepayments, reduce_payment = plan_prepayment_arrays(
+            loan_term_periods, loan_term_years, plan, frequency)
+        return Schedule(kernels.amortize_events(
+            loan_amount, monthly_rates, prepayments, reduce_payment, loan_term_periods, regular_payment))
 
-        month += 1
+    def evaluate_all(chunk):
+        return [evaluate(plan) for plan in chunk]
 
-    return pd.DataFrame(schedule)
+    if executor is None or len(plans) <= PLANS_PER_TASK:
+        schedules = evaluate_all(plans)
+    else:
+        chunks = [plans[i:i + PLANS_PER_TASK] for i in range(0, len(plans), PLANS_PER_TASK)]
+        schedules = [schedule for chunk in executor.map(evaluate_all, chunks) for schedule in chunk]
+
+    regular_interest = float(regular_schedule['interest'].sum())
+    regular_months = period_to_month(len(regular_schedule), frequency)
+    payoff_months = np.array([period_to_month(len(schedule), frequency) for schedule in schedules])
+    total_interest = np.array([schedule['interest'].sum() for schedule in schedules])
+    interest_saved = regular_interest - total_interest
+    months_saved = regular_months - payoff_months
+
+    # Best plan first: most interest saved, then most months saved, then the order given
+    order = np.lexsort((np.arange(len(plans)), -months_saved, -interest_saved))
+    summary = Schedule({
+        'plan': order,
+        'total_payments': np.array([schedule['payment'].sum() for schedule in schedules])[order],
+        'total_interest': total_interest[order],
+        'total_early_payments': np.array([schedule['early_payment'].sum() for schedule in schedules])[order],
+        'interest_saved': interest_saved[order],
+        'months_saved': months_saved[order],
+        'payoff_month': payoff_months[order],
+        'peak_payment': np.array([schedule['payment'].max() for schedule in schedules])[order],
+        'rank': np.arange(1, len(plans) + 1)
+    })
+
+    return regular_schedule, summary, schedules
 
 
 def calculate_restructuring(loan_amount, original_interest_rate, original_term_years,
-                            months_paid, new_interest_rate=None, new_term_years=None):
+                            months_paid, new_interest_rate=None, new_term_years=None,
+                            frequency='monthly', compounding='payment'):
     """
     Calculate mortgage restructuring options
     
@@ -115,21 +247,32 @@ def calculate_restructuring(loan_amount, original_interest_rate, original_term_y
         New annual interest rate (percentage)
     new_term_years : float, optional
         New loan term in years
+    frequency : str, optional
+        Payment frequency: 'monthly', 'semi_monthly', 'biweekly' or 'weekly';
+        the schedules then have one row per payment, and the payments made
+        by the end of month `months_paid` are paid
+    compounding : str, optional
+        Compounding convention (see amortization.periodic_rate)
         
     Returns:
     --------
     tuple
-        (original_schedule, restructured_schedule, comparison)
+        (original_schedule, restructured_schedule, comparison), all Schedule objects
     """
     # Generate original schedule
     original_schedule = generate_payment_schedule(
-        loan_amount, original_interest_rate, original_term_years)
+        loan_amount, original_interest_rate, original_term_years,
+        frequency=frequency, compounding=compounding)
 
-    # Calculate remaining loan amount after months_paid
-    if months_paid >= len(original_schedule):
-        return original_schedule, pd.DataFrame(), pd.DataFrame()
+    # Calculate remaining loan amount after the payments made by the end of month months_paid
+    payments_paid = int(payments_by_month(months_paid, frequency))
+    if payments_paid >= len(original_schedule):
+        return original_schedule, empty_schedule(original_schedule.columns), empty_schedule(COMPARISON_COLUMNS)
 
-    remaining_loan = original_schedule.iloc[months_paid]['remaining_loan']
+    # Balance after the last paid month, in closed form
+    remaining_loan = float(calculate_loan_state(
+        [loan_amount], [original_interest_rate], [original_term_years], [months_paid],
+        frequency=frequency, compounding=compounding)['remaining_loan'][0, 0])
 
     # Use original values if new ones not provided
     if new_interest_rate is None:
@@ -137,64 +280,159 @@ def calculate_restructuring(loan_amount, original_interest_rate, original_term_y
 
     if new_term_years is None:
         # Calculate remaining term in years
-        remaining_months = original_term_years * 12 - months_paid
-        new_term_years = remaining_months / 12
+        remaining_payments = len(original_schedule) - payments_paid
+        new_term_years = remaining_payments / payments_per_year(frequency)
 
     # Generate restructured schedule
     restructured_schedule = generate_payment_schedule(
-        remaining_loan, new_interest_rate, new_term_years)
-
-    # Create comparison DataFrame
-    comparison_data = []
-
-    # First add the already paid months from original schedule
-    for month in range(months_paid):
-        row = original_schedule.iloc[month]
-        comparison_data.append({
-            'month': month + 1,
-            'original_payment': row['payment'],
-            'restructured_payment': row['payment'],
-            'original_remaining': row['remaining_loan'],
-            'restructured_remaining': row['remaining_loan'],
-            'payment_difference': 0,
-            'status': 'paid'
-        })
-
-    # Then add the future months with both original and restructured payments
-    for month in range(max(len(original_schedule) - months_paid, len(restructured_schedule))):
-        orig_month = month + months_paid
-
-        if orig_month < len(original_schedule):
-            orig_row = original_schedule.iloc[orig_month]
-            orig_payment = orig_row['payment']
-            orig_remaining = orig_row['remaining_loan']
-        else:
-            orig_payment = 0
-            orig_remaining = 0
-
-        if month < len(restructured_schedule):
-            restr_row = restructured_schedule.iloc[month]
-            restr_payment = restr_row['payment']
-            restr_remaining = restr_row['remaining_loan']
-        else:
-            restr_payment = 0
-            restr_remaining = 0
-
-        comparison_data.append({
-            'month': orig_month + 1,
-            'original_payment': orig_payment,
-            'restructured_payment': restr_payment,
-            'original_remaining': orig_remaining,
-            'restructured_remaining': restr_remaining,
-            'payment_difference': restr_payment - orig_payment,
-            'status': 'future'
-        })
-
-    return original_schedule, restructured_schedule, pd.DataFrame(comparison_data)
+        remaining_loan, new_interest_rate, new_term_years, frequency=frequency, compounding=compounding)
+
+    # Create comparison schedule from column slices: the already paid months
+    # from the original schedule, then both schedules side by side
+    original_payment = original_schedule['payment']
+    original_remaining = original_schedule['remaining_loan']
+    future_months = max(len(original_schedule) - payments_paid, len(restructured_schedule))
+
+    def pad(values):
+        return np.concatenate((values, np.zeros(future_months - len(values))))
+
+    future_original_payment = pad(original_payment[payments_paid:])
+    future_restructured_payment = pad(restructured_schedule['payment'])
+
+    comparison = Schedule({
+        'original_payment': np.concatenate((original_payment[:payments_paid], future_original_payment)),
+        'restructured_payment': np.concatenate((original_payment[:payments_paid], future_restructured_payment)),
+        'original_remaining': np.concatenate((
+            original_remaining[:payments_paid], pad(original_remaining[payments_paid:]))),
+        'restructured_remaining': np.concatenate((
+            original_remaining[:payments_paid], pad(restructured_schedule['remaining_loan']))),
+        'payment_difference': np.concatenate((
+            np.zeros(payments_paid), future_restructured_payment - future_original_payment)),
+        'status': np.array(['paid'] * payments_paid + ['future'] * future_months, dtype=object)
+    })
+
+    return original_schedule, restructured_schedule, comparison
+
+
+def calculate_restructuring_options(loan_amount, original_interest_rate, original_term_years,
+                                    months_paid, options, frequency='monthly', compounding='payment'):
+    """
+    Compare several restructuring (refinance) options at once
+
+    The remaining balance is computed once in closed form, and all
+    restructured schedules are evaluated together as (options x months)
+    matrices from that shared balance.
+
+    Parameters:
+    -----------
+    loan_amount : float
+        Original loan amount
+    original_interest_rate : float
+        Original annual interest rate (percentage)
+    original_term_years : int
+        Original loan term in years
+    months_paid : int
+        Number of months already paid
+    options : list of dict
+        Restructuring options with format:
+        [{'new_interest_rate': rate, 'new_term_years': years, 'fees': upfront_fees}];
+        a missing rate or term keeps the original rate or the remaining term
+    frequency : str, optional
+        Payment frequency: 'monthly', 'semi_monthly', 'biweekly' or 'weekly';
+        payments, terms and schedules are then per payment period, and the
+        payments made by the end of month `months_paid` are paid
+    compounding : str, optional
+        Compounding convention (see amortization.periodic_rate)
+
+    Returns:
+    --------
+    tuple
+        (original, summary, schedules) where original is a dict describing
+        the remaining original loan, summary is a DataFrame with one row per
+        option ranked by net savings (interest saved minus fees) and
+        break_even_month -1 where the fees are never recovered, and schedules
+        is a dict of (options x payments) matrices in the order the options
+        were given
+    """
+    periods_per_year = payments_per_year(frequency)
+    original_term_months = term_periods(original_term_years, frequency)
+    months_paid = int(payments_by_month(months_paid, frequency))
+    if months_paid >= original_term_months:
+        raise ValueError("monthsPaid must be less than the original term")
+    if not options:
+        raise ValueError("At least one restructuring option is required")
+
+    # Original loan: payment, shared remaining balance and remaining interest per payment
+    original_rate = periodic_rate(original_interest_rate, frequency, compounding)
+    original_payment = annuity_payment_for(loan_amount, original_rate, original_term_months)
+    remaining_loan = float(remaining_balance(loan_amount, original_rate, original_payment, months_paid))
+    original_remaining_months = original_term_months - months_paid
+
+    original_schedule = amortize_matrix(
+        [remaining_loan], [original_rate], [original_payment], [original_remaining_months])
+    original_interest = original_schedule['interest'][0]
+
+    # Restructured schedules for all options as matrices
+    new_rates = np.array([
+        original_interest_rate if option.get('new_interest_rate') is None else option['new_interest_rate']
+        for option in options
+    ], dtype=float)
+    new_months = np.array([
+        original_remaining_months if option.get('new_term_years') is None
+        else term_periods(option['new_term_years'], frequency)
+        for option in options
+    ], dtype=np.int64)
+    fees = np.array([option.get('fees', 0) or 0 for option in options], dtype=float)
+
+    if (new_months <= 0).any():
+        raise ValueError("Restructured term must be at least one month")
+
+    monthly_rates = periodic_rate(new_rates, frequency, compounding)
+    payments = annuity_payment_for(np.full(len(options), remaining_loan), monthly_rates, new_months)
+    schedules = amortize_matrix(np.full(len(options), remaining_loan), monthly_rates, payments, new_months)
+
+    total_payments = schedules['payment'].sum(axis=1)
+    total_interest = schedules['interest'].sum(axis=1)
+    original_remaining_interest = original_interest.sum()
+    interest_saved = original_remaining_interest - total_interest
+
+    # Break-even: first payment after which cumulative interest saved covers the fees
+    horizon = max(schedules['interest'].shape[1], len(original_interest))
+    cumulative_original = np.cumsum(np.pad(original_interest, (0, horizon - len(original_interest))))
+    cumulative_new = np.cumsum(
+        np.pad(schedules['interest'], ((0, 0), (0, horizon - schedules['interest'].shape[1]))), axis=1)
+    covered = (cumulative_original[np.newaxis, :] - cumulative_new) >= fees[:, np.newaxis]
+    break_even = np.where(covered.any(axis=1), period_to_month(covered.argmax(axis=1) + 1, frequency), -1)
+
+    summary = pd.DataFrame({
+        'option': np.arange(len(options)),
+        'new_interest_rate': new_rates,
+        'new_term_years': new_months / periods_per_year,
+        'fees': fees,
+        'monthly_payment': payments,
+        'payment_difference': payments - original_payment,
+        'total_payments': total_payments,
+        'total_interest': total_interest,
+        'interest_saved': interest_saved,
+        'net_savings': interest_saved - fees,
+        'break_even_month': break_even
+    })
+    summary = summary.sort_values(['net_savings', 'option'], ascending=[False, True], kind='stable')
+    summary['rank'] = np.arange(1, len(summary) + 1)
+    original = {
+        'remaining_loan': remaining_loan,
+        'monthly_payment': float(original_payment),
+        'remaining_term': original_remaining_months,
+        'remaining_payments': float(original_schedule['payment'][0].sum()),
+        'remaining_interest': float(original_remaining_interest)
+    }
+
+    return original, summary.reset_index(drop=True), schedules
 
 
 def calculate_with_insurance(loan_amount, interest_rate, loan_term_years,
-                             insurance_rate, insurance_term_years=None):
+                             insurance_rate, insurance_term_years=None, frequency='monthly',
+                             compounding='payment'):
     """
     Calculate mortgage with insurance costs
     
@@ -210,38 +448,40 @@ def calculate_with_insurance(loan_amount, interest_rate, loan_term_years,
         Annual insurance rate as percentage of loan amount
     insurance_term_years : int, optional
         Insurance term in years (defaults to loan term)
+    frequency : str, optional
+        Payment frequency: 'monthly', 'semi_monthly', 'biweekly' or 'weekly';
+        insurance is then charged with every payment
+    compounding : str, optional
+        Compounding convention (see amortization.periodic_rate)
         
     Returns:
     --------
-    pandas.DataFrame
-        DataFrame with payment schedule including insurance
+    Schedule
+        Payment schedule including insurance
     """
     if insurance_term_years is None:
         insurance_term_years = loan_term_years
 
     # Generate regular mortgage schedule
-    base_schedule = generate_payment_schedule(loan_amount, interest_rate, loan_term_years)
+    base_schedule = generate_payment_schedule(
+        loan_amount, interest_rate, loan_term_years, frequency=frequency, compounding=compounding)
 
-    # Calculate insurance
-    insurance_term_months = min(insurance_term_years * 12, loan_term_years * 12)
-    monthly_insurance = loan_amount * insurance_rate / 100 / 12
+    # Insurance for the insurance term
+    periods_per_year = payments_per_year(frequency)
+    insurance_term_periods = min(insurance_term_years * periods_per_year, loan_term_years * periods_per_year)
+    monthly_insurance = loan_amount * insurance_rate / 100 / periods_per_year
+    insurance = np.where(base_schedule.months <= insurance_term_periods, monthly_insurance, 0.0)
 
-    # Add insurance to payment schedule
-    schedule_with_insurance = base_schedule.copy()
-    schedule_with_insurance['insurance'] = 0.0
-    schedule_with_insurance['total_payment'] = schedule_with_insurance['payment']
-
-    # Add insurance for the insurance term
-    for month in range(insurance_term_months):
-        schedule_with_insurance.loc[month, 'insurance'] = monthly_insurance
-        schedule_with_insurance.loc[month, 'total_payment'] += monthly_insurance
-
-    return schedule_with_insurance
+    return base_schedule.with_columns(
+        insurance=insurance,
+        total_payment=base_schedule['payment'] + insurance
+    )
 
 
 def calculate_with_central_bank_rate(loan_amount, base_interest_rate, loan_term_years,
                                      central_bank_rate, margin,
-                                     predicted_cb_rates=None):
+                                     predicted_cb_rates=None, frequency='monthly',
+                                     compounding='payment'):
     """
     Calculate mortgage with floating rate tied to central bank rate
     
@@ -260,70 +500,175 @@ def calculate_with_central_bank_rate(loan_amount, base_interest_rate, loan_term_
     predicted_cb_rates : list, optional
         List of predicted central bank rates for future periods
         Format: [{'month': month_number, 'rate': cb_rate}]
+    frequency : str, optional
+        Payment frequency: 'monthly', 'semi_monthly', 'biweekly' or 'weekly'
+    compounding : str, optional
+        Compounding convention (see amortization.periodic_rate)
         
     Returns:
     --------
-    pandas.DataFrame
-        DataFrame with payment schedule using variable rates
+    Schedule
+        Payment schedule using variable rates, one row per payment
+    """
+    loan_term_periods = term_periods(loan_term_years, frequency)
+
+    # Central bank rate path; the loan rate is the central bank rate plus the margin
+    cb_rates = rate_path(loan_term_periods, central_bank_rate,
+                          floating_rate_changes(central_bank_rate, 0, predicted_cb_rates), frequency)
+    interest_rates = cb_rates + margin
+
+    schedule = get_kernels().amortize_events(
+        loan_amount, periodic_rate(interest_rates, frequency, compounding), np.zeros(loan_term_periods),
+        np.zeros(loan_term_periods, dtype=bool), loan_term_periods)
+    months = len(schedule['payment'])
+
+    return Schedule({
+        'payment': schedule['payment'],
+        'principal': schedule['principal'],
+        'interest': schedule['interest'],
+        'remaining_loan': schedule['remaining_loan'],
+        'cb_rate': cb_rates[:months],
+        'interest_rate': interest_rates[:months]
+    })
+
+
+def floating_rate_changes(central_bank_rate, margin, predicted_cb_rates=None):
+    """
+    Convert central bank rate predictions into loan rate changes
+
+    Parameters:
+    -----------
+    central_bank_rate : float
+        Current central bank rate (percentage)
+    margin : float
+        Margin above central bank rate (percentage points)
+    predicted_cb_rates : list, optional
+        Predicted central bank rates: [{'month': month_number, 'rate': cb_rate}]
+
+    Returns:
+    --------
+    list of dict
+        Loan rate changes: [{'month': month_number, 'rate': loan_rate}], starting at month 1
+    """
+    cb_rates = {1: central_bank_rate}
+    for change in predicted_cb_rates or []:
+        cb_rates[change['month']] = change['rate']
+
+    return [{'month': month, 'rate': cb_rates[month] + margin} for month in sorted(cb_rates)]
+
+
+def calculate_composite_scenario(loan_amount, interest_rate, loan_term_years,
+                                 rate_changes=None, early_payments=None,
+                                 insurance_rate=0, insurance_type='fixed',
+                                 insurance_term_years=None, frequency='monthly',
+                                 compounding='payment'):
+    """
+    Calculate mortgage combining rate changes, early repayments and insurance
+
+    The schedule is amortized by the amortize_events kernel (see
+    backend.core.kernels) from per-month rate and early payment arrays.
+
+    Rate changes take effect at the start of their month and the payment is
+    recalculated over the remaining term. Early payments are applied at the
+    end of their month, after the regular payment; 'reduce_payment' recalculates
+    the payment over the remaining term, 'reduce_term' keeps it. With a
+    payment frequency other than monthly, the schedule has one row per
+    payment and events apply as described in rate_path and prepayment_arrays.
+
+    Parameters:
+    -----------
+    loan_amount : float
+        Loan amount
+    interest_rate : float
+        Initial annual interest rate (percentage)
+    loan_term_years : int
+        Loan term in years
+    rate_changes : list of dict, optional
+        Loan rate changes: [{'month': month_number, 'rate': annual_rate}]
+        (see floating_rate_changes for rates tied to the central bank rate)
+    early_payments : list of dict, optional
+        List of early payments with format:
+        [{'month': month_number, 'amount': payment_amount, 'type': 'reduce_term'/'reduce_payment'}]
+    insurance_rate : float, optional
+        Annual insurance rate (percentage)
+    insurance_type : str, optional
+        'fixed' to charge the rate on the original loan amount,
+        'balance' to charge it on the outstanding balance
+    insurance_term_years : float, optional
+        Insurance term in years (defaults to loan term)
+    frequency : str, optional
+        Payment frequency: 'monthly', 'semi_monthly', 'biweekly' or 'weekly'
+    compounding : str, optional
+        Compounding convention (see amortization.periodic_rate)
+
+    Returns:
+    --------
+    Schedule
+        Combined payment schedule
+    """
+    if insurance_type not in ('fixed', 'balance'):
+        raise ValueError(f"Unknown insurance type: {insurance_type}")
+
+    loan_term_periods = term_periods(loan_term_years, frequency)
+    interest_rates = rate_path(loan_term_periods, interest_rate, rate_changes, frequency)
+    prepayments, reduce_payment = prepayment_arrays(loan_term_periods, early_payments, frequency)
+
+    schedule = get_kernels().amortize_events(
+        loan_amount, periodic_rate(interest_rates, frequency, compounding), prepayments, reduce_payment,
+        loan_term_periods)
+
+    return composite_schedule(loan_amount, loan_term_periods, interest_rates, schedule,
+                              insurance_rate, insurance_type, insurance_term_years, frequency)
+
+
+def composite_schedule(loan_amount, loan_term_periods, interest_rates, schedule,
+                       insurance_rate=0, insurance_type='fixed', insurance_term_years=None,
+                       frequency='monthly'):
+    """
+    Build the composite scenario schedule from the amortized columns
+
+    Parameters:
+    -----------
+    loan_amount : float
+        Loan amount
+    loan_term_periods : int
+        Loan term in months (in payments with other payment frequencies)
+    interest_rates : numpy.ndarray
+        Annual interest rate of each month of the term (percentage)
+    schedule : dict of numpy.ndarray or Schedule
+        Schedule columns returned by the amortize_events kernel
+    insurance_rate, insurance_type, insurance_term_years, frequency
+        See calculate_composite_scenario
+
+    Returns:
+    --------
+    Schedule
+        Combined payment schedule
     """
-    if predicted_cb_rates is None:
-        # Default prediction - no change
-        predicted_cb_rates = [{'month': 1, 'rate': central_bank_rate}]
+    if insurance_type not in ('fixed', 'balance'):
+        raise ValueError(f"Unknown insurance type: {insurance_type}")
+
+    months = np.arange(1, len(schedule['payment']) + 1)
+
+    # Insurance on the original amount or on the balance at the start of each month
+    periods_per_year = payments_per_year(frequency)
+    insurance_term_periods = loan_term_periods if insurance_term_years is None else insurance_term_years * periods_per_year
+    monthly_insurance_rate = insurance_rate / 100 / periods_per_year
+    if insurance_type == 'balance':
+        start_balances = np.concatenate(([loan_amount], schedule['remaining_loan'][:-1]))
+        insurance = start_balances * monthly_insurance_rate
     else:
-        # Ensure the list starts with month 1
-        if not any(rate['month'] == 1 for rate in predicted_cb_rates):
-            predicted_cb_rates.insert(0, {'month': 1, 'rate': central_bank_rate})
-
-        # Sort by month
-        predicted_cb_rates = sorted(predicted_cb_rates, key=lambda x: x['month'])
-
-    loan_term_months = loan_term_years * 12
-    schedule = []
-
-    remaining_loan = loan_amount
-    current_month = 1
-
-    # Initialize with the first rate period
-    current_cb_rate = predicted_cb_rates[0]['rate']
-    current_interest_rate = current_cb_rate + margin
-    next_rate_change_idx = 1
-
-    while current_month <= loan_term_months and remaining_loan > 0:
-        # Check if we need to update the interest rate
-        if (next_rate_change_idx < len(predicted_cb_rates) and
-                predicted_cb_rates[next_rate_change_idx]['month'] == current_month):
-            current_cb_rate = predicted_cb_rates[next_rate_change_idx]['rate']
-            current_interest_rate = current_cb_rate + margin
-            next_rate_change_idx += 1
-
-        # Calculate payment for this month based on current rate
-        remaining_months = loan_term_months - current_month + 1
-        monthly_payment = calculate_annuity_payment(
-            remaining_loan, current_interest_rate, remaining_months / 12)
-
-        # Calculate interest and principal components
-        monthly_rate = current_interest_rate / 100 / 12
-        interest_payment = remaining_loan * monthly_rate
-        principal_payment = monthly_payment - interest_payment
-
-        # Ensure we don't overpay in the last month
-        if principal_payment > remaining_loan:
-            principal_payment = remaining_loan
-            monthly_payment = principal_payment + interest_payment
-
-        # Record the payment
-        schedule.append({
-            'month': current_month,
-            'payment': monthly_payment,
-            'principal': principal_payment,
-            'interest': interest_payment,
-            'remaining_loan': remaining_loan - principal_payment,
-            'cb_rate': current_cb_rate,
-            'interest_rate': current_interest_rate
-        })
-
-        # Update remaining loan for next month
-        remaining_loan -= principal_payment
-        current_month += 1
-
-    return pd.DataFrame(schedule)
\ No newline at end of file
+        insurance = np.full(len(months), loan_amount * monthly_insurance_rate)
+    insurance[months > insurance_term_periods] = 0.0
+
+    return Schedule({
+        'payment': schedule['payment'],
+        'principal': schedule['principal'],
+        'interest': schedule['interest'],
+        'early_payment': schedule['early_payment'],
+        'remaining_loan': schedule['remaining_loan'],
+        'monthly_payment': schedule['monthly_payment'],
+        'interest_rate': interest_rates[:len(months)],
+        'insurance': insurance,
+        'total_payment': schedule['payment'] + insurance
+    })
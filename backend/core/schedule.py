@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+# Column dtypes a schedule can store amounts in
+SCHEDULE_DTYPES = (np.float64, np.float32)
+
+
+class Schedule:
+    """
+    Payment schedule stored as one contiguous NumPy array per column
+
+    A lightweight alternative to a DataFrame for schedules that are computed,
+    cached and serialized without further analysis: no index, no block
+    manager and no per-object overhead beyond the column arrays. The month
+    column is not stored; `schedule['month']` is generated from the first
+    month and the length.
+
+    Float columns are stored as float64, or float32 to halve the memory of
+    cached schedules. Integer columns (cents), booleans and labels keep their
+    dtype.
+
+    Parameters:
+    -----------
+    columns : dict
+        Mapping of column name to array-like, all of the same length
+    first_month : int, optional
+        Month number of the first row
+    dtype : numpy dtype, optional
+        dtype of the float columns: numpy.float64 (default) or numpy.float32
+    """
+
+    __slots__ = ('_columns', 'first_month')
+
+    def __init__(self, columns, first_month=1, dtype=np.float64):
+        if np.dtype(dtype) not in [np.dtype(d) for d in SCHEDULE_DTYPES]:
+            raise ValueError(f"Unsupported schedule dtype: {dtype}")
+
+        stored = {}
+        length = None
+        for name, values in columns.items():
+            if name == 'month':
+                continue
+            values = np.asarray(values)
+            if values.dtype.kind == 'f':
+                values = np.ascontiguousarray(values, dtype=dtype)
+            else:
+                values = np.ascontiguousarray(values)
+            if values.ndim != 1:
+                raise ValueError(f"Schedule column {name} must be one-dimensional")
+            if length is None:
+                length = len(values)
+            elif len(values) != length:
+                raise ValueError(f"Schedule column {name} has {len(values)} rows, expected {length}")
+            stored[name] = values
+
+        self._columns = stored
+        self.first_month = int(first_month)
+
+    @classmethod
+    def _from_arrays(cls, columns, first_month):
+        # Wrap arrays that are already validated (views of another schedule)
+        schedule = cls.__new__(cls)
+        schedule._columns = columns
+        schedule.first_month = first_month
+        return schedule
+
+    @classmethod
+    def from_dataframe(cls, frame, dtype=np.float64):
+        """
+        Build a schedule from a DataFrame with a 'month' column
+        """
+        first_month = int(frame['month'].iloc[0]) if len(frame) else 1
+        return cls({name: frame[name].to_numpy() for name in frame.columns}, first_month, dtype)
+
+    def __len__(self):
+        for values in self._columns.values():
+            return len(values)
+        return 0
+
+    def __contains__(self, name):
+        return name == 'month' or name in self._columns
+
+    def __getitem__(self, name):
+        if name == 'month':
+            return self.months
+        return self._columns[name]
+
+    def __repr__(self):
+        return f"Schedule(months={self.first_month}..{self.first_month + len(self) - 1}, columns={list(self._columns)})"
+
+    @property
+    def columns(self):
+        """
+        Column names, starting with 'month'
+        """
+        return ('month',) + tuple(self._columns)
+
+    @property
+    def months(self):
+        """
+        Month number of each row
+        """
+        return np.arange(self.first_month, self.first_month + len(self))
+
+    @property
+    def nbytes(self):
+        """
+        Memory used by the column arrays, in bytes
+        """
+        return sum(values.nbytes for values in self._columns.values())
+
+    def window(self, start_month, stop_month=None):
+        """
+        Rows of months start_month <= month < stop_month, as a schedule of views
+
+        No data is copied: the columns of the window share memory with this schedule.
+        """
+        start = min(max(start_month - self.first_month, 0), len(self))
+        stop = len(self) if stop_month is None else min(max(stop_month - self.first_month, start), len(self))
+        return Schedule._from_arrays(
+            {name: values[start:stop] for name, values in self._columns.items()},
+            self.first_month + start)
+
+    def with_columns(self, **columns):
+        """
+        New schedule sharing this schedule's columns, with columns added or replaced
+        """
+        merged = dict(self._columns)
+        merged.update(columns)
+        dtype = np.float32 if any(v.dtype == np.float32 for v in self._columns.values()) else np.float64
+        return Schedule(merged, self.first_month, dtype)
+
+    def astype(self, dtype):
+        """
+        Copy of the schedule with float columns converted to `dtype`
+        """
+        return Schedule(self._columns, self.first_month, dtype)
+
+    def to_dataframe(self):
+        """
+        Convert to a pandas DataFrame with a 'month' column first
+        """
+        data = {'month': self.months}
+        data.update(self._columns)
+        return pd.DataFrame(data)
+
+
+def empty_schedule(columns):
+    """
+    Schedule without rows with the given column names
+    """
+    return Schedule({name: np.empty(0) for name in columns})
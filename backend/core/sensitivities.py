@@ -0,0 +1,132 @@
+import numpy as np
+
+from backend.core.amortization import (
+    annuity_payment_for,
+    payments_by_month,
+    payments_per_year,
+    periodic_rate,
+    periodic_rate_derivative,
+    term_periods
+)
+
+
+def calculate_sensitivities(loan_amounts, interest_rates, loan_terms_years, months=None,
+                            frequency="monthly", compounding="payment"):
+    """
+    Analytic partial derivatives of the annuity payment, total interest and
+    remaining balance of loans with respect to rate, term and principal
+
+    With P the principal, r the periodic rate, N the number of payments and
+    g = (1 + r) ** -N, the payment is A = P r / (1 - g), the total interest
+    N A - P and the balance after k payments P (1 - (1 + r) ** (k - N)) / (1 - g).
+    Their derivatives are taken in closed form for all loans at once, with
+    the limits at r = 0 for interest-free loans. The term is differentiated
+    as a continuous number of payments around the rounded term of the
+    schedule.
+
+    Parameters:
+    -----------
+    loan_amounts : array-like
+        Principal amount of each loan
+    interest_rates : array-like
+        Annual interest rate of each loan (percentage)
+    loan_terms_years : array-like
+        Term of each loan in years
+    months : array-like, optional
+        Months at which to differentiate the remaining balance (0 is the start
+        of the loan; at and after the last payment the balance and its
+        derivatives are zero); with monthly payments, the number of payments
+        made, otherwise the payments made by the end of the month
+    frequency : str, optional
+        Payment frequency: 'monthly', 'semi_monthly', 'biweekly' or 'weekly'
+    compounding : str, optional
+        Compounding convention (see amortization.periodic_rate)
+
+    Returns:
+    --------
+    dict of dict of numpy.ndarray
+        'payment' and 'total_interest' (arrays of shape (loans,)) and, when
+        months are given, 'remaining_loan' (matrices of shape (loans, months)),
+        each a dict of 'value' and the derivatives 'rate' (per percentage
+        point of annual rate), 'term' (per year of term) and 'principal' (per
+        unit of principal)
+    """
+    principal = np.asarray(loan_amounts, dtype=float)
+    annual_rates = np.asarray(interest_rates, dtype=float)
+    rates = np.asarray(periodic_rate(annual_rates, frequency, compounding), dtype=float)
+    rate_scale = periodic_rate_derivative(annual_rates, frequency, compounding)
+    term_scale = payments_per_year(frequency)
+    terms = term_periods(np.asarray(loan_terms_years, dtype=float), frequency).astype(float)
+
+    zero_rate = rates == 0
+    log_growth = np.log1p(rates)
+    discount = np.exp(-terms * log_growth)
+    annuity_factor = -np.expm1(-terms * log_growth)
+
+    payment = annuity_payment_for(principal, rates, terms)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payment_rate = np.where(
+            zero_rate,
+            principal * (terms + 1) / (2 * terms),
+            principal * (annuity_factor - rates * terms * discount / (1 + rates)) / annuity_factor ** 2)
+        payment_term = np.where(
+            zero_rate,
+            -principal / terms ** 2,
+            -principal * rates * discount * log_growth / annuity_factor ** 2)
+    payment_principal = payment / principal
+
+    sensitivities = {
+        'payment': {
+            'value': payment,
+            'rate': payment_rate * rate_scale,
+            'term': payment_term * term_scale,
+            'principal': payment_principal
+        },
+        'total_interest': {
+            'value': terms * payment - principal,
+            'rate': terms * payment_rate * rate_scale,
+            'term': (payment + terms * payment_term) * term_scale,
+            'principal': terms * payment_principal - 1
+        }
+    }
+
+    if months is not None:
+        sensitivities['remaining_loan'] = _balance_sensitivities(
+            principal[:, np.newaxis], rates[:, np.newaxis], terms[:, np.newaxis],
+            np.asarray(payments_by_month(months, frequency), dtype=float))
+        for name in ('rate', 'term'):
+            scale = rate_scale[:, np.newaxis] if name == 'rate' else term_scale
+            sensitivities['remaining_loan'][name] *= scale
+
+    return sensitivities
+
+
+def _balance_sensitivities(principal, rates, terms, payments_made):
+    # Balance after k payments and its derivatives per periodic rate and per payment of term
+    k = np.clip(payments_made, 0, terms)
+    repaid = k >= terms
+    zero_rate = rates == 0
+    log_growth = np.log1p(rates)
+    discount = np.exp(-terms * log_growth)
+    annuity_factor = -np.expm1(-terms * log_growth)
+    remaining_discount = np.exp((k - terms) * log_growth)
+    remaining_factor = -np.expm1((k - terms) * log_growth)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = np.where(zero_rate, (terms - k) / terms, remaining_factor / annuity_factor)
+        balance_rate = np.where(
+            zero_rate,
+            principal * (terms - k) * k / (2 * terms),
+            principal / (1 + rates) * ((terms - k) * remaining_discount * annuity_factor
+                                       - terms * discount * remaining_factor) / annuity_factor ** 2)
+        balance_term = np.where(
+            zero_rate,
+            principal * k / terms ** 2,
+            principal * log_growth * (remaining_discount - discount) / annuity_factor ** 2)
+
+    return {
+        'value': np.where(repaid, 0.0, principal * share),
+        'rate': np.where(repaid, 0.0, balance_rate),
+        'term': np.where(repaid, 0.0, balance_term),
+        'principal': np.where(repaid, 0.0, share)
+    }
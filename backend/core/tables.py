@@ -0,0 +1,211 @@
+"""
+Read-only precomputed tables shared by the worker processes of a server
+
+Each table is one NumPy .npy file, `<name>.npy`, in the directory named by
+MORTGAGE_TABLES_DIR. The tables are built once, by the gunicorn master
+before it forks its workers (see backend/gunicorn.conf.py) or ahead of time
+with
+
+    python -m backend.core.tables build DIRECTORY
+
+and every worker memory-maps them read-only: the pages are shared through
+the page cache instead of being copied into each worker (use a directory
+on tmpfs, such as /dev/shm, to keep them off disk). Without the variable a
+process builds the tables it uses in its own memory on first use.
+
+The `growth_factors` table holds (1 + r) ** k for monthly rates r on a grid
+of annual rates (0% to 25% in steps of 0.01%) and k = 0 to 600 months. Its
+rows are computed with the same expression as an exact evaluation, so a
+loan whose rate is on the grid gets bit-identical results from a lookup;
+rates off the grid and longer terms are evaluated exactly.
+"""
+import argparse
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+TABLES_DIR_ENV = 'MORTGAGE_TABLES_DIR'
+
+# Grid of the growth factor table: annual rates in steps of 1 / GRID_STEPS_PER_PERCENT percent
+GRID_STEPS_PER_PERCENT = 100
+GRID_MAX_RATE = 25
+GRID_MAX_MONTHS = 600
+# Smaller batches are evaluated directly: a single row of powers costs no more than its lookup
+GRID_MIN_ROWS = 8
+
+
+def grid_monthly_rates():
+    """
+    Monthly rates of the rows of the growth factor table
+
+    Annual rates are i / 100 percent, the same doubles as the decimal rates
+    of requests, converted like amortization.periodic_rate.
+    """
+    annual_rates = np.arange(GRID_MAX_RATE * GRID_STEPS_PER_PERCENT + 1) / GRID_STEPS_PER_PERCENT
+    return annual_rates / 100 / 12
+
+
+def build_growth_factors():
+    """
+    Growth factor table: (1 + r) ** k for each grid rate r (rows) and k = 0..GRID_MAX_MONTHS
+    """
+    k = np.arange(GRID_MAX_MONTHS + 1, dtype=float)
+    return (1 + grid_monthly_rates()[:, np.newaxis]) ** k
+
+
+# Builder of each shared table
+TABLE_BUILDERS = {
+    'growth_factors': build_growth_factors
+}
+
+
+def build_tables(directory, names=None):
+    """
+    Build tables into a directory, replacing existing files atomically
+
+    Parameters:
+    -----------
+    directory : str
+        Directory of the tables (created if needed)
+    names : sequence of str, optional
+        Tables to build; defaults to all of TABLE_BUILDERS
+
+    Returns:
+    --------
+    dict
+        Size in bytes of each table built
+    """
+    os.makedirs(directory, exist_ok=True)
+    sizes = {}
+    for name in names or TABLE_BUILDERS:
+        table = TABLE_BUILDERS[name]()
+        handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as temp_file:
+                np.save(temp_file, table)
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, os.path.join(directory, f'{name}.npy'))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        sizes[name] = table.nbytes
+    return sizes
+
+
+class SharedTables:
+    """
+    Process-wide access to the precomputed tables
+
+    Tables found in `directory` are memory-mapped read-only (zero-copy views
+    shared with the other workers); missing ones are built in process memory.
+    Either way each table is loaded once per process and is read-only.
+
+    Parameters:
+    -----------
+    directory : str, optional
+        Directory of prebuilt tables
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._tables = {}
+        self._lock = threading.Lock()
+        self._grid_rates = grid_monthly_rates()
+
+    def get(self, name):
+        """
+        Table by name, as a read-only array
+        """
+        table = self._tables.get(name)
+        if table is not None:
+            return table
+        with self._lock:
+            table = self._tables.get(name)
+            if table is None:
+                path = os.path.join(self.directory, f'{name}.npy') if self.directory else None
+                if path is not None and os.path.exists(path):
+                    table = np.load(path, mmap_mode='r')
+                else:
+                    table = TABLE_BUILDERS[name]()
+                    table.flags.writeable = False
+                self._tables[name] = table
+        return table
+
+    def growth_powers(self, monthly_rates, horizon):
+        """
+        (1 + r) ** k for each rate (rows) and k = 0..horizon (columns)
+
+        Rows of rates on the grid are copied from the growth factor table,
+        the others are evaluated exactly; the results are the same either way.
+
+        Parameters:
+        -----------
+        monthly_rates : numpy.ndarray
+            Monthly interest rates (fraction, not percentage)
+        horizon : int
+            Largest power
+
+        Returns:
+        --------
+        numpy.ndarray
+            Matrix of shape (len(monthly_rates), horizon + 1)
+        """
+        monthly_rates = np.asarray(monthly_rates, dtype=float)
+        k = np.arange(horizon + 1, dtype=float)
+        if len(monthly_rates) < GRID_MIN_ROWS or horizon > GRID_MAX_MONTHS:
+            return (1 + monthly_rates[:, np.newaxis]) ** k
+
+        # Grid row of each rate, kept only where the grid rate is the very same double
+        rows = np.nan_to_num(np.rint(monthly_rates * (1200 * GRID_STEPS_PER_PERCENT)), copy=False)
+        rows = np.clip(rows, 0, len(self._grid_rates) - 1).astype(np.intp)
+        on_grid = self._grid_rates[rows] == monthly_rates
+        if not on_grid.any():
+            return (1 + monthly_rates[:, np.newaxis]) ** k
+
+        table = self.get('growth_factors')
+        if on_grid.all():
+            return table[rows, :horizon + 1]
+        growth = np.empty((len(rows), horizon + 1))
+        growth[on_grid] = table[rows[on_grid], :horizon + 1]
+        growth[~on_grid] = (1 + monthly_rates[~on_grid, np.newaxis]) ** k
+        return growth
+
+
+_default_tables = None
+_default_tables_lock = threading.Lock()
+
+
+def get_tables():
+    """
+    Process-wide tables, memory-mapped from MORTGAGE_TABLES_DIR when it is set
+    """
+    global _default_tables
+    if _default_tables is None:
+        with _default_tables_lock:
+            if _default_tables is None:
+                _default_tables = SharedTables(os.environ.get(TABLES_DIR_ENV))
+    return _default_tables
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m backend.core.tables',
+                                     description='Build the precomputed tables shared by server workers')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = commands.add_parser('build', help='build the tables into a directory')
+    build_parser.add_argument('directory')
+    build_parser.add_argument('--table', action='append', choices=sorted(TABLE_BUILDERS),
+                              help='table to build (default: all)')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        for name, size in build_tables(args.directory, args.table).items():
+            print(f'{name}: {size / 1024 / 1024:.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+Gunicorn settings of the API
+
+Loaded automatically when gunicorn is started from this directory, or with
+`gunicorn --config backend/gunicorn.conf.py`. Before forking its workers the
+master builds the precomputed tables (see backend/core/tables.py) into
+MORTGAGE_TABLES_DIR, or into a temporary directory on tmpfs that is removed
+on exit, and every worker memory-maps them instead of building its own copy.
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+# Add the parent directory of backend to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.core.tables import TABLE_BUILDERS, TABLES_DIR_ENV, build_tables
+
+_temporary_dirs = []
+
+
+def on_starting(server):
+    directory = os.environ.get(TABLES_DIR_ENV)
+    if not directory:
+        directory = tempfile.mkdtemp(prefix='mortgage-tables-', dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+        _temporary_dirs.append(directory)
+        # Workers are forked after this hook and inherit the variable
+        os.environ[TABLES_DIR_ENV] = directory
+
+    missing = [name for name in TABLE_BUILDERS if not os.path.exists(os.path.join(directory, f'{name}.npy'))]
+    if missing:
+        sizes = build_tables(directory, missing)
+        server.log.info('Built shared tables in %s: %s', directory,
+                        ', '.join(f'{name} ({size / 1024 / 1024:.1f} MiB)' for name, size in sizes.items()))
+
+
+def on_exit(server):
+    for directory in _temporary_dirs:
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,118 @@
+"""
+Inputs and checks shared by the tests, and by the benchmarks that time the same code
+"""
+import numpy as np
+
+from backend.core.amortization import MONTHLY_RATE_DENOMINATOR, payments_per_year
+from backend.core.calculators import calculate_loan_state, generate_payment_schedules
+from backend.core.sensitivities import calculate_sensitivities
+
+# Payment frequency and compounding pairs whose sensitivities are checked by default
+SENSITIVITY_CONVENTIONS = (('monthly', 'payment'), ('biweekly', 'semi_annual'))
+
+
+def kernel_inputs(events, loan_amount=300000, interest_rate=6.5, loan_term_years=30):
+    """
+    Per-month kernel inputs with `events` rate changes and early payments spread over the term
+    """
+    months = loan_term_years * 12
+    rng = np.random.default_rng(events)
+    monthly_rates = np.full(months, interest_rate / 100 / 12)
+    prepayments = np.zeros(months)
+    reduce_payment = np.zeros(months, dtype=bool)
+    for month in np.sort(rng.choice(np.arange(1, months), size=min(events, months - 1), replace=False)):
+        if month % 2:
+            monthly_rates[month:] = rng.uniform(3, 10) / 100 / 12
+        else:
+            prepayments[month] = 2000
+            reduce_payment[month] = bool(month % 4)
+    return loan_amount, monthly_rates, prepayments, reduce_payment, months
+
+
+def kernel_cents_inputs(size):
+    """
+    Integer-cents inputs for a batch of `size` annuity loans
+    """
+    rng = np.random.default_rng(size)
+    principal_cents = rng.integers(5_000_000, 100_000_000, size)
+    rate_units = rng.integers(20_000, 150_000, size)
+    months = rng.choice([120, 240, 360], size)
+    monthly_rates = rate_units / MONTHLY_RATE_DENOMINATOR
+    growth = (1 + monthly_rates) ** months
+    payment_cents = np.ceil(principal_cents * monthly_rates * growth / (growth - 1)).astype(np.int64)
+    return principal_cents, rate_units, months, payment_cents
+
+
+def kernel_paths_inputs(paths, months=360):
+    """
+    Random monthly returns for `paths` simulated paths
+    """
+    rng = np.random.default_rng(paths)
+    return np.full(paths, 100.0), rng.normal(0.004, 0.02, (paths, months))
+
+
+def check_sensitivities(rtol=1e-4, conventions=SENSITIVITY_CONVENTIONS):
+    """
+    Check the analytic sensitivities against central finite differences
+
+    Rate and principal are bumped by small amounts and the term by one
+    payment, and payments, total interest and balances are recomputed with
+    generate_payment_schedules and calculate_loan_state. Also run by the
+    benchmark runner before timing.
+
+    Parameters:
+    -----------
+    rtol : float, optional
+        Relative tolerance of the comparison
+    conventions : sequence of tuple, optional
+        (frequency, compounding) pairs to check
+
+    Returns:
+    --------
+    list of str
+        Descriptions of the disagreements (empty when all derivatives agree)
+    """
+    loan_amounts = np.array([300000.0, 150000.0, 500000.0, 90000.0])
+    interest_rates = np.array([6.5, 0.0, 3.2, 12.0])
+    loan_terms_years = np.array([30.0, 15.0, 25.0, 10.0])
+    months = [0, 1, 60, 119, 120, 300, 360]
+    bumps = {'rate': 1e-4, 'principal': 1.0}
+    problems = []
+
+    for frequency, compounding in conventions:
+        def values(amounts=loan_amounts, rates=interest_rates, terms=loan_terms_years):
+            schedules = generate_payment_schedules(amounts, rates, terms, frequency=frequency,
+                                                   compounding=compounding)
+            state = calculate_loan_state(amounts, rates, terms, months, frequency=frequency,
+                                         compounding=compounding)
+            return {
+                'payment': schedules['payment'][:, 0],
+                'total_interest': schedules['interest'].sum(axis=1),
+                'remaining_loan': state['remaining_loan']
+            }
+
+        sensitivities = calculate_sensitivities(
+            loan_amounts, interest_rates, loan_terms_years, months, frequency, compounding)
+        term_step = 1 / payments_per_year(frequency)
+        numeric = {
+            'rate': (values(rates=interest_rates + bumps['rate']),
+                     values(rates=interest_rates - bumps['rate']), 2 * bumps['rate']),
+            'principal': (values(amounts=loan_amounts + bumps['principal']),
+                          values(amounts=loan_amounts - bumps['principal']), 2 * bumps['principal']),
+            'term': (values(terms=loan_terms_years + term_step),
+                     values(terms=loan_terms_years - term_step), 2 * term_step)
+        }
+
+        for quantity, derivatives in sensitivities.items():
+            for name, (up, down, step) in numeric.items():
+                expected = (up[quantity] - down[quantity]) / step
+                actual = derivatives[name]
+                if quantity == 'remaining_loan' and name == 'term':
+                    # One payment more or less moves the repayment date across the queried month
+                    paid = np.asarray(months) >= loan_terms_years[:, np.newaxis] * 12 - 1
+                    expected, actual = np.where(paid, 0.0, expected), np.where(paid, 0.0, actual)
+                scale = np.abs(expected).max() or 1.0
+                if not np.allclose(actual, expected, rtol=rtol, atol=rtol * scale):
+                    problems.append(f'{frequency}.{quantity}.{name}: max difference '
+                                    f'{np.abs(actual - expected).max():.3g}')
+    return problems
@@ -0,0 +1,155 @@
+import pytest
+from flask import Flask, Response, jsonify
+
+from backend.api.app import create_app
+from backend.api.utils.admission import CLIENT_CONCURRENCY_ENV, COST_BUDGET_SCALE_ENV, AdmissionRule, init_admission
+from backend.api.utils.validation import Array, Integer, Number, Object, String
+
+CLIENT = '127.0.0.1'
+
+RULE = AdmissionRule(
+    {
+        'size': Integer(True, minimum=1, maximum=1000),
+        'rate': Number(minimum=0, maximum=100, exclusive_minimum=True),
+        'mode': String(choices=('fast', 'exact')),
+        'items': Array(Object({'value': Number(True)}), max_items=3)
+    },
+    cost=lambda body: body['size'] * 10,
+    budget=5000,
+    check=lambda body: 'fast mode needs a rate.' if body.get('mode') == 'fast' and body.get('rate') is None else None
+)
+
+
+def make_app():
+    app = Flask(__name__)
+    init_admission(app, {'ok': RULE, 'fail': RULE, 'stream': RULE})
+
+    @app.route('/ok', methods=['POST'])
+    def ok():
+        return jsonify({'active': app.extensions['client_limiter'].active(CLIENT)})
+
+    @app.route('/fail', methods=['POST'])
+    def fail():
+        raise RuntimeError('route failed')
+
+    @app.route('/stream', methods=['POST'])
+    def stream():
+        return Response((str(i) for i in range(3)), mimetype='text/plain')
+
+    @app.route('/free', methods=['POST'])
+    def free():
+        return 'free'
+
+    return app
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv(CLIENT_CONCURRENCY_ENV, '2')
+    monkeypatch.delenv(COST_BUDGET_SCALE_ENV, raising=False)
+    return make_app()
+
+
+@pytest.fixture
+def limiter(app):
+    return app.extensions['client_limiter']
+
+
+@pytest.mark.parametrize('body, message', [
+    ([1, 2], 'Request body must be a JSON object.'),
+    ({}, 'size is required.'),
+    ({'size': 'ten'}, 'size must be a number.'),
+    ({'size': 2.5}, 'size must be an integer.'),
+    ({'size': True}, 'size must be a number.'),
+    ({'size': 0}, 'size must be at least 1.'),
+    ({'size': 1001}, 'size must be at most 1000.'),
+    ({'size': 1, 'rate': 0}, 'rate must be greater than 0.'),
+    ({'size': 1, 'mode': 'slow'}, 'mode must be one of fast, exact.'),
+    ({'size': 1, 'items': [{'value': 1}] * 4}, 'items must have at most 3 item(s).'),
+    ({'size': 1, 'items': [{'value': 1}, {}]}, 'items[1].value is required.'),
+    ({'size': 1, 'mode': 'fast'}, 'fast mode needs a rate.')
+])
+def test_invalid_body(app, body, message):
+    response = app.test_client().post('/ok', json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': message}
+
+
+def test_valid_body_holds_a_slot_while_the_route_runs(app, limiter):
+    response = app.test_client().post('/ok', json={'size': 10, 'mode': 'fast', 'rate': 5})
+    assert response.status_code == 200
+    assert response.get_json() == {'active': 1}
+    assert limiter.active(CLIENT) == 0
+
+
+def test_cost_budget(app, limiter):
+    client = app.test_client()
+    assert client.post('/ok', json={'size': 500}).status_code == 200
+    response = client.post('/ok', json={'size': 501})
+    assert response.status_code == 413
+    assert 'estimated cost 5,010 exceeds the budget of 5,000' in response.get_json()['error']
+    assert limiter.active(CLIENT) == 0
+
+
+def test_cost_budget_scale(monkeypatch):
+    monkeypatch.setenv(COST_BUDGET_SCALE_ENV, '2')
+    assert make_app().test_client().post('/ok', json={'size': 1000}).status_code == 200
+
+
+def test_concurrency_limit(app, limiter):
+    client = app.test_client()
+    assert limiter.acquire(CLIENT) and limiter.acquire(CLIENT)
+
+    response = client.post('/ok', json={'size': 1})
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '1'
+    assert limiter.active(CLIENT) == 2
+    # Endpoints without a rule are not limited
+    assert client.post('/free').status_code == 200
+
+    limiter.release(CLIENT)
+    assert client.post('/ok', json={'size': 1}).status_code == 200
+    assert limiter.active(CLIENT) == 1
+
+
+def test_slot_released_after_an_exception(app, limiter):
+    client = app.test_client()
+    for _ in range(3):
+        # The 500 response is released when the server closes it, like streamed ones
+        with client.post('/fail', json={'size': 1}) as response:
+            assert response.status_code == 500
+    assert limiter.active(CLIENT) == 0
+
+
+def test_slot_released_when_the_exception_propagates(app, limiter):
+    # No response is built (testing mode): only the teardown hook runs
+    app.testing = True
+    client = app.test_client()
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            client.post('/fail', json={'size': 1})
+    assert limiter.active(CLIENT) == 0
+
+
+def test_streamed_slot_released_when_closed(app, limiter):
+    response = app.test_client().post('/stream', json={'size': 1})
+    assert response.status_code == 200
+    assert limiter.active(CLIENT) == 1
+    assert response.get_data() == b'012'
+    response.close()
+    assert limiter.active(CLIENT) == 0
+
+
+@pytest.mark.parametrize('path, body, message', [
+    ('/api/calculate', {'loanAmount': 100000, 'interestRate': 5, 'loanTermYears': 0.01},
+     'loanTermYears must cover at least one monthly payment.'),
+    ('/api/scenarios/restructuring', {'loanAmount': 100000, 'originalInterestRate': 5, 'originalTermYears': 10,
+                                      'monthsPaid': 120, 'newInterestRate': 4},
+     'monthsPaid must be less than the original term.'),
+    ('/api/calculate/batch', {'loans': [{'loanAmount': 100000, 'interestRate': 5, 'loanTermYears': 10}] * 10001},
+     'loans must have at most 10000 item(s).')
+])
+def test_api_rules(path, body, message):
+    response = create_app().test_client().post(path, json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': message}
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from backend.core.amortization import ROUNDING_RULES, round_divide, round_to_cents
+from backend.core.calculators import generate_payment_schedule_cents, generate_payment_schedules
+
+LOANS = (
+    (250000.37, 6.125, 30),
+    (99999.99, 0.0, 15),
+    (1234567.89, 12.3456, 7.5),
+    (5000.01, 3.3333, 1)
+)
+
+
+@pytest.mark.parametrize('rounding', ROUNDING_RULES)
+@pytest.mark.parametrize('payment_type', ('annuity', 'differentiated'))
+@pytest.mark.parametrize('frequency', ('monthly', 'biweekly'))
+@pytest.mark.parametrize('loan_amount, interest_rate, loan_term_years', LOANS)
+def test_schedule_repays_exact_principal(loan_amount, interest_rate, loan_term_years,
+                                         frequency, payment_type, rounding):
+    schedule = generate_payment_schedule_cents(
+        loan_amount, interest_rate, loan_term_years, payment_type, rounding, frequency)
+    principal_cents = int(round_to_cents(loan_amount, rounding))
+
+    assert schedule['principal'].dtype == np.int64
+    assert int(schedule['principal'].sum()) == principal_cents
+    np.testing.assert_array_equal(schedule['payment'], schedule['principal'] + schedule['interest'])
+    np.testing.assert_array_equal(schedule['remaining_loan'],
+                                  principal_cents - np.cumsum(schedule['principal']))
+    assert schedule['remaining_loan'][-1] == 0
+
+
+@pytest.mark.parametrize('rounding', ROUNDING_RULES)
+@pytest.mark.parametrize('payment_type', ('annuity', 'differentiated'))
+def test_batch_matches_single_schedules(payment_type, rounding):
+    amounts, rates, terms = (list(column) for column in zip(*LOANS))
+    schedules = generate_payment_schedules(amounts, rates, terms, payment_type, rounding)
+
+    np.testing.assert_array_equal(schedules['principal'].sum(axis=1), round_to_cents(amounts, rounding))
+    for i, loan in enumerate(LOANS):
+        single = generate_payment_schedule_cents(*loan, payment_type, rounding)
+        months = schedules['months'][i]
+        assert months == len(single)
+        for name in ('payment', 'principal', 'interest', 'remaining_loan'):
+            np.testing.assert_array_equal(schedules[name][i, :months], single[name])
+            assert not schedules[name][i, months:].any()
+
+
+# 10/4 = 2.5, 14/4 = 3.5, 9/4 = 2.25, 11/4 = 2.75, 12/4 = 3
+@pytest.mark.parametrize('rounding, expected', [
+    ('half_up', [3, 4, 2, 3, 3]),
+    ('half_even', [2, 4, 2, 3, 3]),
+    ('down', [2, 3, 2, 2, 3]),
+    ('up', [3, 4, 3, 3, 3])
+])
+def test_round_divide(rounding, expected):
+    numerators = [10, 14, 9, 11, 12]
+    np.testing.assert_array_equal(round_divide(np.array(numerators), 4, rounding), expected)
+    assert [round_divide(numerator, 4, rounding) for numerator in numerators] == expected
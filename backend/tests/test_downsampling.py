@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from backend.api.app import create_app
+from backend.core.downsampling import lttb_indices
+
+
+def random_series(rng, n, count=2):
+    return np.cumsum(rng.normal(0, 1, (count, n)), axis=1)
+
+
+@pytest.mark.parametrize('n', (4, 10, 361, 1000))
+@pytest.mark.parametrize('max_points', (3, 5, 50, 200))
+def test_bounds_and_kept_rows(n, max_points):
+    rng = np.random.default_rng(n * max_points)
+    keep = rng.choice(n, size=min(n, 4), replace=False)
+    rows = lttb_indices(np.arange(1, n + 1), random_series(rng, n), max_points, keep)
+
+    assert len(rows) <= max_points
+    assert np.all(np.diff(rows) > 0)
+    assert rows[0] == 0 and rows[-1] == n - 1
+    if n > max_points and len(keep) + 2 <= max_points:
+        assert set(keep) <= set(rows)
+
+
+@pytest.mark.parametrize('n', (1, 2, 3, 50))
+def test_all_rows_when_few(n):
+    rows = lttb_indices(np.arange(n), np.arange(n, dtype=float), 50, keep=[n + 5, -1])
+    np.testing.assert_array_equal(rows, np.arange(n))
+
+
+def test_too_many_kept_rows_are_thinned():
+    keep = np.arange(0, 100, 5)
+    rows = lttb_indices(np.arange(100), np.zeros(100), 10, keep)
+    assert len(rows) == 10
+    assert set(rows) <= set(keep) | {99}
+    assert rows[0] == 0 and rows[-1] == 99
+
+
+@pytest.mark.parametrize('values', [np.full(500, np.nan), np.full(500, 7.0), np.zeros(500)])
+def test_flat_and_all_nan_series(values):
+    with np.errstate(all='raise'):
+        rows = lttb_indices(np.arange(500), values, 20)
+    assert len(rows) == 20
+    assert rows[0] == 0 and rows[-1] == 499
+
+
+def test_partly_nan_series():
+    values = np.sin(np.linspace(0, 6, 500))
+    values[100:200] = np.nan
+    rows = lttb_indices(np.arange(500), values, 30)
+    assert len(rows) == 30
+
+
+def test_peaks_are_kept():
+    values = np.zeros(1000)
+    values[[137, 642]] = [10.0, -10.0]
+    rows = lttb_indices(np.arange(1000), values, 40)
+    assert {137, 642} <= set(rows)
+
+
+def test_max_points_below_three():
+    with pytest.raises(ValueError):
+        lttb_indices(np.arange(10), np.arange(10.0), 2)
+
+
+# Falling property prices: buying only breaks even late in the term, as the loan is repaid
+COMPARE = {
+    'propertyValue': 400000, 'downPayment': 80000, 'interestRate': 6.0, 'loanTermYears': 30,
+    'monthlyRent': 1800, 'rentGrowthRate': 3.0, 'propertyGrowthRate': -5.0,
+    'maintenanceCostPercent': 1.0, 'propertyTaxPercent': 1.2, 'taxBenefitRate': 15,
+    'inflationRate': 2.5, 'opportunityCostRate': 0
+}
+
+
+@pytest.mark.parametrize('max_points', (3, 20, 120))
+def test_compare_keeps_break_even_month(max_points):
+    client = create_app().test_client()
+    full = client.post('/api/compare', json=COMPARE).get_json()
+    body = client.post('/api/compare', json=dict(COMPARE, maxPoints=max_points)).get_json()
+
+    break_even_month = full['breakEvenMonth']
+    assert break_even_month is not None and break_even_month > 300
+    assert body['breakEvenMonth'] == break_even_month
+
+    rows = body['comparison']
+    months = [row['month'] for row in rows]
+    assert len(rows) <= max(max_points, 3)
+    assert months[0] == 1 and months[-1] == 360
+    if max_points > 3:
+        assert break_even_month in months
+        # Identical rows to the full response
+        by_month = {row['month']: row for row in full['comparison']}
+        assert all(row == by_month[row['month']] for row in rows)
+        first_true = next(row['month'] for row in rows if row['breakEven'])
+        assert first_true == break_even_month
@@ -0,0 +1,120 @@
+import csv
+import gzip
+import io
+
+import numpy as np
+import pytest
+
+from backend.api import app as app_module
+from backend.api.app import create_app
+from backend.api.utils.export import EXPORT_CHUNK_LOANS
+from backend.core.calculators import generate_payment_schedules
+
+LOANS = [
+    {'loanAmount': 250000, 'interestRate': 6.5, 'loanTermYears': 30},
+    {'loanAmount': 90000, 'interestRate': 0, 'loanTermYears': 10},
+    {'loanAmount': 12000.5, 'interestRate': 11.75, 'loanTermYears': 2.5}
+]
+
+
+@pytest.fixture
+def client():
+    return create_app().test_client()
+
+
+def read_csv(data):
+    rows = list(csv.reader(io.StringIO(data.decode())))
+    return rows[0], rows[1:]
+
+
+def expected_rows(loans, **options):
+    schedules = generate_payment_schedules(
+        [loan['loanAmount'] for loan in loans], [loan['interestRate'] for loan in loans],
+        [loan['loanTermYears'] for loan in loans], **options)
+    return schedules, int(schedules['months'].sum())
+
+
+def test_csv_header_and_rows(client):
+    response = client.post('/api/export', json={'loans': LOANS})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    header, rows = read_csv(response.data)
+    assert header == ['loan', 'month', 'payment', 'principal', 'interest', 'remaining_loan']
+
+    schedules, total_rows = expected_rows(LOANS)
+    assert len(rows) == total_rows
+    values = np.array(rows, dtype=float)
+    for i, months in enumerate(schedules['months']):
+        loan_rows = values[values[:, 0] == i]
+        np.testing.assert_array_equal(loan_rows[:, 1], np.arange(1, months + 1))
+        for j, name in enumerate(('payment', 'principal', 'interest', 'remaining_loan'), start=2):
+            # Full precision: the shortest repr reads back as the same float
+            np.testing.assert_array_equal(loan_rows[:, j], schedules[name][i, :months])
+
+
+def test_biweekly_rows_are_numbered_by_period(client):
+    response = client.post('/api/export', json={'loans': LOANS, 'paymentFrequency': 'biweekly'})
+    header, rows = read_csv(response.data)
+    assert header[1] == 'period'
+    assert len(rows) == expected_rows(LOANS, frequency='biweekly')[1]
+
+
+def test_gzip_decompresses_to_the_csv(client):
+    plain = client.post('/api/export', json={'loans': LOANS}).data
+    response = client.post('/api/export', json={'loans': LOANS, 'compression': 'gzip'})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/gzip'
+    assert gzip.decompress(response.data) == plain
+
+
+def test_decimals(client):
+    response = client.post('/api/export', json={'loans': LOANS, 'decimals': 2})
+    header, rows = read_csv(response.data)
+    for row in rows:
+        assert all(value.isdigit() for value in row[:2])
+        assert all(len(value.rpartition('.')[2]) == 2 for value in row[2:])
+
+
+def test_cents_rounding(client):
+    response = client.post('/api/export', json={'loans': LOANS, 'rounding': 'half_even'})
+    _, rows = read_csv(response.data)
+    values = np.array(rows, dtype=float)
+    for i, loan in enumerate(LOANS):
+        assert values[values[:, 0] == i, 3].sum() == pytest.approx(loan['loanAmount'], abs=1e-6)
+
+
+def test_batch_spanning_several_chunks(client):
+    loans = [dict(LOANS[i % len(LOANS)], loanAmount=1000 + i) for i in range(2 * EXPORT_CHUNK_LOANS + 10)]
+    response = client.post('/api/export', json={'loans': loans, 'compression': 'gzip'})
+    assert response.status_code == 200
+    header, rows = read_csv(gzip.decompress(response.data))
+
+    schedules, total_rows = expected_rows(loans)
+    assert len(rows) == total_rows
+    values = np.array(rows, dtype=float)
+    np.testing.assert_array_equal(np.bincount(values[:, 0].astype(int)), schedules['months'])
+    np.testing.assert_array_equal(values[:, 2], schedules['payment'][values[:, 0].astype(int), values[:, 1].astype(int) - 1])
+
+
+def test_parquet_without_pyarrow(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'parquet_available', lambda: False)
+    response = client.post('/api/export', json={'loans': LOANS, 'format': 'parquet'})
+    assert response.status_code == 400
+    assert 'pyarrow' in response.get_json()['error']
+
+
+def test_error_in_first_chunk_is_reported_with_its_status(client, monkeypatch):
+    def failing_chunks(*args, **kwargs):
+        raise ValueError('Cannot amortize these loans')
+        yield
+
+    monkeypatch.setattr(app_module, 'batch_chunks', failing_chunks)
+    response = client.post('/api/export', json={'loans': LOANS})
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Cannot amortize these loans'}
+
+
+def test_cents_without_compounding_per_payment(client):
+    response = client.post('/api/export', json={
+        'loans': LOANS, 'rounding': 'half_up', 'paymentFrequency': 'weekly', 'compounding': 'monthly'})
+    assert response.status_code == 400
@@ -0,0 +1,147 @@
+import numpy as np
+import pytest
+
+from backend.api.app import create_app
+from backend.core import fx_history as fx_history_module
+from backend.core.fx_history import FxHistory, import_fx_csv, payment_dates, rates_with_projection, to_days
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = FxHistory(str(tmp_path), check_interval=0)
+    history.write('USD', 'EUR', to_days(['2020-01-01', '2020-01-03', '2020-01-06']), [0.90, 0.92, 0.95])
+    history.write('USD', 'JPY', to_days(['2020-01-02', '2020-01-03', '2020-01-07']), [108.0, 109.0, 110.0])
+    return history
+
+
+def test_write_merges_and_replaces_same_day(history):
+    count = history.write('USD', 'EUR', to_days(['2020-01-03', '2020-01-02', '2020-01-10', '2020-01-10']),
+                          [0.93, 0.91, 0.97, 0.98])
+    assert count == 5
+
+    series = history.series('USD', 'EUR')
+    np.testing.assert_array_equal(series.days, to_days(['2020-01-01', '2020-01-02', '2020-01-03',
+                                                        '2020-01-06', '2020-01-10']))
+    # Written rows replace stored ones of the same day; the last of duplicate days wins
+    np.testing.assert_array_equal(series.rates, [0.90, 0.91, 0.93, 0.95, 0.98])
+    assert history.pairs() == [('USD', 'EUR'), ('USD', 'JPY')]
+
+
+def test_as_of(history):
+    series = history.series('USD', 'EUR')
+    rates = series.as_of(np.array(['2019-12-31', '2020-01-01', '2020-01-02', '2020-01-03', '2020-01-05',
+                                   '2020-01-06', '2021-06-01'], dtype='datetime64[D]'))
+    assert np.isnan(rates[0])
+    np.testing.assert_array_equal(rates[1:], [0.90, 0.90, 0.92, 0.92, 0.95, 0.95])
+
+
+def test_range(history):
+    dates, rates = history.series('USD', 'EUR').range('2020-01-02', '2020-01-06')
+    np.testing.assert_array_equal(dates, np.array(['2020-01-03', '2020-01-06'], dtype='datetime64[D]'))
+    np.testing.assert_array_equal(rates, [0.92, 0.95])
+
+
+def test_reverse_pair_is_inverted(history):
+    series = history.series('EUR', 'USD')
+    np.testing.assert_array_equal(series.days, history.series('USD', 'EUR').days)
+    np.testing.assert_allclose(series.as_of(['2020-01-04']), [1 / 0.92])
+    np.testing.assert_allclose(series.inverted().as_of(['2020-01-04']), [0.92])
+
+
+def test_cross_pair_is_triangulated(history):
+    series = history.series('EUR', 'JPY')
+    # Days of either series once both have started
+    np.testing.assert_array_equal(series.days, to_days(['2020-01-02', '2020-01-03', '2020-01-06', '2020-01-07']))
+    np.testing.assert_allclose(series.rates, [108.0 / 0.90, 109.0 / 0.92, 109.0 / 0.95, 110.0 / 0.95])
+
+    with pytest.raises(ValueError, match='No exchange rate history for EUR/RUB'):
+        history.series('EUR', 'RUB')
+
+
+def test_reimport_is_picked_up(history, tmp_path):
+    series = history.series('USD', 'EUR')
+    assert series.last_day == to_days('2020-01-06')
+
+    # Another worker imports newer rows into the same directory
+    csv_path = tmp_path / 'rates.csv'
+    csv_path.write_text('date,EUR,JPY\n2020-01-08,0.96,111.0\n2020-01-06,0.94,\n')
+    counts = import_fx_csv(str(csv_path), FxHistory(str(tmp_path)), base='USD')
+    assert counts == {'USD/EUR': 4, 'USD/JPY': 4}
+
+    series = history.series('USD', 'EUR')
+    assert series.last_day == to_days('2020-01-08')
+    np.testing.assert_array_equal(series.as_of(['2020-01-06', '2020-01-08']), [0.94, 0.96])
+
+
+def test_long_format_import(tmp_path):
+    history = FxHistory(str(tmp_path))
+    csv_path = tmp_path / 'rates.csv'
+    csv_path.write_text('date,base,quote,rate\n2021-03-01,GBP,USD,1.39\n2021-03-02,GBP,USD,1.40\n')
+    assert import_fx_csv(str(csv_path), history) == {'GBP/USD': 2}
+    np.testing.assert_allclose(history.series('USD', 'GBP').as_of(['2021-03-05']), [1 / 1.40])
+
+
+def test_rates_with_projection(history):
+    series = history.series('USD', 'EUR')
+    dates = payment_dates('2020-01-02', 4)
+    rates, historical = rates_with_projection(series, dates, 0.01)
+    np.testing.assert_array_equal(historical, [True, False, False, False])
+    # Projected one step per calendar month after the last observation (January 6)
+    np.testing.assert_allclose(rates, [0.90, 0.95 * 1.01, 0.95 * 1.01 ** 2, 0.95 * 1.01 ** 3])
+
+    with pytest.raises(ValueError, match='history starts on 2020-01-01'):
+        rates_with_projection(series, payment_dates('2019-12-15', 2), 0.0)
+
+
+def test_payment_dates_clip_to_month_end():
+    np.testing.assert_array_equal(payment_dates('2024-01-31', 3, offset=0),
+                                  np.array(['2024-01-31', '2024-02-29', '2024-03-31'], dtype='datetime64[D]'))
+    np.testing.assert_array_equal(payment_dates('2024-01-31', 2, offset=1),
+                                  np.array(['2024-02-29', '2024-03-31'], dtype='datetime64[D]'))
+
+
+@pytest.fixture
+def monthly_history(tmp_path, monkeypatch):
+    history = FxHistory(str(tmp_path))
+    days = np.arange(to_days('2015-01-01'), to_days('2019-12-31') + 1)
+    history.write('USD', 'EUR', days, np.linspace(0.8, 1.0, len(days)))
+    monkeypatch.setattr(fx_history_module, '_default_history', history)
+    return history
+
+
+def post_currency(start_date):
+    return create_app().test_client().post('/api/currency', json={
+        'loanAmount': 200000, 'interestRate': 5, 'loanTermYears': 10, 'baseCurrency': 'USD',
+        'targetCurrencies': ['USD', 'EUR'], 'startDate': start_date,
+        # Months after the history keep its last rate
+        'currencyAnnualChange': {'USD': {'EUR': 0}}})
+
+
+def test_currency_endpoint_before_history(monthly_history):
+    response = post_currency('2014-06-01')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'USD/EUR: Exchange rate history starts on 2015-01-01'}
+
+
+def test_currency_endpoint_inside_history(monthly_history):
+    response = post_currency('2018-01-15')
+    assert response.status_code == 200
+    body = response.get_json()
+    # January 2018 to December 2019 are priced from history
+    assert body['historicalMonths'] == {'EUR': 24}
+
+    series = monthly_history.series('USD', 'EUR')
+    rows = body['currencyAnalysis']
+    for row, date in zip(rows[:24], payment_dates('2018-01-15', 24)):
+        assert row['rate_EUR'] == pytest.approx(series.as_of([date])[0], rel=1e-12)
+    assert all(row['rate_EUR'] == pytest.approx(1.0, rel=1e-12) for row in rows[24:])
+    assert rows[30]['payment_EUR'] == pytest.approx(rows[30]['payment_USD'] * rows[30]['rate_EUR'], rel=1e-12)
+
+
+def test_currency_endpoint_after_history(monthly_history):
+    response = post_currency('2021-01-01')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['historicalMonths'] == {'EUR': 0}
+    assert len(body['currencyAnalysis']) == 120
+    assert all(row['rate_EUR'] == pytest.approx(1.0, rel=1e-12) for row in body['currencyAnalysis'])
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from backend.core.incremental import apply_delta, build_snapshot, normalize_scenario
+
+LOAN_TERM_YEARS = 25
+
+
+def random_delta(rng, months):
+    """
+    A few rate changes (some removals) and early payments (some removals) at random months
+    """
+    rate_changes = [
+        {'month': int(month), 'rate': None if rng.random() < 0.2 else round(float(rng.uniform(2, 12)), 3)}
+        for month in rng.integers(1, months + 1, rng.integers(0, 3))
+    ]
+    early_payments = [
+        {'month': int(month), 'amount': 0 if rng.random() < 0.2 else round(float(rng.uniform(1000, 40000)), 2),
+         'type': 'reduce_payment' if rng.random() < 0.5 else 'reduce_term'}
+        for month in rng.integers(1, months + 1, rng.integers(0, 3))
+    ]
+    return rate_changes, early_payments
+
+
+def assert_same_schedule(actual, expected):
+    assert actual.params == expected.params
+    assert len(actual) == len(expected)
+    for name in expected.schedule.columns:
+        np.testing.assert_allclose(actual.schedule[name], expected.schedule[name], rtol=1e-9, atol=1e-7)
+    composite, reference = actual.to_schedule(), expected.to_schedule()
+    for name in reference.columns:
+        np.testing.assert_allclose(composite[name], reference[name], rtol=1e-9, atol=1e-7)
+
+
+@pytest.mark.parametrize('frequency, compounding', [('monthly', 'payment'), ('biweekly', 'semi_annual')])
+def test_delta_matches_full_recompute(frequency, compounding):
+    rng = np.random.default_rng(7)
+    months = LOAN_TERM_YEARS * 12
+    snapshot = build_snapshot(normalize_scenario(
+        250000, 5.0, LOAN_TERM_YEARS,
+        [{'month': 24, 'rate': 6.0}, {'month': 120, 'rate': 4.5}],
+        [{'month': 36, 'amount': 15000, 'type': 'reduce_payment'}, {'month': 90, 'amount': 20000}],
+        {'rate': 0.3, 'type': 'balance'}, frequency, compounding))
+
+    for _ in range(100):
+        rate_changes, early_payments = random_delta(rng, months)
+        edited, first_recomputed = apply_delta(snapshot, rate_changes, early_payments)
+        assert_same_schedule(edited, build_snapshot(edited.params))
+
+        if first_recomputed is None:
+            assert edited.schedule is snapshot.schedule
+        else:
+            reused = first_recomputed - 1
+            for name in snapshot.schedule.columns:
+                np.testing.assert_array_equal(edited.schedule[name][:reused], snapshot.schedule[name][:reused])
+
+        # Successive requests on a cached scenario edit the previous result
+        chained, _ = apply_delta(edited, *random_delta(rng, months))
+        assert_same_schedule(chained, build_snapshot(chained.params))
+
+
+def test_empty_delta_reuses_schedule():
+    snapshot = build_snapshot(normalize_scenario(200000, 4.0, 20, early_payments=[{'month': 12, 'amount': 5000}]))
+    edited, first_recomputed = apply_delta(snapshot)
+    assert first_recomputed is None
+    assert edited.schedule is snapshot.schedule
+    assert edited.scenario_id == snapshot.scenario_id
+
+
+def test_removing_every_event_restores_plain_schedule():
+    plain = build_snapshot(normalize_scenario(200000, 4.0, 20))
+    snapshot = build_snapshot(normalize_scenario(
+        200000, 4.0, 20, [{'month': 60, 'rate': 7.0}], [{'month': 12, 'amount': 5000}]))
+    edited, first_recomputed = apply_delta(
+        snapshot, [{'month': 60, 'rate': None}], [{'month': 12, 'amount': 0}])
+    assert first_recomputed == 12
+    assert_same_schedule(edited, plain)
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from backend.core.amortization import ROUNDING_RULES
+from backend.core.kernels import BACKENDS, load_backend
+from backend.tests.helpers import kernel_cents_inputs, kernel_inputs, kernel_paths_inputs
+
+LOAN_AMOUNT = 300000
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    try:
+        return load_backend(request.param)
+    except ImportError:
+        pytest.skip(f'{request.param} is not installed')
+
+
+@pytest.fixture
+def reference():
+    return load_backend('numpy')
+
+
+@pytest.mark.parametrize('events', (0, 10, 100))
+def test_amortize_events(backend, reference, events):
+    balance, monthly_rates, prepayments, reduce_payment, months = inputs = kernel_inputs(events, LOAN_AMOUNT)
+    schedule = backend.amortize_events(*inputs)
+
+    # Interest on the opening balance every month, and the loan repaid in full
+    opening = np.concatenate(([balance], schedule['remaining_loan'][:-1]))
+    np.testing.assert_allclose(schedule['interest'], opening * monthly_rates[:len(opening)], rtol=1e-9)
+    np.testing.assert_allclose(schedule['payment'], schedule['principal'] + schedule['interest'], rtol=1e-12)
+    np.testing.assert_allclose(schedule['remaining_loan'], opening - schedule['principal'],
+                               atol=1e-6 * LOAN_AMOUNT)
+    assert schedule['principal'].sum() == pytest.approx(balance, rel=1e-12)
+    assert schedule['remaining_loan'][-1] == pytest.approx(0.0, abs=1e-6)
+    assert len(schedule['payment']) <= months
+
+    expected = reference.amortize_events(*inputs)
+    for name, values in expected.items():
+        np.testing.assert_allclose(schedule[name], values, rtol=1e-9, atol=1e-9 * LOAN_AMOUNT)
+
+
+@pytest.mark.parametrize('rounding', ROUNDING_RULES)
+@pytest.mark.parametrize('payment_type', ('annuity', 'differentiated'))
+def test_amortize_cents(backend, reference, rounding, payment_type):
+    principal_cents, rate_units, months, payment_cents = kernel_cents_inputs(100)
+    if payment_type == 'differentiated':
+        payment_cents = None
+    schedules = backend.amortize_cents(principal_cents, rate_units, months, payment_cents, rounding)
+
+    for name in ('payment', 'principal', 'interest', 'remaining_loan'):
+        assert schedules[name].dtype == np.int64
+    np.testing.assert_array_equal(schedules['principal'].sum(axis=1), principal_cents)
+    np.testing.assert_array_equal(schedules['payment'], schedules['principal'] + schedules['interest'])
+    np.testing.assert_array_equal(schedules['remaining_loan'][np.arange(len(months)), months - 1], 0)
+
+    expected = reference.amortize_cents(principal_cents, rate_units, months, payment_cents, rounding)
+    for name, values in expected.items():
+        np.testing.assert_array_equal(schedules[name], values)
+
+
+def test_compound_paths(backend):
+    initial_values, monthly_returns = kernel_paths_inputs(100)
+    np.testing.assert_allclose(
+        backend.compound_paths(initial_values, monthly_returns),
+        initial_values[:, np.newaxis] * np.cumprod(1 + monthly_returns, axis=1),
+        rtol=1e-12)
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from backend.api.app import create_app
+from backend.core.amortization import payments_by_month
+from backend.core.calculators import calculate_loan_state, generate_payment_schedule
+
+LOANS = (
+    (300000.0, 6.5, 30),
+    (150000.0, 0.0, 15),
+    (80000.0, 11.25, 7.5)
+)
+MONTHS = [0, 1, 2, 59, 60, 89, 90, 91, 179, 180, 181, 359, 360, 400]
+
+
+def schedule_state(loan_amount, interest_rate, loan_term_years, months, payment_type, frequency):
+    """
+    Remaining balance, cumulative interest and principal read off the materialized schedule
+    """
+    schedule = generate_payment_schedule(loan_amount, interest_rate, loan_term_years, payment_type,
+                                         frequency=frequency)
+    paid = np.minimum(np.asarray(payments_by_month(np.array(months), frequency), dtype=int), len(schedule))
+    remaining = np.concatenate(([loan_amount], schedule['remaining_loan']))[paid]
+    interest = np.concatenate(([0.0], np.cumsum(schedule['interest'])))[paid]
+    principal = np.concatenate(([0.0], np.cumsum(schedule['principal'])))[paid]
+    return remaining, interest, principal
+
+
+@pytest.mark.parametrize('frequency', ('monthly', 'biweekly', 'weekly'))
+@pytest.mark.parametrize('payment_type', ('annuity', 'differentiated'))
+def test_loan_state_matches_schedule(payment_type, frequency):
+    amounts, rates, terms = (list(column) for column in zip(*LOANS))
+    state = calculate_loan_state(amounts, rates, terms, MONTHS, payment_type, frequency)
+
+    for i, loan in enumerate(LOANS):
+        remaining, interest, principal = schedule_state(*loan, MONTHS, payment_type, frequency)
+        np.testing.assert_allclose(state['remaining_loan'][i], remaining, rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(state['cumulative_interest'][i], interest, rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(state['cumulative_principal'][i], principal, rtol=1e-9, atol=1e-6)
+
+
+def test_mixed_payment_types():
+    amounts, rates, terms = (list(column) for column in zip(*LOANS))
+    payment_types = ['annuity', 'differentiated', 'annuity']
+    state = calculate_loan_state(amounts, rates, terms, MONTHS, payment_types)
+
+    for i, (loan, payment_type) in enumerate(zip(LOANS, payment_types)):
+        remaining, _, _ = schedule_state(*loan, MONTHS, payment_type, 'monthly')
+        np.testing.assert_allclose(state['remaining_loan'][i], remaining, rtol=1e-9, atol=1e-6)
+
+
+def test_query_endpoint_matches_schedule():
+    client = create_app().test_client()
+    response = client.post('/api/query', json={
+        'loans': [
+            {'loanAmount': amount, 'interestRate': rate, 'loanTermYears': term}
+            for amount, rate, term in LOANS
+        ],
+        'months': MONTHS,
+        'paymentType': 'differentiated',
+        'paymentFrequency': 'biweekly'
+    })
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['months'] == MONTHS
+
+    for result, loan in zip(body['results'], LOANS):
+        remaining, interest, principal = schedule_state(*loan, MONTHS, 'differentiated', 'biweekly')
+        np.testing.assert_allclose(result['remainingLoan'], remaining, rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(result['cumulativeInterest'], interest, rtol=1e-9, atol=1e-6)
+        np.testing.assert_allclose(result['cumulativePrincipal'], principal, rtol=1e-9, atol=1e-6)
@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+import pytest
+
+from backend.core.forecast import PROPERTY_SEASONAL_FACTORS, forecast_property_value, ml_trend_model
+from backend.core.model_cache import ModelCache, model_key
+
+
+class Fitter:
+    """
+    fit() callable for a key that counts its calls
+    """
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {'model': self.value}
+
+
+def test_lru_eviction():
+    lookups = []
+    cache = ModelCache(maxsize=2, on_lookup=lookups.append)
+    fitters = {key: Fitter(key) for key in 'abc'}
+
+    cache.get_or_fit('a', fitters['a'])
+    cache.get_or_fit('b', fitters['b'])
+    # Using "a" makes "b" the least recently used entry
+    assert cache.get_or_fit('a', fitters['a']) == {'model': 'a'}
+    cache.get_or_fit('c', fitters['c'])
+
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.get('a') == {'model': 'a'} and cache.get('c') == {'model': 'c'}
+    cache.get_or_fit('b', fitters['b'])
+    assert {key: fitter.calls for key, fitter in fitters.items()} == {'a': 1, 'b': 2, 'c': 1}
+    assert lookups == [False, False, True, False, False]
+
+
+def test_reload_from_directory_without_refitting(tmp_path):
+    directory = str(tmp_path / 'models')
+    fitter = Fitter(np.arange(5.0))
+    first = ModelCache(directory=directory)
+    first.get_or_fit('trend', fitter)
+    assert os.listdir(directory) == ['trend.joblib']
+
+    # Another worker sharing the directory, and the same one after its memory is cleared
+    lookups = []
+    second = ModelCache(directory=directory, on_lookup=lookups.append)
+    np.testing.assert_array_equal(second.get_or_fit('trend', fitter)['model'], np.arange(5.0))
+    first.clear()
+    assert len(first) == 0
+    np.testing.assert_array_equal(first.get_or_fit('trend', fitter)['model'], np.arange(5.0))
+
+    assert fitter.calls == 1
+    assert lookups == [True]
+    assert len(second) == 1
+
+
+def test_unreadable_file_is_refitted(tmp_path):
+    (tmp_path / 'broken.joblib').write_bytes(b'')
+    fitter = Fitter(1)
+    cache = ModelCache(directory=str(tmp_path))
+    assert cache.get_or_fit('broken', fitter) == {'model': 1}
+    assert fitter.calls == 1
+    assert ModelCache(directory=str(tmp_path)).get('broken') == {'model': 1}
+
+
+def test_model_key():
+    assert model_key('trend', 4.0, [1.0], 12, 0) == model_key('trend', 4.0, [1.0], 12, 0)
+    assert model_key('trend', 4.0, [1.0], 12, 0) != model_key('trend', 4.0, [1.0], 12, 1)
+
+
+@pytest.mark.parametrize('seed', (0, 5))
+def test_cached_forecast_matches_refitted(tmp_path, seed):
+    expected = forecast_property_value(300000, 4.0, 5, model='ml', seed=seed)
+    cache = ModelCache(directory=str(tmp_path))
+    for _ in range(2):
+        forecast = forecast_property_value(300000, 4.0, 5, model='ml', seed=seed, model_cache=cache)
+        np.testing.assert_array_equal(forecast['nominal_value'], expected['nominal_value'])
+
+    # Reloaded from disk by a new cache
+    reloaded = ml_trend_model(4.0, PROPERTY_SEASONAL_FACTORS, 60, seed, ModelCache(directory=str(tmp_path)))
+    np.testing.assert_array_equal(reloaded.coef_, ml_trend_model(4.0, PROPERTY_SEASONAL_FACTORS, 60, seed).coef_)
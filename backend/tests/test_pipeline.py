@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+
+from backend.core.calculators import generate_payment_schedule
+from backend.core.comparison import calculate_rent_vs_buy, rent_vs_buy_blocks, rent_vs_buy_summary
+from backend.core.currency import calculate_mortgage_in_multiple_currencies, currency_summary
+from backend.core.fx_history import FxHistory, to_days
+from backend.core.pipeline import collect_blocks, schedule_blocks, summarize_blocks
+
+# 1 row, a divisor of the 120-month term (the last block ends at payoff), and uneven chunks
+CHUNK_SIZES = (1, 7, 40, 119, 120, 500)
+
+RENT_VS_BUY = {
+    'property_value': 400000,
+    'down_payment': 80000,
+    'interest_rate': 6.0,
+    'loan_term_years': 10,
+    'monthly_rent': 1800,
+    'rent_growth_rate': 3.0,
+    'property_growth_rate': 4.0,
+    'maintenance_cost_percent': 1.0,
+    'property_tax_percent': 1.2,
+    'tax_benefit_rate': 15,
+    'inflation_rate': 2.5,
+    'opportunity_cost_rate': 6.0
+}
+
+
+def assert_same_table(actual, expected):
+    assert list(actual.columns) == list(expected.columns)
+    assert len(actual) == len(expected)
+    for name in expected.columns:
+        np.testing.assert_allclose(np.asarray(actual[name], dtype=float), np.asarray(expected[name], dtype=float),
+                                   rtol=1e-10, atol=1e-6)
+
+
+@pytest.mark.parametrize('chunk_months', CHUNK_SIZES)
+@pytest.mark.parametrize('frequency', ('monthly', 'biweekly'))
+def test_schedule_blocks_match_single_block(frequency, chunk_months):
+    single = collect_blocks(schedule_blocks(250000, 5.5, 10, None, frequency))
+    streamed = collect_blocks(schedule_blocks(250000, 5.5, 10, chunk_months, frequency))
+    assert_same_table(streamed, single)
+    assert streamed.first_month == 1
+    assert streamed['remaining_loan'][-1] == 0.0
+
+    reference = generate_payment_schedule(250000, 5.5, 10, frequency=frequency)
+    for name in ('payment', 'principal', 'interest', 'remaining_loan'):
+        np.testing.assert_allclose(streamed[name], reference[name], rtol=1e-10, atol=1e-6)
+
+
+def test_blocks_are_numbered_from_their_first_month():
+    blocks = list(schedule_blocks(100000, 4.0, 10, 40))
+    assert [block.first_month for block in blocks] == [1, 41, 81]
+    assert [len(block) for block in blocks] == [40, 40, 40]
+
+
+@pytest.mark.parametrize('chunk_months', CHUNK_SIZES)
+def test_rent_vs_buy_blocks_match_single_block(chunk_months):
+    expected = calculate_rent_vs_buy(**RENT_VS_BUY)
+    streamed = collect_blocks(rent_vs_buy_blocks(**RENT_VS_BUY, chunk_months=chunk_months)).to_dataframe()
+    assert list(streamed.columns) == list(expected.columns)
+    for name in expected.columns:
+        np.testing.assert_allclose(streamed[name].astype(float), expected[name].astype(float), rtol=1e-10, atol=1e-6)
+
+
+@pytest.mark.parametrize('chunk_months', CHUNK_SIZES)
+@pytest.mark.parametrize('changes', [
+    {},
+    # Break-even in month 6, and never
+    {'opportunity_cost_rate': 12, 'property_growth_rate': -5, 'monthly_rent': 300},
+    {'down_payment': 300000, 'property_growth_rate': -5}
+])
+def test_rent_vs_buy_summary_matches_table(changes, chunk_months):
+    params = dict(RENT_VS_BUY, **changes)
+    table = calculate_rent_vs_buy(**params)
+    summary = rent_vs_buy_summary(**params, chunk_months=chunk_months, columns=('month', 'net_worth_buy'))
+
+    break_even = table['break_even'].to_numpy()
+    expected_month = int(table['month'][break_even.argmax()]) if break_even.any() else None
+    assert summary['break_even_month'] == expected_month
+    assert summary['total_buy_costs'] == pytest.approx(table['total_buy_cost'].sum(), rel=1e-12)
+    assert summary['total_rent_costs'] == pytest.approx(table['total_rent_cost'].sum(), rel=1e-12)
+    assert summary['final_property_value'] == pytest.approx(table['property_value'].iloc[-1], rel=1e-12)
+    assert summary['final_investment_value'] == pytest.approx(table['investment_value'].iloc[-1], rel=1e-12)
+
+    comparison = summary['comparison']
+    assert list(comparison.columns) == ['month', 'net_worth_buy']
+    np.testing.assert_array_equal(comparison['month'], table['month'])
+    np.testing.assert_allclose(comparison['net_worth_buy'], table['net_worth_buy'], rtol=1e-10)
+
+
+def test_summarize_blocks_without_rows():
+    summary = summarize_blocks(iter(()), sums=('a',), first_true=('b',), final=('c',), collect=('a',))
+    assert summary['rows'] == 0
+    assert summary['sums'] == {'a': 0.0}
+    assert summary['first_true'] == {'b': None}
+    assert summary['final'] == {'c': None}
+    assert len(summary['table']) == 0
+
+
+@pytest.fixture
+def fx_history(tmp_path):
+    history = FxHistory(str(tmp_path))
+    days = np.arange(to_days('2015-01-01'), to_days('2019-12-31') + 1)
+    rng = np.random.default_rng(3)
+    history.write('USD', 'EUR', days, 0.9 * np.exp(np.cumsum(rng.normal(0, 0.004, len(days)))))
+    history.write('USD', 'JPY', days, 110 * np.exp(np.cumsum(rng.normal(0, 0.004, len(days)))))
+    return history
+
+
+@pytest.mark.parametrize('chunk_months', CHUNK_SIZES)
+@pytest.mark.parametrize('start_date', (None, '2016-01-31'))
+def test_currency_blocks_match_single_block(fx_history, start_date, chunk_months):
+    args = (300000, 5.0, 10, 'USD', ['USD', 'EUR', 'JPY'], {'USD': {'EUR': 0.01}}, start_date, fx_history)
+    single = calculate_mortgage_in_multiple_currencies(*args, chunk_months=None)
+    streamed = calculate_mortgage_in_multiple_currencies(*args, chunk_months=chunk_months)
+    assert_same_table(streamed, single)
+
+    summary = currency_summary(*args, chunk_months=chunk_months, columns=('month', 'payment_EUR'))
+    for currency in ('USD', 'EUR', 'JPY'):
+        assert summary['total_interest'][currency] == pytest.approx(single[f'interest_{currency}'].sum(), rel=1e-12)
+    if start_date is None:
+        assert summary['historical_months'] is None
+    else:
+        # Payments from 2016-01-31 to the end of 2019 are priced from history
+        assert summary['historical_months'] == {'EUR': 48, 'JPY': 48}
+    np.testing.assert_allclose(summary['schedule']['payment_EUR'], single['payment_EUR'], rtol=1e-12)
@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+
+from backend.core.sensitivities import calculate_sensitivities
+from backend.tests.helpers import SENSITIVITY_CONVENTIONS, check_sensitivities
+
+
+@pytest.mark.parametrize('frequency, compounding', SENSITIVITY_CONVENTIONS + (('weekly', 'monthly'),))
+def test_sensitivities_match_finite_differences(frequency, compounding):
+    problems = check_sensitivities(conventions=[(frequency, compounding)])
+    assert problems == [], '\n'.join(problems)
+
+
+def test_repaid_loans_have_no_balance_or_balance_sensitivity():
+    balance = calculate_sensitivities([200000.0], [5.0], [10.0], [120, 200])['remaining_loan']
+    for name in ('value', 'rate', 'term', 'principal'):
+        np.testing.assert_array_equal(balance[name], 0.0)
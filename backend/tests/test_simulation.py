@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.core.comparison import calculate_rent_vs_buy, simulate_rent_vs_buy, summarize_break_even
+
+RENT_VS_BUY = {
+    'property_value': 400000,
+    'down_payment': 80000,
+    'interest_rate': 6.0,
+    'loan_term_years': 30,
+    'monthly_rent': 1800,
+    'rent_growth_rate': 3.0,
+    'property_growth_rate': 4.0,
+    'maintenance_cost_percent': 1.0,
+    'property_tax_percent': 1.2,
+    'rental_income': 200,
+    'tax_benefit_rate': 15,
+    'inflation_rate': 2.5,
+    'opportunity_cost_rate': 6.0
+}
+
+
+@pytest.mark.parametrize('changes', [
+    {},
+    # Break-even late in the term, and never
+    {'property_growth_rate': -5.0, 'opportunity_cost_rate': 0},
+    {'down_payment': 300000, 'property_growth_rate': -5.0}
+])
+def test_zero_volatility_reproduces_deterministic_comparison(changes):
+    params = dict(RENT_VS_BUY, **changes)
+    expected = calculate_rent_vs_buy(**params)
+    bands, break_even_months = simulate_rent_vs_buy(
+        **params, paths=3, property_volatility=0, rent_volatility=0, investment_volatility=0, seed=1)
+
+    np.testing.assert_array_equal(bands['month'], expected['month'])
+    for q in (5, 50, 95):
+        np.testing.assert_allclose(bands[f'net_worth_buy_p{q}'], expected['net_worth_buy'], rtol=1e-8)
+        np.testing.assert_allclose(bands[f'net_worth_rent_p{q}'], expected['net_worth_rent'], rtol=1e-8)
+        np.testing.assert_allclose(bands[f'net_worth_difference_p{q}'],
+                                   expected['net_worth_buy'] - expected['net_worth_rent'],
+                                   rtol=1e-8, atol=1e-6 * params['property_value'])
+
+    break_even = expected['break_even'].to_numpy()
+    expected_month = int(expected['month'][break_even.argmax()]) if break_even.any() else -1
+    np.testing.assert_array_equal(break_even_months, expected_month)
+
+
+def test_seeded_runs_are_reproducible():
+    first = simulate_rent_vs_buy(**RENT_VS_BUY, paths=200, investment_volatility=10, seed=42)
+    second = simulate_rent_vs_buy(**RENT_VS_BUY, paths=200, investment_volatility=10, seed=42)
+    other = simulate_rent_vs_buy(**RENT_VS_BUY, paths=200, investment_volatility=10, seed=43)
+
+    pd.testing.assert_frame_equal(first[0], second[0])
+    np.testing.assert_array_equal(first[1], second[1])
+    assert not first[0].equals(other[0])
+
+
+def test_bands_are_ordered():
+    bands, _ = simulate_rent_vs_buy(**RENT_VS_BUY, paths=500, seed=7)
+    for name in ('net_worth_buy', 'net_worth_rent', 'net_worth_difference'):
+        columns = [bands[f'{name}_p{q}'] for q in (5, 25, 50, 75, 95)]
+        for lower, upper in zip(columns, columns[1:]):
+            assert (lower <= upper).all()
+
+
+@pytest.mark.parametrize('kwargs, message', [
+    ({'paths': 0}, 'paths must be at least 1'),
+    ({'property_rent_correlation': 0.9, 'property_investment_correlation': 0.9,
+      'rent_investment_correlation': -0.9}, 'valid correlation matrix')
+])
+def test_invalid_arguments(kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        simulate_rent_vs_buy(**RENT_VS_BUY, **kwargs)
+
+
+def test_summarize_break_even():
+    summary = summarize_break_even(np.array([5, 14, 14, -1, 30, -1, 24, 12]), 2.5, percentiles=(50,))
+    assert summary['probability'] == pytest.approx(6 / 8)
+    assert summary['percentiles'] == {50: 14.0}
+    # Month 30 is in the third (partial) year
+    np.testing.assert_array_equal(summary['by_year'], [2, 3, 1])
+
+    never = summarize_break_even(np.array([-1, -1]), 1)
+    assert never['probability'] == 0.0
+    assert never['percentiles'] == {}